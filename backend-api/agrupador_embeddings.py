@@ -0,0 +1,236 @@
+"""
+MÓDULO DE AGRUPACIÓN DE EMBEDDINGS (MICRO-BATCHING)
+Las consultas concurrentes piden su embedding por separado; este agrupador
+junta las peticiones que llegan dentro de una ventana corta (o hasta un tamaño
+máximo de lote), hace una sola llamada por lotes al modelo y reparte los
+vectores. Con mucho tráfico el rendimiento lo limita el tamaño del lote y no
+el coste fijo de cada llamada
+"""
+
+import os
+import time
+import queue
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from normalizacion_consultas import normalizar_consulta
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+VENTANA_MS = float(os.getenv("EMBEDDING_LOTE_VENTANA_MS", 8))  # Espera máxima para llenar un lote (0 = sin agrupar)
+MAX_LOTE = int(os.getenv("EMBEDDING_LOTE_MAX", 32))  # Textos por llamada al modelo
+LOTES_CONCURRENTES = int(os.getenv("EMBEDDING_LOTES_CONCURRENTES", 4))  # Llamadas por lotes en paralelo
+TIMEOUT_EMBEDDING = float(os.getenv("EMBEDDING_TIMEOUT", 30))  # Segundos que espera cada petición
+EMBEDDING_CACHE_MAX = int(os.getenv("EMBEDDING_CACHE_MAX", 2048))  # Consultas canónicas recordadas (0 = sin caché)
+
+_FIN = object()
+
+
+class AgrupadorEmbeddings:
+    """
+    Micro-batcher de embeddings para llamadas síncronas desde varios hilos
+    (las peticiones de la API se atienden en el pool de hilos, ver single_flight).
+
+    - Un hilo recolector abre un lote con la primera petición y lo cierra al
+      pasar `ventana_ms` o al llegar a `max_lote` textos
+    - El lote se envía a un pool de `lotes_concurrentes` hilos, así que el
+      recolector sigue juntando el siguiente mientras el anterior está en vuelo
+    - Textos repetidos dentro de un lote se calculan una sola vez
+    - Si la llamada falla, el error llega a todas las peticiones del lote
+
+    Args:
+        embed_fn: Función List[str] -> List[List[float]] (misma firma que EmbeddingsLocales.embed)
+        ventana_ms: Milisegundos de espera para llenar un lote
+        max_lote: Máximo de textos por llamada
+        lotes_concurrentes: Llamadas por lotes simultáneas
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        ventana_ms: float = VENTANA_MS,
+        max_lote: int = MAX_LOTE,
+        lotes_concurrentes: int = LOTES_CONCURRENTES,
+        timeout: float = TIMEOUT_EMBEDDING,
+    ):
+        self.embed_fn = embed_fn
+        self.ventana = max(0.0, ventana_ms) / 1000.0
+        self.max_lote = max(1, max_lote)
+        self.timeout = timeout
+        self._cola: "queue.Queue" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, lotes_concurrentes), thread_name_prefix="embeddings")
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.peticiones = 0
+        self.lotes = 0
+        self.textos_enviados = 0
+        self.errores = 0
+        self.espera_total = 0.0  # Segundos en cola antes de salir el lote
+        self.tamanos = Counter()
+
+    # --- Uso ---
+
+    def embed_query(self, texto: str) -> List[float]:
+        """Embedding de un texto; bloquea hasta que su lote se resuelve"""
+        if self.ventana == 0:
+            self._registrar_lote(1, 1, 0.0)
+            return self.embed_fn([texto])[0]
+        futuro = Future()
+        self._arrancar()
+        self._cola.put((texto, futuro, time.perf_counter()))
+        return futuro.result(timeout=self.timeout)
+
+    def embed(self, textos: List[str]) -> List[List[float]]:
+        """Varios textos de una petición: se encolan juntos y comparten lote con los demás"""
+        if self.ventana == 0:
+            self._registrar_lote(len(textos), len(set(textos)), 0.0)
+            return self.embed_fn(list(textos))
+        futuros = []
+        self._arrancar()
+        for texto in textos:
+            futuro = Future()
+            self._cola.put((texto, futuro, time.perf_counter()))
+            futuros.append(futuro)
+        return [futuro.result(timeout=self.timeout) for futuro in futuros]
+
+    def cerrar(self) -> None:
+        """Procesa lo pendiente y detiene el recolector"""
+        with self._lock:
+            hilo, self._hilo = self._hilo, None
+        if hilo is not None:
+            self._cola.put(_FIN)
+            hilo.join()
+        self._pool.shutdown(wait=True)
+
+    # --- Recolección ---
+
+    def _arrancar(self) -> None:
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._recolectar, name="agrupador-embeddings", daemon=True)
+                    self._hilo.start()
+
+    def _recolectar(self) -> None:
+        terminar = False
+        while not terminar:
+            primero = self._cola.get()
+            if primero is _FIN:
+                break
+            lote = [primero]
+            limite = time.perf_counter() + self.ventana
+            while len(lote) < self.max_lote:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                try:
+                    siguiente = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if siguiente is _FIN:
+                    terminar = True
+                    break
+                lote.append(siguiente)
+            self._pool.submit(self._procesar, lote)
+
+    def _procesar(self, lote: list) -> None:
+        salida = time.perf_counter()
+        unicos = list(dict.fromkeys(texto for texto, _, _ in lote))
+        self._registrar_lote(len(lote), len(unicos), sum(salida - llegada for _, _, llegada in lote))
+        try:
+            vectores = self.embed_fn(unicos)
+            if len(vectores) != len(unicos):
+                raise ValueError(f"{len(vectores)} embeddings para {len(unicos)} textos")
+        except Exception as e:
+            with self._lock:
+                self.errores += 1
+            for _, futuro, _ in lote:
+                futuro.set_exception(e)
+            return
+        por_texto = dict(zip(unicos, vectores))
+        for texto, futuro, _ in lote:
+            futuro.set_result(list(por_texto[texto]))
+
+    # --- Estadísticas ---
+
+    def _registrar_lote(self, peticiones: int, textos: int, espera: float) -> None:
+        with self._lock:
+            self.peticiones += peticiones
+            self.lotes += 1
+            self.textos_enviados += textos
+            self.espera_total += espera
+            self.tamanos[peticiones] += 1
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "ventana_ms": round(self.ventana * 1000, 2),
+                "max_lote": self.max_lote,
+                "peticiones": self.peticiones,
+                "lotes": self.lotes,
+                "llamadas_ahorradas": self.peticiones - self.lotes,
+                "tamano_medio_lote": round(self.peticiones / self.lotes, 2) if self.lotes else None,
+                "espera_media_ms": round(self.espera_total * 1000 / self.peticiones, 2) if self.peticiones else None,
+                "textos_enviados": self.textos_enviados,
+                "errores": self.errores,
+                "distribucion_tamanos": dict(sorted(self.tamanos.items())),
+            }
+
+
+class CacheEmbeddings:
+    """
+    LRU en memoria de embeddings de consultas, con clave canónica
+    (ver normalizacion_consultas): "Artículo 142" y "art. 142" comparten vector.
+    Lo que no está en caché se pide a `embed_query` (normalmente el agrupador).
+
+    Args:
+        embed_query: Función str -> List[float]
+        max_entradas: Consultas distintas que se recuerdan
+        clave: Función consulta -> clave de caché
+    """
+
+    def __init__(
+        self,
+        embed_query: Callable[[str], List[float]],
+        max_entradas: int = EMBEDDING_CACHE_MAX,
+        clave: Callable[[str], str] = normalizar_consulta,
+    ):
+        self.embed_query_fn = embed_query
+        self.max_entradas = max(0, max_entradas)
+        self.clave = clave
+        self._vectores: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def embed_query(self, texto: str) -> List[float]:
+        if self.max_entradas == 0:
+            return self.embed_query_fn(texto)
+        clave = self.clave(texto)
+        with self._lock:
+            vector = self._vectores.get(clave)
+            if vector is not None:
+                self._vectores.move_to_end(clave)
+                self.aciertos += 1
+                return list(vector)
+            self.fallos += 1
+        vector = self.embed_query_fn(texto)
+        with self._lock:
+            self._vectores[clave] = list(vector)
+            self._vectores.move_to_end(clave)
+            while len(self._vectores) > self.max_entradas:
+                self._vectores.popitem(last=False)
+        return vector
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._vectores),
+                "max_entradas": self.max_entradas,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else None,
+            }
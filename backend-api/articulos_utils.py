@@ -0,0 +1,305 @@
+"""
+MÓDULO DE UTILIDADES DE ARTÍCULOS
+Localiza artículos y estructura (Libro/Título/Capítulo) en el texto del Código Penal
+y divide el texto en chunks que respetan los límites de cada artículo
+"""
+
+import re
+from typing import List, Optional
+
+from existencia_articulos import clave_orden
+
+# --- CONFIGURACIÓN DE CHUNKING ---
+CHUNK_SIZE = 800  # Caracteres máximos por chunk
+CHUNK_OVERLAP = 100  # Overlap entre partes de un mismo artículo
+
+_SUFIJOS_LATINOS = r'bis|ter|quater|quinquies|sexies|septies|octies|nonies|decies'
+# Inicio de artículo: "Artículo 138." / "ARTÍCULO 138" al principio de línea (no referencias internas)
+PATRON_ENCABEZADO_ARTICULO = re.compile(
+    rf'^[ \t]*Art[íi\xed]culo\s+(\d+(?:\s+(?:{_SUFIJOS_LATINOS}))?)(?:\s*\.|[ \t]*$|\s*[-–])',
+    re.MULTILINE | re.IGNORECASE
+)
+# Patrón laxo original (acepta menciones en cualquier posición)
+PATRON_INICIO_ARTICULO_LAXO = re.compile(
+    rf'Art[ií\xed]culo\s+(\d+(?:\s+(?:{_SUFIJOS_LATINOS}))?)\s*\.?',
+    re.IGNORECASE
+)
+
+_ORDINAL = r'(?:PRELIMINAR|[IVXLC]+(?:\s+(?:BIS|TER|QUATER))?)'
+PATRONES_ESTRUCTURA = {
+    'libro': re.compile(rf'^[ \t]*(LIBRO\s+{_ORDINAL})[ \t]*$', re.MULTILINE),
+    'titulo': re.compile(rf'^[ \t]*(T[ÍI]TULO\s+{_ORDINAL})[ \t]*$', re.MULTILINE),
+    'capitulo': re.compile(rf'^[ \t]*(CAP[ÍI]TULO\s+{_ORDINAL})[ \t]*$', re.MULTILINE),
+}
+_NIVELES = ['libro', 'titulo', 'capitulo']
+
+
+def _epigrafe_siguiente(texto: str, desde: int) -> str:
+    """Primera línea no vacía tras un encabezado (el epígrafe: 'Del homicidio y sus formas')"""
+    for linea in texto[desde:desde + 300].split('\n'):
+        linea = linea.strip()
+        if linea:
+            return linea
+    return ""
+
+
+def localizar_estructura(texto: str) -> list:
+    """
+    Localiza encabezados de Libro/Título/Capítulo.
+
+    Returns:
+        Lista ordenada de {'nivel', 'inicio', 'etiqueta'} (etiqueta = "TÍTULO I. Del homicidio...")
+    """
+    encabezados = []
+    for nivel, patron in PATRONES_ESTRUCTURA.items():
+        for match in patron.finditer(texto):
+            nombre = re.sub(r'\s+', ' ', match.group(1).strip())
+            epigrafe = _epigrafe_siguiente(texto, match.end())
+            etiqueta = f"{nombre}. {epigrafe}" if epigrafe else nombre
+            encabezados.append({'nivel': nivel, 'inicio': match.start(), 'etiqueta': etiqueta})
+    encabezados.sort(key=lambda e: e['inicio'])
+    return encabezados
+
+
+def _numero(match: re.Match) -> str:
+    return re.sub(r'\s+', ' ', match.group(1).strip()).lower()
+
+
+def localizar_articulos(texto: str, patron=PATRON_ENCABEZADO_ARTICULO) -> list:
+    """
+    Localiza los artículos del texto con su intervalo y la estructura en la que se encuentran.
+
+    Returns:
+        Lista ordenada de {'numero', 'inicio', 'fin', 'libro', 'titulo', 'capitulo'}
+    """
+    return _articulos_desde_cabeceras(texto, [(m.start(), _numero(m)) for m in patron.finditer(texto)])
+
+
+def _articulos_desde_cabeceras(texto: str, matches: list) -> list:
+    """Intervalos y estructura a partir de las cabeceras [(inicio, numero)] en orden de documento"""
+    encabezados = localizar_estructura(texto)
+
+    articulos = []
+    contexto = {nivel: None for nivel in _NIVELES}
+    idx_encabezado = 0
+
+    for i, (inicio, numero) in enumerate(matches):
+        fin = matches[i + 1][0] if i < len(matches) - 1 else len(texto)
+
+        # Avanzar la estructura hasta este artículo (un nivel superior reinicia los inferiores)
+        while idx_encabezado < len(encabezados) and encabezados[idx_encabezado]['inicio'] < inicio:
+            encabezado = encabezados[idx_encabezado]
+            contexto[encabezado['nivel']] = encabezado['etiqueta']
+            for nivel in _NIVELES[_NIVELES.index(encabezado['nivel']) + 1:]:
+                contexto[nivel] = None
+            idx_encabezado += 1
+
+        # El texto del artículo termina donde empieza el siguiente encabezado de estructura
+        if idx_encabezado < len(encabezados) and encabezados[idx_encabezado]['inicio'] < fin:
+            fin = encabezados[idx_encabezado]['inicio']
+
+        articulos.append({
+            'numero': numero,
+            'inicio': inicio,
+            'fin': fin,
+            **contexto,
+        })
+
+    return articulos
+
+
+def localizar_articulos_documento(texto: str) -> list:
+    """
+    Igual que localizar_articulos, pero robusto a encabezados que el patrón
+    estricto no reconoce (PDFs sin saltos de línea, formatos raros): cada
+    artículo que falta se toma de la primera mención laxa que encaja en el
+    orden del documento (después del artículo anterior y antes del siguiente).
+    """
+    estrictas = [(m.start(), _numero(m)) for m in PATRON_ENCABEZADO_ARTICULO.finditer(texto)]
+    encontrados = {numero for _, numero in estrictas}
+    laxas = [
+        (m.start(), _numero(m)) for m in PATRON_INICIO_ARTICULO_LAXO.finditer(texto)
+        if _numero(m) not in encontrados
+    ]
+    if not laxas:
+        return _articulos_desde_cabeceras(texto, estrictas)
+
+    # Siguiente cabecera estricta (en orden de artículo) a partir de cada posición
+    flujo = sorted([(inicio, numero, True) for inicio, numero in estrictas] +
+                   [(inicio, numero, False) for inicio, numero in laxas])
+    siguiente_estricta = [None] * len(flujo)
+    proxima = None
+    for i in range(len(flujo) - 1, -1, -1):
+        siguiente_estricta[i] = proxima
+        if flujo[i][2]:
+            proxima = clave_orden(flujo[i][1])
+
+    cabeceras, ultima = [], None
+    for i, (inicio, numero, estricta) in enumerate(flujo):
+        clave = clave_orden(numero)
+        if not estricta:
+            if clave is None or numero in encontrados:
+                continue
+            if (ultima is not None and clave <= ultima) or (
+                    siguiente_estricta[i] is not None and clave >= siguiente_estricta[i]):
+                continue  # Referencia interna fuera de orden, no un encabezado
+            encontrados.add(numero)
+        cabeceras.append((inicio, numero))
+        ultima = clave if clave is not None else ultima
+    return _articulos_desde_cabeceras(texto, cabeceras)
+
+
+def extraer_epigrafes(texto: str, max_chars_epigrafe: int = 90) -> list:
+    """
+    Encabezados de Libro/Título/Capítulo con los artículos que abarcan y, si el
+    documento los tiene, epígrafes de artículo ("Artículo 138. Homicidio." en su
+    propia línea). Alimenta el índice de sugerencias (typeahead).
+
+    Returns:
+        Lista en orden de documento de {'tipo', 'etiqueta', 'articulos'}
+        (tipo: libro | titulo | capitulo | articulo)
+    """
+    entradas = []
+    por_etiqueta = {}
+    for articulo in localizar_articulos_documento(texto):
+        for nivel in _NIVELES:
+            etiqueta = articulo[nivel]
+            if not etiqueta:
+                continue
+            clave = (nivel, etiqueta)
+            if clave not in por_etiqueta:
+                por_etiqueta[clave] = {'tipo': nivel, 'etiqueta': etiqueta, 'articulos': []}
+                entradas.append(por_etiqueta[clave])
+            if articulo['numero'] not in por_etiqueta[clave]['articulos']:
+                por_etiqueta[clave]['articulos'].append(articulo['numero'])
+
+        linea = texto[articulo['inicio']:articulo['fin']].split('\n', 1)[0]
+        epigrafe = re.sub(r'^\s*Art[íi\xed]culo\s+[^.]+\.\s*', '', linea, flags=re.IGNORECASE).strip()
+        if epigrafe and len(epigrafe) <= max_chars_epigrafe and not epigrafe[0].isdigit():
+            entradas.append({
+                'tipo': 'articulo',
+                'etiqueta': f"Artículo {articulo['numero']}. {epigrafe}",
+                'articulos': [articulo['numero']],
+            })
+    return entradas
+
+
+def construir_indice_articulos(texto: str) -> dict:
+    """Construye el índice {numero_articulo: texto} usado como ARTICULOS_CACHE"""
+    indice = {}
+    for articulo in localizar_articulos_documento(texto):
+        texto_articulo = texto[articulo['inicio']:articulo['fin']].strip()
+        # Limpiar saltos de línea excesivos pero mantener estructura
+        indice[articulo['numero']] = re.sub(r'\n{3,}', '\n\n', texto_articulo)
+    return indice
+
+
+def _partir_intervalo(texto: str, inicio: int, fin: int, chunk_size: int, overlap: int) -> list:
+    """
+    Parte texto[inicio:fin] en intervalos de como máximo chunk_size caracteres,
+    cortando en salto de línea o espacio si está en el último 30%.
+
+    Returns:
+        Lista de (char_start, char_end) ya sin espacios en los bordes
+    """
+    intervalos = []
+    start = inicio
+    while start < fin:
+        end = min(start + chunk_size, fin)
+        if end < fin:
+            corte = texto.rfind('\n', start, end)
+            if corte == -1:
+                corte = texto.rfind(' ', start, end)
+            if corte - start > chunk_size * 0.7:
+                end = corte
+
+        # Recortar espacios de los bordes manteniendo offsets exactos
+        s, e = start, end
+        while s < e and texto[s].isspace():
+            s += 1
+        while e > s and texto[e - 1].isspace():
+            e -= 1
+        if s < e:
+            intervalos.append((s, e))
+
+        if end >= fin:
+            break
+        start = max(end - overlap, start + 1)
+    return intervalos
+
+
+def dividir_por_articulos(
+    texto: str,
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+    source: str = ""
+) -> List[dict]:
+    """
+    ⚡ MEJORA #12: Chunking consciente de artículos
+
+    Cada chunk pertenece a un único artículo. Los artículos que no caben en
+    chunk_size se dividen en partes con overlap dentro del propio artículo.
+    El texto anterior al primer artículo (preámbulo) se trocea sin número de artículo.
+
+    Returns:
+        Lista de chunks {'id', 'text', 'source', 'articulo', 'parte', 'total_partes',
+        'char_start', 'char_end', 'libro', 'titulo', 'capitulo'}
+    """
+    articulos = localizar_articulos_documento(texto)
+    segmentos = []
+    if not articulos:
+        segmentos.append({'numero': None, 'inicio': 0, 'fin': len(texto),
+                          'libro': None, 'titulo': None, 'capitulo': None})
+    else:
+        if articulos[0]['inicio'] > 0:
+            segmentos.append({'numero': None, 'inicio': 0, 'fin': articulos[0]['inicio'],
+                              'libro': None, 'titulo': None, 'capitulo': None})
+        previo_fin = None
+        for articulo in articulos:
+            # Texto de estructura entre artículos (encabezados de Título/Capítulo)
+            if previo_fin is not None and articulo['inicio'] > previo_fin:
+                segmentos.append({'numero': None, 'inicio': previo_fin, 'fin': articulo['inicio'],
+                                  'libro': articulo['libro'], 'titulo': articulo['titulo'],
+                                  'capitulo': articulo['capitulo']})
+            segmentos.append(articulo)
+            previo_fin = articulo['fin']
+
+    chunks = []
+    for segmento in segmentos:
+        intervalos = _partir_intervalo(texto, segmento['inicio'], segmento['fin'], chunk_size, overlap)
+        for parte, (char_start, char_end) in enumerate(intervalos, 1):
+            chunks.append({
+                'id': f"chunk_{len(chunks)}",
+                'text': texto[char_start:char_end],
+                'source': source,
+                'articulo': segmento['numero'],
+                'parte': parte,
+                'total_partes': len(intervalos),
+                'char_start': char_start,
+                'char_end': char_end,
+                'libro': segmento['libro'],
+                'titulo': segmento['titulo'],
+                'capitulo': segmento['capitulo'],
+            })
+    return chunks
+
+
+def metadata_pinecone(chunk: dict) -> dict:
+    """Metadata de un chunk para Pinecone (Pinecone no admite valores nulos)"""
+    campos = ['text', 'source', 'articulo', 'parte', 'total_partes',
+              'char_start', 'char_end', 'pagina', 'libro', 'titulo', 'capitulo']
+    return {campo: chunk[campo] for campo in campos if chunk.get(campo) not in (None, "")}
+
+
+def filtro_articulo(numero_articulo: Optional[str]) -> Optional[dict]:
+    """Filtro de metadata de Pinecone para recuperar solo los chunks de un artículo"""
+    if not numero_articulo:
+        return None
+    return {"articulo": {"$eq": re.sub(r'\s+', ' ', numero_articulo.strip())}}
+
+
+def filtro_articulos(numeros: List[str]) -> Optional[dict]:
+    """Filtro de metadata de Pinecone para los chunks de varios artículos ($in)"""
+    if not numeros:
+        return None
+    return {"articulo": {"$in": [re.sub(r'\s+', ' ', n.strip()) for n in numeros]}}
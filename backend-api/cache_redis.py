@@ -0,0 +1,264 @@
+"""
+MÓDULO DE CACHÉ REDIS
+Pool de conexiones compartido entre peticiones, valores binarios compactos
+(msgpack + zlib), lecturas y escrituras en bloque (MGET y pipelines) y recuento
+de artículos con un índice mantenido por documento en lugar de KEYS
+"""
+
+import os
+import json
+import time
+import zlib
+import threading
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import msgpack
+except ImportError:  # Opcional: sin msgpack los valores se guardan en JSON (también comprimido)
+    msgpack = None
+
+from corpus import clave_articulo
+from normalizacion_consultas import numero_canonico
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+REDIS_MAX_CONEXIONES = int(os.getenv("REDIS_MAX_CONEXIONES", 20))  # Conexiones del pool compartido
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", 2))  # Segundos por operación y de espera de conexión libre
+UMBRAL_COMPRESION = int(os.getenv("REDIS_UMBRAL_COMPRESION", 512))  # Bytes a partir de los que se comprime
+
+# Cabecera de 1 byte: formato (bits bajos) + compresión. Nunca coincide con "{",
+# así que los valores JSON antiguos se siguen leyendo
+_FORMATO_MSGPACK = 0x01
+_FORMATO_JSON = 0x02
+_COMPRIMIDO = 0x10
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def codificar(valor: dict) -> bytes:
+    """dict -> bytes (msgpack o JSON; zlib si el valor es grande y comprime)"""
+    if msgpack is not None:
+        cuerpo, cabecera = msgpack.packb(valor, use_bin_type=True), _FORMATO_MSGPACK
+    else:
+        cuerpo = json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        cabecera = _FORMATO_JSON
+    if len(cuerpo) >= UMBRAL_COMPRESION:
+        comprimido = zlib.compress(cuerpo, 6)
+        if len(comprimido) < len(cuerpo):
+            return bytes([cabecera | _COMPRIMIDO]) + comprimido
+    return bytes([cabecera]) + cuerpo
+
+
+def decodificar(datos) -> Optional[dict]:
+    """
+    bytes -> dict. Acepta también los valores JSON del formato anterior.
+    Devuelve None si el valor no se puede leer (se trata como fallo de caché).
+    """
+    if not datos:
+        return None
+    if isinstance(datos, str):
+        datos = datos.encode("utf-8")
+    try:
+        if datos[:1] == b"{":
+            return json.loads(datos)
+        cabecera, cuerpo = datos[0], datos[1:]
+        if cabecera & _COMPRIMIDO:
+            cuerpo = zlib.decompress(cuerpo)
+        formato = cabecera & 0x0F
+        if formato == _FORMATO_JSON:
+            return json.loads(cuerpo)
+        if formato == _FORMATO_MSGPACK and msgpack is not None:
+            return msgpack.unpackb(cuerpo, raw=False)
+    except (ValueError, zlib.error) as e:
+        print(f"⚠️ Valor de Redis ilegible: {e}")
+        return None
+    print(f"⚠️ Formato de valor de Redis no soportado (cabecera {datos[0]:#x})")
+    return None
+
+
+def pool_compartido(host: str, port: int, db: int, max_conexiones: int = REDIS_MAX_CONEXIONES):
+    """
+    Pool de conexiones único para todo el proceso. Con todas las conexiones
+    ocupadas se espera hasta REDIS_TIMEOUT en lugar de abrir conexiones sin límite.
+    """
+    global _pool
+    import redis
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = redis.BlockingConnectionPool(
+                host=host,
+                port=port,
+                db=db,
+                max_connections=max_conexiones,
+                timeout=REDIS_TIMEOUT,
+                socket_connect_timeout=5,
+                socket_timeout=REDIS_TIMEOUT,
+                health_check_interval=30,
+            )
+        return _pool
+
+
+def conectar(host: str, port: int, db: int):
+    """Cliente binario (sin decode_responses) sobre el pool compartido"""
+    import redis
+    return redis.Redis(connection_pool=pool_compartido(host, port, db))
+
+
+# Borra el lock solo si sigue siendo nuestro; GET + DELETE por separado podría
+# borrar el lock que otro worker tomó al caducar el nuestro entre ambas llamadas
+_SCRIPT_LIBERAR_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def liberar_lock(cliente, clave: str, token: str) -> bool:
+    """Compare-and-delete atómico del lock `clave` tomado con `token`"""
+    return bool(cliente.eval(_SCRIPT_LIBERAR_LOCK, 1, clave, token))
+
+
+def clave_respuesta(documento_id: str, numero: str) -> str:
+    """Respuesta ya formateada de un artículo (ruta directa sin LLM o formateada por Gemini)"""
+    return f"respuesta:{documento_id}:{numero_canonico(numero)}"
+
+
+def clave_comparacion(documento_id: str, version: str, art1: str, art2: str) -> str:
+    """Resultado de /comparar; la versión del documento invalida las comparaciones tras un reindexado"""
+    return f"comparacion:{documento_id}:{version}:{numero_canonico(art1)}:{numero_canonico(art2)}"
+
+
+def clave_indice(documento_id: str) -> str:
+    """ZSET de los artículos cacheados de un documento (miembro = número, score = caducidad)"""
+    return f"indice_articulos:{documento_id}"
+
+
+class CacheArticulos:
+    """
+    Caché de artículos en Redis con operaciones en bloque.
+
+    - Lecturas de varios artículos (rangos, comparaciones) con un único MGET
+    - Escrituras en un pipeline: SET con TTL + alta en el índice del documento
+    - Recuento sin KEYS: el índice (ZSET) se purga de entradas caducadas y se cuenta con ZCARD
+
+    Args:
+        cliente: Cliente Redis (ver conectar)
+        ttl: Segundos de vida de cada artículo
+    """
+
+    def __init__(self, cliente, ttl: int = 86400):
+        self.cliente = cliente
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _contar(self, aciertos: int, fallos: int) -> None:
+        with self._lock:
+            self.aciertos += aciertos
+            self.fallos += fallos
+
+    # --- Lectura ---
+
+    def obtener(self, documento_id: str, numero: str) -> Optional[dict]:
+        return self.obtener_varios(documento_id, [numero]).get(numero)
+
+    def obtener_varios(self, documento_id: str, numeros: List[str]) -> Dict[str, dict]:
+        """{numero: {'numero', 'texto', 'metadata', 'cached_at'}} de los artículos presentes (un MGET)"""
+        if not numeros:
+            return {}
+        valores = self.cliente.mget([clave_articulo(documento_id, n) for n in numeros])
+        encontrados = {}
+        for numero, valor in zip(numeros, valores):
+            datos = decodificar(valor)
+            if datos is not None:
+                encontrados[numero] = datos
+        self._contar(len(encontrados), len(numeros) - len(encontrados))
+        return encontrados
+
+    def obtener_respuesta(self, documento_id: str, numero: str) -> Optional[str]:
+        datos = decodificar(self.cliente.get(clave_respuesta(documento_id, numero)))
+        self._contar(int(datos is not None), int(datos is None))
+        return datos.get("respuesta") if datos else None
+
+    def obtener_comparacion(self, documento_id: str, version: str, art1: str, art2: str) -> Optional[dict]:
+        datos = decodificar(self.cliente.get(clave_comparacion(documento_id, version, art1, art2)))
+        self._contar(int(datos is not None), int(datos is None))
+        return datos
+
+    # --- Escritura ---
+
+    def guardar(self, documento_id: str, numero: str, texto: str, metadata: dict = None) -> bool:
+        return self.guardar_varios(documento_id, {numero: texto}, metadata) == 1
+
+    def guardar_varios(self, documento_id: str, articulos: Dict[str, str], metadata: dict = None) -> int:
+        """Guarda {numero: texto} en un único viaje de red; devuelve cuántos se escribieron"""
+        if not articulos:
+            return 0
+        ahora = time.time()
+        indice = clave_indice(documento_id)
+        pipe = self.cliente.pipeline(transaction=False)
+        for numero, texto in articulos.items():
+            valor = codificar({
+                "numero": numero,
+                "texto": texto,
+                "metadata": metadata or {},
+                "cached_at": ahora,
+            })
+            pipe.set(clave_articulo(documento_id, numero), valor, ex=self.ttl)
+        pipe.zadd(indice, {numero_canonico(numero): ahora + self.ttl for numero in articulos})
+        pipe.expire(indice, self.ttl)
+        resultados = pipe.execute()
+        return sum(1 for r in resultados[:len(articulos)] if r)
+
+    def guardar_respuestas(self, documento_id: str, respuestas: Dict[str, str]) -> int:
+        """Guarda {numero: respuesta formateada} en un único pipeline"""
+        if not respuestas:
+            return 0
+        pipe = self.cliente.pipeline(transaction=False)
+        for numero, respuesta in respuestas.items():
+            pipe.set(clave_respuesta(documento_id, numero), codificar({"respuesta": respuesta}), ex=self.ttl)
+        return sum(1 for r in pipe.execute() if r)
+
+    def guardar_comparacion(self, documento_id: str, version: str, art1: str, art2: str, resultado: dict) -> bool:
+        return bool(self.cliente.set(
+            clave_comparacion(documento_id, version, art1, art2), codificar(resultado), ex=self.ttl
+        ))
+
+    def invalidar(self, documento_id: str, numeros: Iterable[str]) -> int:
+        """Borra los artículos indicados (y sus respuestas) y los saca del índice; devuelve las claves borradas"""
+        numeros = list(numeros)
+        if not numeros:
+            return 0
+        borrados = self.cliente.delete(
+            *[clave_articulo(documento_id, n) for n in numeros],
+            *[clave_respuesta(documento_id, n) for n in numeros]
+        )
+        self.cliente.zrem(clave_indice(documento_id), *[numero_canonico(n) for n in numeros])
+        return borrados
+
+    # --- Estadísticas ---
+
+    def contar(self, documentos: Iterable[str]) -> Dict[str, int]:
+        """Artículos cacheados por documento (O(log n) por documento, un único viaje de red)"""
+        documentos = list(documentos)
+        pipe = self.cliente.pipeline(transaction=False)
+        for documento_id in documentos:
+            pipe.zremrangebyscore(clave_indice(documento_id), "-inf", time.time())
+            pipe.zcard(clave_indice(documento_id))
+        resultados = pipe.execute()
+        return {doc: int(resultados[2 * i + 1]) for i, doc in enumerate(documentos)}
+
+    def estadisticas(self, documentos: Iterable[str]) -> dict:
+        por_documento = self.contar(documentos)
+        consultas = self.aciertos + self.fallos
+        return {
+            "total_keys": sum(por_documento.values()),
+            "por_documento": por_documento,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else None,
+            "codificacion": "msgpack+zlib" if msgpack is not None else "json+zlib",
+        }
@@ -0,0 +1,204 @@
+"""
+MÓDULO DE CALENTAMIENTO DE CACHÉ
+Precarga en Redis todos los artículos de un documento, sus respuestas ya
+formateadas y las comparaciones más consultadas, en lotes con pipeline.
+Es idempotente (sello de versión por documento) y un lock SET NX evita que
+varios workers llenen las mismas claves a la vez.
+
+Uso (sin levantar la API):
+    python calentamiento_cache.py [--documento cp] [--forzar] [--comparaciones]
+Con --comparaciones los pares populares se piden a la API en marcha (API_URL),
+que genera cada comparación con Gemini y la guarda en Redis.
+"""
+
+import os
+import json
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from cache_redis import CacheArticulos, liberar_lock
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+LOTE_CALENTAMIENTO = int(os.getenv("CACHE_LOTE_CALENTAMIENTO", 200))  # Artículos por pipeline
+LOCK_TTL = 300  # Segundos; si el worker que calienta muere, otro puede reintentar
+
+# Pares más consultados en /comparar (formato "138-142,234-237"; vacío = lista por defecto)
+PARES_COMPARACION_POPULARES = [
+    ("138", "142"),  # Homicidio doloso vs imprudente
+    ("138", "139"),  # Homicidio vs asesinato
+    ("234", "237"),  # Hurto vs robo
+    ("237", "242"),  # Robo con fuerza vs con violencia o intimidación
+    ("147", "148"),  # Lesiones: tipo básico vs agravado
+    ("248", "253"),  # Estafa vs apropiación indebida
+    ("169", "172"),  # Amenazas vs coacciones
+    ("178", "181"),  # Agresión sexual
+    ("368", "369"),  # Tráfico de drogas: tipo básico vs agravado
+    ("379", "380"),  # Conducción temeraria
+]
+
+
+def pares_configurados(valor: Optional[str] = None) -> List[Tuple[str, str]]:
+    """Lee CACHE_PARES_COMPARACION ("138-142,234-237") o devuelve la lista por defecto"""
+    valor = valor if valor is not None else os.getenv("CACHE_PARES_COMPARACION", "")
+    pares = []
+    for par in valor.split(","):
+        if "-" in par:
+            art1, art2 = (p.strip() for p in par.split("-", 1))
+            pares.append((art1, art2))
+    return pares or list(PARES_COMPARACION_POPULARES)
+
+
+def clave_version(documento_id: str) -> str:
+    return f"cache_version:{documento_id}"
+
+
+def clave_lock(documento_id: str) -> str:
+    return f"calentamiento:{documento_id}"
+
+
+def _lotes(elementos: List, tamano: int) -> Iterable[List]:
+    for i in range(0, len(elementos), max(1, tamano)):
+        yield elementos[i:i + tamano]
+
+
+def calentar_cache(
+    cache: CacheArticulos,
+    documento_id: str,
+    articulos: Dict[str, str],
+    version: str,
+    formatear: Optional[Callable[[str, str], Optional[str]]] = None,
+    comparar: Optional[Callable[[str, str], Optional[dict]]] = None,
+    pares: Iterable[Tuple[str, str]] = (),
+    lote: int = LOTE_CALENTAMIENTO,
+    forzar: bool = False,
+) -> dict:
+    """
+    Carga el documento en Redis si la versión guardada no coincide con `version`.
+
+    Args:
+        cache: Caché de artículos (cliente Redis compartido)
+        documento_id: Documento del corpus
+        articulos: Índice {numero: texto} del documento
+        version: Versión del índice (ver corpus.version_articulos)
+        formatear: Función (numero, texto) -> respuesta directa, o None para no precalcularla
+        comparar: Función (art1, art2) -> resultado de /comparar (p.ej. llamada a Gemini)
+        pares: Pares de artículos a comparar por adelantado
+        lote: Artículos por pipeline
+        forzar: Recargar aunque la versión coincida
+
+    Returns:
+        Dict con estado ("al_dia", "en_curso" o "calentado") y contadores
+    """
+    cliente = cache.cliente
+    inicio = time.time()
+    version_guardada = cliente.get(clave_version(documento_id))
+    if isinstance(version_guardada, bytes):
+        version_guardada = version_guardada.decode("utf-8")
+    if not forzar and version_guardada == version:
+        return {"estado": "al_dia", "documento": documento_id, "version": version}
+
+    # Solo un worker calienta cada documento; el resto sigue atendiendo con la caché en memoria
+    token = uuid.uuid4().hex
+    if not cliente.set(clave_lock(documento_id), token, nx=True, ex=LOCK_TTL):
+        return {"estado": "en_curso", "documento": documento_id, "version": version}
+
+    resultado = {"estado": "calentado", "documento": documento_id, "version": version,
+                 "articulos": 0, "respuestas": 0, "comparaciones": 0}
+    try:
+        numeros = list(articulos)
+        for grupo in _lotes(numeros, lote):
+            resultado["articulos"] += cache.guardar_varios(documento_id, {n: articulos[n] for n in grupo})
+            if formatear:
+                respuestas = {n: formatear(n, articulos[n]) for n in grupo}
+                resultado["respuestas"] += cache.guardar_respuestas(
+                    documento_id, {n: r for n, r in respuestas.items() if r}
+                )
+
+        if comparar:
+            for art1, art2 in pares:
+                if art1 not in articulos or art2 not in articulos:
+                    continue
+                if cache.obtener_comparacion(documento_id, version, art1, art2):
+                    resultado["comparaciones"] += 1
+                    continue
+                try:
+                    comparacion = comparar(art1, art2)
+                except Exception as e:
+                    print(f"⚠️ No se pudo precalcular la comparación {art1} vs {art2}: {e}")
+                    continue
+                if comparacion and "error" not in comparacion:
+                    cache.guardar_comparacion(documento_id, version, art1, art2, comparacion)
+                    resultado["comparaciones"] += 1
+
+        # El sello se escribe al final: un calentamiento interrumpido se repite entero
+        cliente.set(clave_version(documento_id), version, ex=cache.ttl)
+    finally:
+        liberar_lock(cliente, clave_lock(documento_id), token)
+
+    resultado["duracion_s"] = round(time.time() - inicio, 2)
+    return resultado
+
+
+def comparar_via_api(api_url: str, documento_id: str) -> Callable[[str, str], Optional[dict]]:
+    """Comparador que llama a GET {api_url}/comparar (la API guarda el resultado en Redis)"""
+    import urllib.parse
+    import urllib.request
+
+    def comparar(art1: str, art2: str) -> Optional[dict]:
+        parametros = urllib.parse.urlencode({"art1": art1, "art2": art2, "documento": documento_id})
+        with urllib.request.urlopen(f"{api_url.rstrip('/')}/comparar?{parametros}", timeout=120) as respuesta:
+            return json.loads(respuesta.read().decode("utf-8"))
+
+    return comparar
+
+
+def main():
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    import cache_redis
+    from corpus import RegistroCorpus, cargar_documentos, CORPUS_CONFIG, DOCUMENTO_POR_DEFECTO
+    from extraccion_pdf import extraer_texto_pdf
+    from formato_utils import formatear_respuesta_articulo
+
+    parser = argparse.ArgumentParser(description='Precarga en Redis los artículos de un documento del corpus')
+    parser.add_argument('--documento', type=str, default=DOCUMENTO_POR_DEFECTO,
+                        help=f'Documento del corpus (default: {DOCUMENTO_POR_DEFECTO})')
+    parser.add_argument('--forzar', action='store_true', help='Recargar aunque la versión en Redis coincida')
+    parser.add_argument('--comparaciones', action='store_true',
+                        help='Precalcular también las comparaciones populares a través de la API (API_URL)')
+    args = parser.parse_args()
+
+    registro = RegistroCorpus(
+        cargar_documentos(CORPUS_CONFIG, os.getenv("PDF_PATH", "../documentos/codigo_penal.pdf")),
+        cargar_texto=lambda ruta: extraer_texto_pdf(ruta, motor="pypdf2")['texto'],
+    )
+    documento = registro.documento(args.documento)
+    cliente = cache_redis.conectar(
+        os.getenv("REDIS_HOST", "localhost"),
+        int(os.getenv("REDIS_PORT", 6379)),
+        int(os.getenv("REDIS_DB", 0)),
+    )
+    cliente.ping()
+    cache = CacheArticulos(cliente, int(os.getenv("REDIS_TTL", 86400)))
+
+    api_url = os.getenv("API_URL")
+    if args.comparaciones and not api_url:
+        print("⚠️ API_URL no configurada - se omiten las comparaciones")
+    resultado = calentar_cache(
+        cache,
+        documento.id,
+        registro.articulos(documento.id),
+        registro.version(documento.id),
+        formatear=formatear_respuesta_articulo,
+        comparar=comparar_via_api(api_url, documento.id) if args.comparaciones and api_url else None,
+        pares=pares_configurados(),
+        forzar=args.forzar,
+    )
+    print(f"🔥 Calentamiento '{documento.id}': {resultado}")
+
+
+if __name__ == "__main__":
+    main()
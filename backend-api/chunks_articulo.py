@@ -0,0 +1,130 @@
+"""
+MÓDULO DE RECUPERACIÓN DIRECTA DE CHUNKS POR ARTÍCULO
+Cuando la consulta nombra un artículo que falta (o está incompleto) en el índice
+exacto, en lugar de embeber una plantilla ("Contenido literal del Código Penal
+Artículo N...") y confiar en la búsqueda semántica, se traen por id exactamente
+los chunks de ese artículo. El mapa artículo -> ids lo escribe la ingesta en el
+manifiesto de reindexado (reindexado_utils.guardar_manifiesto): sin llamada de
+embedding, sin búsqueda por similitud y con resultado determinista.
+"""
+
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+from reindexado_utils import cargar_manifiesto, ids_por_articulo
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+CHUNKS_POR_ID = os.getenv("CHUNKS_POR_ID", "true").lower() == "true"  # Si hay manifiesto de ingesta
+MANIFEST_DIR = os.getenv("INGESTA_MANIFEST_DIR", ".")  # El mismo directorio que usa la ingesta
+BATCH_FETCH = 100  # Máximo de ids por petición de fetch en Pinecone
+
+
+def matches_desde_fetch(respuesta, ids: List[str]) -> List[dict]:
+    """
+    Convierte la respuesta de index.fetch de Pinecone (objeto o dict) al formato
+    de búsqueda {'id', 'score', 'metadata'}, en el orden de `ids`. Score 1.0:
+    no hay similitud que medir y así el filtrado por umbral no los descarta.
+    """
+    vectores = respuesta.get('vectors', {}) if isinstance(respuesta, dict) else getattr(respuesta, 'vectors', {})
+    matches = []
+    for id_ in ids:
+        vector = vectores.get(id_)
+        if vector is None:
+            continue
+        metadata = vector.get('metadata') if isinstance(vector, dict) else getattr(vector, 'metadata', None)
+        matches.append({'id': id_, 'score': 1.0, 'metadata': dict(metadata or {})})
+    return matches
+
+
+def fetch_pinecone(index, ids: List[str], namespace: str = "") -> dict:
+    """Chunks por id en Pinecone (en lotes) en formato {'matches': [...]}"""
+    matches = []
+    for i in range(0, len(ids), BATCH_FETCH):
+        lote = ids[i:i + BATCH_FETCH]
+        matches.extend(matches_desde_fetch(index.fetch(ids=lote, namespace=namespace), lote))
+    return {'matches': matches}
+
+
+class ChunksPorArticulo:
+    """
+    Mapas artículo -> ids de chunk por documento, leídos bajo demanda del
+    manifiesto de la ingesta. Un documento sin manifiesto sigue con la
+    búsqueda vectorial filtrada por artículo.
+
+    Args:
+        ruta_por_documento: Función Documento -> ruta del manifiesto (o None)
+    """
+
+    def __init__(self, ruta_por_documento: Callable[[object], Optional[str]]):
+        self.ruta_por_documento = ruta_por_documento
+        self._mapas: Dict[str, Dict[str, List[str]]] = {}
+        self._lock = threading.Lock()
+        self._fetches = 0
+        self._fallbacks = 0
+
+    def _mapa(self, documento) -> Dict[str, List[str]]:
+        with self._lock:
+            if documento.id not in self._mapas:
+                ruta = self.ruta_por_documento(documento)
+                mapa = {}
+                try:
+                    mapa = ids_por_articulo(cargar_manifiesto(ruta)) if ruta else {}
+                except Exception as e:
+                    print(f"⚠️ No se pudo leer el manifiesto de '{documento.id}': {e}")
+                if mapa:
+                    print(f"✅ Mapa artículo→chunks de '{documento.id}': {len(mapa)} artículos ({ruta})")
+                else:
+                    print(f"ℹ️  '{documento.id}' sin mapa artículo→chunks ({ruta}) - búsqueda vectorial por artículo")
+                self._mapas[documento.id] = mapa
+            return self._mapas[documento.id]
+
+    def ids(self, documento, numero_articulo: str) -> List[str]:
+        """Ids de los chunks del artículo en orden de documento ([] si no se conocen)"""
+        return list(self._mapa(documento).get(re.sub(r'\s+', ' ', numero_articulo.strip()), []))
+
+    def articulos(self, documento) -> List[str]:
+        """Artículos con chunks registrados por la ingesta"""
+        return list(self._mapa(documento))
+
+    def recuperar(self, documento, numero_articulo: str, fetch: Callable[[List[str]], dict]) -> Optional[dict]:
+        """
+        Trae por id todos los chunks del artículo.
+
+        Args:
+            fetch: Función ids -> {'matches': [...]} (Pinecone o índice local)
+
+        Returns:
+            {'matches': [...]} en orden de partes, o None si el artículo no está en el
+            mapa o el índice no tiene todos sus chunks (manifiesto desfasado)
+        """
+        ids = self.ids(documento, numero_articulo)
+        if not ids:
+            return None
+        results = fetch(ids)
+        if len(results['matches']) < len(ids):
+            with self._lock:
+                self._fallbacks += 1
+            print(f"⚠️ Art. {numero_articulo}: {len(results['matches'])}/{len(ids)} chunks en el índice - "
+                  f"manifiesto desfasado, se usa la búsqueda vectorial")
+            return None
+        with self._lock:
+            self._fetches += 1
+        return results
+
+    def invalidar(self, documento_id: Optional[str] = None) -> None:
+        """Relee el manifiesto en la próxima consulta (tras una reindexación)"""
+        with self._lock:
+            if documento_id is None:
+                self._mapas.clear()
+            else:
+                self._mapas.pop(documento_id, None)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "articulos_por_documento": {doc_id: len(mapa) for doc_id, mapa in self._mapas.items()},
+                "fetches_por_id": self._fetches,
+                "fallbacks_a_vectorial": self._fallbacks,
+            }
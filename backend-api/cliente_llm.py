@@ -0,0 +1,242 @@
+"""
+MÓDULO CLIENTE LLM CON PLAZOS, REINTENTOS Y PETICIONES DE COBERTURA
+Envoltorio de GenerativeModel (Gemini) para recortar la latencia de cola:
+
+- Un único modelo por proceso (el canal gRPC de Vertex AI se mantiene abierto
+  y se reutiliza entre peticiones) con calentamiento opcional al arrancar
+- Plazo por llamada: la petición no espera más de `plazo` segundos
+- Reintentos con backoff exponencial y jitter completo ante errores transitorios
+- Cobertura (hedging) opcional: si la respuesta tarda más que el p95 observado,
+  se lanza una segunda petición idéntica y gana la primera que llegue
+- Métricas de latencia (p50/p95/p99) con y sin cobertura
+"""
+
+import os
+import math
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Optional
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+LLM_PLAZO = float(os.getenv("LLM_PLAZO", 60))  # Segundos máximos por llamada (reintentos incluidos)
+LLM_REINTENTOS = int(os.getenv("LLM_REINTENTOS", 2))  # Reintentos ante errores transitorios
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 0.5))  # Segundos del primer backoff
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 8))
+LLM_COBERTURA = os.getenv("LLM_COBERTURA", "false").lower() == "true"  # Hedging
+LLM_COBERTURA_PERCENTIL = float(os.getenv("LLM_COBERTURA_PERCENTIL", 95))
+LLM_COBERTURA_MAX_FRACCION = float(os.getenv("LLM_COBERTURA_MAX_FRACCION", 0.1))  # Tope de carga extra
+LLM_COBERTURA_MIN_MUESTRAS = 20  # Hasta tener historial se usa LLM_COBERTURA_RETARDO
+LLM_COBERTURA_RETARDO = float(os.getenv("LLM_COBERTURA_RETARDO", 8))  # Segundos (sin historial)
+LLM_HILOS = int(os.getenv("LLM_HILOS", 32))
+
+# Errores de google.api_core que merece la pena reintentar (por nombre: sin importar el SDK aquí)
+ERRORES_TRANSITORIOS = {
+    "ServiceUnavailable", "ResourceExhausted", "TooManyRequests", "DeadlineExceeded",
+    "InternalServerError", "GatewayTimeout", "Aborted",
+}
+
+
+def es_transitorio(error: BaseException) -> bool:
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in ERRORES_TRANSITORIOS
+
+
+def percentil(valores, p: float) -> Optional[float]:
+    """Percentil por el método del rango más cercano (None sin muestras)"""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    indice = min(len(ordenados) - 1, max(0, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class PlazoAgotado(TimeoutError):
+    """La llamada al LLM no terminó dentro del plazo"""
+
+
+class ClienteLLM:
+    """
+    Cliente de Gemini con plazo, reintentos y cobertura.
+
+    `generar(prompt)` devuelve la misma respuesta que `modelo.generate_content(prompt)`
+    (con `.text`), así que sustituye directamente a LLM_CLIENT.generate_content.
+
+    Args:
+        modelo: Objeto con generate_content (GenerativeModel de Vertex AI)
+        plazo: Segundos máximos por llamada, reintentos incluidos
+        reintentos: Reintentos ante errores transitorios
+        cobertura: Lanzar una segunda petición si la primera supera el percentil configurado
+    """
+
+    def __init__(
+        self,
+        modelo,
+        plazo: float = LLM_PLAZO,
+        reintentos: int = LLM_REINTENTOS,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX,
+        cobertura: bool = LLM_COBERTURA,
+        percentil_cobertura: float = LLM_COBERTURA_PERCENTIL,
+        max_fraccion_cobertura: float = LLM_COBERTURA_MAX_FRACCION,
+        retardo_cobertura: float = LLM_COBERTURA_RETARDO,
+        hilos: int = LLM_HILOS,
+        ventana_metricas: int = 500,
+    ):
+        self.modelo = modelo
+        self.plazo = plazo
+        self.reintentos = max(0, reintentos)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cobertura = cobertura
+        self.percentil_cobertura = percentil_cobertura
+        self.max_fraccion_cobertura = max_fraccion_cobertura
+        self.retardo_cobertura = retardo_cobertura
+        self._pool = ThreadPoolExecutor(max_workers=max(2, hilos), thread_name_prefix="llm")
+        self._lock = threading.Lock()
+
+        self.latencias = deque(maxlen=ventana_metricas)  # Observadas por quien llama
+        self.latencias_primarias = deque(maxlen=ventana_metricas)  # De la primera petición de cada intento
+        self.llamadas = 0
+        self.reintentos_hechos = 0
+        self.coberturas = 0
+        self.coberturas_ganadoras = 0
+        self.plazos_agotados = 0
+        self.errores = 0
+
+    # --- Uso ---
+
+    def generar(self, prompt: Any, plazo: Optional[float] = None, **kwargs) -> Any:
+        """
+        Genera la respuesta dentro del plazo (reintentando errores transitorios).
+
+        Raises:
+            PlazoAgotado: Si no hay respuesta dentro del plazo
+            Exception: El último error del modelo si no es transitorio o se agotan los reintentos
+        """
+        inicio = time.perf_counter()
+        limite = inicio + (plazo if plazo is not None else self.plazo)
+        with self._lock:
+            self.llamadas += 1
+
+        intento = 0
+        while True:
+            try:
+                respuesta = self._intento(prompt, limite, kwargs)
+                with self._lock:
+                    self.latencias.append(time.perf_counter() - inicio)
+                return respuesta
+            except Exception as e:
+                restante = limite - time.perf_counter()
+                if intento >= self.reintentos or not es_transitorio(e) or restante <= 0:
+                    with self._lock:
+                        if isinstance(e, PlazoAgotado):
+                            self.plazos_agotados += 1
+                        else:
+                            self.errores += 1
+                    raise
+                # Jitter completo: espera aleatoria en [0, base * 2^intento], sin pasar del plazo
+                espera = min(restante, random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento)))
+                print(f"🔁 Reintentando llamada a Gemini en {espera:.2f}s ({type(e).__name__}: {e})")
+                time.sleep(espera)
+                intento += 1
+                with self._lock:
+                    self.reintentos_hechos += 1
+
+    def calentar(self, prompt: str = "Responde solo: OK") -> None:
+        """Primera llamada al arrancar: abre el canal y evita pagar el arranque en la primera consulta"""
+        try:
+            self.generar(prompt, plazo=min(self.plazo, 30))
+            print("✅ Cliente LLM calentado")
+        except Exception as e:
+            print(f"⚠️ No se pudo calentar el cliente LLM: {e}")
+
+    # --- Un intento (con cobertura opcional) ---
+
+    def _intento(self, prompt: Any, limite: float, kwargs: dict) -> Any:
+        primaria = self._lanzar(prompt, kwargs, primaria=True)
+        pendientes = {primaria}
+        retardo = self._retardo_cobertura()
+        if retardo is not None and retardo < limite - time.perf_counter():
+            hechas, _ = wait(pendientes, timeout=retardo)
+            if not hechas and self._permitir_cobertura():
+                print(f"🛡️ Gemini tarda más de {retardo:.2f}s - lanzando petición de cobertura")
+                pendientes.add(self._lanzar(prompt, kwargs, primaria=False))
+
+        ultimo_error = None
+        while pendientes:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            hechas, pendientes = wait(pendientes, timeout=restante, return_when=FIRST_COMPLETED)
+            for futuro in hechas:
+                error = futuro.exception()
+                if error is None:
+                    if futuro is not primaria:
+                        with self._lock:
+                            self.coberturas_ganadoras += 1
+                    for otro in pendientes:
+                        otro.cancel()  # La petición en vuelo termina sola; su resultado se descarta
+                    return futuro.result()
+                ultimo_error = error
+        if ultimo_error is not None and not pendientes:
+            raise ultimo_error
+        raise PlazoAgotado("Sin respuesta de Gemini dentro del plazo")
+
+    def _lanzar(self, prompt: Any, kwargs: dict, primaria: bool):
+        inicio = time.perf_counter()
+        futuro = self._pool.submit(self.modelo.generate_content, prompt, **kwargs)
+        if primaria:
+            # Latencia que habría tenido la llamada sin cobertura (se registra aunque gane la otra)
+            futuro.add_done_callback(lambda f: self._registrar_primaria(f, inicio))
+        return futuro
+
+    def _registrar_primaria(self, futuro, inicio: float) -> None:
+        if not futuro.cancelled() and futuro.exception() is None:
+            with self._lock:
+                self.latencias_primarias.append(time.perf_counter() - inicio)
+
+    def _retardo_cobertura(self) -> Optional[float]:
+        if not self.cobertura:
+            return None
+        with self._lock:
+            muestras = list(self.latencias_primarias)
+        if len(muestras) < LLM_COBERTURA_MIN_MUESTRAS:
+            return self.retardo_cobertura
+        return percentil(muestras, self.percentil_cobertura)
+
+    def _permitir_cobertura(self) -> bool:
+        """Como mucho max_fraccion_cobertura de las llamadas generan una petición extra"""
+        with self._lock:
+            if self.coberturas + 1 > self.max_fraccion_cobertura * max(1, self.llamadas):
+                return False
+            self.coberturas += 1
+            return True
+
+    # --- Métricas ---
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            observadas = list(self.latencias)
+            primarias = list(self.latencias_primarias)
+            datos = {
+                "llamadas": self.llamadas,
+                "reintentos": self.reintentos_hechos,
+                "plazos_agotados": self.plazos_agotados,
+                "errores": self.errores,
+                "cobertura": {
+                    "activa": self.cobertura,
+                    "lanzadas": self.coberturas,
+                    "ganadoras": self.coberturas_ganadoras,
+                },
+            }
+
+        def ms(valor):
+            return round(valor * 1000, 1) if valor is not None else None
+
+        datos["latencia_ms"] = {f"p{p}": ms(percentil(observadas, p)) for p in (50, 95, 99)}
+        datos["latencia_sin_cobertura_ms"] = {f"p{p}": ms(percentil(primarias, p)) for p in (50, 95, 99)}
+        p99, p99_sin = percentil(observadas, 99), percentil(primarias, 99)
+        datos["mejora_p99_ms"] = ms(p99_sin - p99) if p99 is not None and p99_sin is not None else None
+        return datos
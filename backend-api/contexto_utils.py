@@ -0,0 +1,241 @@
+"""
+MÓDULO DE ENSAMBLADO DE CONTEXTO
+Deduplica y comprime los fragmentos recuperados antes de enviarlos a Gemini
+"""
+
+import re
+import heapq
+import zlib
+
+from normalizacion_consultas import numero_canonico
+from reconstruccion_utils import longitud_solapamiento
+
+# --- CONFIGURACIÓN ---
+CHARS_POR_TOKEN = 4  # Aproximación para texto legal en español
+SHINGLE_PALABRAS = 5  # Tamaño de los shingles (en palabras)
+MINHASH_K = 64  # Tamaño de la firma bottom-k
+UMBRAL_CASI_DUPLICADO = 0.8  # Jaccard estimado a partir del cual se descarta
+SEPARADOR_CONTEXTO = "\n\n---\n\n"
+
+# Cabecera al inicio del fragmento: el artículo al que pertenece (no los que cita)
+_PATRON_CABECERA = re.compile(
+    r'^\s*Art[íi]culo\s+(\d+(?:\s*(?:bis|ter|qu[aá]ter|quinquies|sexies|septies|octies|nonies|decies)\b)?)\s*\.',
+    re.IGNORECASE
+)
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación barata del número de tokens de un texto"""
+    return (len(texto) + CHARS_POR_TOKEN - 1) // CHARS_POR_TOKEN
+
+
+def _shingles(texto: str, k: int = SHINGLE_PALABRAS) -> set:
+    """Devuelve el conjunto de shingles de k palabras (hasheados con crc32)"""
+    palabras = re.findall(r'\w+', texto.lower())
+    if len(palabras) < k:
+        return {zlib.crc32(" ".join(palabras).encode("utf-8"))} if palabras else set()
+    return {
+        zlib.crc32(" ".join(palabras[i:i + k]).encode("utf-8"))
+        for i in range(len(palabras) - k + 1)
+    }
+
+
+def firma_minhash(texto: str, k: int = MINHASH_K) -> list:
+    """
+    Firma MinHash bottom-k: los k hashes de shingle más pequeños.
+    Una sola función hash, O(n) por fragmento.
+    """
+    return sorted(heapq.nsmallest(k, _shingles(texto)))
+
+
+def similitud_minhash(firma_a: list, firma_b: list, k: int = MINHASH_K) -> float:
+    """Estimación de Jaccard entre dos firmas bottom-k"""
+    if not firma_a or not firma_b:
+        return 0.0
+    union_k = heapq.nsmallest(k, set(firma_a) | set(firma_b))
+    conjunto_a = set(firma_a)
+    conjunto_b = set(firma_b)
+    comunes = sum(1 for h in union_k if h in conjunto_a and h in conjunto_b)
+    return comunes / len(union_k)
+
+
+def _normalizar_chunk(match: dict, orden: int) -> dict:
+    """Convierte un match de Pinecone en un registro interno de fragmento"""
+    metadata = match.get('metadata', {}) or {}
+    texto = metadata.get('text', '')
+    articulo = numero_canonico(metadata['articulo']) if metadata.get('articulo') else None
+    return {
+        'texto': texto,
+        'score': match.get('score', 0),
+        'orden': orden,
+        'articulo': articulo,
+        'source': metadata.get('source', ''),
+        'char_start': metadata.get('char_start'),
+        'char_end': metadata.get('char_end'),
+        'articulo_propio': articulo or _articulo_de_cabecera(texto),
+    }
+
+
+def _articulo_de_cabecera(texto: str):
+    match = _PATRON_CABECERA.match(texto)
+    return numero_canonico(match.group(1)) if match else None
+
+
+def _colapsar_por_spans(fragmentos: list) -> list:
+    """
+    Fusiona fragmentos cuyos intervalos [char_start, char_end) se solapan o son contiguos.
+    Los fragmentos sin offsets se devuelven sin cambios.
+    """
+    con_offsets = [f for f in fragmentos if f['char_start'] is not None and f['char_end'] is not None]
+    sin_offsets = [f for f in fragmentos if f['char_start'] is None or f['char_end'] is None]
+
+    con_offsets.sort(key=lambda f: (f['source'], f['char_start']))
+    colapsados = []
+    for frag in con_offsets:
+        ultimo = colapsados[-1] if colapsados else None
+        if ultimo and ultimo['source'] == frag['source'] and frag['char_start'] <= ultimo['char_end']:
+            if frag['char_end'] > ultimo['char_end']:
+                ultimo['texto'] += frag['texto'][ultimo['char_end'] - frag['char_start']:]
+                ultimo['char_end'] = frag['char_end']
+            ultimo['score'] = max(ultimo['score'], frag['score'])
+            ultimo['orden'] = min(ultimo['orden'], frag['orden'])
+            if ultimo['articulo'] != frag['articulo']:
+                ultimo['articulo'] = None
+        else:
+            colapsados.append(dict(frag))
+
+    return colapsados + sin_offsets
+
+
+def _fusionar_mismo_articulo(fragmentos: list) -> list:
+    """Une fragmentos sin offsets que pertenecen al mismo artículo (metadata 'articulo')"""
+    resultado = []
+    por_articulo = {}
+    for frag in fragmentos:
+        if frag['articulo'] is None or frag['char_start'] is not None:
+            resultado.append(frag)
+            continue
+        por_articulo.setdefault(frag['articulo'], []).append(frag)
+
+    for partes in por_articulo.values():
+        partes.sort(key=lambda f: f['orden'])
+        base = dict(partes[0])
+        for parte in partes[1:]:
+            base['texto'] += parte['texto'][longitud_solapamiento(base['texto'], parte['texto']):]
+            base['score'] = max(base['score'], parte['score'])
+        resultado.append(base)
+
+    return resultado
+
+
+def _eliminar_casi_duplicados(fragmentos: list, umbral: float) -> tuple:
+    """Descarta fragmentos cuya similitud MinHash con uno ya aceptado supera el umbral"""
+    aceptados = []
+    firmas = []
+    descartados = 0
+    for frag in sorted(fragmentos, key=lambda f: f['score'], reverse=True):
+        firma = firma_minhash(frag['texto'])
+        if any(similitud_minhash(firma, otra) >= umbral for otra in firmas):
+            descartados += 1
+            continue
+        aceptados.append(frag)
+        firmas.append(firma)
+    return aceptados, descartados
+
+
+def ensamblar_contexto(
+    chunks: list,
+    articulos_reconstruidos: dict = None,
+    formatear_texto=None,
+    umbral_duplicado: float = UMBRAL_CASI_DUPLICADO,
+    articulos_referenciados: dict = None
+) -> tuple:
+    """
+    ⚡ MEJORA #11: Ensamblado de contexto deduplicado y comprimido
+
+    1. Añade los artículos reconstruidos completos
+    2. Descarta fragmentos de artículos ya incluidos (intersección de conjuntos)
+    3. Colapsa fragmentos solapados por intervalo de caracteres
+    4. Une fragmentos contiguos del mismo artículo
+    5. Elimina casi-duplicados con shingles + MinHash
+    6. Añade al final los artículos citados que aún no estén (⚡ MEJORA #28)
+
+    Args:
+        chunks: Matches de Pinecone ya filtrados por umbral
+        articulos_reconstruidos: Salida de reconstruir_articulos_completos (opcional)
+        formatear_texto: Función aplicada al texto de cada fragmento (p.ej. corregir_encoding)
+        articulos_referenciados: {numero: {'texto', 'citado_por'}} vecinos del grafo de referencias
+
+    Returns:
+        (contexto_parts, estadisticas)
+    """
+    articulos_reconstruidos = articulos_reconstruidos or {}
+    formatear_texto = formatear_texto or (lambda t: t)
+
+    contexto_parts = []
+    articulos_ya_incluidos = set()
+    tokens_originales = 0
+
+    # 1. Artículos reconstruidos
+    for num_art, info in articulos_reconstruidos.items():
+        if info['completo'] or info['metodo'].startswith('busqueda_exacta'):
+            contexto_parts.append(
+                f"[Artículo {num_art} - Reconstruido ({info['metodo']})]"
+                f"\n{info['texto']}"
+            )
+            articulos_ya_incluidos.add(numero_canonico(num_art))
+    tokens_originales += sum(estimar_tokens(p) for p in contexto_parts)
+
+    # 2. Fragmentos que no pertenecen a artículos ya incluidos
+    fragmentos = []
+    for orden, match in enumerate(chunks):
+        frag = _normalizar_chunk(match, orden)
+        if not frag['texto']:
+            continue
+        # Solo por el artículo al que pertenece: un fragmento que cita un artículo incluido se conserva.
+        # Sus tokens no cuentan como ahorro: el artículo reconstruido ya los sustituye
+        if frag['articulo_propio'] is not None and frag['articulo_propio'] in articulos_ya_incluidos:
+            continue
+        tokens_originales += estimar_tokens(frag['texto'])
+        fragmentos.append(frag)
+    num_fragmentos_entrada = len(fragmentos)
+
+    # 3-4. Colapsar por spans y unir partes del mismo artículo
+    fragmentos = _fusionar_mismo_articulo(_colapsar_por_spans(fragmentos))
+    num_fusionados = num_fragmentos_entrada - len(fragmentos)
+
+    # 5. Casi-duplicados
+    fragmentos, num_casi_duplicados = _eliminar_casi_duplicados(fragmentos, umbral_duplicado)
+
+    # Mantener el orden de relevancia original
+    for frag in sorted(fragmentos, key=lambda f: f['orden']):
+        contexto_parts.append(
+            f"[Fragmento del Código Penal - Relevancia: {frag['score']:.2f}]"
+            f"\n{formatear_texto(frag['texto'])}"
+        )
+
+    # 6. Artículos citados por los recuperados (grafo de referencias), con menos prioridad
+    articulos_presentes = articulos_ya_incluidos | {f['articulo'] for f in fragmentos if f['articulo']}
+    referenciados_incluidos = []
+    for num_art, info in (articulos_referenciados or {}).items():
+        if numero_canonico(num_art) in articulos_presentes or not info.get('texto'):
+            continue
+        contexto_parts.append(
+            f"[Artículo {num_art} - Citado por el artículo {info['citado_por']}]"
+            f"\n{formatear_texto(info['texto'])}"
+        )
+        referenciados_incluidos.append(num_art)
+
+    tokens_finales = estimar_tokens(SEPARADOR_CONTEXTO.join(contexto_parts))
+    estadisticas = {
+        'fragmentos_entrada': len(chunks),
+        'fragmentos_salida': len(contexto_parts),
+        'fragmentos_fusionados': num_fusionados,
+        'casi_duplicados_eliminados': num_casi_duplicados,
+        'articulos_reconstruidos_incluidos': sorted(articulos_ya_incluidos),
+        'articulos_referenciados_incluidos': referenciados_incluidos,
+        'tokens_originales': tokens_originales,
+        'tokens_finales': tokens_finales,
+        'tokens_ahorrados': max(0, tokens_originales - tokens_finales),
+    }
+    return contexto_parts, estadisticas
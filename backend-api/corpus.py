@@ -0,0 +1,248 @@
+"""
+MÓDULO DE CORPUS MULTI-DOCUMENTO
+Registro de documentos (Código Penal, LECrim, Ley de Seguridad Vial, versiones
+históricas...) con índice de artículos, namespace vectorial y prefijo de caché
+propios. Los índices se cargan bajo demanda y los menos usados se descargan (LRU)
+"""
+
+import os
+import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
+
+from articulos_utils import construir_indice_articulos
+from normalizacion_consultas import numero_canonico
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+DOCUMENTO_POR_DEFECTO = os.getenv("DOCUMENTO_POR_DEFECTO", "cp")
+CORPUS_CONFIG = os.getenv("CORPUS_CONFIG", "corpus.json")
+CORPUS_MAX_CARGADOS = int(os.getenv("CORPUS_MAX_CARGADOS", 3))  # Documentos con índice en memoria a la vez
+CORPUS_TTL_FALLOS = int(os.getenv("CORPUS_TTL_FALLOS", 30))  # Segundos sin reintentar un PDF que no se pudo leer
+
+
+@dataclass
+class Documento:
+    """Un documento del corpus"""
+    id: str  # Identificador corto usado en URLs y claves de caché ("cp", "lecrim", "cp-2015")
+    nombre: str  # Nombre para respuestas y prompts ("Código Penal")
+    pdf_path: str
+    namespace: str = ""  # Namespace de Pinecone ("" = namespace por defecto, ingestas antiguas)
+    indice_local: Optional[str] = None  # Directorio del índice vectorial local (VECTOR_BACKEND=local)
+    indice_articulos: Optional[str] = None  # Directorio del índice de artículos (búsqueda jerárquica)
+    version: Optional[str] = None  # Versión del texto (p.ej. "2015" para una versión histórica)
+
+
+def clave_articulo(documento_id: str, numero: str) -> str:
+    """Clave de Redis de un artículo: articulo:{doc}:{num} (número en forma canónica)"""
+    return f"articulo:{documento_id}:{numero_canonico(numero)}"
+
+
+def version_articulos(articulos: dict) -> str:
+    """Huella del índice de artículos: cambia si cambia el texto de cualquier artículo"""
+    huella = hashlib.sha256()
+    for numero in sorted(articulos):
+        huella.update(f"{numero}\x00{articulos[numero]}\x00".encode("utf-8"))
+    return huella.hexdigest()[:16]
+
+
+def cargar_documentos(ruta: str = CORPUS_CONFIG, pdf_por_defecto: str = "../documentos/codigo_penal.pdf") -> List[Documento]:
+    """
+    Lee la lista de documentos de un JSON:
+        [{"id": "lecrim", "nombre": "Ley de Enjuiciamiento Criminal",
+          "pdf_path": "../documentos/lecrim.pdf", "namespace": "lecrim"}, ...]
+
+    Sin fichero de configuración el corpus es solo el Código Penal (comportamiento original).
+    """
+    if not os.path.exists(ruta):
+        return [Documento(id=DOCUMENTO_POR_DEFECTO, nombre="Código Penal", pdf_path=pdf_por_defecto)]
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return [Documento(**datos) for datos in json.load(f)]
+
+
+class DocumentoNoEncontrado(KeyError):
+    """El documento solicitado no está en el registro"""
+
+
+class RegistroCorpus:
+    """
+    Índices de artículos por documento, cargados bajo demanda.
+
+    - Como mucho `max_cargados` documentos en memoria; al cargar uno más se
+      descarga el usado hace más tiempo (los documentos fijados no se descargan)
+    - Cada documento se carga una sola vez aunque lleguen consultas concurrentes
+    - Un fallo de lectura se recuerda `ttl_fallos` segundos: mientras tanto se responde
+      sin artículos en lugar de releer el PDF en cada consulta
+
+    Args:
+        cargar_texto: Función pdf_path -> texto (p.ej. cargar_texto_pdf de main.py)
+        cargar_indice_vectorial: Función opcional Documento -> índice vectorial local
+        ttl_fallos: Segundos hasta reintentar la carga de un documento que falló
+    """
+
+    def __init__(
+        self,
+        documentos: List[Documento],
+        cargar_texto: Callable[[str], str],
+        por_defecto: str = DOCUMENTO_POR_DEFECTO,
+        max_cargados: int = CORPUS_MAX_CARGADOS,
+        cargar_indice_vectorial: Optional[Callable[[Documento], object]] = None,
+        ttl_fallos: float = CORPUS_TTL_FALLOS,
+    ):
+        self.documentos: Dict[str, Documento] = {doc.id: doc for doc in documentos}
+        if por_defecto not in self.documentos:
+            raise ValueError(f"El documento por defecto '{por_defecto}' no está en el corpus")
+        self.por_defecto = por_defecto
+        self.fijados = {por_defecto}
+        self.max_cargados = max(1, max_cargados)
+        self.cargar_texto = cargar_texto
+        self.cargar_indice_vectorial = cargar_indice_vectorial
+        self.ttl_fallos = ttl_fallos
+
+        self._cargados: "OrderedDict[str, dict]" = OrderedDict()  # doc_id -> {'texto', 'articulos', 'vectorial', 'version'}
+        self._lock = threading.Lock()
+        self._locks_carga: Dict[str, threading.Lock] = {doc_id: threading.Lock() for doc_id in self.documentos}
+        self._fallos: Dict[str, float] = {}  # doc_id -> instante (monotonic) hasta el que no se reintenta
+        self.cargas = 0
+        self.desalojos = 0
+
+    # --- Consulta ---
+
+    def documento(self, documento_id: Optional[str] = None) -> Documento:
+        documento_id = documento_id or self.por_defecto
+        if documento_id not in self.documentos:
+            raise DocumentoNoEncontrado(documento_id)
+        return self.documentos[documento_id]
+
+    def articulos(self, documento_id: Optional[str] = None) -> dict:
+        """Índice {numero: texto} del documento (lo carga si hace falta)"""
+        return self._entrada(documento_id)['articulos']
+
+    def texto(self, documento_id: Optional[str] = None) -> str:
+        return self._entrada(documento_id)['texto']
+
+    def indice_vectorial(self, documento_id: Optional[str] = None):
+        """Índice vectorial local del documento (None si no hay cargador configurado)"""
+        entrada = self._entrada(documento_id)
+        if entrada['vectorial'] is None and self.cargar_indice_vectorial:
+            with self._locks_carga[self.documento(documento_id).id]:
+                if entrada['vectorial'] is None:
+                    entrada['vectorial'] = self.cargar_indice_vectorial(self.documento(documento_id))
+        return entrada['vectorial']
+
+    def version(self, documento_id: Optional[str] = None) -> str:
+        """Versión del índice de artículos (sello de la caché precalculada en Redis)"""
+        return self._entrada(documento_id)['version']
+
+    def esta_cargado(self, documento_id: str) -> bool:
+        with self._lock:
+            return documento_id in self._cargados
+
+    # --- Carga y desalojo ---
+
+    def _entrada(self, documento_id: Optional[str]) -> dict:
+        doc = self.documento(documento_id)
+        with self._lock:
+            if doc.id in self._cargados:
+                self._cargados.move_to_end(doc.id)
+                return self._cargados[doc.id]
+
+        # Cargar fuera del lock global: otros documentos siguen respondiendo mientras tanto
+        with self._locks_carga[doc.id]:
+            with self._lock:
+                if doc.id in self._cargados:
+                    return self._cargados[doc.id]
+            if time.monotonic() < self._fallos.get(doc.id, 0):
+                return self._entrada_vacia()
+            print(f"📚 Cargando documento '{doc.id}' ({doc.nombre})...")
+            try:
+                texto = self.cargar_texto(doc.pdf_path)
+            except Exception as e:
+                # Sin texto no hay búsqueda exacta, pero la búsqueda vectorial sigue funcionando;
+                # no se guarda en el registro: se reintenta pasados ttl_fallos segundos
+                self._fallos[doc.id] = time.monotonic() + self.ttl_fallos
+                print(f"⚠️ No se pudo cargar '{doc.id}' ({doc.pdf_path}): {e} (búsqueda exacta deshabilitada, "
+                      f"reintento en {self.ttl_fallos}s)")
+                return self._entrada_vacia()
+            self._fallos.pop(doc.id, None)
+            articulos = construir_indice_articulos(texto)
+            entrada = {'texto': texto, 'articulos': articulos, 'vectorial': None, 'version': version_articulos(articulos)}
+            print(f"✅ '{doc.id}': {len(entrada['articulos'])} artículos indexados")
+
+            with self._lock:
+                self._cargados[doc.id] = entrada
+                self.cargas += 1
+                self._desalojar()
+            return entrada
+
+    @staticmethod
+    def _entrada_vacia() -> dict:
+        return {'texto': "", 'articulos': {}, 'vectorial': None, 'version': ""}
+
+    def _desalojar(self) -> None:
+        """Descarga los documentos menos usados por encima de max_cargados (con self._lock tomado)"""
+        for doc_id in list(self._cargados):
+            if len(self._cargados) <= self.max_cargados:
+                break
+            if doc_id not in self.fijados:
+                del self._cargados[doc_id]
+                self.desalojos += 1
+                print(f"♻️ Documento '{doc_id}' descargado de memoria (LRU)")
+
+    def precargar(self, documento_id: Optional[str] = None) -> dict:
+        return self._entrada(documento_id)
+
+    def recargar_articulos(self, documento_id: Optional[str], articulos: List[str]) -> tuple:
+        """
+        Relee el documento y actualiza solo los artículos indicados.
+        Si el documento no estaba cargado no hay nada que refrescar (se leerá entero al usarse).
+
+        La entrada nueva (texto, artículos y versión) se construye aparte y sustituye
+        a la anterior de una vez bajo el lock (copy-on-write): quien esté recorriendo
+        el índice anterior sigue viendo un estado coherente.
+
+        Returns:
+            (actualizados, eliminados)
+        """
+        doc = self.documento(documento_id)
+        with self._locks_carga[doc.id]:  # Una recarga (o carga) del documento a la vez
+            with self._lock:
+                anterior = self._cargados.get(doc.id)
+            if anterior is None:
+                return [], []
+            texto = self.cargar_texto(doc.pdf_path)
+            indice = construir_indice_articulos(texto)
+
+            nuevos = dict(anterior['articulos'])
+            actualizados, eliminados = [], []
+            for numero in articulos:
+                if numero in indice:
+                    nuevos[numero] = indice[numero]
+                    actualizados.append(numero)
+                elif nuevos.pop(numero, None) is not None:
+                    eliminados.append(numero)
+            version = version_articulos(nuevos)
+
+            with self._lock:
+                actual = self._cargados.get(doc.id)
+                if actual is None:
+                    return [], []  # Desalojado mientras se releía: se leerá entero al usarse
+                self._cargados[doc.id] = {
+                    'texto': texto, 'articulos': nuevos, 'vectorial': actual['vectorial'], 'version': version
+                }
+            return actualizados, eliminados
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            cargados = {doc_id: len(entrada['articulos']) for doc_id, entrada in self._cargados.items()}
+        return {
+            "por_defecto": self.por_defecto,
+            "disponibles": [asdict(doc) for doc in self.documentos.values()],
+            "cargados": cargados,
+            "max_cargados": self.max_cargados,
+            "cargas": self.cargas,
+            "desalojos": self.desalojos,
+        }
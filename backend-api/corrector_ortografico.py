@@ -0,0 +1,271 @@
+"""
+MÓDULO DE CORRECCIÓN ORTOGRÁFICA (SYMSPELL)
+Corrige erratas de la consulta ("omicidio", "estaffa", "hurtó") contra el
+vocabulario del Código Penal y de la tabla de sinónimos antes de la
+expansión, el embedding y el cálculo de las claves de caché. Usa borrado
+simétrico: al arrancar se indexan las variantes con hasta N letras borradas
+de cada palabra del vocabulario, y corregir una palabra desconocida es buscar
+sus propias variantes borradas en ese diccionario: unas decenas de consultas
+a un dict por palabra, microsegundos por consulta.
+
+Solo se corrige hacia términos jurídicos (tabla de sinónimos y TERMINOS_LEGALES)
+y con margen: si otra palabra del documento está igual de cerca, o el término
+solo es un prefijo de la palabra (plural, forma verbal), la palabra se deja
+como está. "me han pegado" o "me robaron" no son erratas de "pagado" o
+"robaren". La consulta corregida solo se usa para recuperar y para las claves
+de caché; el LLM recibe la pregunta tal como la escribió el usuario.
+"""
+
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from normalizacion_consultas import plegar
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+CORRECTOR_ORTOGRAFICO = os.getenv("CORRECTOR_ORTOGRAFICO", "true").lower() == "true"
+CORRECTOR_MAX_DISTANCIA = int(os.getenv("CORRECTOR_MAX_DISTANCIA", 2))
+LONGITUD_PREFIJO = 7  # Solo se indexan borrados del prefijo (SymSpell): menos memoria, misma precisión
+LONGITUD_MINIMA = 5  # Palabras más cortas no se corrigen ("art", "ley", "bis"...)
+FRECUENCIA_MINIMA = 2  # Palabras del documento que aparecen una sola vez suelen ser artefactos del PDF
+PESO_SINONIMOS = 1000  # Los términos de la tabla de sinónimos ganan los empates
+MARGEN_FRECUENCIA = 3  # Dos términos a la misma distancia: el ganador debe ser 3 veces más frecuente
+MAX_MEMORIA = 10000  # Palabras desconocidas ya resueltas que se recuerdan (las erratas se repiten)
+
+# Palabras frecuentes en las consultas que no aparecen en el Código Penal: no son erratas
+VOCABULARIO_COLOQUIAL = {
+    'coche', 'moto', 'movil', 'telefono', 'vecino', 'vecina', 'pareja', 'novio', 'novia', 'marido',
+    'mujer', 'amigo', 'amiga', 'jefe', 'empresa', 'trabajo', 'calle', 'tienda', 'cartera', 'bolso',
+    'policia', 'guardia', 'multa', 'juicio', 'abogado', 'denuncia', 'denunciar', 'pasaria', 'puedo',
+    'pueden', 'tengo', 'quiero', 'cuanto', 'cuantos', 'cuando', 'donde', 'porque', 'alguien', 'gente',
+    'hijo', 'hija', 'padre', 'madre', 'internet', 'whatsapp', 'redes', 'sociales', 'foto', 'fotos',
+    'video', 'dinero', 'casa', 'piso', 'noche', 'borracho', 'drogas',
+}
+
+# Términos del Código Penal hacia los que se corrige, además de los de la tabla de sinónimos
+TERMINOS_LEGALES = {
+    'homicidio', 'asesinato', 'alevosía', 'ensañamiento', 'lesiones', 'hurto', 'robo', 'estafa',
+    'extorsión', 'allanamiento', 'morada', 'usurpación', 'apropiación', 'indebida', 'malversación',
+    'cohecho', 'prevaricación', 'falsedad', 'falsificación', 'encubrimiento', 'receptación',
+    'blanqueo', 'insolvencia', 'incendio', 'estragos', 'estupefacientes', 'detención', 'secuestro',
+    'amenazas', 'coacciones', 'acoso', 'injurias', 'calumnias', 'revelación', 'secretos',
+    'prostitución', 'pornografía', 'exhibicionismo', 'agresión', 'violación', 'aborto',
+    'imprudencia', 'imprudente', 'reincidencia', 'atenuante', 'agravante', 'eximente', 'tentativa',
+    'conspiración', 'complicidad', 'inducción', 'prisión', 'inhabilitación', 'decomiso',
+    'prescripción', 'delito', 'delitos', 'pena', 'penas', 'condena', 'libertad', 'vigilada',
+}
+
+_PATRON_PALABRA = re.compile(r'[A-Za-zÁÉÍÓÚÜÑáéíóúüñ]+')
+
+
+def distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """
+    Distancia de Damerau-Levenshtein (alineamiento óptimo: inserción, borrado,
+    sustitución y trasposición de adyacentes). Devuelve maximo + 1 si la supera.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    previa2 = None
+    previa = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        minimo_fila = i
+        for j in range(1, len(b) + 1):
+            coste = 0 if a[i - 1] == b[j - 1] else 1
+            actual[j] = min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + coste)
+            if previa2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], previa2[j - 2] + 1)
+            minimo_fila = min(minimo_fila, actual[j])
+        if minimo_fila > maximo:
+            return maximo + 1
+        previa2, previa = previa, actual
+    return previa[-1] if previa[-1] <= maximo else maximo + 1
+
+
+def _borrados_por_nivel(palabra: str, distancia: int) -> List[set]:
+    """[{palabra}, {variantes con 1 letra borrada}, ...] hasta `distancia` letras borradas"""
+    niveles = [{palabra}]
+    vistas = {palabra}
+    for _ in range(distancia):
+        siguiente = set()
+        for variante in niveles[-1]:
+            if len(variante) > 1:
+                for i in range(len(variante)):
+                    siguiente.add(variante[:i] + variante[i + 1:])
+        siguiente -= vistas
+        vistas |= siguiente
+        niveles.append(siguiente)
+    return niveles
+
+
+def _borrados(palabra: str, distancia: int) -> set:
+    """La palabra y todas sus variantes con hasta `distancia` letras borradas"""
+    return set().union(*_borrados_por_nivel(palabra, distancia))
+
+
+def vocabulario_de_texto(texto: str) -> Counter:
+    """Frecuencia de cada palabra (minúsculas, con tildes) de un documento"""
+    return Counter(p.lower() for p in _PATRON_PALABRA.findall(texto))
+
+
+def vocabulario_de_sinonimos(sinonimos: Dict[str, List[str]]) -> Counter:
+    """Palabras de la tabla de sinónimos (términos coloquiales y legales) con peso alto"""
+    vocabulario = Counter()
+    for termino, equivalentes in sinonimos.items():
+        for frase in [termino, *equivalentes]:
+            for palabra in _PATRON_PALABRA.findall(frase):
+                vocabulario[palabra.lower()] += PESO_SINONIMOS
+    return vocabulario
+
+
+class CorrectorOrtografico:
+    """
+    Corrector por borrado simétrico sobre un vocabulario con frecuencias.
+
+    - Palabras conocidas (o cortas, o con dígitos) se dejan como están
+    - Una palabra que solo difiere en tildes de un término objetivo se escribe como él ("hurtó" -> "hurto")
+    - Si no, el término objetivo más cercano (y, a igual distancia, el más frecuente con
+      MARGEN_FRECUENCIA); distancia máxima 1 hasta 7 letras y `max_distancia` a partir de 8
+    - Sin corrección si una palabra del vocabulario que no es objetivo está igual de cerca
+      o si el término es prefijo de la palabra o al revés (plurales y formas verbales)
+
+    Args:
+        vocabulario: {palabra: frecuencia} (ver vocabulario_de_texto / vocabulario_de_sinonimos)
+        objetivos: Términos hacia los que se puede corregir (None = todo el vocabulario)
+        max_distancia: Ediciones máximas para las palabras largas
+        protegidas: Palabras válidas que no están en el vocabulario
+    """
+
+    def __init__(self, vocabulario: Counter, objetivos: Optional[Iterable[str]] = None,
+                 max_distancia: int = CORRECTOR_MAX_DISTANCIA,
+                 protegidas: Iterable[str] = VOCABULARIO_COLOQUIAL):
+        self.max_distancia = max_distancia
+        self.exactas = set()
+        self.frecuencias: Dict[str, int] = {}  # Forma plegada -> frecuencia total
+        self.formas: Dict[str, Tuple[str, int]] = {}  # Forma plegada -> (grafía más frecuente, su frecuencia)
+        for palabra, frecuencia in vocabulario.items():
+            if frecuencia < FRECUENCIA_MINIMA:
+                continue
+            plegada = plegar(palabra)
+            self.exactas.add(palabra)
+            self.frecuencias[plegada] = self.frecuencias.get(plegada, 0) + frecuencia
+            if plegada not in self.formas or frecuencia > self.formas[plegada][1]:
+                self.formas[plegada] = (palabra, frecuencia)
+        self.protegidas = {plegar(p) for p in protegidas}
+        self.objetivos = (set(self.frecuencias) if objetivos is None
+                          else {plegar(o) for o in objetivos} & set(self.frecuencias))
+
+        self._borrados: Dict[str, List[str]] = {}
+        for plegada in self.frecuencias:
+            if len(plegada) < LONGITUD_MINIMA - self.max_distancia:
+                continue
+            for variante in _borrados(plegada[:LONGITUD_PREFIJO], self.max_distancia):
+                self._borrados.setdefault(variante, []).append(plegada)
+
+        self._memoria: Dict[str, Optional[str]] = {}  # Forma plegada desconocida -> corrección
+        self.consultas = 0
+        self.correcciones = 0
+
+    def __len__(self) -> int:
+        return len(self.frecuencias)
+
+    def corregir_palabra(self, palabra: str) -> Optional[str]:
+        """Grafía corregida de la palabra o None si no hay que cambiarla"""
+        minuscula = palabra.lower()
+        if len(minuscula) < LONGITUD_MINIMA or minuscula in self.exactas:
+            return None
+        plegada = plegar(minuscula)
+        if plegada in self.protegidas:
+            return None
+        if plegada in self.formas:
+            return self.formas[plegada][0] if plegada in self.objetivos else None
+
+        if plegada in self._memoria:
+            return self._memoria[plegada]
+
+        maximo = 1 if len(plegada) <= 7 else self.max_distancia
+        objetivos = []  # (distancia, -frecuencia, término)
+        distancia_otra = maximo + 1  # Palabra del vocabulario más cercana que no es objetivo
+        revisadas = set()
+        # Nivel k = k letras borradas de la consulta: la distancia de sus candidatas es >= k,
+        # así que al pasar de la mejor distancia encontrada ya no puede mejorar
+        for nivel, variantes in enumerate(_borrados_por_nivel(plegada[:LONGITUD_PREFIJO], maximo)):
+            if objetivos and nivel > min(objetivos)[0]:
+                break
+            for variante in variantes:
+                for candidata in self._borrados.get(variante, ()):
+                    if candidata in revisadas:
+                        continue
+                    revisadas.add(candidata)
+                    distancia = distancia_edicion(plegada, candidata, maximo)
+                    if distancia > maximo:
+                        continue
+                    if candidata in self.objetivos:
+                        objetivos.append((distancia, -self.frecuencias[candidata], candidata))
+                    else:
+                        distancia_otra = min(distancia_otra, distancia)
+        correccion = self._elegir(plegada, objetivos, distancia_otra)
+        if len(self._memoria) >= MAX_MEMORIA:
+            self._memoria.clear()
+        self._memoria[plegada] = correccion
+        return correccion
+
+    def _elegir(self, plegada: str, objetivos: List[Tuple[int, int, str]], distancia_otra: int) -> Optional[str]:
+        """El término más cercano si gana con margen; None si la corrección es dudosa"""
+        if not objetivos:
+            return None
+        objetivos.sort()
+        distancia, frecuencia, mejor = objetivos[0]
+        if distancia_otra <= distancia:
+            return None  # Otra palabra válida igual de cerca: probablemente una forma de esa palabra
+        if plegada.startswith(mejor) or mejor.startswith(plegada):
+            return None  # "robos" -> "robo", "estafar" -> "estafa": flexiones, no erratas
+        if len(objetivos) > 1 and objetivos[1][0] == distancia and -frecuencia < MARGEN_FRECUENCIA * -objetivos[1][1]:
+            return None  # Empate entre dos términos
+        return self.formas[mejor][0]
+
+    def corregir(self, texto: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Corrige las palabras del texto conservando el resto (números, signos, espacios).
+
+        Returns:
+            (texto corregido, {palabra original: corrección})
+        """
+        cambios = {}
+
+        def sustituir(match: re.Match) -> str:
+            original = match.group(0)
+            correccion = self.corregir_palabra(original)
+            if correccion is None or correccion == original.lower():
+                return original
+            cambios[original] = correccion
+            return correccion
+
+        corregido = _PATRON_PALABRA.sub(sustituir, texto)
+        self.consultas += 1
+        self.correcciones += bool(cambios)
+        return corregido, cambios
+
+    def estadisticas(self) -> dict:
+        return {
+            "vocabulario": len(self.frecuencias),
+            "borrados_indexados": len(self._borrados),
+            "consultas": self.consultas,
+            "consultas_corregidas": self.correcciones,
+        }
+
+
+def construir_corrector(texto_documento: str, sinonimos: Dict[str, List[str]],
+                        max_distancia: int = CORRECTOR_MAX_DISTANCIA,
+                        terminos: Iterable[str] = TERMINOS_LEGALES) -> CorrectorOrtografico:
+    """
+    Corrector con el vocabulario del documento y de la tabla de sinónimos; solo
+    corrige hacia los términos de la tabla de sinónimos y los `terminos` jurídicos
+    """
+    de_sinonimos = vocabulario_de_sinonimos(sinonimos)
+    legales = Counter({termino: PESO_SINONIMOS for termino in terminos})
+    return CorrectorOrtografico(
+        vocabulario_de_texto(texto_documento) + de_sinonimos + legales,
+        objetivos=set(de_sinonimos) | set(legales), max_distancia=max_distancia
+    )
@@ -0,0 +1,176 @@
+"""
+MÓDULO DE EMBEDDINGS LOCALES
+Backend de embeddings con sentence-transformers (solo CPU, sin servicio externo):
+codificación por lotes vectorizada, control de hilos, almacenamiento cuantizado
+(float16 / int8) y artefacto .npy reutilizable entre ingesta y API
+"""
+
+import os
+import json
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "vertex")  # "vertex" o "local"
+MODELO_LOCAL = os.getenv("EMBEDDING_MODELO_LOCAL", "all-MiniLM-L6-v2")
+BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+NUM_HILOS = int(os.getenv("EMBEDDING_THREADS", 0))  # 0 = los que decida torch
+DISPOSITIVO = os.getenv("EMBEDDING_DEVICE", "cpu")
+
+MODOS_CUANTIZACION = ("float32", "float16", "int8")
+
+
+class EmbeddingsLocales:
+    """
+    Modelo de sentence-transformers cargado bajo demanda.
+
+    `embed` tiene la misma firma que el embed_fn de PipelineEmbeddings
+    (List[str] -> List[List[float]]), así que sirve tanto para la ingesta
+    como para el embedding de la consulta en la API.
+    """
+
+    def __init__(
+        self,
+        modelo: str = MODELO_LOCAL,
+        batch_size: int = BATCH_SIZE,
+        num_hilos: int = NUM_HILOS,
+        dispositivo: str = DISPOSITIVO,
+        normalizar: bool = True,
+    ):
+        self.nombre_modelo = modelo
+        self.batch_size = max(1, batch_size)
+        self.num_hilos = num_hilos
+        self.dispositivo = dispositivo
+        self.normalizar = normalizar  # Vectores unitarios: coseno = producto escalar
+        self._modelo = None
+        self._lock = threading.Lock()
+
+    @property
+    def modelo(self):
+        if self._modelo is None:
+            with self._lock:
+                if self._modelo is None:
+                    if self.num_hilos > 0:
+                        import torch
+                        torch.set_num_threads(self.num_hilos)
+                    from sentence_transformers import SentenceTransformer
+                    print(f"🔢 Cargando modelo de embeddings local ({self.nombre_modelo}, {self.dispositivo})...")
+                    self._modelo = SentenceTransformer(self.nombre_modelo, device=self.dispositivo)
+        return self._modelo
+
+    @property
+    def dimension(self) -> int:
+        return self.modelo.get_sentence_embedding_dimension()
+
+    def codificar(self, textos: List[str], mostrar_progreso: bool = False) -> np.ndarray:
+        """Matriz float32 (n, dim) codificada en lotes de batch_size"""
+        if not textos:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        matriz = self.modelo.encode(
+            textos,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=self.normalizar,
+            show_progress_bar=mostrar_progreso,
+        )
+        return np.asarray(matriz, dtype=np.float32)
+
+    def embed(self, textos: List[str]) -> List[List[float]]:
+        return self.codificar(textos).tolist()
+
+    def embed_query(self, texto: str) -> List[float]:
+        return self.codificar([texto])[0].tolist()
+
+
+# --- CUANTIZACIÓN ---
+
+def cuantizar(matriz: np.ndarray, modo: str = "float32") -> tuple:
+    """
+    Reduce el tamaño de la matriz de embeddings.
+
+    - float16: mitad de memoria, error despreciable para similitud coseno
+    - int8: cuarta parte; escala simétrica por dimensión (max |x| / 127)
+
+    Returns:
+        (datos, escala) con escala = None salvo en int8
+    """
+    if modo not in MODOS_CUANTIZACION:
+        raise ValueError(f"Modo de cuantización desconocido: {modo} (opciones: {MODOS_CUANTIZACION})")
+    matriz = np.asarray(matriz, dtype=np.float32)
+    if modo == "float32":
+        return matriz, None
+    if modo == "float16":
+        return matriz.astype(np.float16), None
+
+    escala = np.abs(matriz).max(axis=0) / 127.0 if len(matriz) else np.ones(matriz.shape[1], dtype=np.float32)
+    escala = np.where(escala == 0, 1.0, escala).astype(np.float32)
+    datos = np.clip(np.rint(matriz / escala), -127, 127).astype(np.int8)
+    return datos, escala
+
+
+def descuantizar(datos: np.ndarray, escala: Optional[np.ndarray] = None) -> np.ndarray:
+    """Matriz float32 a partir de los datos cuantizados"""
+    if escala is None:
+        return np.asarray(datos, dtype=np.float32)
+    return datos.astype(np.float32) * np.asarray(escala, dtype=np.float32)
+
+
+# --- ARTEFACTO EN DISCO (.npy + .meta.json) ---
+
+def ruta_metadata(ruta_npy: str) -> str:
+    base = ruta_npy[:-4] if ruta_npy.endswith(".npy") else ruta_npy
+    return f"{base}.meta.json"
+
+
+def guardar_artefacto(
+    ruta_npy: str,
+    matriz: np.ndarray,
+    ids: List[str],
+    modo: str = "float32",
+    modelo: str = "",
+) -> dict:
+    """
+    Guarda la matriz (cuantizada) en .npy y los ids/escala en un .meta.json al lado.
+    La fila i de la matriz corresponde a ids[i].
+    """
+    if len(ids) != len(matriz):
+        raise ValueError(f"{len(ids)} ids para {len(matriz)} vectores")
+    datos, escala = cuantizar(matriz, modo)
+    os.makedirs(os.path.dirname(ruta_npy) or ".", exist_ok=True)
+    np.save(ruta_npy, datos)
+
+    metadata = {
+        "modelo": modelo,
+        "modo": modo,
+        "dimension": int(datos.shape[1]) if datos.ndim == 2 else 0,
+        "num_vectores": len(ids),
+        "escala": escala.tolist() if escala is not None else None,
+        "ids": list(ids),
+    }
+    with open(ruta_metadata(ruta_npy), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
+    return metadata
+
+
+def cargar_artefacto(ruta_npy: str, mmap: bool = True) -> tuple:
+    """
+    Carga un artefacto de embeddings.
+
+    Returns:
+        (matriz float32, ids, metadata); con mmap=True y float32 la matriz no se copia a memoria
+    """
+    with open(ruta_metadata(ruta_npy), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    datos = np.load(ruta_npy, mmap_mode='r' if mmap else None)
+    escala = np.asarray(metadata["escala"], dtype=np.float32) if metadata.get("escala") else None
+    return descuantizar(datos, escala), metadata["ids"], metadata
+
+
+def vectores_por_id(ruta_npy: str) -> Dict[str, np.ndarray]:
+    """{id: vector} de un artefacto previo, o {} si no existe (para reutilizar embeddings)"""
+    if not os.path.exists(ruta_npy) or not os.path.exists(ruta_metadata(ruta_npy)):
+        return {}
+    matriz, ids, _ = cargar_artefacto(ruta_npy, mmap=False)
+    return {id_: matriz[i] for i, id_ in enumerate(ids)}
@@ -0,0 +1,132 @@
+"""
+MÓDULO DE RECUPERACIÓN ESPECULATIVA
+Cuando es probable que la búsqueda exacta no baste (artículo fuera del índice,
+incompleto o rango con huecos), la rama vectorial (embedding + búsqueda) se
+lanza en paralelo con la exacta en lugar de después. Si la rama exacta
+responde, la especulativa se cancela (o su resultado se descarta)
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from typing import Any, Callable, Optional, Tuple
+
+from formato_utils import es_articulo_incompleto
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+RAG_ESPECULATIVO = os.getenv("RAG_ESPECULATIVO", "true").lower() == "true"
+HILOS_ESPECULATIVOS = int(os.getenv("RAG_HILOS_ESPECULATIVOS", 8))  # Ramas vectoriales en paralelo
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_especulativo() -> ThreadPoolExecutor:
+    """Pool propio: las ramas especulativas no compiten con las peticiones por el pool del event loop"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max(1, HILOS_ESPECULATIVOS), thread_name_prefix="especulativa")
+        return _pool
+
+
+def hace_falta_recuperacion(
+    articulos: dict,
+    numero_articulo: Optional[str] = None,
+    rango_articulos: Optional[Tuple[int, int]] = None,
+) -> bool:
+    """
+    Predice si la consulta acabará en la rama vectorial a pesar de nombrar artículos,
+    usando el índice en memoria (las claves de Redis se generan a partir de él):
+
+    - Artículo individual: no está en el índice o su texto está incompleto
+    - Rango: algún artículo incompleto, o ninguno presente
+
+    Sin artículo ni rango no hay rama exacta con la que solapar: devuelve False.
+    """
+    if rango_articulos:
+        inicio, fin = rango_articulos
+        presentes = [articulos[str(n)] for n in range(inicio, fin + 1) if str(n) in articulos]
+        return not presentes or any(es_articulo_incompleto(texto) for texto in presentes)
+    if numero_articulo:
+        texto = articulos.get(numero_articulo)
+        return not texto or es_articulo_incompleto(texto)
+    return False
+
+
+class Cancelada(Exception):
+    """La rama especulativa se canceló porque la búsqueda exacta respondió"""
+
+
+class RamaEspeculativa:
+    """
+    Ejecución en segundo plano de `funcion(*args, cancelada=evento)`.
+    La función debe comprobar `cancelada.is_set()` entre pasos caros
+    (p.ej. antes de la búsqueda vectorial) y devolver None si está activo.
+    """
+
+    lanzadas = 0
+    usadas = 0
+    canceladas = 0
+    ahorro_total = 0.0  # Segundos de latencia ahorrados: solape entre la rama y la búsqueda exacta
+    _lock = threading.Lock()
+
+    def __init__(self, funcion: Callable[..., Any], *args, pool: Optional[ThreadPoolExecutor] = None, **kwargs):
+        self.cancelada = threading.Event()
+        self.inicio = time.perf_counter()
+        self.fin: Optional[float] = None
+        self._consumida = False
+        self._futuro = (pool or pool_especulativo()).submit(self._ejecutar, funcion, *args, **kwargs)
+        self._contar(lanzadas=1)
+
+    def _ejecutar(self, funcion: Callable[..., Any], *args, **kwargs) -> Any:
+        try:
+            return funcion(*args, cancelada=self.cancelada, **kwargs)
+        finally:
+            self.fin = time.perf_counter()
+
+    @classmethod
+    def _contar(cls, lanzadas: int = 0, usadas: int = 0, canceladas: int = 0, ahorro: float = 0.0) -> None:
+        with cls._lock:
+            cls.lanzadas += lanzadas
+            cls.usadas += usadas
+            cls.canceladas += canceladas
+            cls.ahorro_total += ahorro
+
+    def resultado(self, timeout: Optional[float] = None) -> Any:
+        """Espera el resultado de la rama (los errores de la rama se propagan)"""
+        self._consumida = True
+        llamada = time.perf_counter()  # La búsqueda exacta ya terminó sin responder
+        try:
+            resultado = self._futuro.result(timeout=timeout)
+        except CancelledError:
+            raise Cancelada()
+        finally:
+            # En serie la rama habría empezado ahora: se ahorra lo que corrió en paralelo
+            # con la búsqueda exacta, nunca más que la duración de la propia rama
+            duracion = (self.fin or time.perf_counter()) - self.inicio
+            self._contar(usadas=1, ahorro=min(llamada - self.inicio, duracion))
+        if self.cancelada.is_set():
+            raise Cancelada()
+        return resultado
+
+    def cancelar(self) -> None:
+        """Descarta la rama si nadie ha usado su resultado (no-op en caso contrario)"""
+        if self._consumida:
+            return
+        self._consumida = True
+        self.cancelada.set()
+        self._futuro.cancel()  # Si aún no ha empezado, no llega a ejecutarse
+        self._contar(canceladas=1)
+
+    @classmethod
+    def estadisticas(cls) -> dict:
+        with cls._lock:
+            return {
+                "activa": RAG_ESPECULATIVO,
+                "lanzadas": cls.lanzadas,
+                "usadas": cls.usadas,
+                "canceladas": cls.canceladas,
+                "ahorro_medio_ms": round(cls.ahorro_total * 1000 / cls.usadas, 1) if cls.usadas else None,
+            }
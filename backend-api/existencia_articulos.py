@@ -0,0 +1,171 @@
+"""
+MÓDULO DE EXISTENCIA DE ARTÍCULOS (CACHÉ NEGATIVA)
+Conjunto exacto de los artículos válidos de cada documento (índice de artículos
+y mapa de chunks de la ingesta) para responder al instante que un artículo no
+existe ("artículo 999", "artículo 12 quater") en lugar de pasar por el regex
+sobre el PDF entero, el embedding, Pinecone y Gemini. Con ~650 identificadores
+por documento un set exacto ocupa poco y no tiene falsos positivos, así que no
+compensa un filtro de Bloom. Las sugerencias calculadas se guardan en una
+caché negativa ligada a la versión del índice de artículos.
+
+El índice sale de los encabezados del PDF y puede no tener alguno, así que
+solo se afirma que un artículo no existe cuando es seguro: el número supera
+al último artículo, o falta un sufijo (bis, ter...) de un número que sí está.
+En el resto de casos la consulta sigue el camino normal (regex y RAG).
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from normalizacion_consultas import numero_canonico
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+EXISTENCIA_ARTICULOS = os.getenv("EXISTENCIA_ARTICULOS", "true").lower() == "true"
+NEGATIVOS_MAX = int(os.getenv("NEGATIVOS_MAX", 1000))  # Entradas de la caché negativa (LRU)
+NEGATIVOS_TTL = int(os.getenv("NEGATIVOS_TTL", 3600))  # Segundos
+NUM_SUGERENCIAS = 3
+SUFIJOS = ("bis", "ter", "quater", "quinquies", "sexies", "septies", "octies", "nonies", "decies")
+
+
+def clave_orden(numero: str) -> Optional[Tuple[int, int]]:
+    """(número, orden del sufijo latino) o None si no es un identificador de artículo"""
+    match = re.fullmatch(r'(\d+)(?: ([a-z]+))?', numero_canonico(numero))
+    if not match:
+        return None
+    sufijo = match.group(2)
+    if sufijo is None:
+        return int(match.group(1)), 0
+    if sufijo not in SUFIJOS:
+        return None
+    return int(match.group(1)), SUFIJOS.index(sufijo) + 1
+
+
+def sugerencias_cercanas(numero: str, existentes: Iterable[str], n: int = NUM_SUGERENCIAS) -> List[str]:
+    """
+    Artículos válidos más próximos: primero los del mismo número con otro sufijo
+    (12 quater -> 12, 12 bis, 12 ter), después los de número más cercano.
+    Se devuelven en orden de documento.
+    """
+    objetivo = clave_orden(numero)
+    if objetivo is None:
+        return []
+    candidatos = [(clave_orden(e), e) for e in existentes]
+    candidatos = [(clave, e) for clave, e in candidatos if clave is not None]
+    cercanos = sorted(
+        candidatos,
+        key=lambda c: (abs(c[0][0] - objetivo[0]), abs(c[0][1] - objetivo[1]), c[0])
+    )[:n]
+    return [e for _, e in sorted(cercanos)]
+
+
+def inexistencia_segura(numero: str, validos: Iterable[str]) -> bool:
+    """
+    True si el artículo seguro que no existe: número mayor que el del último
+    artículo ("999") o sufijo ausente de un número que existe ("12 quater" con
+    el 12). Un hueco en la numeración puede ser un encabezado no detectado.
+    """
+    objetivo = clave_orden(numero)
+    if objetivo is None:
+        return False
+    claves = [c for c in (clave_orden(v) for v in validos) if c is not None]
+    if not claves:
+        return False
+    if objetivo[0] > max(c[0] for c in claves):
+        return True
+    return objetivo[1] > 0 and (objetivo[0], 0) in claves and objetivo not in claves
+
+
+class ExistenciaArticulos:
+    """
+    Conjuntos de artículos válidos por documento, reconstruidos solo cuando cambia
+    la versión del índice de artículos (p.ej. tras /cache/invalidar).
+
+    Args:
+        articulos_por_documento: Función doc_id -> identificadores válidos
+        version_por_documento: Función doc_id -> versión del índice de artículos
+    """
+
+    def __init__(
+        self,
+        articulos_por_documento: Callable[[str], Iterable[str]],
+        version_por_documento: Callable[[str], str],
+        max_negativos: int = NEGATIVOS_MAX,
+        ttl_negativos: int = NEGATIVOS_TTL,
+    ):
+        self.articulos_por_documento = articulos_por_documento
+        self.version_por_documento = version_por_documento
+        self.max_negativos = max(1, max_negativos)
+        self.ttl_negativos = ttl_negativos
+        self._conjuntos = {}  # doc_id -> (versión, {normalizado: original})
+        self._negativos: "OrderedDict[tuple, tuple]" = OrderedDict()  # (doc, versión, num) -> (expira, sugerencias)
+        self._lock = threading.Lock()
+        self.consultas = 0
+        self.inexistentes = 0
+        self.dudosos = 0  # Ausentes del índice sin certeza de que no existan (siguen por regex/RAG)
+        self.aciertos_negativos = 0
+
+    def _conjunto(self, documento_id: str) -> Tuple[str, dict]:
+        version = self.version_por_documento(documento_id)
+        with self._lock:
+            actual = self._conjuntos.get(documento_id)
+            if actual is not None and actual[0] == version:
+                return actual
+        validos = {numero_canonico(n): n for n in self.articulos_por_documento(documento_id)}
+        with self._lock:
+            self._conjuntos[documento_id] = (version, validos)
+        return version, validos
+
+    def existe(self, documento_id: str, numero: str) -> bool:
+        """False solo si es seguro que el artículo no existe (ver inexistencia_segura)"""
+        _, validos = self._conjunto(documento_id)
+        if not validos or numero_canonico(numero) in validos:
+            return True
+        return not inexistencia_segura(numero, validos.values())
+
+    def comprobar(self, documento_id: str, numero: str) -> Optional[List[str]]:
+        """
+        Returns:
+            None si el artículo existe o no es seguro que falte; si no, las sugerencias
+            (de la caché negativa si ya se calcularon)
+        """
+        with self._lock:
+            self.consultas += 1
+        version, validos = self._conjunto(documento_id)
+        if not validos or numero_canonico(numero) in validos:
+            return None
+        if not inexistencia_segura(numero, validos.values()):
+            with self._lock:
+                self.dudosos += 1
+            return None
+        clave = (documento_id, version, numero_canonico(numero))
+        ahora = time.monotonic()
+        with self._lock:
+            self.inexistentes += 1
+            entrada = self._negativos.get(clave)
+            if entrada is not None and entrada[0] > ahora:
+                self._negativos.move_to_end(clave)
+                self.aciertos_negativos += 1
+                return list(entrada[1])
+
+        sugerencias = sugerencias_cercanas(numero, validos.values())
+        with self._lock:
+            self._negativos[clave] = (ahora + self.ttl_negativos, sugerencias)
+            self._negativos.move_to_end(clave)
+            while len(self._negativos) > self.max_negativos:
+                self._negativos.popitem(last=False)
+        return list(sugerencias)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "articulos_por_documento": {doc_id: len(validos) for doc_id, (_, validos) in self._conjuntos.items()},
+                "consultas": self.consultas,
+                "inexistentes": self.inexistentes,
+                "dudosos": self.dudosos,
+                "aciertos_cache_negativa": self.aciertos_negativos,
+                "cache_negativa": len(self._negativos),
+            }
@@ -0,0 +1,211 @@
+"""
+MÓDULO DE EXTRACCIÓN DE TEXTO DE PDF
+Extracción en paralelo por rangos de páginas (pool de procesos), offsets de
+carácter por página y caché en disco del texto indexada por el hash del PDF
+"""
+
+import os
+import json
+import time
+import bisect
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", min(os.cpu_count() or 1, 8)))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", ".pdf_cache")
+PAGINAS_MIN_PARALELO = 16  # Por debajo de esto el arranque del pool no compensa
+RANGOS_POR_WORKER = 4  # Rangos más pequeños reparten mejor páginas de coste desigual
+SEPARADOR_PAGINAS = "\n"
+VERSION_CACHE = 1  # Incrementar si cambia el formato o la forma de extraer
+
+MOTORES = ("pypdf2", "pdfplumber")
+
+
+def hash_pdf(ruta_pdf: str) -> str:
+    """SHA-256 del fichero PDF (leído por bloques)"""
+    sha = hashlib.sha256()
+    with open(ruta_pdf, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def contar_paginas(ruta_pdf: str, motor: str = "pypdf2") -> int:
+    """Número de páginas del PDF"""
+    if motor == "pdfplumber":
+        import pdfplumber
+        with pdfplumber.open(ruta_pdf) as pdf:
+            return len(pdf.pages)
+    import PyPDF2
+    with open(ruta_pdf, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def _extraer_rango(ruta_pdf: str, motor: str, inicio: int, fin: int) -> List[str]:
+    """
+    Worker: extrae las páginas [inicio, fin) abriendo el PDF una sola vez.
+    Debe ser una función de módulo para poder enviarse al pool de procesos.
+    """
+    if motor == "pdfplumber":
+        import pdfplumber
+        with pdfplumber.open(ruta_pdf) as pdf:
+            return [pdf.pages[i].extract_text() or "" for i in range(inicio, fin)]
+    import PyPDF2
+    with open(ruta_pdf, 'rb') as f:
+        lector = PyPDF2.PdfReader(f)
+        return [lector.pages[i].extract_text() or "" for i in range(inicio, fin)]
+
+
+def rangos_paginas(num_paginas: int, num_rangos: int) -> List[tuple]:
+    """Divide [0, num_paginas) en como máximo num_rangos intervalos contiguos"""
+    num_rangos = max(1, min(num_rangos, num_paginas))
+    tamano, resto = divmod(num_paginas, num_rangos)
+    rangos = []
+    inicio = 0
+    for i in range(num_rangos):
+        fin = inicio + tamano + (1 if i < resto else 0)
+        if fin > inicio:
+            rangos.append((inicio, fin))
+        inicio = fin
+    return rangos
+
+
+def extraer_paginas(
+    ruta_pdf: str,
+    motor: str = "pypdf2",
+    max_workers: int = PDF_WORKERS,
+    contexto_mp: Optional[str] = None,
+) -> List[str]:
+    """
+    Extrae el texto de todas las páginas conservando el orden.
+
+    Con muchas páginas reparte rangos contiguos entre un pool de procesos
+    (el parseo de PDF es CPU-bound y no escala con hilos por el GIL).
+    contexto_mp: método de arranque ("fork", "spawn"...); None = el de la plataforma.
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de extracción desconocido: {motor} (opciones: {MOTORES})")
+
+    num_paginas = contar_paginas(ruta_pdf, motor)
+    if max_workers <= 1 or num_paginas < PAGINAS_MIN_PARALELO:
+        return _extraer_rango(ruta_pdf, motor, 0, num_paginas)
+
+    rangos = rangos_paginas(num_paginas, max_workers * RANGOS_POR_WORKER)
+    contexto = multiprocessing.get_context(contexto_mp)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=contexto) as executor:
+        resultados = executor.map(
+            _extraer_rango,
+            [ruta_pdf] * len(rangos), [motor] * len(rangos),
+            [inicio for inicio, _ in rangos], [fin for _, fin in rangos],
+        )
+        paginas = []
+        for textos in resultados:  # map devuelve los rangos en orden
+            paginas.extend(textos)
+    return paginas
+
+
+def unir_paginas(paginas: List[str], separador: str = SEPARADOR_PAGINAS) -> tuple:
+    """
+    Une las páginas en un único texto (un solo join) y calcula sus offsets.
+
+    Returns:
+        (texto, offsets) con offsets = [{'pagina': n (1-based), 'char_start', 'char_end'}]
+    """
+    offsets = []
+    posicion = 0
+    for numero, texto_pagina in enumerate(paginas, 1):
+        offsets.append({'pagina': numero, 'char_start': posicion, 'char_end': posicion + len(texto_pagina)})
+        posicion += len(texto_pagina) + len(separador)
+    return separador.join(paginas), offsets
+
+
+def pagina_de_offset(offsets: List[dict], char: int) -> Optional[int]:
+    """Página (1-based) que contiene el carácter `char` del texto unido"""
+    if not offsets:
+        return None
+    inicios = [o['char_start'] for o in offsets]
+    return offsets[max(0, bisect.bisect_right(inicios, char) - 1)]['pagina']
+
+
+def anotar_paginas(chunks: List[dict], offsets: List[dict]) -> List[dict]:
+    """Añade 'pagina' (página donde empieza el chunk) a los chunks con char_start"""
+    for chunk in chunks:
+        if chunk.get('char_start') is not None and offsets:
+            chunk['pagina'] = pagina_de_offset(offsets, chunk['char_start'])
+    return chunks
+
+
+# --- CACHÉ EN DISCO ---
+
+def ruta_cache(cache_dir: str, digest: str, motor: str) -> str:
+    return os.path.join(cache_dir, f"{digest}_{motor}_v{VERSION_CACHE}.json")
+
+
+def cargar_cache(ruta: str) -> Optional[List[str]]:
+    """Páginas cacheadas o None si no hay caché válida"""
+    if not os.path.exists(ruta):
+        return None
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)['paginas']
+    except (ValueError, KeyError, OSError) as e:
+        print(f"⚠️ Caché de texto corrupta ({ruta}): {e} - se vuelve a extraer")
+        return None
+
+
+def guardar_cache(ruta: str, paginas: List[str], digest: str, motor: str) -> None:
+    """Guarda las páginas extraídas de forma atómica"""
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({'hash': digest, 'motor': motor, 'version': VERSION_CACHE,
+                   'actualizado': time.time(), 'paginas': paginas}, f, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def extraer_texto_pdf(
+    ruta_pdf: str,
+    motor: str = "pypdf2",
+    max_workers: int = PDF_WORKERS,
+    cache_dir: Optional[str] = PDF_CACHE_DIR,
+    contexto_mp: Optional[str] = None,
+) -> dict:
+    """
+    ⚡ MEJORA #13: Extracción de PDF en paralelo con caché por hash
+
+    Args:
+        ruta_pdf: Ruta al PDF
+        motor: "pypdf2" (API e ingesta Vertex) o "pdfplumber" (procesador local)
+        max_workers: Procesos del pool (1 = secuencial)
+        cache_dir: Directorio de la caché de texto (None = sin caché)
+        contexto_mp: Método de arranque del pool (None = el de la plataforma)
+
+    Returns:
+        {'texto', 'paginas' (offsets por página), 'num_paginas', 'hash', 'desde_cache', 'duracion_s'}
+    """
+    if not os.path.exists(ruta_pdf):
+        raise FileNotFoundError(f"❌ El archivo no existe: {ruta_pdf}")
+
+    inicio = time.time()
+    digest = hash_pdf(ruta_pdf)
+    ruta = ruta_cache(cache_dir, digest, motor) if cache_dir else None
+
+    paginas = cargar_cache(ruta) if ruta else None
+    desde_cache = paginas is not None
+    if not desde_cache:
+        paginas = extraer_paginas(ruta_pdf, motor, max_workers, contexto_mp)
+        if ruta:
+            guardar_cache(ruta, paginas, digest, motor)
+
+    texto, offsets = unir_paginas(paginas)
+    return {
+        'texto': texto,
+        'paginas': offsets,
+        'num_paginas': len(paginas),
+        'hash': digest,
+        'desde_cache': desde_cache,
+        'duracion_s': round(time.time() - inicio, 2),
+    }
@@ -0,0 +1,88 @@
+"""
+MÓDULO DE FORMATO DE RESPUESTAS
+Corrección de encoding, detección de artículos incompletos y formato de las
+respuestas directas (sin LLM), compartidos por la API y el calentamiento de caché
+"""
+
+import re
+from typing import Optional
+
+LIMITE_RESPUESTA_DIRECTA = 4000  # Caracteres; por encima Gemini formatea el artículo
+
+
+def corregir_encoding(texto: str) -> str:
+    """
+    Corrige problemas de encoding usando ftfy (automático y robusto).
+    
+    ⚡ MEJORA #2: Corrección automática con ftfy en lugar de reemplazos manuales
+    """
+    try:
+        import ftfy
+        # ftfy detecta y corrige automáticamente problemas de encoding
+        texto_corregido = ftfy.fix_text(texto)
+        return texto_corregido
+    except ImportError:
+        # Fallback a reemplazos manuales si ftfy no está disponible
+        texto = texto.replace('Ã­', 'í')
+        texto = texto.replace('Ã³', 'ó')
+        texto = texto.replace('Ã±', 'ñ')
+        texto = texto.replace('Ã¡', 'á')
+        texto = texto.replace('Ã©', 'é')
+        texto = texto.replace('Ãº', 'ú')
+        texto = texto.replace('Ã¼', 'ü')
+        texto = texto.replace('Ã¶', 'ö')
+        
+        # Mayúsculas
+        texto = texto.replace('Ã', 'Á')
+        texto = texto.replace('Ã‰', 'É')
+        texto = texto.replace('Ã"', 'Ó')
+        texto = texto.replace('Ãš', 'Ú')
+        
+        # Eliminar caracteres basura
+        texto = texto.replace('Â', '')
+        
+        return texto
+
+
+def es_articulo_incompleto(texto: str) -> bool:
+    """
+    Detecta si un chunk contiene un artículo incompleto.
+    Heurísticas:
+    - Termina abruptamente (no termina en punto)
+    - Contiene "..." o texto cortado
+    - Tiene numeración incompleta (1., 2., pero no cierra)
+    """
+    texto_limpio = texto.strip()
+    
+    # Heurística 1: No termina en punto ni en paréntesis de cierre
+    if not texto_limpio.endswith(('.', ')', '»', '"')):
+        return True
+    
+    # Heurística 2: Contiene indicadores de truncado
+    if '...' in texto_limpio or '[truncado]' in texto_limpio.lower():
+        return True
+    
+    # Heurística 3: Tiene numeración sin cerrar (ej: "1. xxx 2. xxx 3." pero sin texto después del 3)
+    numeros = re.findall(r'\n\s*(\d+)\.\s+', texto_limpio)
+    if len(numeros) >= 2:
+        ultimo_numero = numeros[-1]
+        # Verificar si después del último número hay texto sustancial
+        patron = rf'{ultimo_numero}\.\s+(.+)$'
+        match = re.search(patron, texto_limpio, re.DOTALL)
+        if match and len(match.group(1).strip()) < 20:
+            return True
+    
+    return False
+
+
+def formatear_respuesta_articulo(numero: str, texto: str) -> Optional[str]:
+    """
+    Respuesta directa de un artículo (sin LLM), o None si el artículo parece
+    incompleto o es demasiado largo y debe pasar por RAG/Gemini
+    """
+    if not texto or es_articulo_incompleto(texto):
+        return None
+    texto_corregido = corregir_encoding(texto)
+    if len(texto_corregido) >= LIMITE_RESPUESTA_DIRECTA:
+        return None
+    return f"**Artículo {numero}**\n\n{texto_corregido}"
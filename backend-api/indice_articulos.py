@@ -0,0 +1,187 @@
+"""
+MÓDULO DE RECUPERACIÓN JERÁRQUICA (ARTÍCULOS → CHUNKS)
+Índice vectorial con un embedding por artículo (u opcionalmente por Título)
+que se consulta antes que el de chunks: la búsqueda de chunks se restringe a
+los artículos ganadores (filtro $in por metadata), así que los candidatos
+pertenecen a pocos artículos y apenas queda reconstrucción por hacer. El coste
+de la primera etapa depende del número de artículos (~650), no del de chunks.
+
+Construcción (mismo backend y modelo de embeddings que la API):
+    python indice_articulos.py --documento cp --salida ../indices/codigo_penal_articulos [--nivel titulo]
+"""
+
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from articulos_utils import localizar_articulos_documento, filtro_articulos
+from indice_local import IndiceVectorialLocal
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+BUSQUEDA_JERARQUICA = os.getenv("BUSQUEDA_JERARQUICA", "true").lower() == "true"  # Si hay índice de artículos
+INDICE_ARTICULOS_DIR = os.getenv("INDICE_ARTICULOS_DIR", "../indices/codigo_penal_articulos")
+TOP_ARTICULOS = int(os.getenv("TOP_ARTICULOS", 6))  # Artículos (o Títulos) que pasan a la segunda etapa
+MAX_CHARS_EMBEDDING = 2000  # Texto por artículo (los modelos truncan; el inicio es lo más representativo)
+NIVELES = ("articulo", "titulo")
+
+
+def entradas_indice(texto_documento: str, nivel: str = "articulo", max_chars: int = MAX_CHARS_EMBEDDING) -> Tuple[List[str], List[str], List[dict]]:
+    """
+    Textos a embeber para el índice de primera etapa.
+
+    - nivel "articulo": un texto por artículo, precedido de su Título y Capítulo
+    - nivel "titulo": un texto por Título con su epígrafe y el inicio de cada artículo
+
+    Returns:
+        (ids, textos, metadatas); metadata['articulos'] = artículos que cubre cada entrada
+    """
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel desconocido: {nivel} (opciones: {NIVELES})")
+    ubicados = {}
+    for articulo in localizar_articulos_documento(texto_documento):
+        ubicados[articulo['numero']] = articulo  # Si un número se repite, gana el último (como en el índice exacto)
+
+    if nivel == "articulo":
+        ids, textos, metadatas = [], [], []
+        for numero, articulo in ubicados.items():
+            cuerpo = re.sub(r'\s+', ' ', texto_documento[articulo['inicio']:articulo['fin']]).strip()
+            cabecera = " | ".join(e for e in (articulo['titulo'], articulo['capitulo']) if e)
+            ids.append(numero)
+            textos.append(f"{cabecera}\n{cuerpo[:max_chars]}" if cabecera else cuerpo[:max_chars])
+            metadatas.append({
+                'articulo': numero, 'articulos': [numero],
+                'titulo': articulo['titulo'], 'capitulo': articulo['capitulo'],
+            })
+        return ids, textos, metadatas
+
+    grupos: Dict[str, dict] = {}
+    for numero, articulo in ubicados.items():
+        clave = articulo['titulo'] or articulo['libro'] or "Sin título"
+        grupo = grupos.setdefault(clave, {'articulos': [], 'partes': [clave]})
+        grupo['articulos'].append(numero)
+        cuerpo = re.sub(r'\s+', ' ', texto_documento[articulo['inicio']:articulo['fin']]).strip()
+        grupo['partes'].append(cuerpo[:200])
+    ids = list(grupos)
+    textos = ["\n".join(grupos[c]['partes'])[:max_chars * 2] for c in ids]
+    metadatas = [{'titulo': c, 'articulos': grupos[c]['articulos']} for c in ids]
+    return ids, textos, metadatas
+
+
+def construir_indice(
+    texto_documento: str,
+    embed_fn: Callable[[List[str]], List[List[float]]],
+    nivel: str = "articulo",
+    modo: str = "float32",
+    lote: int = 32,
+) -> IndiceVectorialLocal:
+    """Embebe las entradas por lotes y devuelve el índice (vectores normalizados)"""
+    ids, textos, metadatas = entradas_indice(texto_documento, nivel)
+    vectores = []
+    for i in range(0, len(textos), max(1, lote)):
+        vectores.extend(embed_fn(textos[i:i + lote]))
+    matriz = np.asarray(vectores, dtype=np.float32).reshape(len(ids), -1)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    matriz = matriz / np.where(normas == 0, 1.0, normas)
+    return IndiceVectorialLocal(matriz, ids, metadatas, modo=modo)
+
+
+def articulos_candidatos(indice: IndiceVectorialLocal, query_vector: List[float], top: int = TOP_ARTICULOS) -> Optional[dict]:
+    """
+    Primera etapa: artículos ganadores para la consulta.
+
+    Returns:
+        {'articulos', 'entradas', 'scores', 'filtro'} o None si el índice no es compatible con la consulta
+    """
+    if not len(indice) or indice.vectores.shape[1] != len(query_vector):
+        return None
+    matches = indice.buscar(query_vector, top_k=top)['matches']
+    articulos = []
+    for match in matches:
+        for numero in match['metadata'].get('articulos', [match['id']]):
+            if numero not in articulos:
+                articulos.append(numero)
+    return {
+        'articulos': articulos,
+        'entradas': [m['id'] for m in matches],
+        'scores': [round(m['score'], 3) for m in matches],
+        'filtro': filtro_articulos(articulos),
+    }
+
+
+class IndicesArticulos:
+    """
+    Índices de primera etapa por documento, cargados bajo demanda desde disco.
+    Un documento sin índice construido sigue con la búsqueda plana de chunks.
+
+    Args:
+        ruta_por_documento: Función Documento -> directorio del índice (o None)
+    """
+
+    def __init__(self, ruta_por_documento: Callable[[object], Optional[str]]):
+        self.ruta_por_documento = ruta_por_documento
+        self._indices: Dict[str, Optional[IndiceVectorialLocal]] = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, documento) -> Optional[IndiceVectorialLocal]:
+        with self._lock:
+            if documento.id in self._indices:
+                return self._indices[documento.id]
+            ruta = self.ruta_por_documento(documento)
+            indice = None
+            if ruta and os.path.exists(os.path.join(ruta, "config.json")):
+                try:
+                    indice = IndiceVectorialLocal.cargar(ruta)
+                    print(f"✅ Índice de artículos '{documento.id}' cargado: {len(indice)} entradas ({ruta})")
+                except Exception as e:
+                    print(f"⚠️ No se pudo cargar el índice de artículos de '{documento.id}': {e}")
+            else:
+                print(f"ℹ️  '{documento.id}' sin índice de artículos ({ruta}) - búsqueda plana de chunks")
+            self._indices[documento.id] = indice
+            return indice
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {doc_id: len(indice) if indice is not None else None for doc_id, indice in self._indices.items()}
+
+
+def main():
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from corpus import cargar_documentos, CORPUS_CONFIG, DOCUMENTO_POR_DEFECTO
+    from extraccion_pdf import extraer_texto_pdf
+
+    parser = argparse.ArgumentParser(description='Construye el índice vectorial de artículos (primera etapa)')
+    parser.add_argument('--documento', type=str, default=DOCUMENTO_POR_DEFECTO,
+                        help=f'Documento del corpus (default: {DOCUMENTO_POR_DEFECTO})')
+    parser.add_argument('--salida', type=str, default=INDICE_ARTICULOS_DIR, help='Directorio del índice')
+    parser.add_argument('--nivel', choices=NIVELES, default="articulo", help='Un vector por artículo o por Título')
+    parser.add_argument('--modo', choices=("float32", "int8"), default="float32", help='Almacenamiento del índice')
+    parser.add_argument('--lote', type=int, default=32, help='Textos por llamada al modelo de embeddings')
+    args = parser.parse_args()
+
+    documentos = {doc.id: doc for doc in cargar_documentos(CORPUS_CONFIG, os.getenv("PDF_PATH", "../documentos/codigo_penal.pdf"))}
+    documento = documentos[args.documento]
+    texto = extraer_texto_pdf(documento.pdf_path, motor="pypdf2")['texto']
+
+    if os.getenv("EMBEDDING_BACKEND", "vertex") == "local":
+        from embeddings_locales import EmbeddingsLocales
+        embed_fn = EmbeddingsLocales().embed
+    else:
+        import vertexai
+        from vertexai.language_models import TextEmbeddingModel
+        vertexai.init(project=os.getenv("GCP_PROJECT_ID", "resolute-return-476416-g5"), location=os.getenv("GCP_REGION", "us-central1"))
+        modelo = TextEmbeddingModel.from_pretrained("text-embedding-004")
+        embed_fn = lambda textos: [e.values for e in modelo.get_embeddings(textos)]
+
+    indice = construir_indice(texto, embed_fn, nivel=args.nivel, modo=args.modo, lote=args.lote)
+    indice.guardar(args.salida)
+    print(f"💾 Índice de {args.nivel}s de '{documento.id}' guardado en {args.salida} ({len(indice)} entradas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+MÓDULO DE ÍNDICE VECTORIAL LOCAL
+Búsqueda por similitud sin servicio externo con tres modos de almacenamiento:
+float32 (exacto), int8 (cuantización escalar) y PQ (product quantization).
+En int8/PQ se puntúa con los códigos compactos y se re-ordena una shortlist
+con los vectores float32 leídos del disco (memory-map)
+"""
+
+import os
+import json
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from embeddings_locales import cuantizar
+
+MODOS_INDICE = ("float32", "int8", "pq")
+FACTOR_SHORTLIST = int(os.getenv("INDICE_LOCAL_SHORTLIST", 10))  # Candidatos = top_k * factor
+PQ_CENTROIDES = 256  # Un byte por subespacio
+PQ_ITERACIONES = 20
+BLOQUE_PUNTUACION = 8192  # Filas por bloque al puntuar int8 (acota la memoria temporal)
+VERSION_INDICE = 1
+
+
+def _kmeans(datos: np.ndarray, k: int, iteraciones: int = PQ_ITERACIONES, semilla: int = 0) -> np.ndarray:
+    """K-means de Lloyd (numpy); devuelve los k centroides"""
+    rng = np.random.default_rng(semilla)
+    k = min(k, len(datos))
+    centroides = datos[rng.choice(len(datos), size=k, replace=False)].copy()
+    for _ in range(iteraciones):
+        distancias = (
+            (datos ** 2).sum(axis=1, keepdims=True)
+            - 2 * datos @ centroides.T
+            + (centroides ** 2).sum(axis=1)
+        )
+        asignacion = distancias.argmin(axis=1)
+        sumas = np.zeros_like(centroides)
+        np.add.at(sumas, asignacion, datos)
+        tamanos = np.bincount(asignacion, minlength=k)
+        vacios = tamanos == 0
+        centroides[~vacios] = sumas[~vacios] / tamanos[~vacios, None]
+        if vacios.any():  # Centroides vacíos: reiniciar en puntos al azar
+            centroides[vacios] = datos[rng.integers(len(datos), size=int(vacios.sum()))]
+    return centroides
+
+
+def entrenar_pq(matriz: np.ndarray, subespacios: int, centroides: int = PQ_CENTROIDES) -> tuple:
+    """
+    Product quantization: parte cada vector en `subespacios` trozos y cuantiza
+    cada trozo con su propio diccionario de hasta 256 centroides.
+
+    Returns:
+        (codigos uint8 (n, subespacios), centroides float32 (subespacios, k, dim/subespacios))
+    """
+    n, dim = matriz.shape
+    if dim % subespacios:
+        raise ValueError(f"La dimensión {dim} no es divisible entre {subespacios} subespacios")
+    sub_dim = dim // subespacios
+    k = min(centroides, n)
+
+    diccionarios = np.zeros((subespacios, k, sub_dim), dtype=np.float32)
+    codigos = np.zeros((n, subespacios), dtype=np.uint8)
+    for s in range(subespacios):
+        trozo = matriz[:, s * sub_dim:(s + 1) * sub_dim]
+        diccionarios[s] = _kmeans(trozo, k, semilla=s)
+        distancias = (
+            (trozo ** 2).sum(axis=1, keepdims=True)
+            - 2 * trozo @ diccionarios[s].T
+            + (diccionarios[s] ** 2).sum(axis=1)
+        )
+        codigos[:, s] = distancias.argmin(axis=1)
+    return codigos, diccionarios
+
+
+def _cumple_filtro(metadata: dict, filtro: Optional[dict]) -> bool:
+    """Subconjunto de la sintaxis de filtros de Pinecone: valor, $eq, $ne, $in"""
+    for campo, condicion in (filtro or {}).items():
+        valor = metadata.get(campo)
+        if isinstance(condicion, dict):
+            if "$eq" in condicion and valor != condicion["$eq"]:
+                return False
+            if "$ne" in condicion and valor == condicion["$ne"]:
+                return False
+            if "$in" in condicion and valor not in condicion["$in"]:
+                return False
+        elif valor != condicion:
+            return False
+    return True
+
+
+class IndiceVectorialLocal:
+    """
+    Índice vectorial en memoria con resultados en el mismo formato que Pinecone
+    ({'matches': [{'id', 'score', 'metadata'}]}), para poder sustituirlo en la API.
+
+    Los vectores deben estar normalizados (similitud coseno = producto escalar).
+    El modo se elige al construir cada índice y se guarda con él.
+    """
+
+    def __init__(
+        self,
+        vectores: np.ndarray,
+        ids: List[str],
+        metadatas: Optional[List[dict]] = None,
+        modo: str = "float32",
+        pq_subespacios: Optional[int] = None,
+        factor_shortlist: int = FACTOR_SHORTLIST,
+        _codigos: Optional[np.ndarray] = None,
+        _escala: Optional[np.ndarray] = None,
+        _centroides: Optional[np.ndarray] = None,
+    ):
+        if modo not in MODOS_INDICE:
+            raise ValueError(f"Modo de índice desconocido: {modo} (opciones: {MODOS_INDICE})")
+        if len(ids) != len(vectores):
+            raise ValueError(f"{len(ids)} ids para {len(vectores)} vectores")
+
+        self.modo = modo
+        self.ids = list(ids)
+        self.metadatas = list(metadatas) if metadatas is not None else [{} for _ in ids]
+        self.vectores = vectores  # float32; en int8/PQ solo se leen las filas de la shortlist
+        self.factor_shortlist = max(1, factor_shortlist)
+        self.codigos, self.escala, self.centroides = _codigos, _escala, _centroides
+        self._posiciones = None  # id -> fila, se construye en el primer obtener()
+
+        if modo == "int8" and self.codigos is None:
+            self.codigos, self.escala = cuantizar(vectores, "int8")
+        elif modo == "pq" and self.codigos is None:
+            dim = vectores.shape[1]
+            subespacios = pq_subespacios or max(1, dim // 8)
+            self.codigos, self.centroides = entrenar_pq(np.asarray(vectores, dtype=np.float32), subespacios)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- Puntuación ---
+
+    def _puntuar_aproximado(self, query: np.ndarray) -> np.ndarray:
+        if self.modo == "int8":
+            q = query * self.escala
+            puntuaciones = np.empty(len(self), dtype=np.float32)
+            for i in range(0, len(self), BLOQUE_PUNTUACION):
+                puntuaciones[i:i + BLOQUE_PUNTUACION] = self.codigos[i:i + BLOQUE_PUNTUACION].astype(np.float32) @ q
+            return puntuaciones
+        # PQ: tabla (subespacio, centroide) con q·centroide y suma por código (ADC)
+        subespacios, _, sub_dim = self.centroides.shape
+        tabla = np.einsum('skd,sd->sk', self.centroides, query.reshape(subespacios, sub_dim))
+        return tabla[np.arange(subespacios), self.codigos].sum(axis=1)
+
+    def _puntuar_exacto(self, query: np.ndarray, filas: Optional[np.ndarray] = None) -> np.ndarray:
+        if filas is None:
+            return np.asarray(self.vectores, dtype=np.float32) @ query
+        return np.asarray(self.vectores[filas], dtype=np.float32) @ query  # filas ordenadas: lectura secuencial del mmap
+
+    def buscar(
+        self,
+        vector: List[float],
+        top_k: int = 10,
+        filtro: Optional[dict] = None,
+        reordenar: bool = True,
+    ) -> dict:
+        """
+        Args:
+            vector: Embedding de la consulta
+            top_k: Número de resultados
+            filtro: Filtro de metadata estilo Pinecone (p.ej. filtro_articulo)
+            reordenar: En int8/PQ, re-puntuar la shortlist con float32
+
+        Returns:
+            {'matches': [{'id', 'score', 'metadata'}]} ordenados por score descendente
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        if not len(self):
+            return {'matches': []}
+
+        candidatas = None
+        if filtro:
+            candidatas = np.array([i for i, m in enumerate(self.metadatas) if _cumple_filtro(m, filtro)], dtype=np.int64)
+            if not len(candidatas):
+                return {'matches': []}
+
+        if self.modo == "float32":
+            puntuaciones = self._puntuar_exacto(query)
+        else:
+            puntuaciones = self._puntuar_aproximado(query)
+
+        if candidatas is not None:
+            mascara = np.full(len(self), -np.inf, dtype=np.float32)
+            mascara[candidatas] = puntuaciones[candidatas]
+            puntuaciones = mascara
+        disponibles = len(candidatas) if candidatas is not None else len(self)
+
+        if self.modo != "float32" and reordenar:
+            tamano = min(disponibles, top_k * self.factor_shortlist)
+            shortlist = np.argpartition(-puntuaciones, tamano - 1)[:tamano]
+            filas = np.sort(shortlist)
+            exactas = self._puntuar_exacto(query, filas)
+            puntuaciones = np.full(len(self), -np.inf, dtype=np.float32)
+            puntuaciones[filas] = exactas
+
+        k = min(top_k, disponibles)
+        mejores = np.argpartition(-puntuaciones, k - 1)[:k]
+        mejores = mejores[np.argsort(-puntuaciones[mejores])]
+        return {'matches': [
+            {'id': self.ids[i], 'score': float(puntuaciones[i]), 'metadata': self.metadatas[i]}
+            for i in mejores
+        ]}
+
+    def obtener(self, ids: List[str]) -> dict:
+        """
+        Chunks por id, sin puntuar (equivalente a index.fetch de Pinecone).
+
+        Returns:
+            {'matches': [{'id', 'score', 'metadata'}]} en el orden pedido; los ids inexistentes se omiten
+        """
+        if self._posiciones is None:
+            self._posiciones = {id_: i for i, id_ in enumerate(self.ids)}
+        return {'matches': [
+            {'id': id_, 'score': 1.0, 'metadata': self.metadatas[self._posiciones[id_]]}
+            for id_ in ids if id_ in self._posiciones
+        ]}
+
+    # --- Memoria ---
+
+    def bytes_residentes(self) -> int:
+        """Memoria que ocupa el índice en RAM (los vectores float32 mapeados no cuentan en int8/PQ)"""
+        total = 0
+        if self.modo == "float32":
+            total += np.asarray(self.vectores).nbytes
+        for array in (self.codigos, self.escala, self.centroides):
+            if array is not None:
+                total += array.nbytes
+        return total
+
+    # --- Persistencia ---
+
+    def guardar(self, directorio: str) -> None:
+        os.makedirs(directorio, exist_ok=True)
+        np.save(os.path.join(directorio, "vectores.npy"), np.asarray(self.vectores, dtype=np.float32))
+        if self.codigos is not None:
+            np.save(os.path.join(directorio, "codigos.npy"), self.codigos)
+        if self.centroides is not None:
+            np.save(os.path.join(directorio, "centroides.npy"), self.centroides)
+        config = {
+            "version": VERSION_INDICE,
+            "modo": self.modo,
+            "dimension": int(self.vectores.shape[1]),
+            "escala": self.escala.tolist() if self.escala is not None else None,
+            "ids": self.ids,
+            "metadatas": self.metadatas,
+            "actualizado": time.time(),
+        }
+        with open(os.path.join(directorio, "config.json"), 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False)
+
+    @classmethod
+    def cargar(cls, directorio: str, factor_shortlist: int = FACTOR_SHORTLIST) -> "IndiceVectorialLocal":
+        """Carga un índice; en int8/PQ los vectores float32 quedan en disco (memory-map)"""
+        with open(os.path.join(directorio, "config.json"), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        modo = config["modo"]
+        vectores = np.load(os.path.join(directorio, "vectores.npy"), mmap_mode=None if modo == "float32" else 'r')
+        ruta_codigos = os.path.join(directorio, "codigos.npy")
+        ruta_centroides = os.path.join(directorio, "centroides.npy")
+        return cls(
+            vectores,
+            config["ids"],
+            config["metadatas"],
+            modo=modo,
+            factor_shortlist=factor_shortlist,
+            _codigos=np.load(ruta_codigos) if os.path.exists(ruta_codigos) else None,
+            _escala=np.asarray(config["escala"], dtype=np.float32) if config.get("escala") else None,
+            _centroides=np.load(ruta_centroides) if os.path.exists(ruta_centroides) else None,
+        )
+
+
+def recall_at_k(exactos: List[List[str]], aproximados: List[List[str]], k: int) -> float:
+    """Fracción media de los k resultados exactos que recupera el índice aproximado"""
+    if not exactos:
+        return 0.0
+    aciertos = [len(set(e[:k]) & set(a[:k])) / max(1, len(e[:k])) for e, a in zip(exactos, aproximados)]
+    return sum(aciertos) / len(aciertos)
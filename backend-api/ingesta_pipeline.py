@@ -0,0 +1,244 @@
+"""
+MÓDULO DE INGESTA CONCURRENTE DE EMBEDDINGS
+Pool de workers acotado, tamaño de lote adaptativo, reintentos con backoff
+ante límites de cuota y checkpoint para reanudar una ingesta interrumpida
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, List, Optional
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+MAX_WORKERS = int(os.getenv("INGESTA_WORKERS", 4))
+BATCH_INICIAL = int(os.getenv("INGESTA_BATCH_INICIAL", 16))
+BATCH_MAXIMO = int(os.getenv("INGESTA_BATCH_MAX", 250))  # Límite de textos por petición de Vertex AI
+TOKENS_MAXIMOS_BATCH = int(os.getenv("INGESTA_TOKENS_MAX", 20000))  # Límite de tokens por petición
+MAX_REINTENTOS = int(os.getenv("INGESTA_REINTENTOS", 6))
+BACKOFF_BASE = 1.0  # Segundos
+BACKOFF_MAXIMO = 60.0
+UPSERT_BATCH = 100  # Pinecone recomienda lotes de 100 vectores
+CHARS_POR_TOKEN = 4
+
+_MARCAS_RATE_LIMIT = ("429", "resource exhausted", "resourceexhausted", "quota", "rate limit", "too many requests")
+
+
+def es_error_rate_limit(error: Exception) -> bool:
+    """Detecta errores de cuota/rate limit de Vertex AI o Pinecone"""
+    texto = f"{type(error).__name__} {error}".lower()
+    return any(marca in texto for marca in _MARCAS_RATE_LIMIT)
+
+
+def calcular_backoff(intento: int, base: float = BACKOFF_BASE, maximo: float = BACKOFF_MAXIMO) -> float:
+    """Backoff exponencial con jitter completo"""
+    return random.uniform(0, min(maximo, base * (2 ** intento)))
+
+
+class Checkpoint:
+    """
+    Registro en disco de los chunks ya subidos.
+    Se reescribe de forma atómica (fichero temporal + os.replace) tras cada lote.
+    """
+
+    def __init__(self, ruta: Optional[str], clave: str = ""):
+        self.ruta = ruta
+        self.clave = clave  # Identifica la ingesta (p.ej. índice de Pinecone); otra clave = empezar de cero
+        self.completados = set()
+        self._lock = threading.Lock()
+        if ruta and os.path.exists(ruta):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            if datos.get('clave', "") == clave:
+                self.completados = set(datos.get('completados', []))
+            else:
+                print(f"⚠️ Checkpoint de otra ingesta ({datos.get('clave')}) - se ignora")
+
+    def marcar(self, ids: List[str]) -> None:
+        with self._lock:
+            self.completados.update(ids)
+            if not self.ruta:
+                return
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({'clave': self.clave, 'completados': sorted(self.completados),
+                           'actualizado': time.time()}, f)
+            os.replace(temporal, self.ruta)
+
+    def eliminar(self) -> None:
+        if self.ruta and os.path.exists(self.ruta):
+            os.remove(self.ruta)
+
+
+class PipelineEmbeddings:
+    """
+    Genera embeddings y sube vectores con concurrencia acotada.
+
+    - Como mucho `max_workers` lotes en vuelo a la vez
+    - El tamaño de lote crece (x2) tras cada éxito y se reduce a la mitad ante un rate limit,
+      respetando el límite de textos y de tokens por petición
+    - Cada lote se reintenta con backoff exponencial + jitter; los que agotan los reintentos
+      se devuelven en el resumen (no se descartan en silencio)
+    - Los chunks subidos se registran en el checkpoint; una nueva ejecución los salta
+
+    Args:
+        embed_fn: Función List[str] -> List[List[float]]
+        upsert_fn: Función List[dict] -> None (vectores con id, values, metadata)
+        metadata_fn: Función chunk -> metadata del vector
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        upsert_fn: Callable[[List[dict]], None],
+        metadata_fn: Callable[[dict], dict] = None,
+        max_workers: int = MAX_WORKERS,
+        batch_inicial: int = BATCH_INICIAL,
+        batch_maximo: int = BATCH_MAXIMO,
+        tokens_maximos: int = TOKENS_MAXIMOS_BATCH,
+        max_reintentos: int = MAX_REINTENTOS,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_clave: str = "",
+        backoff_base: float = BACKOFF_BASE,
+    ):
+        self.embed_fn = embed_fn
+        self.upsert_fn = upsert_fn
+        self.metadata_fn = metadata_fn or (lambda chunk: {"text": chunk["text"]})
+        self.max_workers = max(1, max_workers)
+        self.batch_maximo = max(1, batch_maximo)
+        self.batch_actual = max(1, min(batch_inicial, self.batch_maximo))
+        self.tokens_maximos = tokens_maximos
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.checkpoint = Checkpoint(checkpoint_path, checkpoint_clave)
+
+        self._lock = threading.Lock()
+        self.reintentos = 0
+        self.rate_limits = 0
+
+    # --- Tamaño de lote adaptativo ---
+
+    def _ajustar_batch(self, exito: bool) -> None:
+        with self._lock:
+            if exito:
+                self.batch_actual = min(self.batch_maximo, self.batch_actual * 2)
+            else:
+                self.batch_actual = max(1, self.batch_actual // 2)
+
+    def _siguiente_lote(self, pendientes: List[dict], desde: int) -> int:
+        """Índice final del siguiente lote respetando el límite de textos y de tokens"""
+        with self._lock:
+            tamano = self.batch_actual
+        fin = desde
+        tokens = 0
+        while fin < len(pendientes) and fin - desde < tamano:
+            tokens_chunk = len(pendientes[fin]["text"]) // CHARS_POR_TOKEN + 1
+            if fin > desde and tokens + tokens_chunk > self.tokens_maximos:
+                break
+            tokens += tokens_chunk
+            fin += 1
+        return fin
+
+    # --- Worker ---
+
+    def _procesar_lote(self, lote: List[dict]) -> None:
+        """Embedding + upsert de un lote con reintentos; lanza la última excepción si se agotan"""
+        for intento in range(self.max_reintentos + 1):
+            try:
+                embeddings = self.embed_fn([chunk["text"] for chunk in lote])
+                vectores = [
+                    {"id": chunk["id"], "values": list(embedding), "metadata": self.metadata_fn(chunk)}
+                    for chunk, embedding in zip(lote, embeddings)
+                ]
+                for i in range(0, len(vectores), UPSERT_BATCH):
+                    self.upsert_fn(vectores[i:i + UPSERT_BATCH])
+                self.checkpoint.marcar([chunk["id"] for chunk in lote])
+                self._ajustar_batch(exito=True)
+                return
+            except Exception as e:
+                rate_limit = es_error_rate_limit(e)
+                with self._lock:
+                    self.reintentos += 1
+                    if rate_limit:
+                        self.rate_limits += 1
+                if rate_limit:
+                    self._ajustar_batch(exito=False)
+                if intento >= self.max_reintentos:
+                    raise
+                espera = calcular_backoff(intento, self.backoff_base)
+                tipo = "rate limit" if rate_limit else "error"
+                print(f"   ⚠️ {tipo} en lote de {len(lote)} chunks ({e}) - reintento {intento + 1}/{self.max_reintentos} en {espera:.1f}s")
+                time.sleep(espera)
+
+    # --- Orquestación ---
+
+    def ejecutar(self, chunks: List[dict]) -> dict:
+        """
+        Procesa todos los chunks pendientes (los del checkpoint se saltan).
+
+        Returns:
+            Resumen con procesados, saltados, fallidos (ids), tiempo y throughput en chunks/s
+        """
+        pendientes = [c for c in chunks if c["id"] not in self.checkpoint.completados]
+        saltados = len(chunks) - len(pendientes)
+        if saltados:
+            print(f"♻️  Reanudando: {saltados} chunks ya subidos según el checkpoint")
+
+        inicio = time.time()
+        procesados = 0
+        fallidos = []
+        en_vuelo = {}
+        cursor = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while cursor < len(pendientes) or en_vuelo:
+                # Rellenar hasta max_workers lotes en vuelo
+                while cursor < len(pendientes) and len(en_vuelo) < self.max_workers:
+                    fin = self._siguiente_lote(pendientes, cursor)
+                    lote = pendientes[cursor:fin]
+                    en_vuelo[executor.submit(self._procesar_lote, lote)] = lote
+                    cursor = fin
+
+                terminados, _ = wait(list(en_vuelo), return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    lote = en_vuelo.pop(futuro)
+                    try:
+                        futuro.result()
+                        procesados += len(lote)
+                        print(f"   ✓ Procesados {procesados + saltados}/{len(chunks)} chunks (lote: {len(lote)}, siguiente: {self.batch_actual})")
+                    except Exception as e:
+                        fallidos.extend(chunk["id"] for chunk in lote)
+                        print(f"   ❌ Lote de {len(lote)} chunks descartado tras {self.max_reintentos} reintentos: {e}")
+
+        duracion = time.time() - inicio
+        resumen = {
+            "total": len(chunks),
+            "procesados": procesados,
+            "saltados_checkpoint": saltados,
+            "fallidos": fallidos,
+            "reintentos": self.reintentos,
+            "rate_limits": self.rate_limits,
+            "batch_final": self.batch_actual,
+            "duracion_s": round(duracion, 2),
+            "chunks_por_segundo": round(procesados / duracion, 2) if duracion > 0 else 0.0,
+        }
+
+        # Si todo terminó bien, el checkpoint ya no hace falta
+        if not fallidos:
+            self.checkpoint.eliminar()
+        return resumen
+
+
+def imprimir_resumen(resumen: dict) -> None:
+    """Resumen de throughput de la ingesta"""
+    print(f"\n📊 RESUMEN DE INGESTA")
+    print(f"   - Chunks procesados: {resumen['procesados']}/{resumen['total']}")
+    print(f"   - Saltados (checkpoint): {resumen['saltados_checkpoint']}")
+    print(f"   - Reintentos: {resumen['reintentos']} ({resumen['rate_limits']} por rate limit)")
+    print(f"   - Tamaño de lote final: {resumen['batch_final']}")
+    print(f"   - Tiempo: {resumen['duracion_s']}s")
+    print(f"   - Throughput: {resumen['chunks_por_segundo']} chunks/s")
+    if resumen['fallidos']:
+        print(f"   ❌ Fallidos: {len(resumen['fallidos'])} chunks (vuelve a ejecutar para reintentarlos desde el checkpoint)")
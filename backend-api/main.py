@@ -3,7 +3,9 @@
 # Versión con Vertex AI (Google Cloud)
 
 import os
-from fastapi import FastAPI, HTTPException
+import hmac
+from fastapi import FastAPI, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -18,6 +20,75 @@ import vertexai
 # ⚡ MEJORA #7: Importar función de expansión semántica
 from semantic_utils import expandir_query_con_sinonimos, SINONIMOS_LEGALES
 
+# ⚡ MEJORA #11: Ensamblado de contexto deduplicado antes de Gemini
+from contexto_utils import ensamblar_contexto
+from reconstruccion_utils import unir_fragmentos, tiene_offsets
+from formato_utils import corregir_encoding, es_articulo_incompleto, LIMITE_RESPUESTA_DIRECTA
+
+# ⚡ MEJORA #12: Índice de artículos y metadata estructurada de chunks
+from articulos_utils import construir_indice_articulos, filtro_articulo
+
+# ⚡ MEJORA #13: Extracción del PDF en paralelo con caché por hash
+from extraccion_pdf import extraer_texto_pdf
+
+# ⚡ MEJORA #16: Corpus multi-documento (índice, namespace y prefijo de caché por documento)
+from corpus import (
+    RegistroCorpus, Documento, DocumentoNoEncontrado, cargar_documentos,
+    DOCUMENTO_POR_DEFECTO, CORPUS_CONFIG
+)
+
+# ⚡ MEJORA #17: Caché Redis con pool compartido, valores msgpack/zlib y operaciones en bloque
+import cache_redis
+from cache_redis import CacheArticulos
+
+# ⚡ MEJORA #18: Calentamiento de la caché Redis (idempotente, con sello de versión y lock)
+import threading
+from calentamiento_cache import calentar_cache, pares_configurados
+from formato_utils import formatear_respuesta_articulo
+
+# ⚡ MEJORA #19: Coalescencia de consultas idénticas en curso (single-flight)
+from single_flight import SingleFlight, clave_consulta
+
+# ⚡ MEJORA #20: Embeddings de consultas concurrentes agrupados en una sola llamada por lotes
+from agrupador_embeddings import AgrupadorEmbeddings, CacheEmbeddings
+
+# ⚡ MEJORA #21: Búsqueda exacta y recuperación vectorial en paralelo (especulativa)
+from especulacion import RAG_ESPECULATIVO, RamaEspeculativa, hace_falta_recuperacion
+
+# ⚡ MEJORA #22: Llamadas a Gemini con plazo, reintentos con jitter y peticiones de cobertura
+from cliente_llm import ClienteLLM
+
+# ⚡ MEJORA #23: Re-ranking local (cross-encoder) para acotar el contexto que se envía a Gemini
+from reranker_local import RerankerLocal, RERANKER_ACTIVO
+
+# ⚡ MEJORA #24: Top-k adaptativo según la distribución de scores (k pequeño y ampliación solo si hace falta)
+from topk_adaptativo import TOPK_ADAPTATIVO, recuperar_adaptativo, EstadisticasTopK
+
+# ⚡ MEJORA #25: Recuperación jerárquica - índice de artículos primero, chunks de los artículos ganadores después
+from indice_articulos import BUSQUEDA_JERARQUICA, INDICE_ARTICULOS_DIR, IndicesArticulos, articulos_candidatos
+
+# ⚡ MEJORA #26: Artículo nombrado pero ausente/incompleto - fetch directo de sus chunks por id (mapa de la ingesta)
+from chunks_articulo import CHUNKS_POR_ID, MANIFEST_DIR, ChunksPorArticulo, fetch_pinecone
+from reindexado_utils import ruta_manifiesto
+
+# ⚡ MEJORA #27: Conjunto de artículos válidos + caché negativa - "no existe" al instante con sugerencias
+from existencia_articulos import EXISTENCIA_ARTICULOS, ExistenciaArticulos
+
+# ⚡ MEJORA #28: Grafo de referencias entre artículos - los citados entran al contexto sin más búsquedas
+from referencias_articulos import REFERENCIAS_CONTEXTO, REFERENCIAS_MAX_CHARS, GrafosReferencias
+
+# ⚡ MEJORA #29: Penas estructuradas por artículo - "¿qué pena tiene el artículo N?" sin llamar a Gemini
+from penas_articulos import PENAS_RESPUESTA_DIRECTA, IndicePenas, es_pregunta_de_pena, formatear_penas, describir_pena, penas_completas
+
+# ⚡ MEJORA #30: Typeahead de epígrafes (Libro/Título/Capítulo/artículo) - del prefijo al artículo exacto
+from sugerencias import SUGERENCIAS_LIMITE, IndicesSugerencias
+
+# ⚡ MEJORA #31: Forma canónica de las consultas - todas las claves de caché la comparten
+from normalizacion_consultas import normalizar_consulta, numero_canonico
+
+# ⚡ MEJORA #32: Corrector ortográfico (SymSpell) con el vocabulario del Código Penal y los sinónimos
+from corrector_ortografico import CORRECTOR_ORTOGRAFICO, construir_corrector
+
 # 🗄️ MEJORA #9: Redis para caché persistente
 import redis
 import json
@@ -41,9 +112,20 @@ REGION = os.getenv("GCP_REGION", "us-central1")
 MODEL_NAME = "gemini-2.0-flash-001"  # Modelo de generación
 EMBEDDING_MODEL = "text-embedding-004"  # Modelo de embeddings de Google
 
+# ⚡ MEJORA #14: Backend de embeddings ("vertex" o "local" = sentence-transformers en CPU)
+# El índice de Pinecone debe haberse generado con el mismo modelo (misma dimensión)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "vertex")
+if EMBEDDING_BACKEND == "local":
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODELO_LOCAL", "all-MiniLM-L6-v2")
+
 # Configuración de Pinecone
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "codigo-penal-vertex-ai")
+
+# ⚡ MEJORA #15: Índice vectorial local ("pinecone" o "local" = indice_local.py, float32/int8/PQ)
+# El modo de almacenamiento es el del índice guardado en INDICE_LOCAL_DIR
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+INDICE_LOCAL_DIR = os.getenv("INDICE_LOCAL_DIR", "../indices/codigo_penal")
 TOP_K_RESULTS = 20  # Aumentado a 20 para mayor cobertura de artículos largos partidos
 TOP_K_MIN = 10  # Mínimo para consultas simples
 TOP_K_MAX = 30  # Máximo para consultas complejas
@@ -53,14 +135,46 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
 REDIS_TTL = int(os.getenv("REDIS_TTL", 86400))  # 24 horas por defecto
+CACHE_CALENTAR_AL_INICIO = os.getenv("CACHE_CALENTAR_AL_INICIO", "false").lower() == "true"
+LLM_CALENTAR_AL_INICIO = os.getenv("LLM_CALENTAR_AL_INICIO", "false").lower() == "true"  # Llamada de prueba
+SINGLE_FLIGHT_ENTRE_WORKERS = os.getenv("SINGLE_FLIGHT_ENTRE_WORKERS", "true").lower() == "true"  # Lock en Redis
+CACHE_CALENTAR_COMPARACIONES = os.getenv("CACHE_CALENTAR_COMPARACIONES", "false").lower() == "true"  # Llama a Gemini
+
+# 🔐 Clave de los endpoints de operación (/cache/invalidar); sin clave configurada quedan deshabilitados
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+
+# Configuración del documento fuente
+PDF_PATH = os.getenv("PDF_PATH", "../documentos/codigo_penal.pdf")
 
 # --- INICIALIZACIÓN DE SERVICIOS ---
 print("🔧 Inicializando Vertex AI y Pinecone...")
 
 # Variables globales para búsqueda exacta y cache
-TEXTO_COMPLETO_PDF = None
-ARTICULOS_CACHE = {}  # Cache en memoria (deprecated, usar Redis)
-REDIS_CLIENT = None  # Cliente Redis global
+REGISTRO_CORPUS = None  # ⚡ MEJORA #16: índices de artículos por documento (carga bajo demanda + LRU)
+REDIS_CLIENT = None  # Cliente Redis global (binario, sobre el pool compartido)
+CACHE_ARTICULOS = None  # ⚡ MEJORA #17: MGET/pipelines e índice de claves por documento
+SINGLE_FLIGHT = SingleFlight()  # ⚡ MEJORA #19: solo en el proceso hasta que Redis esté conectado
+ESTADISTICAS_TOPK = EstadisticasTopK()  # ⚡ MEJORA #24: recuperados vs devueltos por estrategia
+INDICES_ARTICULOS = None  # ⚡ MEJORA #25: índice de artículos por documento (primera etapa)
+CHUNKS_ARTICULO = None  # ⚡ MEJORA #26: mapa artículo -> ids de chunk por documento (manifiesto de ingesta)
+EXISTENCIA = None  # ⚡ MEJORA #27: artículos válidos por documento y caché negativa
+GRAFOS_REFERENCIAS = None  # ⚡ MEJORA #28: artículo -> artículos citados, por documento
+INDICE_PENAS = None  # ⚡ MEJORA #29: penas (prisión/multa/inhabilitación) por artículo y apartado
+SUGERENCIAS = None  # ⚡ MEJORA #30: epígrafes y números de artículo ordenados para /sugerencias
+CORRECTOR = None  # ⚡ MEJORA #32: corrección de erratas del documento por defecto
+
+
+def cargar_texto_pdf(pdf_path: str = PDF_PATH) -> str:
+    """
+    ⚡ MEJORA #13: Extrae el texto completo del PDF con páginas en paralelo.
+    El texto se cachea en disco por hash del PDF: los arranques siguientes no lo vuelven a leer.
+    """
+    # "spawn": a estas alturas ya hay hilos de gRPC (Vertex AI) y no es seguro hacer fork
+    extraccion = extraer_texto_pdf(pdf_path, motor="pypdf2", contexto_mp="spawn")
+    origen = "caché" if extraccion['desde_cache'] else f"{extraccion['num_paginas']} páginas"
+    print(f"📖 Texto del PDF obtenido desde {origen} en {extraccion['duracion_s']}s")
+    return extraccion['texto']
+
 
 try:
     # A. Inicializar Vertex AI
@@ -69,90 +183,132 @@ try:
     
     # B. Inicializar Redis
     try:
-        REDIS_CLIENT = redis.Redis(
-            host=REDIS_HOST,
-            port=REDIS_PORT,
-            db=REDIS_DB,
-            decode_responses=True,
-            socket_connect_timeout=5
-        )
+        REDIS_CLIENT = cache_redis.conectar(REDIS_HOST, REDIS_PORT, REDIS_DB)
         # Test de conexión
         REDIS_CLIENT.ping()
-        print(f"✅ Redis conectado - {REDIS_HOST}:{REDIS_PORT} (DB: {REDIS_DB})")
-    except redis.ConnectionError as e:
+        CACHE_ARTICULOS = CacheArticulos(REDIS_CLIENT, REDIS_TTL)
+        if SINGLE_FLIGHT_ENTRE_WORKERS:
+            SINGLE_FLIGHT = SingleFlight(REDIS_CLIENT)
+        print(f"✅ Redis conectado - {REDIS_HOST}:{REDIS_PORT} (DB: {REDIS_DB}, "
+              f"pool de {cache_redis.REDIS_MAX_CONEXIONES} conexiones)")
+    except (redis.ConnectionError, redis.TimeoutError) as e:
         print(f"⚠️ Redis no disponible: {e}")
         print("⚠️ Usando caché en memoria como fallback")
         REDIS_CLIENT = None
+        CACHE_ARTICULOS = None
     
     # C. Inicializar Pinecone
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    PINECONE_INDEX = pc.Index(PINECONE_INDEX_NAME)
-    print(f"✅ Pinecone conectado - Índice: {PINECONE_INDEX_NAME}")
+    if VECTOR_BACKEND == "local":
+        # Un índice local por documento, cargado junto a su índice de artículos (ver REGISTRO_CORPUS)
+        from indice_local import IndiceVectorialLocal
+        PINECONE_INDEX = None
+        print(f"✅ Búsqueda vectorial local - índices por documento (por defecto: {INDICE_LOCAL_DIR})")
+    else:
+        pc = Pinecone(api_key=PINECONE_API_KEY)
+        PINECONE_INDEX = pc.Index(PINECONE_INDEX_NAME)
+        print(f"✅ Pinecone conectado - Índice: {PINECONE_INDEX_NAME}")
 
     # D. Cargar Modelos de Vertex AI
-    EMBEDDING_CLIENT = TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL)
+    if EMBEDDING_BACKEND == "local":
+        from embeddings_locales import EmbeddingsLocales
+        EMBEDDING_CLIENT = EmbeddingsLocales(modelo=EMBEDDING_MODEL)
+        EMBEDDING_CLIENT.embed_query("calentamiento")  # Cargar el modelo ahora y no en la primera consulta
+        AGRUPADOR_EMBEDDINGS = AgrupadorEmbeddings(EMBEDDING_CLIENT.embed)
+    else:
+        EMBEDDING_CLIENT = TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL)
+        AGRUPADOR_EMBEDDINGS = AgrupadorEmbeddings(
+            lambda textos: [e.values for e in EMBEDDING_CLIENT.get_embeddings(textos)]
+        )
+    # ⚡ MEJORA #31: Variantes de la misma consulta ("Artículo 142" / "art. 142") reutilizan el vector
+    CACHE_EMBEDDINGS = CacheEmbeddings(AGRUPADOR_EMBEDDINGS.embed_query)
+    RERANKER = None
+    if RERANKER_ACTIVO:
+        RERANKER = RerankerLocal()
+        RERANKER.calentar()  # Cargar el modelo ahora y no en la primera consulta
+        print(f"✅ Re-ranker local cargado - {RERANKER.nombre_modelo}")
     LLM_CLIENT = GenerativeModel(MODEL_NAME)
+    CLIENTE_LLM = ClienteLLM(LLM_CLIENT)  # Un único modelo: el canal gRPC se reutiliza entre peticiones
+    if LLM_CALENTAR_AL_INICIO:
+        CLIENTE_LLM.calentar()
     print(f"✅ Modelos cargados - Embeddings: {EMBEDDING_MODEL}, LLM: {MODEL_NAME}")
     
-    # E. Cargar texto completo del PDF para búsqueda exacta
-    try:
-        import PyPDF2
-        import re
-        pdf_path = "../documentos/codigo_penal.pdf"
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            texto_paginas = []
-            for page in pdf_reader.pages:
-                texto_paginas.append(page.extract_text())
-            TEXTO_COMPLETO_PDF = "\n".join(texto_paginas)
-            print(f"✅ PDF cargado para búsqueda exacta ({len(TEXTO_COMPLETO_PDF)} caracteres)")
-            
-        # E. Construir cache de artículos para búsqueda ultra-rápida (⚡ Mejora #1)
-        print("🔄 Construyendo cache de artículos...")
-        
-        # Estrategia robusta: encontrar todos los inicios de artículos
-        # Patrón que acepta múltiples variantes: "Artículo", "Articulo", "ARTÍCULO", etc.
-        patron_inicio = r'Art[ií\xed]culo\s+(\d+(?:\s+(?:bis|ter|quater))?)\s*\.?'
-        matches = list(re.finditer(patron_inicio, TEXTO_COMPLETO_PDF, re.IGNORECASE))
-        
-        print(f"   📋 Detectados {len(matches)} inicios de artículos en el PDF")
-        
-        for i, match in enumerate(matches):
-            numero_articulo = match.group(1).strip()
-            inicio = match.start()
-            
-            # Encontrar el final: siguiente artículo o fin del texto
-            if i < len(matches) - 1:
-                fin = matches[i + 1].start()
-            else:
-                fin = len(TEXTO_COMPLETO_PDF)
-            
-            # Extraer texto completo del artículo
-            texto_articulo = TEXTO_COMPLETO_PDF[inicio:fin].strip()
-            
-            # Limpiar saltos de línea excesivos pero mantener estructura
-            texto_articulo = re.sub(r'\n{3,}', '\n\n', texto_articulo)
-            
-            ARTICULOS_CACHE[numero_articulo] = texto_articulo
-        
-        print(f"✅ Cache construido: {len(ARTICULOS_CACHE)} artículos indexados para búsqueda instantánea")
-        
-        if len(ARTICULOS_CACHE) < 500:
-            print(f"⚠️  ADVERTENCIA: Solo se cachearon {len(ARTICULOS_CACHE)} artículos (esperado ~600+)")
-            print(f"   Primeros 10 artículos cacheados: {list(ARTICULOS_CACHE.keys())[:10]}")
-            # Mostrar muestra del PDF para debug
-            muestra = TEXTO_COMPLETO_PDF[10000:10500]
-            print(f"   Muestra del PDF (chars 10000-10500):")
-            print(f"   {repr(muestra[:200])}")
-        else:
-            print(f"✅ Calidad del cache verificada")
-            # Verificar algunos artículos clave
-            articulos_prueba = ['138', '237', '244', '142']
-            encontrados = [art for art in articulos_prueba if art in ARTICULOS_CACHE]
-            print(f"   Artículos de prueba ({len(encontrados)}/4): {encontrados}")
-        
-    except Exception as e:
-        print(f"⚠️ No se pudo cargar PDF completo: {e} (búsqueda exacta deshabilitada)")
+    # E. Registro del corpus: solo el documento por defecto se carga al arrancar
+    import re
+    REGISTRO_CORPUS = RegistroCorpus(
+        cargar_documentos(CORPUS_CONFIG, PDF_PATH),
+        cargar_texto=cargar_texto_pdf,
+        cargar_indice_vectorial=(
+            (lambda doc: IndiceVectorialLocal.cargar(doc.indice_local or INDICE_LOCAL_DIR))
+            if VECTOR_BACKEND == "local" else None
+        ),
+    )
+    print(f"📚 Corpus: {list(REGISTRO_CORPUS.documentos)} (por defecto: {REGISTRO_CORPUS.por_defecto})")
+    
+    # ⚡ MEJORA #25: Índices de artículos (construidos con indice_articulos.py); el del documento por defecto ya
+    if BUSQUEDA_JERARQUICA:
+        INDICES_ARTICULOS = IndicesArticulos(
+            lambda doc: doc.indice_articulos or (INDICE_ARTICULOS_DIR if doc.id == REGISTRO_CORPUS.por_defecto else None)
+        )
+        INDICES_ARTICULOS.obtener(REGISTRO_CORPUS.documento())
+    
+    # ⚡ MEJORA #26: Manifiesto de la ingesta (mismo índice/namespace/PDF que usaron los scripts)
+    if CHUNKS_POR_ID:
+        CHUNKS_ARTICULO = ChunksPorArticulo(
+            lambda doc: ruta_manifiesto(
+                MANIFEST_DIR,
+                PINECONE_INDEX_NAME + (f"_{doc.namespace}" if doc.namespace else ""),
+                os.path.basename(doc.pdf_path)
+            )
+        )
+    
+    # ⚡ MEJORA #27: Artículos válidos = índice exacto ∪ artículos con chunks en la ingesta
+    if EXISTENCIA_ARTICULOS:
+        EXISTENCIA = ExistenciaArticulos(
+            lambda doc_id: set(REGISTRO_CORPUS.articulos(doc_id)) | set(
+                CHUNKS_ARTICULO.articulos(REGISTRO_CORPUS.documento(doc_id)) if CHUNKS_ARTICULO else ()
+            ),
+            REGISTRO_CORPUS.version
+        )
+    
+    # ⚡ MEJORA #28: El grafo se construye al cargar cada documento (y al cambiar su versión), no por consulta
+    GRAFOS_REFERENCIAS = GrafosReferencias(REGISTRO_CORPUS.articulos, REGISTRO_CORPUS.version)
+    GRAFOS_REFERENCIAS.construir(REGISTRO_CORPUS.por_defecto)
+    
+    # ⚡ MEJORA #29: Penas extraídas al cargar cada documento (y al cambiar su versión)
+    INDICE_PENAS = IndicePenas(REGISTRO_CORPUS.articulos, REGISTRO_CORPUS.version)
+    INDICE_PENAS.construir(REGISTRO_CORPUS.por_defecto)
+    
+    # ⚡ MEJORA #30: Epígrafes extraídos del texto al cargar cada documento (y al cambiar su versión)
+    SUGERENCIAS = IndicesSugerencias(REGISTRO_CORPUS.texto, REGISTRO_CORPUS.articulos, REGISTRO_CORPUS.version)
+    SUGERENCIAS.construir(REGISTRO_CORPUS.por_defecto)
+    
+    # ⚡ MEJORA #32: Índice de borrados del vocabulario construido una vez al arrancar
+    if CORRECTOR_ORTOGRAFICO:
+        CORRECTOR = construir_corrector(REGISTRO_CORPUS.texto(), SINONIMOS_LEGALES)
+        print(f"✏️  Corrector ortográfico listo: {len(CORRECTOR)} palabras")
+    
+    # E. Construir cache de artículos para búsqueda ultra-rápida (⚡ Mejora #1)
+    print("🔄 Construyendo cache de artículos...")
+    
+    # ⚡ MEJORA #12: Índice compartido con el chunker de ingesta (encabezados a principio de línea,
+    # cortando en Libro/Título/Capítulo; fallback al patrón laxo si el PDF no conserva saltos de línea)
+    articulos_defecto = REGISTRO_CORPUS.articulos()
+    
+    print(f"✅ Cache construido: {len(articulos_defecto)} artículos indexados para búsqueda instantánea")
+    
+    if len(articulos_defecto) < 500:
+        print(f"⚠️  ADVERTENCIA: Solo se cachearon {len(articulos_defecto)} artículos (esperado ~600+)")
+        print(f"   Primeros 10 artículos cacheados: {list(articulos_defecto.keys())[:10]}")
+        # Mostrar muestra del PDF para debug
+        muestra = REGISTRO_CORPUS.texto()[10000:10500]
+        print(f"   Muestra del PDF (chars 10000-10500):")
+        print(f"   {repr(muestra[:200])}")
+    else:
+        print(f"✅ Calidad del cache verificada")
+        # Verificar algunos artículos clave
+        articulos_prueba = ['138', '237', '244', '142']
+        encontrados = [art for art in articulos_prueba if art in articulos_defecto]
+        print(f"   Artículos de prueba ({len(encontrados)}/4): {encontrados}")
     
     print("✅ ¡Inicialización completada con éxito!")
 
@@ -173,6 +329,7 @@ class ChatRequest(BaseModel):
     historial: list[ChatMessage] = []  # ⚡ MEJORA #3: Historial conversacional
     session_id: Optional[str] = None  # 🗄️ MEJORA #10: ID de sesión para tracking
     user_id: Optional[str] = None  # 🗄️ MEJORA #10: ID de usuario (opcional)
+    documento: Optional[str] = None  # ⚡ MEJORA #16: Documento del corpus (None = por defecto)
 
 
 class ChatResponse(BaseModel):
@@ -180,6 +337,11 @@ class ChatResponse(BaseModel):
     metadata: dict = None
 
 
+class InvalidarCacheRequest(BaseModel):
+    articulos: list[str] = []  # Artículos afectados por un reindexado incremental
+    documento: Optional[str] = None  # ⚡ MEJORA #16: Documento reindexado (None = por defecto)
+
+
 # --- 3. INICIALIZAR LA APLICACIÓN ---
 app = FastAPI(
     title="API RAG - Código Penal Español",
@@ -199,34 +361,42 @@ app.add_middleware(
 
 # --- 4. FUNCIONES DE CACHÉ REDIS ---
 
-def get_cached_articulo(numero: str) -> Optional[dict]:
+def get_cached_articulo(numero: str, documento_id: str = DOCUMENTO_POR_DEFECTO) -> Optional[dict]:
     """
     🗄️ MEJORA #9: Obtener artículo desde Redis cache
     
     Args:
         numero: Número del artículo (puede incluir "bis", "ter", etc.)
+        documento_id: Documento del corpus (clave articulo:{doc}:{num})
         
     Returns:
         Dict con datos del artículo o None si no está en caché
     """
-    if not REDIS_CLIENT:
-        return None
+    return get_cached_articulos([numero], documento_id).get(numero)
+
+
+def get_cached_articulos(numeros: list, documento_id: str = DOCUMENTO_POR_DEFECTO) -> dict:
+    """
+    ⚡ MEJORA #17: Varios artículos en un único MGET (rangos y comparaciones)
+    
+    Returns:
+        Dict {numero: datos} solo con los artículos presentes en Redis
+    """
+    if not CACHE_ARTICULOS:
+        return {}
     
     try:
-        key = f"articulo:{numero}"
-        cached_data = REDIS_CLIENT.get(key)
-        
-        if cached_data:
-            print(f"🗄️ Artículo {numero} encontrado en Redis cache")
-            return json.loads(cached_data)
-        
-        return None
+        encontrados = CACHE_ARTICULOS.obtener_varios(documento_id, list(numeros))
+        if encontrados:
+            print(f"🗄️ {len(encontrados)}/{len(numeros)} artículo(s) encontrados en Redis cache")
+        return encontrados
     except Exception as e:
         print(f"⚠️ Error al leer de Redis: {e}")
-        return None
+        return {}
 
 
-def set_cached_articulo(numero: str, texto: str, metadata: dict = None) -> bool:
+def set_cached_articulo(numero: str, texto: str, metadata: dict = None,
+                        documento_id: str = DOCUMENTO_POR_DEFECTO) -> bool:
     """
     🗄️ MEJORA #9: Guardar artículo en Redis cache
     
@@ -234,51 +404,53 @@ def set_cached_articulo(numero: str, texto: str, metadata: dict = None) -> bool:
         numero: Número del artículo
         texto: Texto completo del artículo
         metadata: Metadatos adicionales (opcional)
+        documento_id: Documento del corpus (clave articulo:{doc}:{num})
         
     Returns:
         True si se guardó correctamente, False en caso de error
     """
-    if not REDIS_CLIENT:
-        return False
+    return set_cached_articulos({numero: texto}, metadata, documento_id) == 1
+
+
+def set_cached_articulos(articulos: dict, metadata: dict = None,
+                         documento_id: str = DOCUMENTO_POR_DEFECTO) -> int:
+    """
+    ⚡ MEJORA #17: Guardar {numero: texto} en un único pipeline (SET con TTL + índice del documento)
+    
+    Returns:
+        Número de artículos guardados (0 si Redis no está disponible)
+    """
+    if not CACHE_ARTICULOS or not articulos:
+        return 0
     
     try:
-        key = f"articulo:{numero}"
-        data = {
-            "numero": numero,
-            "texto": texto,
-            "metadata": metadata or {},
-            "cached_at": str(os.times())
-        }
-        
-        # Guardar con TTL
-        REDIS_CLIENT.setex(key, REDIS_TTL, json.dumps(data))
-        print(f"🗄️ Artículo {numero} guardado en Redis (TTL: {REDIS_TTL}s)")
-        return True
+        guardados = CACHE_ARTICULOS.guardar_varios(documento_id, articulos, metadata)
+        print(f"🗄️ {guardados} artículo(s) guardados en Redis (TTL: {REDIS_TTL}s)")
+        return guardados
     except Exception as e:
         print(f"⚠️ Error al guardar en Redis: {e}")
-        return False
+        return 0
 
 
 def get_cache_stats() -> dict:
     """
     🗄️ Obtener estadísticas del caché Redis
+    ⚡ MEJORA #17: Recuento con el índice por documento (ZCARD), sin KEYS
     
     Returns:
         Dict con estadísticas del caché
     """
-    if not REDIS_CLIENT:
+    if not CACHE_ARTICULOS:
         return {"status": "disabled", "keys": 0}
     
     try:
         # Obtener info de Redis
         info = REDIS_CLIENT.info()
-        
-        # Contar claves de artículos
-        articulos_keys = REDIS_CLIENT.keys("articulo:*")
+        stats = CACHE_ARTICULOS.estadisticas(REGISTRO_CORPUS.documentos if REGISTRO_CORPUS else [DOCUMENTO_POR_DEFECTO])
         
         return {
             "status": "connected",
-            "total_keys": len(articulos_keys),
+            **stats,
             "memory_used": info.get("used_memory_human", "N/A"),
             "uptime_seconds": info.get("uptime_in_seconds", 0),
             "redis_version": info.get("redis_version", "unknown")
@@ -287,9 +459,93 @@ def get_cache_stats() -> dict:
         return {"status": "error", "error": str(e)}
 
 
+def buscar_articulos_exactos(numeros: list, documento_id: Optional[str] = None) -> dict:
+    """
+    ⚡ MEJORA #17: Texto de varios artículos: Redis (un MGET) y, para los que falten,
+    el índice en memoria; los encontrados en memoria se escriben en Redis en un pipeline.
+    
+    Returns:
+        Dict {numero: texto} solo con los artículos encontrados
+    """
+    documento_id = REGISTRO_CORPUS.documento(documento_id).id
+    textos = {num: datos.get("texto", "") for num, datos in get_cached_articulos(numeros, documento_id).items()}
+    
+    faltantes = [num for num in numeros if num not in textos]
+    if faltantes:
+        articulos_cache = REGISTRO_CORPUS.articulos(documento_id)
+        desde_memoria = {num: articulos_cache[num] for num in faltantes if num in articulos_cache}
+        set_cached_articulos(desde_memoria, documento_id=documento_id)
+        textos.update(desde_memoria)
+    return textos
+
+
 # --- 5. FUNCIÓN CENTRAL DE RAG CON VERTEX AI ---
 
-def buscar_articulo_exacto(texto_completo: str, numero_articulo: str) -> str:
+def generar_embedding_query(texto: str) -> list:
+    """
+    ⚡ MEJORA #14: Embedding de la consulta con el backend configurado (Vertex AI o local)
+    ⚡ MEJORA #20: A través del agrupador: las consultas simultáneas comparten llamada
+    ⚡ MEJORA #31: Caché LRU con la forma canónica de la consulta como clave
+    """
+    return CACHE_EMBEDDINGS.embed_query(texto)
+
+
+def buscar_vectores(query_vector: list, top_k: int, filtro: Optional[dict] = None,
+                    documento: Optional[Documento] = None) -> dict:
+    """
+    ⚡ MEJORA #15: Búsqueda vectorial en Pinecone o en el índice local.
+    Ambos devuelven {'matches': [{'id', 'score', 'metadata'}]}.
+    ⚡ MEJORA #16: Cada documento tiene su namespace de Pinecone / su índice local.
+    """
+    documento = documento or REGISTRO_CORPUS.documento()
+    if VECTOR_BACKEND == "local":
+        return REGISTRO_CORPUS.indice_vectorial(documento.id).buscar(query_vector, top_k=top_k, filtro=filtro)
+    return PINECONE_INDEX.query(
+        vector=query_vector,
+        top_k=top_k,
+        include_metadata=True,
+        filter=filtro,
+        namespace=documento.namespace
+    )
+
+
+def articulos_citados(chunks: list, numero_articulo: Optional[str], articulos_reconstruidos: dict,
+                      documento: Documento) -> dict:
+    """
+    ⚡ MEJORA #28: Artículos citados (a un salto) por los que ya están en el contexto,
+    con su texto del índice exacto: sin embeddings ni consultas vectoriales.
+    
+    Returns:
+        {numero: {'texto', 'citado_por'}} para ensamblar_contexto
+    """
+    if not REFERENCIAS_CONTEXTO or GRAFOS_REFERENCIAS is None:
+        return {}
+    semillas = [numero_articulo] if numero_articulo else []
+    for num in list(articulos_reconstruidos) + [c.get('metadata', {}).get('articulo') for c in chunks]:
+        if num and num not in semillas:
+            semillas.append(num)
+    vecinos = GRAFOS_REFERENCIAS.vecinos(documento.id, semillas)
+    if not vecinos:
+        return {}
+    textos = buscar_articulos_exactos(list(vecinos), documento.id)
+    print(f"🕸️  Artículos citados añadidos al contexto: {[n for n in vecinos if n in textos]}")
+    return {
+        num: {'texto': textos[num][:REFERENCIAS_MAX_CHARS], 'citado_por': citado_por}
+        for num, citado_por in vecinos.items() if num in textos
+    }
+
+
+def obtener_chunks_por_id(ids: list, documento: Documento) -> dict:
+    """
+    ⚡ MEJORA #26: Chunks por id (sin embedding ni búsqueda) en Pinecone o en el índice local.
+    Devuelve {'matches': [{'id', 'score', 'metadata'}]} en el orden de `ids`.
+    """
+    if VECTOR_BACKEND == "local":
+        return REGISTRO_CORPUS.indice_vectorial(documento.id).obtener(ids)
+    return fetch_pinecone(PINECONE_INDEX, ids, documento.namespace)
+
+
+def buscar_articulo_exacto(texto_completo: str, numero_articulo: str, documento_id: Optional[str] = None) -> str:
     """
     Busca un artículo específico usando cache O(1) o fallback a regex O(n).
     Soporta artículos simples (142) y con sufijos (142 bis, 127 ter, etc.)
@@ -301,22 +557,29 @@ def buscar_articulo_exacto(texto_completo: str, numero_articulo: str) -> str:
     
     # Normalizar el número de artículo
     numero_articulo = numero_articulo.strip()
+    documento_id = REGISTRO_CORPUS.documento(documento_id).id
+    articulos_cache = REGISTRO_CORPUS.articulos(documento_id)
     
     # ⚡ PASO 0: Intentar obtener de Redis primero
-    cached = get_cached_articulo(numero_articulo)
+    cached = get_cached_articulo(numero_articulo, documento_id)
     if cached:
         return cached.get("texto", "")
     
     # ⚡ PASO 1: Buscar en cache en memoria (O(1) - instantáneo)
-    if numero_articulo in ARTICULOS_CACHE:
+    if numero_articulo in articulos_cache:
         print(f"⚡ Artículo {numero_articulo} encontrado en cache en memoria")
-        texto = ARTICULOS_CACHE[numero_articulo]
+        texto = articulos_cache[numero_articulo]
         
         # Guardar en Redis para próximas consultas
-        set_cached_articulo(numero_articulo, texto)
+        set_cached_articulo(numero_articulo, texto, documento_id=documento_id)
         
         return texto
     
+    # ⚡ MEJORA #27: Un número que no existe no justifica recorrer el PDF entero
+    if EXISTENCIA and not EXISTENCIA.existe(documento_id, numero_articulo):
+        print(f"🚫 Artículo {numero_articulo} no existe en '{documento_id}' - sin búsqueda con regex")
+        return None
+    
     # PASO 2: Si no está en cache, buscar con regex (O(n) - lento)
     print(f"🔍 Artículo {numero_articulo} no en cache, buscando con regex...")
     
@@ -335,7 +598,7 @@ def buscar_articulo_exacto(texto_completo: str, numero_articulo: str) -> str:
         texto_articulo = match.group(0).strip()
         
         # Guardar en cache para futuras búsquedas
-        ARTICULOS_CACHE[numero_articulo] = texto_articulo
+        articulos_cache[numero_articulo] = texto_articulo
         print(f"💾 Artículo {numero_articulo} guardado en cache")
         
         # NO truncar - devolver el artículo completo
@@ -344,50 +607,33 @@ def buscar_articulo_exacto(texto_completo: str, numero_articulo: str) -> str:
     return None
 
 
-def corregir_encoding(texto: str) -> str:
-    """
-    Corrige problemas de encoding usando ftfy (automático y robusto).
-    
-    ⚡ MEJORA #2: Corrección automática con ftfy en lugar de reemplazos manuales
-    """
-    try:
-        import ftfy
-        # ftfy detecta y corrige automáticamente problemas de encoding
-        texto_corregido = ftfy.fix_text(texto)
-        return texto_corregido
-    except ImportError:
-        # Fallback a reemplazos manuales si ftfy no está disponible
-        texto = texto.replace('Ã­', 'í')
-        texto = texto.replace('Ã³', 'ó')
-        texto = texto.replace('Ã±', 'ñ')
-        texto = texto.replace('Ã¡', 'á')
-        texto = texto.replace('Ã©', 'é')
-        texto = texto.replace('Ãº', 'ú')
-        texto = texto.replace('Ã¼', 'ü')
-        texto = texto.replace('Ã¶', 'ö')
-        
-        # Mayúsculas
-        texto = texto.replace('Ã', 'Á')
-        texto = texto.replace('Ã‰', 'É')
-        texto = texto.replace('Ã"', 'Ó')
-        texto = texto.replace('Ãš', 'Ú')
-        
-        # Eliminar caracteres basura
-        texto = texto.replace('Â', '')
-        
-        return texto
-
-
 def detectar_articulos_en_chunks(chunks: list) -> dict:
     """
     Analiza chunks recuperados y detecta qué artículos aparecen y cuántas partes tienen.
     Retorna: {numero_articulo: [lista de chunks con ese artículo]}
+    
+    ⚡ MEJORA #12: Si el chunk trae metadata de artículo (chunking consciente de artículos),
+    se usa directamente sin escanear el texto con regex.
     """
     import re
     articulos_encontrados = {}
     
     for idx, chunk in enumerate(chunks):
-        texto = chunk.get('metadata', {}).get('text', '')
+        metadata = chunk.get('metadata', {})
+        texto = metadata.get('text', '')
+        
+        if metadata.get('articulo'):
+            articulos_encontrados.setdefault(metadata['articulo'], []).append({
+                'chunk_index': idx,
+                'score': chunk.get('score', 0),
+                'texto': texto,
+                'posicion_articulo': 0,
+                'char_start': metadata.get('char_start'),
+                'char_end': metadata.get('char_end'),
+                'parte': int(metadata.get('parte', 1)),
+                'total_partes': int(metadata.get('total_partes', 1))
+            })
+            continue
         
         # Buscar todos los artículos mencionados en este chunk
         matches = re.finditer(r'Art[íi]culo\s+(\d+(?:\s+bis|\s+ter|\s+quater)?)', texto, re.IGNORECASE)
@@ -402,58 +648,63 @@ def detectar_articulos_en_chunks(chunks: list) -> dict:
                 'chunk_index': idx,
                 'score': chunk.get('score', 0),
                 'texto': texto,
-                'posicion_articulo': match.start()
+                'posicion_articulo': match.start(),
+                'char_start': metadata.get('char_start'),
+                'char_end': metadata.get('char_end')
             })
     
     return articulos_encontrados
 
 
-def es_articulo_incompleto(texto: str) -> bool:
-    """
-    Detecta si un chunk contiene un artículo incompleto.
-    Heurísticas:
-    - Termina abruptamente (no termina en punto)
-    - Contiene "..." o texto cortado
-    - Tiene numeración incompleta (1., 2., pero no cierra)
-    """
-    import re
-    
-    texto_limpio = texto.strip()
-    
-    # Heurística 1: No termina en punto ni en paréntesis de cierre
-    if not texto_limpio.endswith(('.', ')', '»', '"')):
-        return True
-    
-    # Heurística 2: Contiene indicadores de truncado
-    if '...' in texto_limpio or '[truncado]' in texto_limpio.lower():
-        return True
-    
-    # Heurística 3: Tiene numeración sin cerrar (ej: "1. xxx 2. xxx 3." pero sin texto después del 3)
-    numeros = re.findall(r'\n\s*(\d+)\.\s+', texto_limpio)
-    if len(numeros) >= 2:
-        ultimo_numero = numeros[-1]
-        # Verificar si después del último número hay texto sustancial
-        patron = rf'{ultimo_numero}\.\s+(.+)$'
-        match = re.search(patron, texto_limpio, re.DOTALL)
-        if match and len(match.group(1).strip()) < 20:
-            return True
-    
-    return False
-
-
-def reconstruir_articulos_completos(articulos_detectados: dict, chunks_originales: list) -> dict:
+def reconstruir_articulos_completos(articulos_detectados: dict, chunks_originales: list,
+                                    articulos_cache: Optional[dict] = None) -> dict:
     """
     Para artículos que aparecen partidos, intenta reconstruirlos usando:
     1. Combinación de múltiples chunks si están disponibles
-    2. Búsqueda instantánea en ARTICULOS_CACHE (O(1))
+    2. Búsqueda instantánea en el índice de artículos del documento (O(1))
     
     Retorna: {numero_articulo: texto_completo_reconstruido}
     """
+    if articulos_cache is None:
+        articulos_cache = REGISTRO_CORPUS.articulos()
     articulos_reconstruidos = {}
     
     for num_articulo, partes in articulos_detectados.items():
-        # Ordenar partes por posición en el texto (usando chunk_index como proxy)
-        partes_ordenadas = sorted(partes, key=lambda x: x['chunk_index'])
+        # ⚡ MEJORA #12: Reconstrucción por metadata (parte/total_partes) sin heurísticas
+        if all('parte' in p for p in partes):
+            partes_unicas = {p['parte']: p for p in partes}
+            total_partes = partes[0]['total_partes']
+            
+            if len(partes_unicas) == total_partes:
+                articulos_reconstruidos[num_articulo] = {
+                    'texto': corregir_encoding(unir_fragmentos(list(partes_unicas.values()))),
+                    'metodo': f'metadata_{total_partes}_partes',
+                    'completo': True
+                }
+                continue
+            
+            if num_articulo in articulos_cache:
+                articulos_reconstruidos[num_articulo] = {
+                    'texto': corregir_encoding(articulos_cache[num_articulo]),
+                    'metodo': 'cache_instantaneo',
+                    'completo': True
+                }
+                print(f"  ✅ Art. {num_articulo} ({len(partes_unicas)}/{total_partes} partes) completado desde cache (O(1))")
+                continue
+            
+            articulos_reconstruidos[num_articulo] = {
+                # unir_fragmentos ordena por `parte` y marca con [...] las partes que faltan
+                'texto': corregir_encoding(unir_fragmentos(list(partes_unicas.values()))),
+                'metodo': f'metadata_{len(partes_unicas)}_de_{total_partes}_partes',
+                'completo': False
+            }
+            continue
+        
+        # Ordenar partes por posición en el documento (offsets de ingesta o chunk_index como proxy)
+        if all(tiene_offsets(p) for p in partes):
+            partes_ordenadas = sorted(partes, key=lambda x: x['char_start'])
+        else:
+            partes_ordenadas = sorted(partes, key=lambda x: x['chunk_index'])
         
         # CASO 1: Solo hay 1 parte
         if len(partes_ordenadas) == 1:
@@ -464,8 +715,8 @@ def reconstruir_articulos_completos(articulos_detectados: dict, chunks_originale
                 print(f"  ⚠️ Art. {num_articulo} parece incompleto (1 chunk) - buscando en cache...")
                 
                 # ⚡ MEJORA #1: Búsqueda instantánea en cache O(1)
-                if num_articulo in ARTICULOS_CACHE:
-                    articulo_completo = ARTICULOS_CACHE[num_articulo]
+                if num_articulo in articulos_cache:
+                    articulo_completo = articulos_cache[num_articulo]
                     articulos_reconstruidos[num_articulo] = {
                         'texto': corregir_encoding(articulo_completo),
                         'metodo': 'cache_instantaneo',
@@ -492,34 +743,16 @@ def reconstruir_articulos_completos(articulos_detectados: dict, chunks_originale
         else:
             print(f"  🔄 Art. {num_articulo} encontrado en {len(partes_ordenadas)} chunks - combinando...")
             
-            # Combinar textos evitando duplicados
-            textos_combinados = []
-            texto_previo = ""
-            
-            for parte in partes_ordenadas:
-                texto_actual = parte['texto']
-                
-                # Evitar duplicar texto si hay overlap
-                if texto_previo:
-                    # Buscar overlap entre final de texto_previo y inicio de texto_actual
-                    overlap_length = min(200, len(texto_previo), len(texto_actual))
-                    for i in range(overlap_length, 0, -1):
-                        if texto_previo[-i:] == texto_actual[:i]:
-                            texto_actual = texto_actual[i:]
-                            break
-                
-                textos_combinados.append(texto_actual)
-                texto_previo = texto_actual
-            
-            texto_combinado = "".join(textos_combinados)
+            # Combinar textos evitando duplicados: cosido por offsets o solapamiento lineal
+            texto_combinado = unir_fragmentos(partes_ordenadas)
             
             # Verificar si la combinación parece completa
             if es_articulo_incompleto(texto_combinado):
                 print(f"  ⚠️ Art. {num_articulo} combinado aún parece incompleto - buscando en cache...")
                 
                 # ⚡ MEJORA #1: Fallback a búsqueda instantánea en cache
-                if num_articulo in ARTICULOS_CACHE:
-                    articulo_completo = ARTICULOS_CACHE[num_articulo]
+                if num_articulo in articulos_cache:
+                    articulo_completo = articulos_cache[num_articulo]
                     articulos_reconstruidos[num_articulo] = {
                         'texto': corregir_encoding(articulo_completo),
                         'metodo': 'cache_instantaneo_fallback',
@@ -543,8 +776,9 @@ def decidir_estrategia_busqueda(query: str, numero_articulo: str = None) -> dict
     
     Retorna:
     {
-        'top_k': int,  # Cuántos resultados recuperar
+        'top_k': int,  # Cuántos resultados recuperar (máximo si TOPK_ADAPTATIVO)
         'usar_reconstruccion': bool,  # Si aplicar post-procesamiento
+        'nombre': str,  # Identificador corto para estadísticas
         'razon': str  # Explicación de la decisión
     }
     """
@@ -555,6 +789,7 @@ def decidir_estrategia_busqueda(query: str, numero_articulo: str = None) -> dict
         return {
             'top_k': TOP_K_MIN,  # 10 suficiente, irá a búsqueda exacta
             'usar_reconstruccion': False,
+            'nombre': 'articulo',
             'razon': 'Consulta de artículo específico - búsqueda exacta'
         }
     
@@ -566,6 +801,7 @@ def decidir_estrategia_busqueda(query: str, numero_articulo: str = None) -> dict
         return {
             'top_k': TOP_K_MAX,  # 30 para capturar más contexto
             'usar_reconstruccion': True,
+            'nombre': 'compleja',
             'razon': 'Consulta compleja multi-concepto - máxima cobertura + reconstrucción'
         }
     
@@ -573,11 +809,116 @@ def decidir_estrategia_busqueda(query: str, numero_articulo: str = None) -> dict
     return {
         'top_k': TOP_K_RESULTS,  # 20 (balance)
         'usar_reconstruccion': True,
+        'nombre': 'estandar',
         'razon': 'Consulta conceptual estándar - cobertura media + reconstrucción'
     }
 
 
-def generate_rag_response(query: str, historial: list = None):
+def umbral_relevancia(numero_articulo: Optional[str] = None) -> float:
+    """Score mínimo de un match: más permisivo si la consulta nombra un artículo"""
+    return 0.35 if numero_articulo else 0.45
+
+
+def recuperar_candidatos(query: str, query_enriquecida: str, numero_articulo: Optional[str],
+                         documento_corpus: Documento, cancelada: Optional[threading.Event] = None):
+    """
+    Pasos 3-6 del RAG: estrategia, query de embedding, embedding y búsqueda vectorial.
+    
+    ⚡ MEJORA #21: Se puede ejecutar como rama especulativa (ver especulacion.py);
+    si `cancelada` se activa, se detiene antes de cada paso caro y devuelve None.
+    
+    Returns:
+        (estrategia, results) o None si se canceló
+    """
+    # --- PASO 3: DECIDIR ESTRATEGIA INTELIGENTE ---
+    estrategia = decidir_estrategia_busqueda(query, numero_articulo)
+    print(f"🧠 Estrategia seleccionada: {estrategia['razon']}")
+    print(f"   - Top K: {estrategia['top_k']}")
+    print(f"   - Reconstrucción: {estrategia['usar_reconstruccion']}")
+    
+    # ⚡ MEJORA #26: Si la ingesta registró los chunks del artículo, traerlos por id
+    if numero_articulo and CHUNKS_ARTICULO is not None:
+        results = CHUNKS_ARTICULO.recuperar(
+            documento_corpus, numero_articulo, lambda ids: obtener_chunks_por_id(ids, documento_corpus)
+        )
+        if results is not None:
+            estrategia['fetch_por_id'] = {"articulo": numero_articulo, "chunks": len(results['matches'])}
+            print(f"🎯 Art. {numero_articulo}: {len(results['matches'])} chunks por id (sin embedding ni búsqueda)")
+            return estrategia, results
+    
+    # --- PASO 4: ENRIQUECER QUERY (si no hubo match exacto) ---
+    if numero_articulo:
+        query_enriquecida_embedding = (
+            f"Contenido literal del {documento_corpus.nombre} "
+            f"Artículo {numero_articulo} delito pena castigo texto completo"
+        )
+        print(f"🔄 Query para embedding: {query_enriquecida_embedding}")
+    else:
+        # IMPORTANTE: Mantener la query enriquecida con contexto conversacional
+        # que se creó en PASO 0.5 (no sobrescribir)
+        query_enriquecida_embedding = query_enriquecida
+        if query_enriquecida != query:
+            print(f"🔄 Usando query enriquecida con contexto conversacional")
+    
+    # 🔍 MEJORA #6: Expansión semántica con sinónimos legales
+    query_expandida_semantica = expandir_query_con_sinonimos(query_enriquecida_embedding)
+
+    # --- PASO 5: GENERAR EMBEDDING ---
+    if cancelada is not None and cancelada.is_set():
+        return None
+    print(f"🔢 Generando embedding ({EMBEDDING_BACKEND}: {EMBEDDING_MODEL})...")
+    query_vector = generar_embedding_query(query_expandida_semantica)
+    print(f"✅ Embedding generado: {len(query_vector)} dimensiones")
+
+    # --- PASO 6: BÚSQUEDA VECTORIAL EN PINECONE (con Top K dinámico) ---
+    if cancelada is not None and cancelada.is_set():
+        return None
+    top_k_dinamico = estrategia['top_k']
+    print(f"🔍 Buscando en {VECTOR_BACKEND} (TOP_K={top_k_dinamico})...")
+    
+    # ⚡ MEJORA #12: Si la consulta nombra un artículo, filtrar por metadata en Pinecone
+    filtro = filtro_articulo(numero_articulo)
+    
+    # ⚡ MEJORA #25: Si no, primera etapa en el índice de artículos y chunks solo de los artículos ganadores
+    indice_articulos = INDICES_ARTICULOS.obtener(documento_corpus) if INDICES_ARTICULOS and not filtro else None
+    if indice_articulos is not None:
+        etapa = articulos_candidatos(indice_articulos, query_vector)
+        if etapa and etapa['articulos']:
+            filtro = etapa['filtro']
+            estrategia['jerarquica'] = {clave: etapa[clave] for clave in ('articulos', 'entradas', 'scores')}
+            print(f"🗂️  Primera etapa (artículos): {etapa['articulos'][:10]} - chunks restringidos a estos artículos")
+    
+    def buscar(k: int) -> dict:
+        results = buscar_vectores(query_vector, k, filtro, documento_corpus)
+        if filtro and not results['matches']:
+            # Índice sin metadata de artículo (ingesta antigua): búsqueda sin filtro
+            print(f"⚠️ Sin resultados con filtro de artículo - repitiendo búsqueda sin filtro")
+            results = buscar_vectores(query_vector, k, documento=documento_corpus)
+        return results
+    
+    # ⚡ MEJORA #24: Empezar con k pequeño y ampliar solo si la cola sigue siendo relevante
+    if TOPK_ADAPTATIVO:
+        results, stats_topk = recuperar_adaptativo(buscar, umbral_relevancia(numero_articulo), top_k_dinamico)
+        ESTADISTICAS_TOPK.registrar(estrategia['nombre'], stats_topk, top_k_dinamico)
+        estrategia['recuperacion'] = stats_topk
+        print(f"📐 Top-k adaptativo ({estrategia['nombre']}): k {stats_topk['k_inicial']}→{stats_topk['k_final']} "
+              f"en {stats_topk['rondas']} ronda(s), {stats_topk['recuperados']} recuperados, "
+              f"{stats_topk['devueltos']} relevantes (sin ampliar: {stats_topk['motivo']})")
+    else:
+        results = buscar(top_k_dinamico)
+    return estrategia, results
+
+
+def respuesta_articulo_inexistente(numero_articulo: str, sugerencias: list, nombre_documento: str) -> str:
+    """⚡ MEJORA #27: Texto de la respuesta cuando el artículo pedido no existe"""
+    respuesta = f"**El artículo {numero_articulo} no existe en el {nombre_documento}.**"
+    if sugerencias:
+        respuesta += "\n\n¿Quizá buscabas " + ", ".join(f"el artículo {s}" for s in sugerencias) + "?"
+    return respuesta
+
+
+def generate_rag_response(query: str, historial: list = None, documento: Optional[str] = None,
+                          pregunta_original: Optional[str] = None):
     """
     Sistema RAG híbrido con búsqueda exacta + vector search + memoria conversacional.
     
@@ -588,11 +929,19 @@ def generate_rag_response(query: str, historial: list = None):
     3. Intenta búsqueda exacta con regex primero
     4. Si no encuentra, usa RAG con embeddings
     5. Corrige encoding en todos los resultados
+    
+    ⚡ MEJORA #16: `documento` elige el documento del corpus (None = el por defecto)
+    ⚡ MEJORA #32: `query` es la consulta con las erratas corregidas (recuperación, embeddings y
+    claves de caché); `pregunta_original` son las palabras del usuario, que es lo que ve el LLM
     """
     import re  # Importar al principio para usar en todo el scope
     import time  # Para medir tiempo de respuesta
     
     start_time = time.time()  # Iniciar contador de tiempo
+    documento_corpus = REGISTRO_CORPUS.documento(documento)
+    articulos_cache = REGISTRO_CORPUS.articulos(documento_corpus.id)
+    nombre_documento = documento_corpus.nombre
+    rama_vectorial = None  # ⚡ MEJORA #21: recuperación especulativa
     
     try:
         print(f"\n{'='*80}")
@@ -602,7 +951,10 @@ def generate_rag_response(query: str, historial: list = None):
         print(f"{'='*80}")
 
         # --- PASO 0.5: ENRIQUECER CONSULTA CON CONTEXTO CONVERSACIONAL ---
+        # ⚡ MEJORA #32: El prompt lleva la redacción del usuario, no la corregida
+        pregunta_usuario = pregunta_original or query
         query_enriquecida = query
+        consulta_prompt = pregunta_usuario
         nota_correccion = ""  # Variable para almacenar instrucciones de corrección
         
         if historial and len(historial) > 0:
@@ -709,6 +1061,7 @@ Según los hechos descritos (atropello por imprudencia grave), el artículo corr
                     
                     # No enriquecer con contexto previo en correcciones - el usuario ya sabe qué quiere
                     query_enriquecida = query
+                    consulta_prompt = pregunta_usuario
                     print(f"   ✅ Corrección procesada - enfocándose en artículo {articulo_propuesto}")
                 
             elif es_nuevo_caso:
@@ -749,6 +1102,7 @@ Según los hechos descritos (atropello por imprudencia grave), el artículo corr
                     
                     if contexto_previo:
                         query_enriquecida = f"{contexto_previo} {query}"
+                        consulta_prompt = f"{contexto_previo} {pregunta_usuario}"
                         print(f"🔗 Consulta detectada como seguimiento")
                         print(f"📝 Contexto previo: {contexto_previo[:80]}...")
                         print(f"🔍 Consulta enriquecida: {query_enriquecida[:150]}...")
@@ -769,10 +1123,14 @@ Según los hechos descritos (atropello por imprudencia grave), el artículo corr
         numero_articulo = None
         rango_articulos = None
         
+        # ⚡ MEJORA #31: Detección sobre la forma canónica - "ART. 142 BIS?", "articulo 142 bis" y
+        # "Artículo 142 bis" siguen el mismo camino y dan el mismo número (y la misma clave de caché)
+        consulta_canonica = normalizar_consulta(query_enriquecida)
+        
         # Primero verificar si es un rango
-        match_rango = (re.search(rango_pattern_1, query_enriquecida, re.IGNORECASE) or 
-                       re.search(rango_pattern_2, query_enriquecida, re.IGNORECASE) or
-                       re.search(rango_pattern_3, query_enriquecida, re.IGNORECASE))
+        match_rango = (re.search(rango_pattern_1, consulta_canonica, re.IGNORECASE) or 
+                       re.search(rango_pattern_2, consulta_canonica, re.IGNORECASE) or
+                       re.search(rango_pattern_3, consulta_canonica, re.IGNORECASE))
         
         if match_rango:
             inicio = int(match_rango.group(1))
@@ -787,18 +1145,70 @@ Según los hechos descritos (atropello por imprudencia grave), el artículo corr
         
         # Si no hay rango, buscar artículo individual
         if not rango_articulos:
-            match_articulo = re.search(articulo_pattern, query_enriquecida, re.IGNORECASE)
-            match_numero = re.match(solo_numero_pattern, query_enriquecida)
+            match_articulo = re.search(articulo_pattern, consulta_canonica, re.IGNORECASE)
+            match_numero = re.match(solo_numero_pattern, consulta_canonica)
             
             if match_articulo:
-                numero_articulo = match_articulo.group(1)
+                numero_articulo = numero_canonico(match_articulo.group(1))
                 print(f"🎯 Artículo detectado (patrón completo): {numero_articulo}")
             elif match_numero:
-                numero_articulo = match_numero.group(1)
+                numero_articulo = numero_canonico(match_numero.group(1))
                 print(f"🎯 Artículo detectado (solo número): {numero_articulo}")
             else:
                 print(f"ℹ️  No se detectó número de artículo en la query")
         
+        # ⚡ MEJORA #27: Artículo seguro inexistente (más allá del último, o sufijo ausente de un número
+        # que existe) - respuesta inmediata con los más cercanos; los huecos del índice siguen al RAG
+        if numero_articulo and EXISTENCIA and not nota_correccion:
+            sugerencias = EXISTENCIA.comprobar(documento_corpus.id, numero_articulo)
+            if sugerencias is not None:
+                print(f"🚫 Artículo {numero_articulo} no existe - sugerencias: {sugerencias}")
+                return {
+                    "respuesta": respuesta_articulo_inexistente(numero_articulo, sugerencias, nombre_documento),
+                    "metadata": {
+                        "num_fragmentos": 0,
+                        "tiene_contexto": False,
+                        "modelo": "Conjunto de artículos (sin LLM)",
+                        "embedding_model": "N/A",
+                        "metodo": "articulo_inexistente",
+                        "documento": documento_corpus.id,
+                        "sugerencias": sugerencias
+                    }
+                }
+        
+        # ⚡ MEJORA #29: Pregunta solo por la pena de un artículo completo - respuesta determinista
+        pena_por_rag = False  # Penas no estructuradas: ni respuesta cacheada ni texto literal, va al RAG
+        if (PENAS_RESPUESTA_DIRECTA and numero_articulo and not nota_correccion and es_pregunta_de_pena(query)
+                and numero_articulo in articulos_cache and not es_articulo_incompleto(articulos_cache[numero_articulo])):
+            penas = INDICE_PENAS.penas(documento_corpus.id, numero_articulo)
+            if penas and not penas_completas(penas):
+                print(f"⚖️  Artículo {numero_articulo} con penas no estructuradas (relativas o no reconocidas): se usa el RAG")
+                pena_por_rag = True
+            elif penas:
+                print(f"⚖️  Pregunta de pena: {len(penas)} pena(s) del artículo {numero_articulo} desde el índice")
+                return {
+                    "respuesta": formatear_penas(numero_articulo, penas, nombre_documento),
+                    "metadata": {
+                        "num_fragmentos": 1,
+                        "tiene_contexto": True,
+                        "modelo": "Índice de penas (sin LLM)",
+                        "embedding_model": "N/A",
+                        "metodo": "indice_penas",
+                        "documento": documento_corpus.id,
+                        "penas": penas
+                    }
+                }
+        
+        # ⚡ MEJORA #21: Si la búsqueda exacta probablemente no baste (artículo ausente o incompleto),
+        # lanzar ya el embedding + búsqueda vectorial en paralelo; se cancela si la exacta responde
+        if RAG_ESPECULATIVO and not nota_correccion and hace_falta_recuperacion(
+            articulos_cache, numero_articulo, rango_articulos
+        ):
+            print(f"🚀 Recuperación vectorial especulativa en paralelo con la búsqueda exacta")
+            rama_vectorial = RamaEspeculativa(
+                recuperar_candidatos, query, query_enriquecida, numero_articulo, documento_corpus
+            )
+        
         # --- PASO 2: BÚSQUEDA EXACTA INSTANTÁNEA ---
         # ⚡ MEJORA #1: Usar cache O(1) para artículos individuales
         # 📚 MEJORA #4: Usar cache para rangos de artículos
@@ -813,10 +1223,13 @@ Según los hechos descritos (atropello por imprudencia grave), el artículo corr
             
             print(f"📚 Buscando rango de artículos {inicio} a {fin} en cache...")
             
+            # ⚡ MEJORA #17: Todo el rango en un único viaje a Redis
+            textos_rango = buscar_articulos_exactos([str(num) for num in range(inicio, fin + 1)], documento_corpus.id)
+            
             for num in range(inicio, fin + 1):
                 num_str = str(num)
-                if num_str in ARTICULOS_CACHE:
-                    texto = ARTICULOS_CACHE[num_str]
+                if num_str in textos_rango:
+                    texto = textos_rango[num_str]
                     
                     # 🔍 Verificar si el artículo está completo
                     if es_articulo_incompleto(texto):
@@ -839,7 +1252,7 @@ Según los hechos descritos (atropello por imprudencia grave), el artículo corr
                 # NO retornar aquí - dejar que caiga en el flujo de RAG normal
             elif articulos_encontrados:
                 # Solo si TODOS los artículos están completos, responder desde cache
-                respuesta_rango = f"**Artículos {inicio} a {fin} del Código Penal**\n\n"
+                respuesta_rango = f"**Artículos {inicio} a {fin} del {nombre_documento}**\n\n"
                 
                 for num, texto in articulos_encontrados:
                     texto_corregido = corregir_encoding(texto)
@@ -865,13 +1278,33 @@ Según los hechos descritos (atropello por imprudencia grave), el artículo corr
         # 🎯 Caso 2: ARTÍCULO INDIVIDUAL
         if numero_articulo:
             print(f"🔑 Buscando '{numero_articulo}' en cache...")
-            print(f"📋 Cache tiene {len(ARTICULOS_CACHE)} artículos")
-            print(f"🔍 Artículo en cache: {numero_articulo in ARTICULOS_CACHE}")
+            print(f"📋 Cache tiene {len(articulos_cache)} artículos")
+            print(f"🔍 Artículo en cache: {numero_articulo in articulos_cache}")
             
+        # ⚡ MEJORA #18: Respuesta ya formateada en Redis (calentamiento o consulta anterior)
+        if numero_articulo and CACHE_ARTICULOS and not nota_correccion and not pena_por_rag:
+            try:
+                respuesta_cacheada = CACHE_ARTICULOS.obtener_respuesta(documento_corpus.id, numero_articulo)
+            except Exception as e:
+                print(f"⚠️ Error al leer la respuesta de Redis: {e}")
+                respuesta_cacheada = None
+            if respuesta_cacheada:
+                print(f"🗄️ Respuesta del artículo {numero_articulo} servida desde Redis")
+                return {
+                    "respuesta": respuesta_cacheada,
+                    "metadata": {
+                        "num_fragmentos": 1,
+                        "tiene_contexto": True,
+                        "modelo": "Cache de respuestas (Redis)",
+                        "embedding_model": "N/A",
+                        "metodo": "cache_respuesta"
+                    }
+                }
+        
         # Solo usar cache directo si NO es corrección
-        if numero_articulo and numero_articulo in ARTICULOS_CACHE and not nota_correccion:
+        if numero_articulo and numero_articulo in articulos_cache and not nota_correccion and not pena_por_rag:
             print(f"⚡ Búsqueda instantánea en cache para artículo {numero_articulo}...")
-            texto_exacto = ARTICULOS_CACHE[numero_articulo]
+            texto_exacto = articulos_cache[numero_articulo]
             
             if texto_exacto:
                 print(f"✅ ¡Artículo {numero_articulo} encontrado en cache (O(1))!")
@@ -885,7 +1318,7 @@ Según los hechos descritos (atropello por imprudencia grave), el artículo corr
                     
                     # Responder directamente sin pasar por Gemini si es texto razonable
                     # Aumentado a 4000 caracteres (la mayoría de artículos caben)
-                    if len(texto_corregido) < 4000:
+                    if len(texto_corregido) < LIMITE_RESPUESTA_DIRECTA:
                         respuesta_final = f"**Artículo {numero_articulo}**\n\n{texto_corregido}"
                         return {
                             "respuesta": respuesta_final,
@@ -898,11 +1331,11 @@ Según los hechos descritos (atropello por imprudencia grave), el artículo corr
                             }
                         }
                     else:
-                        # Si es muy largo (>4000 chars), pasar por Gemini para formatear mejor
+                        # Si es muy largo (>4000 chars), pasar por Gemini para formatear mejor.
+                        # El prompt solo formatea (no incluye la pregunta) para que la respuesta
+                        # valga para cualquier consulta del artículo y pueda cachearse por artículo
                         prompt = f"""Eres un asistente legal especializado en el Código Penal español.
 
-El usuario preguntó: "{query}"
-
 Aquí está el texto LITERAL y COMPLETO del artículo encontrado:
 
 {texto_corregido}
@@ -916,7 +1349,13 @@ INSTRUCCIONES:
 
 Responde ahora:"""
 
-                        response = LLM_CLIENT.generate_content(prompt)
+                        response = CLIENTE_LLM.generar(prompt)
+                        # ⚡ MEJORA #18: El prompt es solo de formato (sin la pregunta): se reutiliza
+                        if CACHE_ARTICULOS:
+                            try:
+                                CACHE_ARTICULOS.guardar_respuestas(documento_corpus.id, {numero_articulo: response.text})
+                            except Exception as e:
+                                print(f"⚠️ Error al guardar la respuesta en Redis: {e}")
                         return {
                             "respuesta": response.text,
                             "metadata": {
@@ -928,54 +1367,15 @@ Responde ahora:"""
                             }
                         }
 
-        # --- PASO 3: DECIDIR ESTRATEGIA INTELIGENTE ---
-        estrategia = decidir_estrategia_busqueda(query, numero_articulo)
-        print(f"🧠 Estrategia seleccionada: {estrategia['razon']}")
-        print(f"   - Top K: {estrategia['top_k']}")
-        print(f"   - Reconstrucción: {estrategia['usar_reconstruccion']}")
-        
-        # --- PASO 4: ENRIQUECER QUERY (si no hubo match exacto) ---
-        if numero_articulo:
-            query_enriquecida_embedding = (
-                f"Contenido literal del Código Penal español "
-                f"Artículo {numero_articulo} delito pena castigo texto completo"
-            )
-            print(f"🔄 Query para embedding: {query_enriquecida_embedding}")
+        # --- PASOS 3-6: ESTRATEGIA, EMBEDDING Y BÚSQUEDA VECTORIAL ---
+        if rama_vectorial is not None:
+            estrategia, results = rama_vectorial.resultado()
+            print(f"⚡ Recuperación especulativa aprovechada ({len(results['matches'])} matches)")
         else:
-            # IMPORTANTE: Mantener la query enriquecida con contexto conversacional
-            # que se creó en PASO 0.5 (no sobrescribir)
-            query_enriquecida_embedding = query_enriquecida
-            if query_enriquecida != query:
-                print(f"🔄 Usando query enriquecida con contexto conversacional")
-        
-        # 🔍 MEJORA #6: Expansión semántica con sinónimos legales
-        query_expandida_semantica = expandir_query_con_sinonimos(query_enriquecida_embedding)
-
-        # --- PASO 5: GENERAR EMBEDDING ---
-        print("🔢 Generando embedding con Vertex AI...")
-        embeddings = EMBEDDING_CLIENT.get_embeddings([query_expandida_semantica])
-        query_vector = embeddings[0].values
-        print(f"✅ Embedding generado: {len(query_vector)} dimensiones")
-
-        # --- PASO 6: BÚSQUEDA VECTORIAL EN PINECONE (con Top K dinámico) ---
-        top_k_dinamico = estrategia['top_k']
-        print(f"🔍 Buscando en Pinecone (TOP_K={top_k_dinamico})...")
-        results = PINECONE_INDEX.query(
-            vector=query_vector,
-            top_k=top_k_dinamico,
-            include_metadata=True
-        )
-        # --- PASO 6: BÚSQUEDA VECTORIAL EN PINECONE (con Top K dinámico) ---
-        top_k_dinamico = estrategia['top_k']
-        print(f"🔍 Buscando en Pinecone (TOP_K={top_k_dinamico})...")
-        results = PINECONE_INDEX.query(
-            vector=query_vector,
-            top_k=top_k_dinamico,
-            include_metadata=True
-        )
+            estrategia, results = recuperar_candidatos(query, query_enriquecida, numero_articulo, documento_corpus)
 
         # --- PASO 7: FILTRADO ADAPTATIVO ---
-        umbral = 0.35 if numero_articulo else 0.45
+        umbral = umbral_relevancia(numero_articulo)
         print(f"📊 Aplicando umbral adaptativo: {umbral}")
         
         chunks_relevantes = []
@@ -986,11 +1386,21 @@ Responde ahora:"""
             if score > umbral:
                 chunks_relevantes.append(match)
                 print(f"  ✓ Chunk aceptado (score: {score:.3f})")
+        
+        # ⚡ MEJORA #23: El cross-encoder decide qué fragmentos llegan al prompt (top N dentro del presupuesto)
+        stats_reranking = None
+        if RERANKER and len(chunks_relevantes) > 1:
+            try:
+                chunks_relevantes, stats_reranking = RERANKER.reordenar(query_enriquecida, chunks_relevantes)
+                print(f"🎯 Re-ranking: {stats_reranking['fragmentos_entrada']} → {stats_reranking['fragmentos_salida']} fragmentos "
+                      f"({stats_reranking['tokens_ahorrados']} tokens ahorrados, {stats_reranking['duracion_ms']} ms)")
+            except Exception as e:
+                print(f"⚠️ Error en el re-ranking (se usan los fragmentos por score vectorial): {e}")
 
         if not chunks_relevantes:
             print("⚠️ No hay resultados relevantes después del filtrado")
             return {
-                "respuesta": "Lo siento, no encontré información relevante en el Código Penal sobre tu consulta. ¿Podrías reformularla o ser más específico?",
+                "respuesta": f"Lo siento, no encontré información relevante en el {nombre_documento} sobre tu consulta. ¿Podrías reformularla o ser más específico?",
                 "metadata": {
                     "num_fragmentos": 0,
                     "tiene_contexto": False,
@@ -1009,40 +1419,19 @@ Responde ahora:"""
             print(f"📋 Artículos detectados: {list(articulos_detectados.keys())}")
             
             # Reconstruir artículos completos
-            articulos_reconstruidos = reconstruir_articulos_completos(articulos_detectados, chunks_relevantes)
+            articulos_reconstruidos = reconstruir_articulos_completos(articulos_detectados, chunks_relevantes, articulos_cache)
             
-            # Construir contexto usando artículos reconstruidos + chunks originales
-            contexto_parts = []
-            articulos_ya_incluidos = set()
-            
-            # Primero, agregar artículos reconstruidos
-            for num_art, info in articulos_reconstruidos.items():
-                if info['completo'] or info['metodo'].startswith('busqueda_exacta'):
-                    contexto_parts.append(
-                        f"[Artículo {num_art} - Reconstruido ({info['metodo']})]"
-                        f"\n{info['texto']}"
-                    )
-                    articulos_ya_incluidos.add(num_art)
-                    print(f"  ✅ Art. {num_art} agregado como reconstruido ({info['metodo']})")
-            
-            # Luego, agregar chunks que no sean de artículos ya reconstruidos
-            for match in chunks_relevantes:
-                texto = match.get('metadata', {}).get('text', '')
-                score = match.get('score', 0)
-                
-                # Verificar si este chunk es de un artículo ya incluido
-                es_duplicado = False
-                for num_art in articulos_ya_incluidos:
-                    if f"Artículo {num_art}" in texto or f"Art. {num_art}" in texto:
-                        es_duplicado = True
-                        break
-                
-                if not es_duplicado:
-                    texto_corregido = corregir_encoding(texto)
-                    contexto_parts.append(
-                        f"[Fragmento del Código Penal - Relevancia: {score:.2f}]"
-                        f"\n{texto_corregido}"
-                    )
+            # ⚡ MEJORA #11: Contexto deduplicado (spans, partes del mismo artículo, MinHash)
+            contexto_parts, stats_contexto = ensamblar_contexto(
+                chunks_relevantes,
+                articulos_reconstruidos,
+                formatear_texto=corregir_encoding,
+                articulos_referenciados=articulos_citados(
+                    chunks_relevantes, numero_articulo, articulos_reconstruidos, documento_corpus
+                )
+            )
+            for num_art in stats_contexto['articulos_reconstruidos_incluidos']:
+                print(f"  ✅ Art. {num_art} agregado como reconstruido ({articulos_reconstruidos[num_art]['metodo']})")
             
             contexto = "\n\n---\n\n".join(contexto_parts)
             num_matches = len(contexto_parts)
@@ -1055,19 +1444,22 @@ Responde ahora:"""
             print(f"   - Total: {len(contexto)} caracteres")
         
         else:
-            # Sin reconstrucción - método original
+            # Sin reconstrucción - solo deduplicación de fragmentos
             print(f"\n📋 Construcción de contexto sin reconstrucción...")
-            contexto_parts = []
-            for match in chunks_relevantes:
-                text = match.get('metadata', {}).get('text', '')
-                score = match.get('score', 0)
-                if text:
-                    texto_corregido = corregir_encoding(text)
-                    contexto_parts.append(f"[Fragmento del Código Penal - Relevancia: {score:.2f}]\n{texto_corregido}")
+            contexto_parts, stats_contexto = ensamblar_contexto(
+                chunks_relevantes,
+                formatear_texto=corregir_encoding,
+                articulos_referenciados=articulos_citados(chunks_relevantes, numero_articulo, {}, documento_corpus)
+            )
             
             contexto = "\n\n---\n\n".join(contexto_parts)
             num_matches = len(contexto_parts)
             print(f"📋 Contexto construido: {num_matches} fragmentos ({len(contexto)} caracteres)")
+        
+        print(f"🗜️  Contexto comprimido: {stats_contexto['tokens_originales']} → {stats_contexto['tokens_finales']} tokens "
+              f"(ahorrados ~{stats_contexto['tokens_ahorrados']}, "
+              f"{stats_contexto['fragmentos_fusionados']} fusionados, "
+              f"{stats_contexto['casi_duplicados_eliminados']} casi-duplicados)")
 
         # --- PASO 9: GENERAR RESPUESTA CON GEMINI ---
         
@@ -1100,8 +1492,8 @@ Responde ahora:"""
 El usuario está continuando una conversación previa. Esta consulta hace referencia a múltiples aspectos:
 
 - **Consulta anterior:** "{ultima_consulta_usuario}"
-- **Consulta actual:** "{query}"
-- **CONSULTA COMPLETA INTERPRETADA:** "{query_enriquecida}"
+- **Consulta actual:** "{pregunta_usuario}"
+- **CONSULTA COMPLETA INTERPRETADA:** "{consulta_prompt}"
 
 **INSTRUCCIÓN CRÍTICA:** 
 Debes analizar y responder sobre TODOS los delitos/aspectos mencionados en la "CONSULTA COMPLETA INTERPRETADA" con IGUAL importancia y detalle. No priorices solo el último tema mencionado - dedica espacio y artículos similares a CADA aspecto del caso.
@@ -1116,14 +1508,14 @@ Ejemplo: Si la consulta completa es "robo de coche y además atropello mortal",
             limite_max_penas = "6 penas"
             nota_contextual = ""
         
-        prompt = f"""Actúa como un asistente jurídico especializado en Derecho Penal español. Tu conocimiento se basa exclusivamente en el texto oficial del Código Penal.
+        prompt = f"""Actúa como un asistente jurídico especializado en Derecho Penal español. Tu conocimiento se basa exclusivamente en el texto oficial del {nombre_documento}.
 
 {nota_contextual}
 
 CONSULTA DEL USUARIO:
-{query_enriquecida}
+{consulta_prompt}
 
-CONTEXTO RECUPERADO ({num_matches} fragmentos del Código Penal):
+CONTEXTO RECUPERADO ({num_matches} fragmentos del {nombre_documento}):
 {contexto}
 
 ═══════════════════════════════════════════════════════════════
@@ -1224,7 +1616,7 @@ El uso de un cuchillo en una agresión se considera empleo de instrumento peligr
 RESPONDE AHORA:"""
 
         print("⚖️ Generando respuesta con Gemini (Vertex AI)...")
-        response = LLM_CLIENT.generate_content(prompt)
+        response = CLIENTE_LLM.generar(prompt)
         
         print("✅ Respuesta generada exitosamente")
         return {
@@ -1234,7 +1626,13 @@ RESPONDE AHORA:"""
                 "tiene_contexto": True,
                 "modelo": MODEL_NAME,
                 "embedding_model": EMBEDDING_MODEL,
-                "metodo": "rag_vector_search"
+                "metodo": "rag_vector_search",
+                "documento": documento_corpus.id,
+                "contexto": stats_contexto,
+                "reranking": stats_reranking,
+                "recuperacion": estrategia.get('recuperacion'),
+                "jerarquica": estrategia.get('jerarquica'),
+                "fetch_por_id": estrategia.get('fetch_por_id')
             }
         }
 
@@ -1251,6 +1649,10 @@ RESPONDE AHORA:"""
                 "tiene_contexto": False
             }
         }
+    finally:
+        # ⚡ MEJORA #21: Si la búsqueda exacta respondió, la rama especulativa sobra
+        if rama_vectorial is not None:
+            rama_vectorial.cancelar()
 # --- 5. ENDPOINT PRINCIPAL DE CHAT ---
 @app.post("/chat", response_model=ChatResponse)
 async def handle_chat_request(request: ChatRequest):
@@ -1260,7 +1662,13 @@ async def handle_chat_request(request: ChatRequest):
     
     ⚡ MEJORA #3: Soporte para historial conversacional
     🗄️ MEJORA #10: Persistencia en PostgreSQL
+    ⚡ MEJORA #16: Campo `documento` para consultar otro documento del corpus
     """
+    try:
+        documento_corpus = REGISTRO_CORPUS.documento(request.documento)
+    except DocumentoNoEncontrado:
+        raise HTTPException(status_code=404, detail=f"Documento '{request.documento}' no encontrado en el corpus")
+    
     pregunta_usuario = request.pregunta
     historial = request.historial if hasattr(request, 'historial') else []
     session_id = request.session_id if hasattr(request, 'session_id') and request.session_id else str(uuid.uuid4())
@@ -1304,8 +1712,22 @@ async def handle_chat_request(request: ChatRequest):
             if db:
                 db.close()
     
+    # ⚡ MEJORA #32: Erratas corregidas antes de la clave de single-flight, la expansión con
+    # sinónimos y el embedding (el vocabulario es el del documento por defecto); el LLM recibe
+    # la pregunta tal como la escribió el usuario
+    pregunta_rag, correcciones = pregunta_usuario, {}
+    if CORRECTOR and documento_corpus.id == REGISTRO_CORPUS.por_defecto:
+        pregunta_rag, correcciones = CORRECTOR.corregir(pregunta_usuario)
+        if correcciones:
+            print(f"✏️  Corrección ortográfica: {correcciones}")
+    
     # Llamar a la función RAG con Vertex AI, pasando el historial
-    resultado = generate_rag_response(pregunta_usuario, historial)
+    # ⚡ MEJORA #19: En el pool de hilos (no bloquea el event loop) y con single-flight:
+    # las preguntas idénticas en curso (misma conversación y documento) comparten una ejecución
+    resultado = await SINGLE_FLIGHT.ejecutar(
+        f"chat:{clave_consulta(pregunta_rag, documento_corpus.id, historial)}",
+        lambda: generate_rag_response(pregunta_rag, historial, documento_corpus.id, pregunta_usuario)
+    )
     
     # Calcular tiempo de respuesta
     response_time_ms = (time.time() - start_time) * 1000
@@ -1339,93 +1761,91 @@ async def handle_chat_request(request: ChatRequest):
         respuesta=resultado["respuesta"],
         metadata={
             "pregunta": pregunta_usuario,
+            "correcciones": correcciones,
             "session_id": session_id,
             "tieneContexto": resultado["metadata"].get("tiene_contexto", False),
             "numeroResultados": resultado["metadata"].get("num_fragmentos", 0),
             "modelo": resultado["metadata"].get("modelo", MODEL_NAME),
             "dominio": "codigo-penal-espanol",
+            "documento": documento_corpus.id,
             "proveedor": "Vertex AI (Google Cloud)",
-            "response_time_ms": round(response_time_ms, 2)
+            "response_time_ms": round(response_time_ms, 2),
+            # Estadísticas del ensamblado de contexto y del re-ranking (None en las rutas sin RAG)
+            "contexto": resultado["metadata"].get("contexto"),
+            "reranking": resultado["metadata"].get("reranking")
         }
     )
 
 
 
-# --- ENDPOINT: COMPARADOR DE ARTÍCULOS ⚖️ ---
-@app.get("/comparar")
-async def comparar_articulos(art1: str, art2: str):
+def generar_comparacion(art1: str, art2: str, documento_corpus: Documento) -> dict:
     """
-    🆕 MEJORA #5: Comparador de artículos
-    
-    Compara dos artículos del Código Penal generando una tabla comparativa detallada.
-    
-    Parámetros:
-    - art1: Número del primer artículo (ej: "138")
-    - art2: Número del segundo artículo (ej: "142")
-    
-    Retorna análisis comparativo con:
-    - Nombres de los delitos
-    - Penas aplicables
-    - Diferencias clave
-    - Similitudes
-    - Ejemplos de aplicación
+    Genera con Gemini la tabla comparativa de dos artículos (cuerpo de /comparar).
+    También la usa el calentamiento de caché para precalcular los pares populares.
     """
-    print(f"\n{'='*60}")
-    print(f"⚖️  COMPARACIÓN DE ARTÍCULOS")
-    print(f"   Art. {art1} vs Art. {art2}")
-    print(f"{'='*60}")
-    
     try:
-        # Buscar ambos artículos en el cache
+        # Buscar ambos artículos en el cache (⚡ MEJORA #17: un único MGET a Redis)
+        textos = buscar_articulos_exactos([art1, art2], documento_corpus.id)
         texto_art1 = None
         texto_art2 = None
         
         # Artículo 1
-        if art1 in ARTICULOS_CACHE:
-            texto_art1 = ARTICULOS_CACHE[art1]
+        if art1 in textos:
+            texto_art1 = textos[art1]
             if es_articulo_incompleto(texto_art1):
                 print(f"⚠️  Art. {art1} incompleto en cache - buscando versión completa...")
                 # Buscar en Pinecone para reconstruir
                 query_temp = f"Artículo {art1} completo"
-                resultado = generate_rag_response(query_temp, [])
+                resultado = generate_rag_response(query_temp, [], documento_corpus.id)
                 texto_art1 = resultado["respuesta"]
             else:
                 texto_art1 = corregir_encoding(texto_art1)
         else:
             print(f"⚠️  Art. {art1} no encontrado en cache - buscando...")
             query_temp = f"Artículo {art1}"
-            resultado = generate_rag_response(query_temp, [])
+            resultado = generate_rag_response(query_temp, [], documento_corpus.id)
             texto_art1 = resultado["respuesta"]
         
         # Artículo 2
-        if art2 in ARTICULOS_CACHE:
-            texto_art2 = ARTICULOS_CACHE[art2]
+        if art2 in textos:
+            texto_art2 = textos[art2]
             if es_articulo_incompleto(texto_art2):
                 print(f"⚠️  Art. {art2} incompleto en cache - buscando versión completa...")
                 query_temp = f"Artículo {art2} completo"
-                resultado = generate_rag_response(query_temp, [])
+                resultado = generate_rag_response(query_temp, [], documento_corpus.id)
                 texto_art2 = resultado["respuesta"]
             else:
                 texto_art2 = corregir_encoding(texto_art2)
         else:
             print(f"⚠️  Art. {art2} no encontrado en cache - buscando...")
             query_temp = f"Artículo {art2}"
-            resultado = generate_rag_response(query_temp, [])
+            resultado = generate_rag_response(query_temp, [], documento_corpus.id)
             texto_art2 = resultado["respuesta"]
         
         print(f"✅ Ambos artículos recuperados")
         
+        # ⚡ MEJORA #29: Penas ya extraídas del texto: el modelo las copia en vez de deducirlas
+        bloque_penas = ""
+        if INDICE_PENAS:
+            penas_art1 = INDICE_PENAS.penas(documento_corpus.id, art1) or []
+            penas_art2 = INDICE_PENAS.penas(documento_corpus.id, art2) or []
+            if penas_art1 or penas_art2:
+                bloque_penas = "\n**PENAS EXTRAÍDAS DEL TEXTO (úsalas tal cual en las filas de pena):**\n" + "\n".join(
+                    f"- Art. {art}: " + ("; ".join(describir_pena(p) for p in penas) or "sin pena propia")
+                    for art, penas in ((art1, penas_art1), (art2, penas_art2))
+                ) + "\n"
+        
         # Generar comparación con Gemini - Formato de TABLA COMPARATIVA
         prompt = f"""Eres un experto en Derecho Penal español especializado en análisis comparativo de delitos.
 
-Se te han proporcionado dos artículos del Código Penal para comparar:
+Se te han proporcionado dos artículos del {documento_corpus.nombre} para comparar:
 
 **ARTÍCULO {art1}:**
 {texto_art1}
 
 **ARTÍCULO {art2}:**
 {texto_art2}
-
+{bloque_penas}
 **⚠️ ADVERTENCIA CRÍTICA:**
 - ❌ **NUNCA** incluyas el texto completo de los artículos en tu respuesta
 - ❌ **NUNCA** copies párrafos literales de los artículos
@@ -1505,7 +1925,7 @@ NO incluyas ningún texto de los artículos antes de las tablas.
 GENERA LA TABLA COMPARATIVA AHORA (SOLO TABLAS, SIN TEXTO DE ARTÍCULOS):"""
 
         print(f"⚖️  Generando comparación con Gemini...")
-        response = LLM_CLIENT.generate_content(prompt)
+        response = CLIENTE_LLM.generar(prompt)
         
         print(f"✅ Comparación generada exitosamente")
         
@@ -1518,7 +1938,8 @@ GENERA LA TABLA COMPARATIVA AHORA (SOLO TABLAS, SIN TEXTO DE ARTÍCULOS):"""
             "metadata": {
                 "modelo": MODEL_NAME,
                 "tipo_analisis": "comparativo",
-                "fuente": "Código Penal Español"
+                "fuente": documento_corpus.nombre,
+                "documento": documento_corpus.id
             }
         }
         
@@ -1532,6 +1953,112 @@ GENERA LA TABLA COMPARATIVA AHORA (SOLO TABLAS, SIN TEXTO DE ARTÍCULOS):"""
         }
 
 
+# --- ENDPOINT: COMPARADOR DE ARTÍCULOS ⚖️ ---
+@app.get("/comparar")
+async def comparar_articulos(art1: str, art2: str, documento: Optional[str] = None):
+    """
+    🆕 MEJORA #5: Comparador de artículos
+    
+    Compara dos artículos del Código Penal generando una tabla comparativa detallada.
+    
+    Parámetros:
+    - art1: Número del primer artículo (ej: "138")
+    - art2: Número del segundo artículo (ej: "142")
+    - documento: Documento del corpus (⚡ MEJORA #16, por defecto el Código Penal)
+    
+    Retorna análisis comparativo con:
+    - Nombres de los delitos
+    - Penas aplicables
+    - Diferencias clave
+    - Similitudes
+    - Ejemplos de aplicación
+    """
+    # ⚡ MEJORA #31: "142 BIS" y "142 bis" comparten caché y single-flight
+    art1, art2 = numero_canonico(art1), numero_canonico(art2)
+    
+    print(f"\n{'='*60}")
+    print(f"⚖️  COMPARACIÓN DE ARTÍCULOS")
+    print(f"   Art. {art1} vs Art. {art2}")
+    print(f"{'='*60}")
+    
+    try:
+        documento_corpus = REGISTRO_CORPUS.documento(documento)
+    except DocumentoNoEncontrado:
+        raise HTTPException(status_code=404, detail=f"Documento '{documento}' no encontrado en el corpus")
+    
+    # ⚡ MEJORA #27: Comparar con un artículo que no existe no merece una llamada a Gemini
+    # (en el threadpool: la comprobación puede cargar el documento y leer su PDF)
+    if EXISTENCIA:
+        for articulo in (art1, art2):
+            sugerencias = await run_in_threadpool(EXISTENCIA.comprobar, documento_corpus.id, articulo)
+            if sugerencias is not None:
+                raise HTTPException(status_code=404, detail={
+                    "error": f"El artículo {articulo} no existe en el {documento_corpus.nombre}",
+                    "sugerencias": sugerencias
+                })
+    
+    # ⚡ MEJORA #19: Comparaciones idénticas simultáneas comparten una sola llamada a Gemini
+    return await SINGLE_FLIGHT.ejecutar(
+        f"comparar:{documento_corpus.id}:{art1}:{art2}",
+        lambda: comparar_con_cache(art1, art2, documento_corpus)
+    )
+
+
+def comparar_con_cache(art1: str, art2: str, documento_corpus: Documento) -> dict:
+    """
+    ⚡ MEJORA #18: Comparación ya generada (o precalculada en el calentamiento) para esta
+    versión del texto; si no existe se genera con Gemini y se guarda en Redis
+    """
+    version = REGISTRO_CORPUS.version(documento_corpus.id)
+    if CACHE_ARTICULOS:
+        try:
+            cacheada = CACHE_ARTICULOS.obtener_comparacion(documento_corpus.id, version, art1, art2)
+            if cacheada:
+                print(f"🗄️ Comparación {art1} vs {art2} servida desde Redis")
+                return cacheada
+        except Exception as e:
+            print(f"⚠️ Error al leer la comparación de Redis: {e}")
+    
+    resultado = generar_comparacion(art1, art2, documento_corpus)
+    if CACHE_ARTICULOS and "error" not in resultado:
+        try:
+            CACHE_ARTICULOS.guardar_comparacion(documento_corpus.id, version, art1, art2, resultado)
+        except Exception as e:
+            print(f"⚠️ Error al guardar la comparación en Redis: {e}")
+    return resultado
+
+
+# --- CALENTAMIENTO DE CACHÉ AL ARRANCAR ---
+@app.on_event("startup")
+def iniciar_calentamiento_cache():
+    """
+    ⚡ MEJORA #18: Con CACHE_CALENTAR_AL_INICIO=true carga en Redis, en segundo plano, todos los
+    artículos del documento por defecto, sus respuestas formateadas y (opcionalmente) las
+    comparaciones populares. El sello de versión y el lock evitan trabajo repetido entre workers.
+    """
+    if not CACHE_CALENTAR_AL_INICIO or not CACHE_ARTICULOS:
+        return
+    documento_defecto = REGISTRO_CORPUS.documento()
+    
+    def _calentar():
+        try:
+            resultado = calentar_cache(
+                CACHE_ARTICULOS,
+                documento_defecto.id,
+                REGISTRO_CORPUS.articulos(documento_defecto.id),
+                REGISTRO_CORPUS.version(documento_defecto.id),
+                formatear=formatear_respuesta_articulo,
+                comparar=(lambda a, b: generar_comparacion(a, b, documento_defecto))
+                if CACHE_CALENTAR_COMPARACIONES else None,
+                pares=pares_configurados()
+            )
+            print(f"🔥 Calentamiento de caché: {resultado}")
+        except Exception as e:
+            print(f"⚠️ Error en el calentamiento de caché: {e}")
+    
+    threading.Thread(target=_calentar, name="calentamiento-cache", daemon=True).start()
+
+
 # --- 6. ENDPOINT DE SALUD ---
 @app.get("/health")
 async def health_check():
@@ -1551,11 +2078,30 @@ async def health_check():
         "provider": "Google Cloud Vertex AI",
         "models": {
             "llm": MODEL_NAME,
-            "embeddings": EMBEDDING_MODEL
+            "embeddings": EMBEDDING_MODEL,
+            "embedding_backend": EMBEDDING_BACKEND,
+            "vector_backend": VECTOR_BACKEND
         },
         "cache": {
             "redis": cache_stats,
-            "memory_cache_size": len(ARTICULOS_CACHE)
+            "memory_cache_size": sum(REGISTRO_CORPUS.estadisticas()["cargados"].values())
+        },
+        "single_flight": SINGLE_FLIGHT.estadisticas(),
+        "embeddings_por_lotes": AGRUPADOR_EMBEDDINGS.estadisticas(),
+        "cache_embeddings": CACHE_EMBEDDINGS.estadisticas(),
+        "recuperacion_especulativa": RamaEspeculativa.estadisticas(),
+        "llm": CLIENTE_LLM.estadisticas(),
+        "indices_articulos": INDICES_ARTICULOS.estadisticas() if INDICES_ARTICULOS else None,
+        "chunks_por_id": CHUNKS_ARTICULO.estadisticas() if CHUNKS_ARTICULO else None,
+        "existencia_articulos": EXISTENCIA.estadisticas() if EXISTENCIA else None,
+        "grafo_referencias": GRAFOS_REFERENCIAS.estadisticas() if GRAFOS_REFERENCIAS else None,
+        "indice_penas": INDICE_PENAS.estadisticas() if INDICE_PENAS else None,
+        "sugerencias": SUGERENCIAS.estadisticas() if SUGERENCIAS else None,
+        "corrector_ortografico": CORRECTOR.estadisticas() if CORRECTOR else None,
+        "top_k_adaptativo": {"activo": TOPK_ADAPTATIVO, "por_estrategia": ESTADISTICAS_TOPK.resumen()},
+        "corpus": {
+            "por_defecto": REGISTRO_CORPUS.por_defecto,
+            "cargados": list(REGISTRO_CORPUS.estadisticas()["cargados"])
         },
         "database": {
             "postgresql": db_connection,
@@ -1564,6 +2110,149 @@ async def health_check():
     }
 
 
+# --- 6b. ENDPOINT DE INVALIDACIÓN DE CACHÉ ---
+def verificar_clave_admin(clave: Optional[str]) -> None:
+    """401/403 si la cabecera X-Admin-Key no coincide con ADMIN_API_KEY (o no hay clave configurada)"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Endpoint de operación deshabilitado: configura ADMIN_API_KEY")
+    if not clave or not hmac.compare_digest(clave.encode("utf-8"), ADMIN_API_KEY.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Cabecera X-Admin-Key ausente o incorrecta")
+
+
+@app.post("/cache/invalidar")
+async def invalidar_cache_articulos(request: InvalidarCacheRequest, x_admin_key: Optional[str] = Header(None)):
+    """
+    Invalida solo los artículos afectados por un reindexado incremental
+    (ver reindexado_utils.invalidar_caches en los scripts de ingesta).
+
+    Relee el PDF del documento, actualiza en su índice de artículos únicamente
+    los artículos indicados y borra sus claves articulo:{doc}:{n} de Redis.
+    Requiere la cabecera X-Admin-Key; la relectura del PDF se hace en el
+    threadpool para no bloquear el event loop.
+    """
+    verificar_clave_admin(x_admin_key)
+    try:
+        documento_corpus = REGISTRO_CORPUS.documento(request.documento)
+    except DocumentoNoEncontrado:
+        raise HTTPException(status_code=404, detail=f"Documento '{request.documento}' no encontrado en el corpus")
+
+    if not request.articulos:
+        return {"documento": documento_corpus.id, "actualizados": [], "eliminados": [], "redis_borrados": 0}
+
+    try:
+        actualizados, eliminados = await run_in_threadpool(
+            REGISTRO_CORPUS.recargar_articulos, documento_corpus.id, request.articulos
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"No se pudo releer el PDF: {str(e)}")
+
+    if CHUNKS_ARTICULO:
+        CHUNKS_ARTICULO.invalidar(documento_corpus.id)  # El manifiesto nuevo trae otros ids
+    
+    redis_borrados = 0
+    if CACHE_ARTICULOS:
+        try:
+            redis_borrados = CACHE_ARTICULOS.invalidar(documento_corpus.id, request.articulos)
+        except Exception as e:
+            print(f"⚠️ Error al invalidar Redis: {e}")
+
+    print(f"♻️ Caché invalidada ({documento_corpus.id}): {len(actualizados)} actualizados, "
+          f"{len(eliminados)} eliminados, {redis_borrados} claves Redis")
+    return {
+        "documento": documento_corpus.id,
+        "actualizados": actualizados,
+        "eliminados": eliminados,
+        "redis_borrados": redis_borrados
+    }
+
+
+# --- 6c. REFERENCIAS ENTRE ARTÍCULOS ---
+# Manejadores síncronos (def): FastAPI los ejecuta en el threadpool, así la primera consulta
+# a un documento no cargado (lectura del PDF) no bloquea el event loop
+@app.get("/articulos/{numero}/referencias")
+def referencias_articulo(numero: str, documento: Optional[str] = None):
+    """
+    ⚡ MEJORA #28: Artículos que cita un artículo (con "anterior"/"siguiente" resueltos)
+    y artículos que lo citan, según el grafo de referencias del documento.
+    """
+    numero = numero_canonico(numero)  # ⚡ MEJORA #31: "142BIS", "142  bis" -> "142 bis"
+    try:
+        documento_corpus = REGISTRO_CORPUS.documento(documento)
+    except DocumentoNoEncontrado:
+        raise HTTPException(status_code=404, detail=f"Documento '{documento}' no encontrado en el corpus")
+    
+    referencias = GRAFOS_REFERENCIAS.referencias(documento_corpus.id, numero)
+    if referencias is None:
+        sugerencias = EXISTENCIA.comprobar(documento_corpus.id, numero) if EXISTENCIA else None
+        raise HTTPException(status_code=404, detail={
+            "error": f"El artículo {numero} no existe en el {documento_corpus.nombre}",
+            "sugerencias": sugerencias or []
+        })
+    return {"documento": documento_corpus.id, "articulo": numero, **referencias}
+
+
+@app.get("/articulos/{numero}/penas")
+def penas_articulo(numero: str, documento: Optional[str] = None):
+    """
+    ⚡ MEJORA #29: Penas del artículo por apartado (prisión, multa, inhabilitación) con
+    los rangos en meses, extraídas del texto sin pasar por el LLM.
+    """
+    numero = numero_canonico(numero)  # ⚡ MEJORA #31
+    try:
+        documento_corpus = REGISTRO_CORPUS.documento(documento)
+    except DocumentoNoEncontrado:
+        raise HTTPException(status_code=404, detail=f"Documento '{documento}' no encontrado en el corpus")
+    
+    penas = INDICE_PENAS.penas(documento_corpus.id, numero)
+    if penas is None:
+        sugerencias = EXISTENCIA.comprobar(documento_corpus.id, numero) if EXISTENCIA else None
+        raise HTTPException(status_code=404, detail={
+            "error": f"El artículo {numero} no existe en el {documento_corpus.nombre}",
+            "sugerencias": sugerencias or []
+        })
+    return {
+        "documento": documento_corpus.id,
+        "articulo": numero,
+        "penas": penas,
+        "completas": penas_completas(penas),  # False: algún apartado tiene una pena no estructurada
+        "resumen": [describir_pena(p) for p in penas]
+    }
+
+
+# --- 6c-bis. SUGERENCIAS (TYPEAHEAD) ---
+@app.get("/sugerencias")
+def sugerencias(q: str, documento: Optional[str] = None, limite: int = SUGERENCIAS_LIMITE):
+    """
+    ⚡ MEJORA #30: Epígrafes y artículos cuyo texto empieza por lo tecleado, sin tildes
+    ni mayúsculas ("homic" -> Artículo 138. Homicidio). Cada sugerencia trae la
+    `consulta` que lleva a la búsqueda exacta del artículo en /chat.
+    """
+    try:
+        documento_corpus = REGISTRO_CORPUS.documento(documento)
+    except DocumentoNoEncontrado:
+        raise HTTPException(status_code=404, detail=f"Documento '{documento}' no encontrado en el corpus")
+    
+    inicio = time.perf_counter()
+    # ⚡ MEJORA #31: "art.142bis" -> "articulo 142 bis", como las claves del índice
+    resultados = SUGERENCIAS.buscar(documento_corpus.id, normalizar_consulta(q), max(1, min(limite, 50)))
+    return {
+        "documento": documento_corpus.id,
+        "q": q,
+        "sugerencias": resultados,
+        "duracion_ms": round((time.perf_counter() - inicio) * 1000, 3)
+    }
+
+
+# --- 6d. ENDPOINT DEL CORPUS ---
+@app.get("/corpus")
+async def listar_corpus():
+    """
+    ⚡ MEJORA #16: Documentos disponibles (id para el campo `documento` de /chat y /comparar)
+    y cuáles tienen su índice de artículos cargado en memoria
+    """
+    return REGISTRO_CORPUS.estadisticas()
+
+
 # --- 7. ENDPOINT DE INFORMACIÓN ---
 @app.get("/")
 async def root():
@@ -1583,6 +2272,11 @@ async def root():
             "conversations": "/conversations (GET) - Historial de conversaciones",
             "analytics": "/analytics (GET) - Estadísticas del sistema",
             "health": "/health (GET) - Estado del servicio",
+            "cache_invalidar": "/cache/invalidar (POST, X-Admin-Key) - Refresca los artículos reindexados",
+            "corpus": "/corpus (GET) - Documentos consultables (campo `documento`)",
+            "referencias": "/articulos/{n}/referencias (GET) - Artículos citados y que lo citan",
+            "penas": "/articulos/{n}/penas (GET) - Penas del artículo por apartado",
+            "sugerencias": "/sugerencias?q=X (GET) - Autocompletado de epígrafes y artículos",
             "docs": "/docs - Documentación interactiva"
         },
         "features": {
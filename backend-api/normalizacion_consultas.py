@@ -0,0 +1,72 @@
+"""
+MÓDULO DE NORMALIZACIÓN CANÓNICA DE CONSULTAS
+"Artículo 142", "art. 142", "ART 142 ", "articulo 142" y sus variantes de
+tildes son la misma pregunta. Este módulo les da una única forma canónica
+(Unicode NFC, minúsculas, sin tildes salvo la ñ, espacios colapsados,
+referencias a artículos reescritas como "articulo N sufijo") y una firma que
+además ignora artículos y preposiciones de relleno. Todas las claves de caché
+(artículos y respuestas en Redis, comparaciones, embeddings, single-flight) se
+construyen a partir de estas funciones para que las variantes compartan entrada.
+"""
+
+import re
+import unicodedata
+
+# Palabras que no cambian la respuesta ("el artículo 138 del código" = "artículo 138 código").
+# No incluye "a"/"al" (rangos), "y"/"no" (seguimiento y corrección), "con"/"sin" ni "que"
+PALABRAS_VACIAS_FIRMA = {'el', 'la', 'los', 'las', 'lo', 'un', 'una', 'unos', 'unas', 'de', 'del'}
+
+_SUFIJOS = r'bis|ter|quater|quinquies|sexies|septies|octies|nonies|decies'
+# "artículo", "articulo", "art.", "art", "arts.", "artículos" seguidos de un número (sobre texto ya plegado)
+_PATRON_REFERENCIA = re.compile(
+    rf'\b(art(?:iculo)?(s?))\b\.?\s*(\d+)(?:\s*({_SUFIJOS})\b)?'
+)
+# "142bis", "142-bis" -> "142 bis"
+_PATRON_SUFIJO_PEGADO = re.compile(rf'\b(\d+)[\s-]*({_SUFIJOS})\b')
+_SIGNOS_BORDE = ' ¿?¡!.,;:"\''
+
+
+def plegar(texto: str) -> str:
+    """NFC, minúsculas y sin tildes/diéresis (la ñ se conserva): 'ÁRBOL Pingüino Año' -> 'arbol pinguino año'"""
+    descompuesto = unicodedata.normalize('NFD', texto.lower())
+    sin_marcas = re.sub(r'(?<!n)\u0303|[\u0300-\u0302\u0304-\u036f]', '', descompuesto)
+    return unicodedata.normalize('NFC', sin_marcas)
+
+
+def numero_canonico(numero: str) -> str:
+    """
+    '142  BIS ' -> '142 bis'; '142bis' -> '142 bis'; 'quáter' -> 'quater'. Única forma
+    de los números de artículo en claves de Redis e índices en memoria.
+    """
+    return _PATRON_SUFIJO_PEGADO.sub(r'\1 \2', re.sub(r'\s+', ' ', plegar(str(numero)).strip()))
+
+
+def canonizar_referencias(texto_plegado: str) -> str:
+    """'art.142bis' / 'arts 138 a 140' -> 'articulo 142 bis' / 'articulos 138 a 140'"""
+    def reescribir(match: re.Match) -> str:
+        palabra = 'articulos' if match.group(2) else 'articulo'
+        sufijo = f" {match.group(4)}" if match.group(4) else ""
+        return f"{palabra} {match.group(3)}{sufijo}"
+    return _PATRON_REFERENCIA.sub(reescribir, texto_plegado)
+
+
+def normalizar_consulta(query: str) -> str:
+    """
+    Forma canónica de una consulta.
+
+    '¿Qué dice el ART. 142 BIS?' -> 'que dice el articulo 142 bis'
+    """
+    texto = plegar(unicodedata.normalize('NFC', query))
+    texto = re.sub(r'\s+', ' ', texto).strip(_SIGNOS_BORDE)
+    return _PATRON_SUFIJO_PEGADO.sub(r'\1 \2', canonizar_referencias(texto))
+
+
+def firma_consulta(query: str) -> str:
+    """
+    Forma canónica sin palabras de relleno ni puntuación interior; es la clave
+    de las cachés que guardan respuestas a consultas libres.
+
+    'El artículo 138 del Código Penal' -> 'articulo 138 codigo penal'
+    """
+    palabras = re.findall(r'[a-z0-9ñ]+', normalizar_consulta(query))
+    return " ".join(p for p in palabras if p not in PALABRAS_VACIAS_FIRMA)
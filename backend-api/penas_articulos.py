@@ -0,0 +1,312 @@
+"""
+MÓDULO DE PENAS ESTRUCTURADAS
+Extrae de cada artículo sus penas (prisión, multa, inhabilitación) por apartado,
+con los rangos en meses ("prisión de diez a quince años" -> 120-180). El índice
+se construye una vez por versión del índice de artículos, al cargar el
+documento; las preguntas del tipo "¿qué pena tiene el artículo 138?" y
+/articulos/{n}/penas se responden sin llamar a Gemini, y el comparador recibe
+las penas ya extraídas en lugar de pedir al modelo que las deduzca del texto.
+Los apartados que imponen una pena que no se ha podido estructurar (penas
+relativas como "la pena superior en grado", duraciones no reconocidas) quedan
+registrados como 'sin_extraer' y esas preguntas vuelven al RAG.
+"""
+
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+from normalizacion_consultas import numero_canonico
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+PENAS_RESPUESTA_DIRECTA = os.getenv("PENAS_RESPUESTA_DIRECTA", "true").lower() == "true"
+MAX_PALABRAS_PREGUNTA_PENA = 14  # Preguntas más largas piden algo más que la pena: van al RAG
+
+NUMEROS = {
+    'un': 1, 'uno': 1, 'una': 1, 'dos': 2, 'tres': 3, 'cuatro': 4, 'cinco': 5, 'seis': 6, 'siete': 7,
+    'ocho': 8, 'nueve': 9, 'diez': 10, 'once': 11, 'doce': 12, 'trece': 13, 'catorce': 14, 'quince': 15,
+    'dieciséis': 16, 'dieciseis': 16, 'diecisiete': 17, 'dieciocho': 18, 'diecinueve': 19, 'veinte': 20,
+    'veintiún': 21, 'veintiun': 21, 'veintiuno': 21, 'veintidós': 22, 'veintidos': 22, 'veintitrés': 23,
+    'veintitres': 23, 'veinticuatro': 24, 'veinticinco': 25, 'veintiséis': 26, 'veintiseis': 26,
+    'veintisiete': 27, 'veintiocho': 28, 'veintinueve': 29, 'treinta': 30, 'cuarenta': 40, 'cincuenta': 50,
+    'sesenta': 60, 'setenta': 70, 'ochenta': 80, 'noventa': 90, 'cien': 100, 'ciento': 100,
+    'doscientos': 200, 'trescientos': 300, 'cuatrocientos': 400, 'quinientos': 500, 'seiscientos': 600,
+    'setecientos': 700, 'ochocientos': 800, 'novecientos': 900, 'mil': 1000,
+}
+MESES_POR_UNIDAD = {'año': 12, 'mes': 1, 'día': 1 / 30, 'dia': 1 / 30}
+
+_CANTIDAD = r'(?:\d+|[a-záéíóúñ]+(?:\s+y\s+[a-záéíóúñ]+)?)'  # "diez", "treinta y uno"
+_UNIDAD = r'(?:años?|mes(?:es)?|d[íi]as?)'
+# "dos años", "dos años y seis meses", "tres meses y un día"
+_DURACION = rf'{_CANTIDAD}\s+{_UNIDAD}(?:\s+y\s+{_CANTIDAD}\s+{_UNIDAD})?'
+# El mínimo puede omitir la unidad: "de diez a quince años"
+_RANGO = rf'de\s+({_CANTIDAD}(?:\s+{_UNIDAD}(?:\s+y\s+{_CANTIDAD}\s+{_UNIDAD})?)?)\s+a\s+({_DURACION})'
+_PATRON_TERMINO = re.compile(rf'({_CANTIDAD})\s+({_UNIDAD})', re.IGNORECASE)
+PATRONES_PENA = [
+    ('prision_permanente', re.compile(r'prisi[óo]n\s+permanente\s+revisable', re.IGNORECASE)),
+    ('prision', re.compile(rf'prisi[óo]n\s+{_RANGO}', re.IGNORECASE)),
+    ('multa', re.compile(rf'multa\s+{_RANGO}', re.IGNORECASE)),
+    # "multa del tanto al triplo del perjuicio", "multa de dos a cinco veces el valor"
+    ('multa_proporcional', re.compile(
+        r'multa\s+(?:del\s+(?:tanto|duplo|triplo)(?:\s+al\s+\w+)?|de\s+\w+\s+a\s+\w+\s+veces)', re.IGNORECASE
+    )),
+    ('inhabilitacion', re.compile(
+        rf'inhabilitaci[óo]n\s+(especial|absoluta)[^.;]{{0,200}}?{_RANGO}', re.IGNORECASE
+    )),
+]
+# El apartado impone una pena (aunque no se haya podido estructurar)
+_PATRON_CLAUSULA_PENA = re.compile(
+    r'\b(?:castigad[oa]s?|castigar[áa]n?|(?:la|las)\s+penas?|se\s+(?:le\s+)?impondr[áa]n?)\b', re.IGNORECASE
+)
+# Penas definidas respecto de otras: no tienen rango propio que extraer
+_PATRON_PENA_RELATIVA = re.compile(
+    r'\b(?:penas?\s+(?:superior|inferior)(?:es)?\s+en\s+(?:uno\s+o\s+dos\s+)?grados?|'
+    r'en\s+su\s+mitad\s+(?:superior|inferior)|'
+    r'(?:mismas?|las?)\s+penas?\s+(?:señalad|previst|establecid|respectivamente)\w*|'
+    r'misma\s+pena|mismas\s+penas)',
+    re.IGNORECASE
+)
+LONGITUD_FRASE_SIN_EXTRAER = 200
+
+# "1. El que..." al inicio del artículo o tras fin de frase; se exige numeración consecutiva
+_PATRON_APARTADO = re.compile(r'(?:^|(?<=[.:;]\s)|(?<=\n))\s*(\d{1,2})\.\s+(?=[A-ZÁÉÍÓÚÑ¿])')
+_PATRON_PREGUNTA_PENA = re.compile(
+    r'\b(?:qu[ée]\s+(?:pena|castigo|condena)|cu[áa]l(?:es)?\s+(?:es|son)\s+la?s?\s*(?:pena|castigo)|'
+    r'penas?\s+(?:del?|para|tiene|prev[ée]|corresponde|impone)|c[óo]mo\s+se\s+castiga|cu[áa]nt[ao]s?\s+(?:años|cárcel|prisión))',
+    re.IGNORECASE
+)
+# Matices que piden razonar sobre el caso, no solo leer la pena
+_PATRON_MATIZ = re.compile(
+    r'\b(?:si|cuando|agravantes?|atenuantes?|tentativa|reincid\w*|menor(?:es)?|concurso|grado|eximente)\b',
+    re.IGNORECASE
+)
+
+
+def _cantidad(texto: str) -> Optional[int]:
+    """'diez' -> 10, 'treinta y uno' -> 31, '12' -> 12; None si alguna palabra no es un número"""
+    total = 0
+    for palabra in re.split(r'\s+y\s+', texto.lower().strip()):
+        valor = int(palabra) if palabra.isdigit() else NUMEROS.get(palabra)
+        if valor is None:
+            return None
+        total += valor
+    return total
+
+
+def _meses(cantidad: int, unidad: str) -> float:
+    unidad = unidad.lower().rstrip('s')
+    unidad = 'mes' if unidad.startswith('mes') else unidad
+    return round(cantidad * MESES_POR_UNIDAD.get(unidad, 1), 2)
+
+
+def _duracion_meses(texto: str, unidad_por_defecto: Optional[str]) -> Optional[float]:
+    """'dos años y seis meses' -> 30; 'diez' con unidad por defecto 'años' -> 120; None si no se entiende"""
+    terminos = _PATRON_TERMINO.findall(texto)
+    if not terminos:
+        cantidad = _cantidad(texto)
+        if cantidad is None or unidad_por_defecto is None:
+            return None
+        return _meses(cantidad, unidad_por_defecto)
+    total = 0
+    for cantidad, unidad in terminos:
+        cantidad = _cantidad(cantidad)
+        if cantidad is None:
+            return None
+        total += _meses(cantidad, unidad)
+    return round(total, 2)
+
+
+def _frase(texto: str, posicion: int) -> str:
+    """La frase del texto que contiene la posición (acotada)"""
+    inicio = texto.rfind('.', 0, posicion) + 1
+    fin = texto.find('.', posicion)
+    frase = re.sub(r'\s+', ' ', texto[inicio:fin if fin != -1 else len(texto)]).strip()
+    return frase[:LONGITUD_FRASE_SIN_EXTRAER]
+
+
+def dividir_apartados(texto: str) -> List[tuple]:
+    """
+    Apartados numerados del artículo: [(apartado, texto)]. Un artículo sin
+    numeración es un único apartado (None).
+    """
+    cortes = []
+    esperado = 1
+    for match in _PATRON_APARTADO.finditer(texto):
+        if int(match.group(1)) == esperado:
+            cortes.append((match.group(1), match.start()))
+            esperado += 1
+    if not cortes:
+        return [(None, texto)]
+    return [
+        (apartado, texto[inicio:cortes[i + 1][1] if i + 1 < len(cortes) else len(texto)])
+        for i, (apartado, inicio) in enumerate(cortes)
+    ]
+
+
+def extraer_penas(texto: str) -> List[dict]:
+    """
+    Penas de un artículo por apartado.
+
+    Returns:
+        [{'apartado', 'tipo', 'min_meses', 'max_meses', 'detalle', 'texto'}] en orden de aparición;
+        tipo: prision | prision_permanente | multa | multa_proporcional | inhabilitacion | sin_extraer
+        ('sin_extraer': el apartado impone una pena que no se ha podido estructurar; 'texto' es la frase)
+    """
+    registros = []
+    for apartado, fragmento in dividir_apartados(texto):
+        encontradas = []
+        fallidas = []
+        for tipo, patron in PATRONES_PENA:
+            for match in patron.finditer(fragmento):
+                registro = {'apartado': apartado, 'tipo': tipo, 'min_meses': None, 'max_meses': None,
+                            'detalle': None, 'texto': re.sub(r'\s+', ' ', match.group(0)).strip()}
+                grupos = match.groups()
+                if tipo == 'inhabilitacion':
+                    registro['detalle'] = grupos[0].lower()
+                    grupos = grupos[1:]
+                if len(grupos) == 2:
+                    unidad = _PATRON_TERMINO.search(grupos[1])
+                    minimo = _duracion_meses(grupos[0], unidad.group(2) if unidad else None)
+                    maximo = _duracion_meses(grupos[1], None)
+                    if minimo is None or maximo is None:
+                        fallidas.append(match.start())
+                        continue
+                    registro['min_meses'], registro['max_meses'] = minimo, maximo
+                encontradas.append((match.start(), registro))
+
+        relativa = _PATRON_PENA_RELATIVA.search(fragmento)
+        clausula = _PATRON_CLAUSULA_PENA.search(fragmento)
+        if relativa:
+            posicion = relativa.start()
+        elif fallidas:
+            posicion = fallidas[0]
+        elif clausula and not encontradas:
+            posicion = clausula.start()
+        else:
+            posicion = None
+        if posicion is not None:
+            encontradas.append((posicion, {'apartado': apartado, 'tipo': 'sin_extraer', 'min_meses': None,
+                                           'max_meses': None, 'detalle': None, 'texto': _frase(fragmento, posicion)}))
+        registros.extend(r for _, r in sorted(encontradas, key=lambda e: e[0]))
+    return registros
+
+
+def penas_completas(registros: List[dict]) -> bool:
+    """True si todas las penas del artículo están estructuradas (se puede responder sin el LLM)"""
+    return all(r['tipo'] != 'sin_extraer' for r in registros)
+
+
+def formatear_duracion(meses: Optional[float], en_anos: bool = True) -> str:
+    """
+    120 -> '10 años', 18 -> '1 año y 6 meses', 3.03 -> '3 meses y 1 día', 0.2 -> '6 días';
+    con en_anos=False no se agrupa en años (multas: 24 -> '24 meses')
+    """
+    if meses is None:
+        return "?"
+    enteros = int(meses)
+    dias = round((meses - enteros) * 30)
+    anos, resto = divmod(enteros, 12) if en_anos else (0, enteros)
+    partes = []
+    if anos:
+        partes.append(f"{anos} año{'s' if anos != 1 else ''}")
+    if resto or not (anos or dias):
+        partes.append(f"{resto} mes{'es' if resto != 1 else ''}")
+    if dias:
+        partes.append(f"{dias} día{'s' if dias != 1 else ''}")
+    return " y ".join(partes)
+
+
+def describir_pena(registro: dict) -> str:
+    """
+    Una línea del registro con el texto tal como aparece en el artículo
+    ("Prisión de tres meses y un día a un año"): los rangos en meses son para
+    comparar, no para reescribir la pena en otras unidades
+    """
+    tipo = registro['tipo']
+    if tipo == 'prision_permanente':
+        return "Prisión permanente revisable"
+    if tipo == 'sin_extraer':
+        return f"Pena no estructurada: «{registro['texto']}»"
+    if tipo == 'multa_proporcional':
+        return f"Multa proporcional ({registro['texto']})"
+    texto = registro['texto']
+    return texto[:1].upper() + texto[1:]
+
+
+def formatear_penas(numero_articulo: str, registros: List[dict], nombre_documento: str = "Código Penal") -> str:
+    """Respuesta en Markdown con las penas del artículo agrupadas por apartado"""
+    lineas = [f"**Penas del artículo {numero_articulo} del {nombre_documento}**", ""]
+    apartado_actual = object()
+    for registro in registros:
+        if registro['apartado'] != apartado_actual:
+            apartado_actual = registro['apartado']
+            if apartado_actual is not None:
+                lineas.append(f"*Apartado {apartado_actual}:*")
+        lineas.append(f"- {describir_pena(registro)}")
+    lineas += ["", "_Extraído literalmente del texto del artículo; consulta el artículo completo para las circunstancias de cada pena._"]
+    return "\n".join(lineas)
+
+
+def es_pregunta_de_pena(query: str) -> bool:
+    """'¿Qué pena tiene el artículo 138?' sí; '¿qué pena tiene el 138 si hay alevosía?' no (va al RAG)"""
+    return (
+        bool(_PATRON_PREGUNTA_PENA.search(query))
+        and not _PATRON_MATIZ.search(query)
+        and len(query.split()) <= MAX_PALABRAS_PREGUNTA_PENA
+    )
+
+
+class IndicePenas:
+    """
+    Penas estructuradas por documento y artículo, reconstruidas solo cuando cambia
+    la versión del índice de artículos (p.ej. tras /cache/invalidar).
+
+    Args:
+        articulos_por_documento: Función doc_id -> {numero: texto}
+        version_por_documento: Función doc_id -> versión del índice de artículos
+    """
+
+    def __init__(
+        self,
+        articulos_por_documento: Callable[[str], Dict[str, str]],
+        version_por_documento: Callable[[str], str],
+    ):
+        self.articulos_por_documento = articulos_por_documento
+        self.version_por_documento = version_por_documento
+        self._indices = {}  # doc_id -> (versión, {numero normalizado: registros})
+        self._lock = threading.Lock()
+
+    def _indice(self, documento_id: str) -> dict:
+        version = self.version_por_documento(documento_id)
+        with self._lock:
+            actual = self._indices.get(documento_id)
+            if actual is not None and actual[0] == version:
+                return actual[1]
+        indice = {
+            numero_canonico(numero): extraer_penas(texto)
+            for numero, texto in self.articulos_por_documento(documento_id).items()
+        }
+        with self._lock:
+            self._indices[documento_id] = (version, indice)
+        print(f"⚖️  Índice de penas de '{documento_id}': {sum(1 for r in indice.values() if r)} artículos con pena")
+        return indice
+
+    def construir(self, documento_id: str) -> None:
+        """Construye el índice del documento si no está al día (al arrancar)"""
+        self._indice(documento_id)
+
+    def penas(self, documento_id: str, numero: str) -> Optional[List[dict]]:
+        """Registros del artículo ([] si no impone penas) o None si el artículo no está en el documento"""
+        registros = self._indice(documento_id).get(numero_canonico(numero))
+        return [dict(r) for r in registros] if registros is not None else None
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                doc_id: {
+                    "articulos": len(indice),
+                    "con_pena": sum(1 for r in indice.values() if r),
+                    "sin_extraer": sum(1 for r in indice.values() if not penas_completas(r)),
+                }
+                for doc_id, (_, indice) in self._indices.items()
+            }
@@ -9,10 +9,18 @@ from dotenv import load_dotenv
 import vertexai
 from vertexai.language_models import TextEmbeddingModel
 from pinecone import Pinecone
-import PyPDF2
-import time
 from typing import List
 
+import extraccion_pdf
+from articulos_utils import dividir_por_articulos, metadata_pinecone
+from ingesta_pipeline import PipelineEmbeddings, imprimir_resumen
+from reindexado_utils import (
+    asignar_ids_por_contenido, ruta_manifiesto, cargar_manifiesto, guardar_manifiesto,
+    calcular_diferencias, borrar_vectores, purgar_ids_posicionales, actualizar_metadata_posicional,
+    invalidar_caches, conectar_redis_opcional
+)
+from corpus import DOCUMENTO_POR_DEFECTO
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -21,77 +29,62 @@ PROJECT_ID = os.getenv("GCP_PROJECT_ID", "resolute-return-476416-g5")
 REGION = os.getenv("GCP_REGION", "us-central1")
 EMBEDDING_MODEL = "text-embedding-004"
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-PINECONE_INDEX_NAME = input("Nombre del índice de Pinecone (1024 dims): ").strip()
+PINECONE_INDEX_NAME = None  # Se pide por consola al ejecutar el script (ver __main__)
 
-# Ruta al PDF
-PDF_PATH = "../documentos/codigo_penal.pdf"
+# Ruta al PDF y documento del corpus (cada documento va en su propio namespace de Pinecone)
+PDF_PATH = os.getenv("PDF_PATH", "../documentos/codigo_penal.pdf")
+DOCUMENTO_ID = os.getenv("DOCUMENTO_ID", DOCUMENTO_POR_DEFECTO)
+PINECONE_NAMESPACE = os.getenv("PINECONE_NAMESPACE", "")  # "" = namespace por defecto (Código Penal)
 
 # Configuración de chunking
 CHUNK_SIZE = 800  # Caracteres por chunk
 CHUNK_OVERLAP = 100  # Overlap entre chunks
 
-print("="*70)
-print("🚀 PROCESADOR DE PDF CON VERTEX AI")
-print("="*70)
-print(f"📄 PDF: {PDF_PATH}")
-print(f"🔢 Modelo embeddings: {EMBEDDING_MODEL} (1024 dims)")
-print(f"📊 Índice Pinecone: {PINECONE_INDEX_NAME}")
-print(f"⚙️  Chunk size: {CHUNK_SIZE} caracteres")
-print("="*70)
+# Configuración de ingesta concurrente
+INGESTA_WORKERS = int(os.getenv("INGESTA_WORKERS", 4))  # Lotes de embeddings en paralelo
+INGESTA_BATCH_MAX = int(os.getenv("INGESTA_BATCH_MAX", 250))  # Límite de textos por petición de Vertex AI
+CHECKPOINT_PATH = os.getenv("INGESTA_CHECKPOINT", ".ingesta_checkpoint.json")
+
+# Reindexado incremental: manifiesto local (id, hash) y URL de la API para invalidar su caché
+MANIFEST_DIR = os.getenv("INGESTA_MANIFEST_DIR", ".")
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+
 
+def imprimir_cabecera():
+    print("="*70)
+    print("🚀 PROCESADOR DE PDF CON VERTEX AI")
+    print("="*70)
+    print(f"📄 PDF: {PDF_PATH}")
+    print(f"🔢 Modelo embeddings: {EMBEDDING_MODEL} (1024 dims)")
+    print(f"📊 Índice Pinecone: {PINECONE_INDEX_NAME} (namespace: '{PINECONE_NAMESPACE}', documento: {DOCUMENTO_ID})")
+    print(f"⚙️  Chunk size: {CHUNK_SIZE} caracteres")
+    print("="*70)
 
-def extraer_texto_pdf(pdf_path: str) -> str:
-    """Extrae todo el texto del PDF"""
-    print("\n📖 Extrayendo texto del PDF...")
+
+def extraer_texto_pdf(pdf_path: str) -> dict:
+    """Extrae todo el texto del PDF (páginas en paralelo, caché por hash del PDF)"""
+    print(f"\n📖 Extrayendo texto del PDF ({extraccion_pdf.PDF_WORKERS} procesos)...")
     
-    texto_completo = ""
-    with open(pdf_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        num_paginas = len(pdf_reader.pages)
-        print(f"   Total de páginas: {num_paginas}")
-        
-        for i, page in enumerate(pdf_reader.pages, 1):
-            texto = page.extract_text()
-            texto_completo += texto + "\n"
-            
-            if i % 50 == 0:
-                print(f"   ✓ Procesadas {i}/{num_paginas} páginas...")
+    extraccion = extraccion_pdf.extraer_texto_pdf(pdf_path, motor="pypdf2")
     
-    print(f"✅ Texto extraído: {len(texto_completo)} caracteres")
-    return texto_completo
+    origen = "caché" if extraccion['desde_cache'] else "PDF"
+    print(f"   Total de páginas: {extraccion['num_paginas']}")
+    print(f"✅ Texto extraído: {len(extraccion['texto'])} caracteres (desde {origen}, {extraccion['duracion_s']}s)")
+    return extraccion
 
 
 def dividir_en_chunks(texto: str, chunk_size: int, overlap: int) -> List[dict]:
-    """Divide el texto en chunks con overlap"""
-    print(f"\n✂️  Dividiendo texto en chunks de {chunk_size} caracteres...")
-    
-    chunks = []
-    start = 0
-    chunk_id = 0
+    """
+    Divide el texto en chunks respetando los límites de cada artículo.
+    Cada chunk lleva metadata: artículo, parte, total de partes, offsets y Libro/Título/Capítulo.
+    """
+    print(f"\n✂️  Dividiendo texto en chunks por artículo (máx. {chunk_size} caracteres)...")
     
-    while start < len(texto):
-        end = start + chunk_size
-        chunk_text = texto[start:end]
-        
-        # Intentar cortar en un punto natural (fin de línea o espacio)
-        if end < len(texto):
-            ultimo_espacio = chunk_text.rfind('\n')
-            if ultimo_espacio == -1:
-                ultimo_espacio = chunk_text.rfind(' ')
-            if ultimo_espacio > chunk_size * 0.7:  # Solo si está en el último 30%
-                end = start + ultimo_espacio
-                chunk_text = texto[start:end]
-        
-        if chunk_text.strip():  # Solo agregar chunks no vacíos
-            chunks.append({
-                "id": f"chunk_{chunk_id}",
-                "text": chunk_text.strip()
-            })
-            chunk_id += 1
-        
-        start = end - overlap
+    chunks = dividir_por_articulos(texto, chunk_size, overlap, source=os.path.basename(PDF_PATH))
     
-    print(f"✅ Generados {len(chunks)} chunks")
+    num_articulos = len({c["articulo"] for c in chunks if c["articulo"]})
+    num_partidos = len({c["articulo"] for c in chunks if c["articulo"] and c["total_partes"] > 1})
+    print(f"✅ Generados {len(chunks)} chunks ({num_articulos} artículos, {num_partidos} en varias partes)")
     return chunks
 
 
@@ -101,46 +94,31 @@ def generar_embeddings_batch(textos: List[str], modelo) -> List[List[float]]:
     return [emb.values for emb in embeddings_result]
 
 
-def procesar_y_subir(chunks: List[dict], modelo, pinecone_index):
-    """Procesa chunks, genera embeddings y sube a Pinecone"""
+def procesar_y_subir(chunks: List[dict], modelo, pinecone_index) -> dict:
+    """
+    Procesa chunks, genera embeddings y sube a Pinecone con un pool de workers acotado,
+    lotes adaptativos, reintentos con backoff y checkpoint reanudable
+    """
     print(f"\n🔢 Generando embeddings y subiendo a Pinecone...")
-    print(f"   (Procesando en lotes de 5 chunks)")
+    print(f"   (Workers: {INGESTA_WORKERS}, lote máximo: {INGESTA_BATCH_MAX}, checkpoint: {CHECKPOINT_PATH})")
     
-    BATCH_SIZE = 5
-    total_chunks = len(chunks)
+    pipeline = PipelineEmbeddings(
+        embed_fn=lambda textos: generar_embeddings_batch(textos, modelo),
+        upsert_fn=lambda vectores: pinecone_index.upsert(vectors=vectores, namespace=PINECONE_NAMESPACE),
+        metadata_fn=metadata_pinecone,
+        max_workers=INGESTA_WORKERS,
+        batch_maximo=INGESTA_BATCH_MAX,
+        checkpoint_path=CHECKPOINT_PATH,
+        checkpoint_clave=f"{PINECONE_INDEX_NAME}/{PINECONE_NAMESPACE}" if PINECONE_NAMESPACE else PINECONE_INDEX_NAME
+    )
+    resumen = pipeline.ejecutar(chunks)
+    imprimir_resumen(resumen)
     
-    for i in range(0, total_chunks, BATCH_SIZE):
-        batch = chunks[i:i+BATCH_SIZE]
-        batch_textos = [chunk["text"] for chunk in batch]
-        
-        # Generar embeddings
-        try:
-            embeddings = generar_embeddings_batch(batch_textos, modelo)
-            
-            # Preparar vectors para Pinecone
-            vectors_to_upsert = []
-            for j, chunk in enumerate(batch):
-                vectors_to_upsert.append({
-                    "id": chunk["id"],
-                    "values": embeddings[j],
-                    "metadata": {
-                        "text": chunk["text"]
-                    }
-                })
-            
-            # Subir a Pinecone
-            pinecone_index.upsert(vectors=vectors_to_upsert)
-            
-            print(f"   ✓ Procesados {min(i+BATCH_SIZE, total_chunks)}/{total_chunks} chunks")
-            
-            # Pequeña pausa para no saturar la API
-            time.sleep(0.5)
-            
-        except Exception as e:
-            print(f"   ❌ Error en batch {i//BATCH_SIZE + 1}: {e}")
-            continue
-    
-    print(f"\n✅ ¡Proceso completado!")
+    if resumen["fallidos"]:
+        print(f"\n⚠️  Proceso incompleto: vuelve a ejecutar el script para reanudar")
+    else:
+        print(f"\n✅ ¡Proceso completado!")
+    return resumen
 
 
 def main():
@@ -169,21 +147,65 @@ def main():
         print(f"   Vectores actuales: {stats.get('total_vector_count', 0)}")
         
         # 4. Extraer texto del PDF
-        texto_completo = extraer_texto_pdf(PDF_PATH)
-        
-        # 5. Dividir en chunks
-        chunks = dividir_en_chunks(texto_completo, CHUNK_SIZE, CHUNK_OVERLAP)
+        extraccion = extraer_texto_pdf(PDF_PATH)
+        
+        # 5. Dividir en chunks con ids direccionados por contenido (y página de inicio)
+        source = os.path.basename(PDF_PATH)
+        chunks = asignar_ids_por_contenido(dividir_en_chunks(extraccion['texto'], CHUNK_SIZE, CHUNK_OVERLAP), source)
+        extraccion_pdf.anotar_paginas(chunks, extraccion['paginas'])
+        
+        # 5b. Comparar con el manifiesto de la última indexación
+        indice_manifiesto = PINECONE_INDEX_NAME + (f"_{PINECONE_NAMESPACE}" if PINECONE_NAMESPACE else "")
+        manifest_path = ruta_manifiesto(MANIFEST_DIR, indice_manifiesto, source)
+        manifiesto = cargar_manifiesto(manifest_path)
+        diferencias = calcular_diferencias(chunks, manifiesto)
+        
+        print(f"\n🧮 Reindexado incremental ({manifest_path}):")
+        if manifiesto is None:
+            print(f"   - Sin manifiesto previo: indexación completa")
+        print(f"   - Nuevos o modificados: {len(diferencias['nuevos'])}")
+        print(f"   - Sin cambios (no se re-embeben): {diferencias['sin_cambios']}")
+        print(f"   - Reposicionados (solo metadata): {len(diferencias['reposicionados'])}")
+        print(f"   - Obsoletos a borrar: {len(diferencias['obsoletos'])}")
+        print(f"   - Artículos afectados: {len(diferencias['articulos_afectados'])}")
+        
+        if not diferencias['nuevos'] and not diferencias['obsoletos'] and not diferencias['reposicionados']:
+            print("\n✅ El índice ya está al día - nada que hacer")
+            sys.exit(0)
         
         # 6. Confirmar antes de proceder
-        print(f"\n⚠️  ¿Estás seguro de querer procesar {len(chunks)} chunks?")
+        print(f"\n⚠️  ¿Estás seguro de querer procesar {len(diferencias['nuevos'])} chunks?")
         confirmacion = input("   Escribe 'SI' para continuar: ").strip().upper()
         
         if confirmacion != "SI":
             print("❌ Proceso cancelado por el usuario")
             sys.exit(0)
         
-        # 7. Procesar y subir
-        procesar_y_subir(chunks, embedding_model, index)
+        # 7. Procesar y subir solo lo nuevo
+        resumen = procesar_y_subir(diferencias['nuevos'], embedding_model, index)
+        if resumen["fallidos"]:
+            # No se borra nada ni se actualiza el manifiesto: la siguiente ejecución reanuda
+            sys.exit(1)
+        
+        # 7a. Chunks desplazados: misma metadata de texto, offsets/página/partes nuevos
+        if diferencias['reposicionados']:
+            actualizados = actualizar_metadata_posicional(index, diferencias['reposicionados'], PINECONE_NAMESPACE)
+            print(f"📝 Metadata posicional actualizada en {actualizados} vectores")
+        
+        # 7b. Borrar vectores obsoletos (y los ids posicionales antiguos en la primera migración)
+        if diferencias['obsoletos']:
+            borrados = borrar_vectores(index, diferencias['obsoletos'], PINECONE_NAMESPACE)
+            print(f"🗑️  {borrados} vectores obsoletos borrados")
+        if manifiesto is None:
+            purgados = purgar_ids_posicionales(index, namespace=PINECONE_NAMESPACE)
+            print(f"🗑️  {purgados} vectores con ids posicionales (chunk_N) borrados")
+        guardar_manifiesto(manifest_path, chunks, source)
+        
+        # 7c. Invalidar cachés solo de los artículos afectados
+        if manifiesto is not None and diferencias['articulos_afectados']:
+            invalidacion = invalidar_caches(diferencias['articulos_afectados'], conectar_redis_opcional(),
+                                           API_URL, documento=DOCUMENTO_ID)
+            print(f"♻️  Cachés invalidadas: {invalidacion['redis']} claves Redis, API: {invalidacion['api']}")
         
         # 8. Verificar resultados
         print("\n📊 Verificando resultados...")
@@ -193,7 +215,7 @@ def main():
         print("\n" + "="*70)
         print("🎉 ¡PROCESO COMPLETADO CON ÉXITO!")
         print("="*70)
-        print(f"✅ {len(chunks)} chunks procesados y subidos a Pinecone")
+        print(f"✅ {len(diferencias['nuevos'])} chunks nuevos subidos, {diferencias['sin_cambios']} reutilizados")
         print(f"✅ Índice: {PINECONE_INDEX_NAME}")
         print(f"✅ Dimensiones: 1024")
         print("\n💡 Ahora actualiza el PINECONE_INDEX_NAME en tu .env")
@@ -206,4 +228,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Fuera del nivel de módulo: los procesos de extracción del PDF (spawn) reimportan este script
+    PINECONE_INDEX_NAME = input("Nombre del índice de Pinecone (1024 dims): ").strip()
+    imprimir_cabecera()
     main()
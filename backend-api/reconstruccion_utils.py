@@ -0,0 +1,120 @@
+"""
+MÓDULO DE RECONSTRUCCIÓN DE ARTÍCULOS
+Une fragmentos consecutivos de un mismo artículo eliminando el texto solapado
+"""
+
+SOLAPAMIENTO_MAXIMO = 200  # Overlap máximo usado en la ingesta
+_MAX_CANDIDATOS = 32  # Candidatos a verificar antes de pasar a KMP
+MARCA_HUECO = "\n[...]\n"  # Entre partes no contiguas: falta texto del artículo
+
+
+def _funcion_prefijo(texto: str) -> list:
+    """Función de prefijo de KMP: pi[i] = mayor borde propio de texto[:i+1]"""
+    pi = [0] * len(texto)
+    k = 0
+    for i in range(1, len(texto)):
+        c = texto[i]
+        while k and c != texto[k]:
+            k = pi[k - 1]
+        if c == texto[k]:
+            k += 1
+        pi[i] = k
+    return pi
+
+
+def solapamiento_kmp(previo: str, actual: str, maximo: int = SOLAPAMIENTO_MAXIMO) -> int:
+    """
+    Longitud del mayor sufijo de `previo` que es prefijo de `actual`, en O(n).
+
+    Aplica la función de prefijo sobre `actual + sentinela + cola(previo)`:
+    el último valor es exactamente el solapamiento buscado.
+    """
+    limite = min(maximo, len(previo), len(actual))
+    if limite <= 0:
+        return 0
+    return _funcion_prefijo(actual[:limite] + "\x00" + previo[-limite:])[-1]
+
+
+def longitud_solapamiento(previo: str, actual: str, maximo: int = SOLAPAMIENTO_MAXIMO) -> int:
+    """
+    Longitud del mayor sufijo de `previo` que es prefijo de `actual`.
+
+    Camino rápido: localiza con str.find las posiciones de la cola de `previo`
+    donde empieza el primer carácter de `actual` y verifica cada candidato
+    (de mayor a menor solapamiento). Si hay demasiados candidatos (texto muy
+    repetitivo), cae a KMP, que garantiza tiempo lineal.
+    """
+    limite = min(maximo, len(previo), len(actual))
+    if limite <= 0:
+        return 0
+
+    inicio_cola = len(previo) - limite
+    primero = actual[0]
+    pos = previo.find(primero, inicio_cola)
+    candidatos = 0
+    while pos != -1:
+        if actual.startswith(previo[pos:]):
+            return len(previo) - pos
+        candidatos += 1
+        if candidatos >= _MAX_CANDIDATOS:
+            return solapamiento_kmp(previo, actual, limite)
+        pos = previo.find(primero, pos + 1)
+    return 0
+
+
+def tiene_offsets(parte: dict) -> bool:
+    """Indica si un fragmento trae offsets de ingesta (char_start/char_end)"""
+    return parte.get('char_start') is not None and parte.get('char_end') is not None
+
+
+def unir_por_offsets(partes: list) -> str:
+    """
+    Une fragmentos por intervalos [char_start, char_end) del documento original.
+    Cosido exacto sin comparar texto: cada fragmento aporta solo lo que
+    queda a la derecha de lo ya cubierto. Si entre dos fragmentos queda un
+    tramo sin cubrir se inserta MARCA_HUECO.
+    """
+    ordenadas = sorted(partes, key=lambda p: p['char_start'])
+    texto = ""
+    cubierto_hasta = None
+    for parte in ordenadas:
+        inicio, fin = parte['char_start'], parte['char_end']
+        if cubierto_hasta is None or inicio >= cubierto_hasta:
+            if cubierto_hasta is not None and inicio > cubierto_hasta:
+                texto += MARCA_HUECO
+            texto += parte['texto']
+            cubierto_hasta = fin
+        elif fin > cubierto_hasta:
+            texto += parte['texto'][cubierto_hasta - inicio:]
+            cubierto_hasta = fin
+    return texto
+
+
+def unir_fragmentos(partes: list, maximo: int = SOLAPAMIENTO_MAXIMO) -> str:
+    """
+    Une las partes de un artículo.
+
+    Si todas traen offsets de ingesta, usa cosido por intervalos.
+    Si no, ordena por `parte` (metadata de ingesta) o, en su defecto, por chunk_index
+    y elimina el overlap textual entre partes consecutivas. Entre partes no
+    contiguas (1/3 + 3/3) inserta MARCA_HUECO en vez de coserlas.
+    """
+    if partes and all(tiene_offsets(p) for p in partes):
+        return unir_por_offsets(partes)
+
+    por_parte = bool(partes) and all('parte' in p for p in partes)
+    clave = (lambda p: p['parte']) if por_parte else (lambda p: p.get('chunk_index', 0))
+
+    textos = []
+    texto_previo = ""
+    parte_previa = None
+    for parte in sorted(partes, key=clave):
+        texto_actual = parte['texto']
+        if por_parte and parte_previa is not None and parte['parte'] > parte_previa + 1:
+            textos.append(MARCA_HUECO)
+        elif texto_previo:
+            texto_actual = texto_actual[longitud_solapamiento(texto_previo, texto_actual, maximo):]
+        textos.append(texto_actual)
+        texto_previo = texto_actual
+        parte_previa = parte['parte'] if por_parte else None
+    return "".join(textos)
@@ -0,0 +1,200 @@
+"""
+MÓDULO DE REFERENCIAS ENTRE ARTÍCULOS
+Grafo artículo -> artículos que cita ("las penas previstas en el artículo 138",
+"en los casos del artículo anterior", "artículos 138 a 140"), con las
+referencias relativas (anterior/siguiente/precedente) resueltas según el orden
+del documento. Se construye una vez por versión del índice de artículos, al
+cargar el documento, y el ensamblado de contexto añade los vecinos a un salto
+leyendo su texto del índice exacto, sin más embeddings ni consultas a Pinecone.
+"""
+
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+from existencia_articulos import clave_orden
+from normalizacion_consultas import numero_canonico
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+REFERENCIAS_CONTEXTO = os.getenv("REFERENCIAS_CONTEXTO", "true").lower() == "true"
+REFERENCIAS_MAX = int(os.getenv("REFERENCIAS_MAX", 3))  # Artículos vecinos añadidos al contexto
+REFERENCIAS_MAX_CHARS = int(os.getenv("REFERENCIAS_MAX_CHARS", 1500))  # Texto por artículo vecino
+
+_NUM = r'\d+(?:\s+(?:bis|ter|qu[aá]ter|quinquies|sexies|septies|octies))?'
+# "artículo 138", "arts. 24 y 25", "artículos 138, 139 y 140", "artículos 138 a 140"
+_PATRON_LISTA = re.compile(
+    rf'\bart(?:[íi]culos?|s?\.)\s*({_NUM}(?:\s*(?:,|\by\b|\be\b|\bo\b|\ba\b|\bal\b)\s*{_NUM})*)',
+    re.IGNORECASE
+)
+_PATRON_ELEMENTO = re.compile(rf'({_NUM})|\b(a|al)\b', re.IGNORECASE)
+# Referencias a otras normas: "artículo 5 de la Ley Orgánica...", "del Código Civil"
+_PATRON_NORMA_EXTERNA = re.compile(
+    r'\s*(?:,\s*)?(?:apartado\s+\S+\s+)?(?:de|del)\s+(?:la\s+|el\s+|esta\s+)?'
+    r'(?:Ley|Real\s+Decreto|Decreto|Constituci[óo]n|C[óo]digo\s+Civil|Estatuto|Tratado|Convenio|Reglamento|Directiva)',
+    re.IGNORECASE
+)
+# "el artículo anterior", "los dos artículos anteriores", "el artículo siguiente", "el artículo precedente"
+_PATRON_RELATIVO = re.compile(
+    r'\b(?:(dos|tres|cuatro)\s+)?art[íi]culos?\s+(anterior(?:es)?|precedentes?|siguientes?)\b',
+    re.IGNORECASE
+)
+_CANTIDADES = {'dos': 2, 'tres': 3, 'cuatro': 4}
+
+
+def orden_documento(numeros) -> List[str]:
+    """Artículos en orden de documento (138 < 138 bis < 139); los no reconocibles al final"""
+    return sorted(numeros, key=lambda n: (clave_orden(n) is None, clave_orden(n) or (0, 0)))
+
+
+def extraer_referencias(texto: str, numero: str, orden: List[str], posiciones: Optional[Dict[str, int]] = None) -> List[str]:
+    """
+    Artículos del mismo documento citados en el texto de un artículo.
+
+    Args:
+        texto: Texto del artículo
+        numero: Número del artículo (se excluye a sí mismo)
+        orden: Todos los artículos del documento en orden (resuelve anterior/siguiente y rangos)
+        posiciones: {número normalizado: posición en orden} (se calcula si no se pasa)
+
+    Returns:
+        Referencias sin duplicados, en orden de aparición
+    """
+    if posiciones is None:
+        posiciones = {numero_canonico(n): i for i, n in enumerate(orden)}
+    propio = numero_canonico(numero)
+    referencias = []
+
+    def anadir(candidato: str):
+        clave = numero_canonico(candidato)
+        if clave in posiciones and clave != propio:
+            original = orden[posiciones[clave]]
+            if original not in referencias:
+                referencias.append(original)
+
+    eventos = []
+    for match in _PATRON_LISTA.finditer(texto):
+        if _PATRON_NORMA_EXTERNA.match(texto, match.end()):
+            continue
+        eventos.append((match.start(), 'lista', match.group(1)))
+    for match in _PATRON_RELATIVO.finditer(texto):
+        eventos.append((match.start(), 'relativo', match))
+
+    for _, tipo, valor in sorted(eventos, key=lambda e: e[0]):
+        if tipo == 'lista':
+            elementos = [(m.group(1), m.group(2)) for m in _PATRON_ELEMENTO.finditer(valor)]
+            for i, (num, conector) in enumerate(elementos):
+                if num:
+                    anadir(num)
+                elif 0 < i < len(elementos) - 1 and elementos[i - 1][0] and elementos[i + 1][0]:
+                    desde = posiciones.get(numero_canonico(elementos[i - 1][0]))
+                    hasta = posiciones.get(numero_canonico(elementos[i + 1][0]))
+                    if desde is not None and hasta is not None and desde < hasta:
+                        for intermedio in orden[desde + 1:hasta]:
+                            anadir(intermedio)
+        elif propio in posiciones:
+            relacion = valor.group(2).lower()
+            plural = relacion.endswith('s')
+            cantidad = _CANTIDADES.get((valor.group(1) or '').lower(), 2 if plural else 1)
+            actual = posiciones[propio]
+            if relacion.startswith(('anterior', 'precedente')):
+                vecinos = orden[max(0, actual - cantidad):actual]
+            else:
+                vecinos = orden[actual + 1:actual + 1 + cantidad]
+            for vecino in vecinos:
+                anadir(vecino)
+    return referencias
+
+
+def construir_grafo(articulos: Dict[str, str]) -> Dict[str, List[str]]:
+    """Grafo {artículo: [artículos citados]} de un documento ({numero: texto})"""
+    orden = orden_documento(articulos)
+    posiciones = {numero_canonico(n): i for i, n in enumerate(orden)}
+    return {numero: extraer_referencias(articulos[numero], numero, orden, posiciones) for numero in orden}
+
+
+def invertir_grafo(grafo: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Grafo inverso {artículo: [artículos que lo citan]}"""
+    inverso: Dict[str, List[str]] = {}
+    for origen, destinos in grafo.items():
+        for destino in destinos:
+            inverso.setdefault(destino, []).append(origen)
+    return inverso
+
+
+def vecinos_a_un_salto(grafo: Dict[str, List[str]], semillas: List[str], maximo: int = REFERENCIAS_MAX) -> Dict[str, str]:
+    """
+    Artículos citados por las semillas que no están ya entre ellas.
+
+    Returns:
+        {vecino: semilla que lo cita}, por orden de relevancia de las semillas
+    """
+    por_clave = {numero_canonico(n): n for n in grafo}
+    presentes = {numero_canonico(s) for s in semillas}
+    vecinos = {}
+    for semilla in semillas:
+        for destino in grafo.get(por_clave.get(numero_canonico(semilla)), []):
+            if len(vecinos) >= maximo:
+                return vecinos
+            if numero_canonico(destino) not in presentes and destino not in vecinos:
+                vecinos[destino] = semilla
+    return vecinos
+
+
+class GrafosReferencias:
+    """
+    Grafos de referencias por documento, reconstruidos solo cuando cambia la
+    versión del índice de artículos (p.ej. tras /cache/invalidar).
+
+    Args:
+        articulos_por_documento: Función doc_id -> {numero: texto}
+        version_por_documento: Función doc_id -> versión del índice de artículos
+    """
+
+    def __init__(
+        self,
+        articulos_por_documento: Callable[[str], Dict[str, str]],
+        version_por_documento: Callable[[str], str],
+    ):
+        self.articulos_por_documento = articulos_por_documento
+        self.version_por_documento = version_por_documento
+        self._grafos = {}  # doc_id -> (versión, grafo, inverso)
+        self._lock = threading.Lock()
+
+    def _grafo(self, documento_id: str) -> tuple:
+        version = self.version_por_documento(documento_id)
+        with self._lock:
+            actual = self._grafos.get(documento_id)
+            if actual is not None and actual[0] == version:
+                return actual
+        grafo = construir_grafo(self.articulos_por_documento(documento_id))
+        entrada = (version, grafo, invertir_grafo(grafo))
+        with self._lock:
+            self._grafos[documento_id] = entrada
+        print(f"🕸️  Grafo de referencias de '{documento_id}': {len(grafo)} artículos, "
+              f"{sum(len(d) for d in grafo.values())} referencias")
+        return entrada
+
+    def construir(self, documento_id: str) -> None:
+        """Construye el grafo del documento si no está al día (al arrancar)"""
+        self._grafo(documento_id)
+
+    def referencias(self, documento_id: str, numero: str) -> Optional[dict]:
+        """{'referencias', 'referenciado_por'} del artículo o None si no está en el documento"""
+        _, grafo, inverso = self._grafo(documento_id)
+        clave = {numero_canonico(n): n for n in grafo}.get(numero_canonico(numero))
+        if clave is None:
+            return None
+        return {"referencias": list(grafo[clave]), "referenciado_por": list(inverso.get(clave, []))}
+
+    def vecinos(self, documento_id: str, semillas: List[str], maximo: int = REFERENCIAS_MAX) -> Dict[str, str]:
+        """Vecinos a un salto de las semillas (ver vecinos_a_un_salto)"""
+        _, grafo, _ = self._grafo(documento_id)
+        return vecinos_a_un_salto(grafo, semillas, maximo)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                doc_id: {"articulos": len(grafo), "referencias": sum(len(d) for d in grafo.values())}
+                for doc_id, (_, grafo, _) in self._grafos.items()
+            }
@@ -0,0 +1,249 @@
+"""
+MÓDULO DE REINDEXADO INCREMENTAL
+IDs de chunk direccionados por contenido, manifiesto local (id, hash, posición) y
+cálculo de qué vectores hay que embeber, cuáles borrar, a cuáles actualizar solo
+la metadata posicional y qué artículos invalidar en caché
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+from typing import Dict, List, Optional
+
+from corpus import DOCUMENTO_POR_DEFECTO
+import cache_redis
+from cache_redis import CacheArticulos
+
+PREFIJO_ID_POSICIONAL = "chunk_"  # Esquema antiguo: chunk_{i}
+BATCH_BORRADO = 1000  # Máximo de ids por petición de borrado en Pinecone
+# Metadata que depende de dónde cae el chunk, no de su texto: cambia al desplazarse el documento
+CAMPOS_POSICIONALES = ('char_start', 'char_end', 'pagina', 'parte', 'total_partes')
+
+
+def hash_contenido(texto: str) -> str:
+    """SHA-256 del texto del chunk"""
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def _slug(texto: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', texto.lower()).strip('-') or "doc"
+
+
+def asignar_ids_por_contenido(chunks: List[dict], source: str = "") -> List[dict]:
+    """
+    Sustituye los ids posicionales por ids direccionados por contenido:
+    "{source}-{sha256(texto)[:24]}". Un chunk desplazado conserva su id; solo
+    cambian los ids de los chunks cuyo texto cambia. Textos idénticos dentro
+    del mismo documento se desambiguan con un sufijo de ocurrencia.
+    """
+    prefijo = _slug(source)
+    vistos = {}
+    for chunk in chunks:
+        digest = hash_contenido(chunk["text"])
+        ocurrencia = vistos.get(digest, 0)
+        vistos[digest] = ocurrencia + 1
+        chunk["hash"] = digest
+        chunk["id"] = f"{prefijo}-{digest[:24]}" + (f"-{ocurrencia + 1}" if ocurrencia else "")
+    return chunks
+
+
+def ruta_manifiesto(directorio: str, indice: str, source: str) -> str:
+    """Ruta del manifiesto de un documento en un índice"""
+    return os.path.join(directorio, f".manifest_{_slug(indice)}_{_slug(source)}.json")
+
+
+def cargar_manifiesto(ruta: str) -> Optional[dict]:
+    """Manifiesto previo o None si es la primera indexación con ids de contenido"""
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _normalizar_articulo(numero: str) -> str:
+    return re.sub(r'\s+', ' ', str(numero).strip())
+
+
+def ids_por_articulo(manifiesto: Optional[dict]) -> Dict[str, List[str]]:
+    """
+    Mapa artículo -> ids de sus chunks en orden de documento (parte 1, 2...).
+    Los manifiestos anteriores a este mapa se derivan de 'chunks' (mismo orden).
+    """
+    if not manifiesto:
+        return {}
+    if "articulos" in manifiesto:
+        return {_normalizar_articulo(n): list(ids) for n, ids in manifiesto["articulos"].items()}
+    mapa: Dict[str, List[str]] = {}
+    for id_, datos in manifiesto.get("chunks", {}).items():
+        if datos.get("articulo"):
+            mapa.setdefault(_normalizar_articulo(datos["articulo"]), []).append(id_)
+    return mapa
+
+
+def metadata_posicional(chunk: dict) -> dict:
+    """Offsets, página y parte/total_partes del chunk (sin valores nulos, como en Pinecone)"""
+    return {campo: chunk[campo] for campo in CAMPOS_POSICIONALES if chunk.get(campo) is not None}
+
+
+def guardar_manifiesto(ruta: str, chunks: List[dict], source: str = "") -> None:
+    """
+    Guarda el manifiesto de forma atómica: {id: {hash, articulo, posicion}} y el
+    mapa artículo -> ids (la API lo usa para traer un artículo por id, sin embeddings)
+    """
+    articulos: Dict[str, List[str]] = {}
+    for chunk in sorted(chunks, key=lambda c: c.get("parte") or 0):  # sort estable: orden de documento
+        if chunk.get("articulo"):
+            articulos.setdefault(_normalizar_articulo(chunk["articulo"]), []).append(chunk["id"])
+    manifiesto = {
+        "source": source,
+        "actualizado": time.time(),
+        "chunks": {
+            chunk["id"]: {
+                "hash": chunk["hash"],
+                "articulo": chunk.get("articulo"),
+                "posicion": metadata_posicional(chunk),
+            }
+            for chunk in chunks
+        },
+        "articulos": articulos,
+    }
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def calcular_diferencias(chunks: List[dict], manifiesto: Optional[dict]) -> dict:
+    """
+    Compara los chunks actuales con el manifiesto previo.
+
+    Returns:
+        {
+            'nuevos': chunks a embeber (texto nuevo o modificado),
+            'reposicionados': chunks con el mismo texto pero otra posición (offsets,
+                              página o parte/total_partes): solo se actualiza su metadata,
+            'sin_cambios': número de chunks que se reutilizan (incluidos los reposicionados),
+            'obsoletos': ids a borrar del índice,
+            'articulos_afectados': artículos con algún chunk nuevo o borrado
+        }
+    """
+    previos = (manifiesto or {}).get("chunks", {})
+    actuales = {chunk["id"]: chunk for chunk in chunks}
+
+    nuevos = [
+        chunk for chunk in chunks
+        if chunk["id"] not in previos or previos[chunk["id"]].get("hash") != chunk["hash"]
+    ]
+    ids_nuevos = {chunk["id"] for chunk in nuevos}
+    # Manifiestos sin 'posicion' (anteriores a este campo): se refresca la metadata de todos una vez
+    reposicionados = [
+        chunk for chunk in chunks
+        if chunk["id"] not in ids_nuevos
+        and previos[chunk["id"]].get("posicion") != metadata_posicional(chunk)
+    ]
+    obsoletos = [id_ for id_ in previos if id_ not in actuales]
+
+    articulos_afectados = {c.get("articulo") for c in nuevos}
+    articulos_afectados |= {previos[id_].get("articulo") for id_ in obsoletos}
+    articulos_afectados.discard(None)
+
+    return {
+        "nuevos": nuevos,
+        "reposicionados": reposicionados,
+        "sin_cambios": len(chunks) - len(nuevos),
+        "obsoletos": obsoletos,
+        "articulos_afectados": sorted(articulos_afectados),
+    }
+
+
+def borrar_vectores(index, ids: List[str], namespace: str = "") -> int:
+    """Borra vectores por id en lotes (dentro del namespace del documento)"""
+    for i in range(0, len(ids), BATCH_BORRADO):
+        index.delete(ids=ids[i:i + BATCH_BORRADO], namespace=namespace)
+    return len(ids)
+
+
+def actualizar_metadata_posicional(index, chunks: List[dict], namespace: str = "") -> int:
+    """
+    Actualiza solo la metadata posicional (sin re-embeber) de los chunks
+    reposicionados, para que la unión por offsets y la comprobación de
+    total_partes no trabajen con valores de la indexación anterior
+    """
+    for chunk in chunks:
+        index.update(id=chunk["id"], set_metadata=metadata_posicional(chunk), namespace=namespace)
+    return len(chunks)
+
+
+def purgar_ids_posicionales(index, prefijo: str = PREFIJO_ID_POSICIONAL, namespace: str = "") -> int:
+    """
+    Borra los vectores con ids posicionales del esquema antiguo (chunk_{i}).
+    Solo es necesario la primera vez que se indexa con ids de contenido.
+    Requiere index.list (índices serverless de Pinecone).
+    """
+    if not hasattr(index, "list"):
+        print(f"⚠️ El índice no soporta listar ids - borra manualmente los ids '{prefijo}*'")
+        return 0
+    borrados = 0
+    for pagina in index.list(prefix=prefijo, namespace=namespace):
+        ids = list(pagina)
+        if ids:
+            borrados += borrar_vectores(index, ids, namespace)
+    return borrados
+
+
+def invalidar_caches(
+    articulos: List[str],
+    redis_client=None,
+    api_url: Optional[str] = None,
+    documento: str = DOCUMENTO_POR_DEFECTO,
+    clave_admin: Optional[str] = None,
+) -> dict:
+    """
+    Invalida solo los artículos afectados del documento:
+    - Redis: borra las claves articulo:{doc}:{n}
+    - API: POST {api_url}/cache/invalidar para refrescar el índice de artículos en memoria
+      (con la cabecera X-Admin-Key; por defecto ADMIN_API_KEY del .env)
+    """
+    resultado = {"redis": 0, "api": None}
+    if not articulos:
+        return resultado
+
+    if redis_client is not None:
+        try:
+            resultado["redis"] = CacheArticulos(redis_client).invalidar(documento, articulos)
+        except Exception as e:
+            print(f"⚠️ No se pudo invalidar Redis: {e}")
+
+    if api_url:
+        import urllib.request
+        try:
+            peticion = urllib.request.Request(
+                f"{api_url.rstrip('/')}/cache/invalidar",
+                data=json.dumps({"articulos": articulos, "documento": documento}).encode("utf-8"),
+                headers={"Content-Type": "application/json",
+                         "X-Admin-Key": clave_admin or os.getenv("ADMIN_API_KEY", "")},
+                method="POST",
+            )
+            with urllib.request.urlopen(peticion, timeout=30) as respuesta:
+                resultado["api"] = json.loads(respuesta.read().decode("utf-8"))
+        except Exception as e:
+            print(f"⚠️ No se pudo notificar a la API ({api_url}): {e}")
+
+    return resultado
+
+
+def conectar_redis_opcional():
+    """Cliente Redis con la configuración del .env, o None si no está disponible"""
+    try:
+        cliente = cache_redis.conectar(
+            os.getenv("REDIS_HOST", "localhost"),
+            int(os.getenv("REDIS_PORT", 6379)),
+            int(os.getenv("REDIS_DB", 0)),
+        )
+        cliente.ping()
+        return cliente
+    except Exception as e:
+        print(f"⚠️ Redis no disponible para invalidación: {e}")
+        return None
@@ -0,0 +1,154 @@
+"""
+MÓDULO DE RE-RANKING LOCAL (CROSS-ENCODER)
+Puntúa cada par (consulta, fragmento) con un cross-encoder pequeño en CPU y
+se queda solo con los mejores fragmentos que caben en un presupuesto de
+tokens, para que el prompt de Gemini no crezca con TOP_K. Las puntuaciones
+se calculan por lotes y se cachean por par (consulta, fragmento)
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from contexto_utils import estimar_tokens
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+RERANKER_ACTIVO = os.getenv("RERANKER_ACTIVO", "false").lower() == "true"
+MODELO_RERANKER = os.getenv("RERANKER_MODELO", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")  # Multilingüe
+RERANKER_TOP_N = int(os.getenv("RERANKER_TOP_N", 8))  # Fragmentos que pasan a Gemini como máximo
+RERANKER_PRESUPUESTO_TOKENS = int(os.getenv("RERANKER_PRESUPUESTO_TOKENS", 6000))  # Tokens de contexto
+RERANKER_BATCH_SIZE = int(os.getenv("RERANKER_BATCH_SIZE", 16))
+RERANKER_TAM_CACHE = int(os.getenv("RERANKER_TAM_CACHE", 4096))  # Pares (consulta, fragmento) en memoria
+DISPOSITIVO = os.getenv("EMBEDDING_DEVICE", "cpu")
+
+
+def _texto_match(match) -> str:
+    return (match.get('metadata', {}) or {}).get('text', '')
+
+
+def _clave_par(query: str, texto: str) -> str:
+    return hashlib.sha1(f"{query}\x00{texto}".encode("utf-8")).hexdigest()
+
+
+class RerankerLocal:
+    """
+    Cross-encoder de sentence-transformers cargado bajo demanda.
+
+    Args:
+        modelo: Nombre del cross-encoder (Hugging Face)
+        batch_size: Pares por lote en la inferencia
+        tam_cache: Pares cuya puntuación se guarda (LRU)
+        puntuar_fn: Función List[(query, texto)] -> List[float] en lugar del modelo (tests u otro backend)
+    """
+
+    def __init__(
+        self,
+        modelo: str = MODELO_RERANKER,
+        batch_size: int = RERANKER_BATCH_SIZE,
+        tam_cache: int = RERANKER_TAM_CACHE,
+        dispositivo: str = DISPOSITIVO,
+        puntuar_fn: Optional[Callable[[List[Tuple[str, str]]], List[float]]] = None,
+    ):
+        self.nombre_modelo = modelo
+        self.batch_size = max(1, batch_size)
+        self.tam_cache = max(0, tam_cache)
+        self.dispositivo = dispositivo
+        self._puntuar_fn = puntuar_fn
+        self._modelo = None
+        self._cache: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos_cache = 0
+        self.pares_puntuados = 0
+
+    @property
+    def modelo(self):
+        if self._modelo is None:
+            with self._lock:
+                if self._modelo is None:
+                    from sentence_transformers import CrossEncoder
+                    print(f"🔢 Cargando cross-encoder ({self.nombre_modelo}, {self.dispositivo})...")
+                    self._modelo = CrossEncoder(self.nombre_modelo, device=self.dispositivo)
+        return self._modelo
+
+    def calentar(self) -> None:
+        """Carga el modelo al arrancar en lugar de en la primera consulta"""
+        self.puntuar("calentamiento", ["texto de prueba"])
+
+    def _inferir(self, pares: List[Tuple[str, str]]) -> List[float]:
+        if self._puntuar_fn is not None:
+            return [float(p) for p in self._puntuar_fn(pares)]
+        return [float(p) for p in self.modelo.predict(pares, batch_size=self.batch_size, show_progress_bar=False)]
+
+    def puntuar(self, query: str, textos: List[str]) -> List[float]:
+        """Puntuación de relevancia de cada texto para la consulta (solo se infieren los pares no cacheados)"""
+        return self._puntuar(query, textos)[0]
+
+    def _puntuar(self, query: str, textos: List[str]) -> Tuple[List[float], int]:
+        claves = [_clave_par(query, texto) for texto in textos]
+        puntuaciones = {}
+        with self._lock:
+            for clave in claves:
+                if clave in self._cache:
+                    self._cache.move_to_end(clave)
+                    puntuaciones[clave] = self._cache[clave]
+            aciertos = len(puntuaciones)
+            self.aciertos_cache += aciertos
+
+        pendientes = list(dict.fromkeys(
+            (clave, texto) for clave, texto in zip(claves, textos) if clave not in puntuaciones
+        ))
+        if pendientes:
+            nuevas = self._inferir([(query, texto) for _, texto in pendientes])
+            with self._lock:
+                self.pares_puntuados += len(pendientes)
+                for (clave, _), puntuacion in zip(pendientes, nuevas):
+                    puntuaciones[clave] = puntuacion
+                    if self.tam_cache:
+                        self._cache[clave] = puntuacion
+                        self._cache.move_to_end(clave)
+                while len(self._cache) > self.tam_cache:
+                    self._cache.popitem(last=False)
+        return [puntuaciones[clave] for clave in claves], aciertos
+
+    def reordenar(
+        self,
+        query: str,
+        matches: list,
+        top_n: int = RERANKER_TOP_N,
+        presupuesto_tokens: int = RERANKER_PRESUPUESTO_TOKENS,
+    ) -> Tuple[list, dict]:
+        """
+        Ordena los matches por la puntuación del cross-encoder y se queda con los
+        mejores hasta `top_n` fragmentos o `presupuesto_tokens` (siempre al menos uno).
+
+        Returns:
+            (matches seleccionados en orden de relevancia, estadísticas para la metadata)
+        """
+        inicio = time.perf_counter()
+        textos = [_texto_match(m) for m in matches]
+        puntuaciones, aciertos = self._puntuar(query, textos)
+        orden = sorted(range(len(matches)), key=lambda i: puntuaciones[i], reverse=True)
+
+        seleccionados, tokens_salida = [], 0
+        for i in orden:
+            tokens = estimar_tokens(textos[i])
+            if seleccionados and (len(seleccionados) >= top_n or tokens_salida + tokens > presupuesto_tokens):
+                continue
+            seleccionados.append(i)
+            tokens_salida += tokens
+
+        tokens_entrada = sum(estimar_tokens(t) for t in textos)
+        estadisticas = {
+            "modelo": self.nombre_modelo,
+            "fragmentos_entrada": len(matches),
+            "fragmentos_salida": len(seleccionados),
+            "tokens_entrada": tokens_entrada,
+            "tokens_salida": tokens_salida,
+            "tokens_ahorrados": tokens_entrada - tokens_salida,
+            "aciertos_cache": aciertos,
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        }
+        return [matches[i] for i in seleccionados], estadisticas
@@ -0,0 +1,171 @@
+"""
+MÓDULO DE COALESCENCIA DE CONSULTAS (SINGLE-FLIGHT)
+Las peticiones idénticas que llegan mientras otra igual está en curso esperan
+a esa única ejecución y comparten su resultado, en el mismo proceso y, con
+Redis, entre workers (lock SET NX + resultado compartido de vida corta)
+"""
+
+import os
+import copy
+import time
+import uuid
+import asyncio
+import hashlib
+from typing import Any, Callable, Dict, Optional
+
+from cache_redis import codificar, decodificar, liberar_lock
+from normalizacion_consultas import firma_consulta
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+SINGLE_FLIGHT_TTL_LOCK = float(os.getenv("SINGLE_FLIGHT_TTL_LOCK", 60))  # Segundos; cubre una llamada a Gemini
+SINGLE_FLIGHT_TTL_RESULTADO = float(os.getenv("SINGLE_FLIGHT_TTL_RESULTADO", 10))  # Segundos que otros workers pueden recogerlo
+SINGLE_FLIGHT_INTERVALO = 0.05  # Segundos entre comprobaciones de un worker que espera a otro
+
+
+def clave_consulta(query: str, documento: str = "", historial: Optional[list] = None) -> str:
+    """
+    Clave de coalescencia: la firma canónica de la consulta (ver
+    normalizacion_consultas), el documento y una huella del historial,
+    porque la respuesta depende de la conversación previa
+    """
+    huella = hashlib.sha1()
+    huella.update(f"{documento}\x00{firma_consulta(query)}".encode("utf-8"))
+    for mensaje in historial or []:
+        if isinstance(mensaje, dict):
+            rol, contenido = mensaje.get("role", ""), mensaje.get("content", "")
+        else:  # ChatMessage de pydantic
+            rol, contenido = mensaje.role, mensaje.content
+        huella.update(f"\x00{rol}\x00{contenido}".encode("utf-8"))
+    return huella.hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalescencia de ejecuciones por clave.
+
+    - En el proceso: la primera petición lanza la tarea y el resto espera su resultado
+      (la tarea sigue aunque la petición que la lanzó se cancele)
+    - Entre workers (opcional): solo el worker con el lock de Redis calcula; los demás
+      esperan el resultado compartido y, si no llega a tiempo, calculan ellos mismos
+
+    Args:
+        redis_client: Cliente Redis para coordinar workers (None = solo en el proceso)
+        prefijo: Espacio de claves en Redis
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        prefijo: str = "singleflight",
+        ttl_lock: float = SINGLE_FLIGHT_TTL_LOCK,
+        ttl_resultado: float = SINGLE_FLIGHT_TTL_RESULTADO,
+        intervalo: float = SINGLE_FLIGHT_INTERVALO,
+    ):
+        self.redis = redis_client
+        self.prefijo = prefijo
+        self.ttl_lock = ttl_lock
+        self.ttl_resultado = ttl_resultado
+        self.intervalo = intervalo
+        self._en_vuelo: Dict[str, asyncio.Task] = {}
+        self.ejecuciones = 0
+        self.compartidas = 0  # Peticiones servidas con el resultado de otra en el mismo proceso
+        self.compartidas_redis = 0  # Peticiones servidas con el resultado de otro worker
+
+    async def ejecutar(self, clave: str, funcion: Callable[[], Any]) -> Any:
+        """
+        Ejecuta `funcion` (síncrona, en el pool de hilos) o espera a la ejecución en curso con la misma clave.
+        Cada petición recibe su propia copia del resultado (se puede modificar sin afectar a las demás).
+        """
+        tarea = self._en_vuelo.get(clave)
+        if tarea is not None:
+            self.compartidas += 1
+        else:
+            tarea = asyncio.ensure_future(self._calcular(clave, funcion))
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda t: self._terminar(clave, t))
+        return copy.deepcopy(await asyncio.shield(tarea))
+
+    def _terminar(self, clave: str, tarea: asyncio.Task) -> None:
+        if self._en_vuelo.get(clave) is tarea:
+            del self._en_vuelo[clave]
+        if not tarea.cancelled():
+            tarea.exception()  # Marcar como recogida aunque nadie la espere ya
+
+    async def _en_hilo(self, funcion: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: funcion(*args, **kwargs))
+
+    async def _calcular(self, clave: str, funcion: Callable[[], Any]) -> Any:
+        if self.redis is None:
+            self.ejecuciones += 1
+            return await self._en_hilo(funcion)
+
+        clave_lock = f"{self.prefijo}:lock:{clave}"
+        clave_resultado = f"{self.prefijo}:resultado:{clave}"
+        token = uuid.uuid4().hex
+        try:
+            es_lider = await self._en_hilo(self.redis.set, clave_lock, token, nx=True, px=int(self.ttl_lock * 1000))
+        except Exception as e:
+            print(f"⚠️ Single-flight sin Redis ({e}) - se calcula en este worker")
+            self.ejecuciones += 1
+            return await self._en_hilo(funcion)
+
+        if not es_lider:
+            compartido = await self._esperar_otro_worker(clave_lock, clave_resultado)
+            if compartido is not None:
+                self.compartidas_redis += 1
+                return compartido["resultado"]
+
+        self.ejecuciones += 1
+        try:
+            resultado = await self._en_hilo(funcion)
+            if es_lider:
+                await self._publicar(clave_resultado, resultado)
+            return resultado
+        finally:
+            if es_lider:
+                await self._en_hilo(self._liberar, clave_lock, token)
+
+    async def _esperar_otro_worker(self, clave_lock: str, clave_resultado: str) -> Optional[dict]:
+        """Resultado publicado por el worker con el lock, o None si se libera sin resultado o se agota la espera"""
+        limite = time.monotonic() + self.ttl_lock
+        try:
+            while time.monotonic() < limite:
+                valor, lock_activo = await self._en_hilo(self._leer, clave_resultado, clave_lock)
+                compartido = decodificar(valor)
+                if compartido is not None:
+                    return compartido
+                if not lock_activo:
+                    return None
+                await asyncio.sleep(self.intervalo)
+        except Exception as e:
+            print(f"⚠️ Error esperando a otro worker: {e}")
+        return None
+
+    def _leer(self, clave_resultado: str, clave_lock: str) -> tuple:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(clave_resultado)
+        pipe.exists(clave_lock)
+        valor, existe = pipe.execute()
+        return valor, bool(existe)
+
+    async def _publicar(self, clave_resultado: str, resultado: Any) -> None:
+        try:
+            valor = codificar({"resultado": resultado})
+            await self._en_hilo(self.redis.set, clave_resultado, valor, px=int(self.ttl_resultado * 1000))
+        except Exception as e:  # Resultado no serializable o Redis caído: los demás workers calculan
+            print(f"⚠️ No se pudo compartir el resultado con otros workers: {e}")
+
+    def _liberar(self, clave_lock: str, token: str) -> None:
+        try:
+            liberar_lock(self.redis, clave_lock, token)
+        except Exception as e:
+            print(f"⚠️ No se pudo liberar el lock de single-flight: {e}")
+
+    def estadisticas(self) -> dict:
+        return {
+            "en_vuelo": len(self._en_vuelo),
+            "ejecuciones": self.ejecuciones,
+            "compartidas": self.compartidas,
+            "compartidas_redis": self.compartidas_redis,
+        }
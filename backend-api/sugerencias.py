@@ -0,0 +1,169 @@
+"""
+MÓDULO DE SUGERENCIAS (TYPEAHEAD)
+Índice de encabezados (Libro/Título/Capítulo), epígrafes de artículo y números
+de artículo en un array ordenado de claves normalizadas (sin tildes ni
+mayúsculas). Cada encabezado se indexa también por cada palabra significativa
+("robos" encuentra "CAPÍTULO II. De los robos"), así que una consulta es una
+búsqueda binaria del prefijo más un recorrido corto: microsegundos por tecla en
+lugar de una ronda completa de RAG, y el usuario salta al artículo exacto.
+"""
+
+import bisect
+import os
+import re
+import threading
+import unicodedata
+from typing import Callable, List, Optional
+
+from articulos_utils import extraer_epigrafes
+from existencia_articulos import clave_orden
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+SUGERENCIAS_LIMITE = int(os.getenv("SUGERENCIAS_LIMITE", 8))
+SUGERENCIAS_MIN_CHARS = 2  # Prefijos más cortos devuelven demasiado ruido
+MAX_CLAVES_RECORRIDAS = 400  # Tope del recorrido tras la búsqueda binaria (prefijos muy comunes)
+PALABRAS_VACIAS = {
+    'de', 'del', 'la', 'las', 'el', 'los', 'y', 'e', 'o', 'u', 'en', 'a', 'al', 'por', 'para', 'con',
+    'sin', 'sus', 'su', 'se', 'que', 'lo', 'otras', 'otros', 'demas',
+}
+PRIORIDAD_TIPO = {'articulo': 0, 'capitulo': 1, 'titulo': 2, 'libro': 3}
+
+
+def normalizar(texto: str) -> str:
+    """'TÍTULO I. Del Homicidio' -> 'titulo i del homicidio'"""
+    sin_tildes = unicodedata.normalize('NFKD', texto)
+    sin_tildes = ''.join(c for c in sin_tildes if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]+', ' ', sin_tildes.lower()).strip()
+
+
+def _sin_ordinal(etiqueta_normalizada: str) -> str:
+    """'titulo xiii de los delitos...' -> 'de los delitos...' (lo que el usuario escribe)"""
+    return re.sub(r'^(?:libro|titulo|capitulo|seccion)\s+(?:preliminar|[ivxlc]+)(?:\s+(?:bis|ter|quater))?\s*', '',
+                  etiqueta_normalizada)
+
+
+class IndiceSugerencias:
+    """
+    Array ordenado de (clave, posición en la clave, id de entrada) sobre las
+    entradas de extraer_epigrafes más una entrada por artículo.
+
+    Args:
+        entradas: [{'tipo', 'etiqueta', 'articulos'}]
+        articulos: Números de artículo del documento (para "138" -> Artículo 138)
+    """
+
+    def __init__(self, entradas: List[dict], articulos: Optional[List[str]] = None):
+        self.entradas = list(entradas)
+        con_epigrafe = {e['articulos'][0] for e in self.entradas if e['tipo'] == 'articulo'}
+        for numero in articulos or []:
+            if numero not in con_epigrafe:
+                self.entradas.append({'tipo': 'articulo', 'etiqueta': f"Artículo {numero}", 'articulos': [numero]})
+
+        claves = []
+        for id_entrada, entrada in enumerate(self.entradas):
+            texto = normalizar(entrada['etiqueta'])
+            if entrada['tipo'] == 'articulo':
+                claves.append((texto, 0, id_entrada))
+                claves.append((normalizar(entrada['articulos'][0]), 0, id_entrada))
+                texto = re.sub(r'^articulo\s+\S+(?:\s+(?:bis|ter|quater|quinquies|sexies))?\s*', '', texto)
+            else:
+                claves.append((texto, 0, id_entrada))
+                texto = _sin_ordinal(texto)
+            palabras = texto.split()
+            for i, palabra in enumerate(palabras):
+                if palabra not in PALABRAS_VACIAS:
+                    claves.append((" ".join(palabras[i:]), i + 1, id_entrada))
+        claves = sorted(set(claves))
+        self._claves = [c[0] for c in claves]
+        self._datos = [(c[1], c[2]) for c in claves]
+
+    def __len__(self) -> int:
+        return len(self.entradas)
+
+    def buscar(self, consulta: str, limite: int = SUGERENCIAS_LIMITE) -> List[dict]:
+        """
+        Entradas cuyo encabezado (o alguna palabra significativa de él) empieza por la consulta.
+
+        Returns:
+            [{'tipo', 'etiqueta', 'articulos', 'consulta'}] - artículos y encabezados más concretos
+            primero; 'consulta' es la pregunta que lleva a la búsqueda exacta del primer artículo
+        """
+        prefijo = normalizar(consulta)
+        if len(prefijo) < SUGERENCIAS_MIN_CHARS:
+            return []
+        inicio = bisect.bisect_left(self._claves, prefijo)
+        vistos = {}
+        for i in range(inicio, min(len(self._claves), inicio + MAX_CLAVES_RECORRIDAS)):
+            if not self._claves[i].startswith(prefijo):
+                break
+            posicion, id_entrada = self._datos[i]
+            if id_entrada not in vistos or posicion < vistos[id_entrada]:
+                vistos[id_entrada] = posicion
+        ordenados = sorted(
+            vistos.items(),
+            key=lambda item: (
+                item[1] > 0,  # Coincidencia desde el principio del encabezado
+                PRIORIDAD_TIPO[self.entradas[item[0]]['tipo']],
+                len(self.entradas[item[0]]['articulos']),
+                clave_orden(self.entradas[item[0]]['articulos'][0]) or (0, 0),
+            )
+        )[:limite]
+        return [
+            dict(self.entradas[id_entrada], consulta=f"artículo {self.entradas[id_entrada]['articulos'][0]}")
+            for id_entrada, _ in ordenados
+        ]
+
+
+def construir_indice_sugerencias(texto_documento: str, articulos: Optional[List[str]] = None) -> IndiceSugerencias:
+    """Índice de sugerencias de un documento a partir de su texto"""
+    return IndiceSugerencias(extraer_epigrafes(texto_documento), articulos)
+
+
+class IndicesSugerencias:
+    """
+    Índices de sugerencias por documento, reconstruidos solo cuando cambia la
+    versión del índice de artículos (p.ej. tras /cache/invalidar).
+
+    Args:
+        texto_por_documento: Función doc_id -> texto del documento
+        articulos_por_documento: Función doc_id -> números de artículo
+        version_por_documento: Función doc_id -> versión del índice de artículos
+    """
+
+    def __init__(
+        self,
+        texto_por_documento: Callable[[str], str],
+        articulos_por_documento: Callable[[str], List[str]],
+        version_por_documento: Callable[[str], str],
+    ):
+        self.texto_por_documento = texto_por_documento
+        self.articulos_por_documento = articulos_por_documento
+        self.version_por_documento = version_por_documento
+        self._indices = {}  # doc_id -> (versión, IndiceSugerencias)
+        self._lock = threading.Lock()
+
+    def _indice(self, documento_id: str) -> IndiceSugerencias:
+        version = self.version_por_documento(documento_id)
+        with self._lock:
+            actual = self._indices.get(documento_id)
+            if actual is not None and actual[0] == version:
+                return actual[1]
+        indice = construir_indice_sugerencias(
+            self.texto_por_documento(documento_id), list(self.articulos_por_documento(documento_id))
+        )
+        with self._lock:
+            self._indices[documento_id] = (version, indice)
+        print(f"🔎 Índice de sugerencias de '{documento_id}': {len(indice)} entradas")
+        return indice
+
+    def construir(self, documento_id: str) -> None:
+        """Construye el índice del documento si no está al día (al arrancar)"""
+        self._indice(documento_id)
+
+    def buscar(self, documento_id: str, consulta: str, limite: int = SUGERENCIAS_LIMITE) -> List[dict]:
+        """Sugerencias del documento para el prefijo (ver IndiceSugerencias.buscar)"""
+        return self._indice(documento_id).buscar(consulta, limite)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {doc_id: len(indice) for doc_id, (_, indice) in self._indices.items()}
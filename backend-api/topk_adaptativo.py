@@ -0,0 +1,130 @@
+"""
+MÓDULO DE TOP-K ADAPTATIVO
+En lugar de pedir siempre 10/20/30 resultados, se empieza con pocos y solo se
+amplía la búsqueda si la cola sigue por encima del umbral y la distribución de
+scores no muestra un "codo" (salto claro entre los relevantes y el resto).
+Pinecone no pagina por desplazamiento, así que cada ampliación repite la
+consulta con un k mayor; con el k inicial basta en la mayoría de consultas.
+El codo solo decide si se sigue ampliando: se devuelven todos los resultados
+por encima del umbral y el filtrado adaptativo y el reranker hacen el recorte.
+"""
+
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+TOPK_ADAPTATIVO = os.getenv("TOPK_ADAPTATIVO", "true").lower() == "true"
+TOPK_INICIAL = int(os.getenv("TOPK_INICIAL", 8))
+TOPK_FACTOR = 2  # Cada ampliación multiplica k por este factor (hasta el top_k de la estrategia)
+SALTO_MINIMO = float(os.getenv("TOPK_SALTO_MINIMO", 0.06))  # Caída de score que cuenta como codo
+SALTO_RELATIVO = 3.0  # ...y que además es N veces la caída media entre resultados consecutivos
+MIN_ANTES_DEL_CODO = 2  # No cortar por codo con menos resultados que estos
+
+
+def detectar_codo(scores: List[float]) -> Optional[int]:
+    """
+    Posición del codo en una lista de scores ordenada de mayor a menor: el índice
+    del primer resultado tras el mayor salto, si ese salto es claramente mayor que
+    los demás. None si la distribución cae de forma gradual.
+    """
+    if len(scores) <= MIN_ANTES_DEL_CODO:
+        return None
+    saltos = [scores[i - 1] - scores[i] for i in range(1, len(scores))]
+    medio = sum(saltos) / len(saltos)
+    candidatos = range(MIN_ANTES_DEL_CODO, len(scores))
+    corte = max(candidatos, key=lambda i: saltos[i - 1])
+    salto = saltos[corte - 1]
+    if salto >= SALTO_MINIMO and salto >= SALTO_RELATIVO * medio:
+        return corte
+    return None
+
+
+def recuperar_adaptativo(
+    buscar: Callable[[int], dict],
+    umbral: float,
+    top_k_max: int,
+    k_inicial: int = TOPK_INICIAL,
+) -> Tuple[dict, dict]:
+    """
+    Búsqueda vectorial con k creciente.
+
+    Args:
+        buscar: Función k -> {'matches': [...]} (p.ej. buscar_vectores con la consulta fijada)
+        umbral: Score mínimo de relevancia (el mismo del filtrado adaptativo)
+        top_k_max: k máximo (el de la estrategia elegida)
+        k_inicial: k de la primera ronda
+
+    Returns:
+        (results con todos los matches por encima del umbral, estadísticas de la búsqueda)
+    """
+    k = max(1, min(k_inicial, top_k_max))
+    rondas, recuperados = 0, 0
+    while True:
+        results = buscar(k)
+        matches = sorted(results['matches'], key=lambda m: m.get('score', 0), reverse=True)
+        rondas += 1
+        recuperados += len(matches)
+        scores = [m.get('score', 0) for m in matches]
+
+        relevantes = sum(1 for s in scores if s > umbral)
+        codo = detectar_codo(scores[:relevantes])
+        if len(matches) < k:
+            motivo = "agotado"  # El índice no tiene más resultados
+        elif relevantes < len(matches):
+            motivo = "umbral"  # La cola ya cae por debajo del umbral
+        elif codo is not None:
+            motivo = "codo"
+        elif k >= top_k_max:
+            motivo = "maximo"
+        else:
+            k = min(k * TOPK_FACTOR, top_k_max)
+            continue
+        break
+
+    devueltos = matches[:relevantes]  # El codo no recorta: solo evita pedir más resultados
+    estadisticas = {
+        "k_inicial": min(k_inicial, top_k_max),
+        "k_final": k,
+        "rondas": rondas,
+        "recuperados": recuperados,
+        "devueltos": len(devueltos),
+        "codo": codo,
+        "motivo": motivo,
+    }
+    return {'matches': devueltos}, estadisticas
+
+
+class EstadisticasTopK:
+    """Volumen recuperado frente a devuelto por estrategia (para /health y los logs)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_estrategia: Dict[str, dict] = {}
+
+    def registrar(self, estrategia: str, estadisticas: dict, top_k_fijo: int) -> None:
+        with self._lock:
+            datos = self._por_estrategia.setdefault(estrategia, {
+                "consultas": 0, "rondas": 0, "recuperados": 0, "devueltos": 0, "recuperados_top_k_fijo": 0,
+                "motivos": {},
+            })
+            datos["consultas"] += 1
+            datos["rondas"] += estadisticas["rondas"]
+            datos["recuperados"] += estadisticas["recuperados"]
+            datos["devueltos"] += estadisticas["devueltos"]
+            datos["recuperados_top_k_fijo"] += top_k_fijo
+            datos["motivos"][estadisticas["motivo"]] = datos["motivos"].get(estadisticas["motivo"], 0) + 1
+
+    def resumen(self) -> dict:
+        with self._lock:
+            return {
+                estrategia: {
+                    "consultas": d["consultas"],
+                    "rondas_media": round(d["rondas"] / d["consultas"], 2),
+                    "recuperados_media": round(d["recuperados"] / d["consultas"], 1),
+                    "devueltos_media": round(d["devueltos"] / d["consultas"], 1),
+                    "recuperados_con_top_k_fijo": round(d["recuperados_top_k_fijo"] / d["consultas"], 1),
+                    "motivos": dict(d["motivos"]),
+                }
+                for estrategia, d in self._por_estrategia.items()
+            }
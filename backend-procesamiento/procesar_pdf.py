@@ -9,13 +9,28 @@ import sys
 import argparse
 from typing import List, Dict
 from dotenv import load_dotenv
-import pdfplumber
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from pinecone import Pinecone, ServerlessSpec
 import requests
 import json
-# Importar sentence-transformers
-from sentence_transformers import SentenceTransformer
+from pathlib import Path
+# Chunking consciente de artículos compartido con la API
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend-api"))
+from articulos_utils import dividir_por_articulos, metadata_pinecone
+import extraccion_pdf
+from reindexado_utils import (
+    asignar_ids_por_contenido, ruta_manifiesto, cargar_manifiesto, guardar_manifiesto,
+    calcular_diferencias, borrar_vectores, purgar_ids_posicionales, actualizar_metadata_posicional,
+    invalidar_caches, conectar_redis_opcional
+)
+# ⚡ Backend de embeddings local (lotes, hilos, cuantización y artefacto .npy)
+import numpy as np
+from embeddings_locales import (
+    EmbeddingsLocales, guardar_artefacto, vectores_por_id,
+    BATCH_SIZE, NUM_HILOS, MODOS_CUANTIZACION
+)
+from indice_local import IndiceVectorialLocal, MODOS_INDICE
+from corpus import DOCUMENTO_POR_DEFECTO
 
 
 def cargar_variables_entorno() -> Dict[str, str]:
@@ -45,44 +60,38 @@ def cargar_variables_entorno() -> Dict[str, str]:
     return variables_requeridas
 
 
-def extraer_texto_pdf(ruta_pdf: str) -> str:
+def extraer_texto_pdf(ruta_pdf: str, max_workers: int = extraccion_pdf.PDF_WORKERS) -> dict:
     """
     Extrae todo el texto de un archivo PDF usando pdfplumber
     
+    Las páginas se extraen en paralelo (pool de procesos) y el resultado se guarda
+    en caché por hash del PDF: una segunda ejecución sobre el mismo PDF no lo vuelve a leer.
+    
     Args:
         ruta_pdf: Ruta al archivo PDF a procesar
+        max_workers: Número de procesos de extracción (1 = secuencial)
         
     Returns:
-        String con todo el texto extraído del PDF
+        Dict con 'texto' (texto completo) y 'paginas' (offsets de carácter de cada página)
     """
     print(f"📄 Abriendo archivo PDF: {ruta_pdf}")
     
     if not os.path.exists(ruta_pdf):
         raise FileNotFoundError(f"❌ El archivo no existe: {ruta_pdf}")
     
-    texto_completo = ""
-    
     try:
-        with pdfplumber.open(ruta_pdf) as pdf:
-            print(f"📖 Procesando {len(pdf.pages)} páginas...")
-            
-            for i, pagina in enumerate(pdf.pages, 1):
-                texto_pagina = pagina.extract_text()
-                if texto_pagina:
-                    texto_completo += texto_pagina + "\n"
-                
-                # Mostrar progreso cada 10 páginas
-                if i % 10 == 0:
-                    print(f"   Procesadas {i}/{len(pdf.pages)} páginas...")
+        extraccion = extraccion_pdf.extraer_texto_pdf(ruta_pdf, motor="pdfplumber", max_workers=max_workers)
         
-        print(f"✅ Texto extraído correctamente ({len(texto_completo)} caracteres)")
-        return texto_completo
+        origen = "caché" if extraccion['desde_cache'] else f"{max_workers} procesos"
+        print(f"📖 {extraccion['num_paginas']} páginas ({origen}, {extraccion['duracion_s']}s)")
+        print(f"✅ Texto extraído correctamente ({len(extraccion['texto'])} caracteres)")
+        return extraccion
     
     except Exception as e:
         raise Exception(f"❌ Error al extraer texto del PDF: {str(e)}")
 
 
-def dividir_texto_en_chunks(texto: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+def dividir_texto_en_chunks(texto: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Dict]:
     """
     Divide el texto en fragmentos usando RecursiveCharacterTextSplitter
     
@@ -92,7 +101,7 @@ def dividir_texto_en_chunks(texto: str, chunk_size: int = 1000, chunk_overlap: i
         chunk_overlap: Superposición entre fragmentos en caracteres
         
     Returns:
-        Lista de fragmentos de texto
+        Lista de fragmentos {'text', 'char_start', 'char_end'} con sus offsets en el texto original
     """
     print(f"✂️  Dividiendo texto en chunks (tamaño: {chunk_size}, overlap: {chunk_overlap})...")
     
@@ -102,11 +111,20 @@ def dividir_texto_en_chunks(texto: str, chunk_size: int = 1000, chunk_overlap: i
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             length_function=len,
-            separators=["\n\n", "\n", " ", ""]
+            separators=["\n\n", "\n", " ", ""],
+            add_start_index=True
         )
         
-        # Dividir el texto en chunks
-        chunks = text_splitter.split_text(texto)
+        # Dividir el texto en chunks conservando el offset de inicio de cada uno
+        documentos = text_splitter.create_documents([texto])
+        chunks = [
+            {
+                'text': doc.page_content,
+                'char_start': doc.metadata['start_index'],
+                'char_end': doc.metadata['start_index'] + len(doc.page_content)
+            }
+            for doc in documentos
+        ]
         
         print(f"✅ Texto dividido en {len(chunks)} fragmentos")
         return chunks
@@ -115,45 +133,133 @@ def dividir_texto_en_chunks(texto: str, chunk_size: int = 1000, chunk_overlap: i
         raise Exception(f"❌ Error al dividir el texto: {str(e)}")
 
 
-def generar_embeddings(chunks: List[str], api_key: str) -> List[List[float]]:
+def dividir_texto_por_articulos(texto: str, chunk_size: int = 1000, chunk_overlap: int = 200,
+                                nombre_archivo: str = "") -> List[Dict]:
+    """
+    Divide el texto en fragmentos que respetan los límites de cada artículo
+    
+    Args:
+        texto: Texto completo a dividir
+        chunk_size: Tamaño máximo de cada fragmento en caracteres
+        chunk_overlap: Superposición entre partes de un mismo artículo
+        nombre_archivo: Nombre del PDF original (para metadata)
+        
+    Returns:
+        Lista de fragmentos con metadata de artículo, parte, offsets y Libro/Título/Capítulo
+    """
+    print(f"✂️  Dividiendo texto por artículos (máx: {chunk_size}, overlap: {chunk_overlap})...")
+    
+    chunks = dividir_por_articulos(texto, chunk_size, chunk_overlap, source=nombre_archivo)
+    num_articulos = len({c['articulo'] for c in chunks if c['articulo']})
+    
+    print(f"✅ Texto dividido en {len(chunks)} fragmentos ({num_articulos} artículos)")
+    return chunks
+
+
+def generar_embeddings(textos: List[str], backend: EmbeddingsLocales) -> List[List[float]]:
     """
     Genera embeddings para cada fragmento de texto usando un modelo local de sentence-transformers
     Args:
-        chunks: Lista de fragmentos de texto
-        api_key: (No se usa, solo por compatibilidad)
+        textos: Lista de fragmentos de texto
+        backend: Backend local (modelo, tamaño de lote, hilos y dispositivo)
     Returns:
         Lista de embeddings (vectores)
     """
-    print("Cargando modelo de embeddings local (all-MiniLM-L6-v2)...")
+    print(f"Cargando modelo de embeddings local ({backend.nombre_modelo})...")
     try:
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        print("Modelo cargado.")
-        print(f"Generando embeddings para {len(chunks)} fragmentos...")
-        embeddings = model.encode(chunks, show_progress_bar=True)
+        print(f"Generando embeddings para {len(textos)} fragmentos (lotes de {backend.batch_size})...")
+        embeddings = backend.codificar(textos, mostrar_progreso=True)
         print(f"✅ Embeddings generados correctamente ({len(embeddings)} vectores)")
-        return embeddings
+        return embeddings.tolist()
     except Exception as e:
         raise Exception(f"❌ Error al generar embeddings con sentence-transformers: {str(e)}")
 
 
+def generar_embeddings_con_artefacto(
+    chunks: List[Dict],
+    nuevos: List[Dict],
+    backend: EmbeddingsLocales,
+    ruta_npy: str,
+    cuantizacion: str
+) -> List[List[float]]:
+    """
+    Mantiene un artefacto .npy con los embeddings de todos los chunks del documento.
+    Reutiliza los vectores del artefacto anterior por id y solo codifica los que faltan.
+    
+    Returns:
+        Embeddings de los chunks nuevos (los que hay que subir a Pinecone)
+    """
+    vectores = vectores_por_id(ruta_npy)
+    faltan = [c for c in chunks if c['id'] not in vectores]
+    print(f"💾 Artefacto {ruta_npy}: {len(chunks) - len(faltan)} vectores reutilizados, {len(faltan)} por calcular")
+    
+    if faltan:
+        calculados = generar_embeddings([c['text'] for c in faltan], backend)
+        vectores.update((c['id'], np.asarray(v, dtype=np.float32)) for c, v in zip(faltan, calculados))
+    
+    matriz = np.stack([vectores[c['id']] for c in chunks])
+    metadata = guardar_artefacto(ruta_npy, matriz, [c['id'] for c in chunks], cuantizacion, backend.nombre_modelo)
+    print(f"✅ Artefacto guardado ({metadata['num_vectores']} x {metadata['dimension']}, {cuantizacion})")
+    return [vectores[c['id']].tolist() for c in nuevos]
+
+
+def construir_indice_local(
+    chunks: List[Dict],
+    ruta_npy: str,
+    directorio: str,
+    modo: str,
+    nombre_archivo: str
+) -> None:
+    """
+    Construye el índice vectorial local a partir del artefacto de embeddings
+    
+    Args:
+        chunks: Todos los fragmentos del documento (con id de contenido)
+        ruta_npy: Artefacto con los embeddings de todos los chunks
+        directorio: Directorio de salida del índice
+        modo: float32 (exacto), int8 o pq (con re-ordenación float32 de la shortlist)
+        nombre_archivo: Nombre del archivo PDF original (para metadata)
+    """
+    print(f"🗂️  Construyendo índice local ({modo}) en {directorio}...")
+    vectores = vectores_por_id(ruta_npy)
+    matriz = np.stack([vectores[c['id']] for c in chunks])
+    metadatas = []
+    for chunk in chunks:
+        metadata = metadata_pinecone(chunk)
+        metadata.update({'text': chunk['text'], 'source': nombre_archivo})
+        metadatas.append(metadata)
+    
+    indice = IndiceVectorialLocal(matriz, [c['id'] for c in chunks], metadatas, modo=modo)
+    indice.guardar(directorio)
+    print(f"✅ Índice local guardado ({len(indice)} vectores, {indice.bytes_residentes() / 1024 / 1024:.1f} MB en memoria)")
+
+
 def subir_a_pinecone(
-    chunks: List[str],
+    chunks: List[Dict],
     embeddings: List[List[float]],
     api_key: str,
     environment: str,
     index_name: str,
-    nombre_archivo: str
+    nombre_archivo: str,
+    ids_obsoletos: List[str] = None,
+    purgar_ids_posicionales_antiguos: bool = False,
+    namespace: str = "",
+    reposicionados: List[Dict] = None
 ) -> None:
     """
     Sube los fragmentos y sus embeddings a Pinecone
     
     Args:
-        chunks: Lista de fragmentos de texto
+        chunks: Lista de fragmentos con sus offsets (ver dividir_texto_en_chunks)
         embeddings: Lista de embeddings correspondientes
         api_key: Clave de API de Pinecone
         environment: Entorno de Pinecone
         index_name: Nombre del índice en Pinecone
         nombre_archivo: Nombre del archivo PDF original (para metadata)
+        ids_obsoletos: Ids de vectores que ya no existen en el documento (se borran)
+        purgar_ids_posicionales_antiguos: Borrar los ids "{archivo}_chunk_N" del esquema antiguo
+        namespace: Namespace de Pinecone del documento ("" = namespace por defecto)
+        reposicionados: Chunks sin cambios de texto cuya metadata posicional hay que actualizar
     """
     print(f"🌲 Conectando con Pinecone (índice: {index_name})...")
     
@@ -186,16 +292,17 @@ def subir_a_pinecone(
         vectores_para_subir = []
         
         for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            # Crear un ID único para cada vector
-            vector_id = f"{nombre_archivo}_chunk_{i}"
+            # ID direccionado por contenido (ver asignar_ids_por_contenido)
+            vector_id = chunk['id']
             
-            # Preparar metadata
-            metadata = {
-                'text': chunk,
+            # Preparar metadata (artículo, parte y estructura si el chunking es por artículos)
+            metadata = metadata_pinecone(chunk)
+            metadata.update({
+                'text': chunk['text'],
                 'source': nombre_archivo,
-                'chunk_id': i,
-                'total_chunks': len(chunks)
-            }
+                'char_start': chunk['char_start'],
+                'char_end': chunk['char_end']
+            })
             
             # Agregar a la lista
             vectores_para_subir.append({
@@ -208,10 +315,22 @@ def subir_a_pinecone(
         batch_size = 100
         for i in range(0, len(vectores_para_subir), batch_size):
             batch = vectores_para_subir[i:i + batch_size]
-            index.upsert(vectors=batch)
+            index.upsert(vectors=batch, namespace=namespace)
             
             print(f"   Subidos {min(i+batch_size, len(vectores_para_subir))}/{len(vectores_para_subir)} vectores...")
         
+        # Chunks desplazados: mismo vector, metadata posicional nueva (offsets, página, partes)
+        if reposicionados:
+            actualizados = actualizar_metadata_posicional(index, reposicionados, namespace)
+            print(f"📝 Metadata posicional actualizada en {actualizados} vectores")
+        
+        # Borrar vectores obsoletos (chunks que cambiaron o desaparecieron)
+        if ids_obsoletos:
+            print(f"🗑️  Borrados {borrar_vectores(index, ids_obsoletos, namespace)} vectores obsoletos")
+        if purgar_ids_posicionales_antiguos:
+            purgados = purgar_ids_posicionales(index, prefijo=f"{nombre_archivo}_chunk_", namespace=namespace)
+            print(f"🗑️  Borrados {purgados} vectores con ids posicionales antiguos")
+        
         # Verificar estadísticas del índice
         stats = index.describe_index_stats()
         print(f"✅ Datos subidos correctamente a Pinecone")
@@ -251,8 +370,77 @@ def main():
         default=200,
         help='Superposición entre fragmentos en caracteres (default: 200)'
     )
+    parser.add_argument(
+        '--chunking',
+        choices=['articulos', 'recursivo'],
+        default='articulos',
+        help='Estrategia de división: por artículos con metadata (default) o RecursiveCharacterTextSplitter'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=extraccion_pdf.PDF_WORKERS,
+        help=f'Procesos para extraer las páginas del PDF (default: {extraccion_pdf.PDF_WORKERS})'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=BATCH_SIZE,
+        help=f'Textos por lote al generar embeddings (default: {BATCH_SIZE})'
+    )
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=NUM_HILOS,
+        help='Hilos de CPU para el modelo de embeddings (default: 0 = automático)'
+    )
+    parser.add_argument(
+        '--embeddings-npy',
+        type=str,
+        default=None,
+        help='Guardar/reutilizar los embeddings de todos los chunks en este fichero .npy'
+    )
+    parser.add_argument(
+        '--cuantizacion',
+        choices=MODOS_CUANTIZACION,
+        default='float32',
+        help='Formato de almacenamiento del artefacto .npy (default: float32)'
+    )
+    parser.add_argument(
+        '--indice-local',
+        type=str,
+        default=None,
+        help='Construir también un índice vectorial local en este directorio (API con VECTOR_BACKEND=local)'
+    )
+    parser.add_argument(
+        '--modo-indice',
+        choices=MODOS_INDICE,
+        default='int8',
+        help='Almacenamiento del índice local: float32 exacto, int8 o pq, con re-ordenación float32 (default: int8)'
+    )
+    parser.add_argument(
+        '--documento',
+        type=str,
+        default=DOCUMENTO_POR_DEFECTO,
+        help=f'Id del documento en el corpus de la API, para invalidar su caché (default: {DOCUMENTO_POR_DEFECTO})'
+    )
+    parser.add_argument(
+        '--namespace',
+        type=str,
+        default='',
+        help='Namespace de Pinecone del documento (default: namespace por defecto)'
+    )
+    parser.add_argument(
+        '--manifest-dir',
+        type=str,
+        default='.',
+        help='Directorio del manifiesto (id, hash) para el reindexado incremental (default: .)'
+    )
     
     args = parser.parse_args()
+    if args.indice_local and not args.embeddings_npy:
+        # El índice local necesita los vectores de todos los chunks: se guardan junto a él
+        args.embeddings_npy = os.path.join(args.indice_local, 'embeddings.npy')
     
     try:
         # Paso 1: Cargar variables de entorno
@@ -260,7 +448,8 @@ def main():
         print()
         
         # Paso 2: Extraer texto del PDF
-        texto = extraer_texto_pdf(args.pdf_path)
+        extraccion = extraer_texto_pdf(args.pdf_path, args.workers)
+        texto = extraccion['texto']
         print()
         
         # Validar que se extrajo texto
@@ -268,23 +457,63 @@ def main():
             raise ValueError("❌ No se pudo extraer texto del PDF. El archivo puede estar vacío o corrupto.")
         
         # Paso 3: Dividir texto en chunks
-        chunks = dividir_texto_en_chunks(texto, args.chunk_size, args.chunk_overlap)
+        nombre_archivo = os.path.basename(args.pdf_path)
+        if args.chunking == 'articulos':
+            chunks = dividir_texto_por_articulos(texto, args.chunk_size, args.chunk_overlap, nombre_archivo)
+        else:
+            chunks = dividir_texto_en_chunks(texto, args.chunk_size, args.chunk_overlap)
+        chunks = asignar_ids_por_contenido(chunks, nombre_archivo)
+        extraccion_pdf.anotar_paginas(chunks, extraccion['paginas'])
         print()
         
-        # Paso 4: Generar embeddings
-        embeddings = generar_embeddings(chunks, variables['GOOGLE_API_KEY'])
+        # Paso 3b: Reindexado incremental contra el manifiesto de la última ejecución
+        indice_manifiesto = variables['PINECONE_INDEX_NAME'] + (f"_{args.namespace}" if args.namespace else "")
+        manifest_path = ruta_manifiesto(args.manifest_dir, indice_manifiesto, nombre_archivo)
+        manifiesto = cargar_manifiesto(manifest_path)
+        diferencias = calcular_diferencias(chunks, manifiesto)
+        nuevos = diferencias['nuevos']
+        print(f"🧮 Nuevos o modificados: {len(nuevos)} | Sin cambios: {diferencias['sin_cambios']} | "
+              f"Reposicionados: {len(diferencias['reposicionados'])} | Obsoletos: {len(diferencias['obsoletos'])} | Artículos afectados: {len(diferencias['articulos_afectados'])}")
+        
+        artefacto_pendiente = (args.embeddings_npy and not os.path.exists(args.embeddings_npy)) or \
+            (args.indice_local and not os.path.exists(os.path.join(args.indice_local, 'config.json')))
+        if not nuevos and not diferencias['obsoletos'] and not diferencias['reposicionados'] \
+                and not artefacto_pendiente:
+            print("✅ El índice ya está al día - nada que hacer")
+            return
+        print()
+        
+        # Paso 4: Generar embeddings solo de los chunks nuevos
+        backend = EmbeddingsLocales(batch_size=args.batch_size, num_hilos=args.threads)
+        if args.embeddings_npy:
+            embeddings = generar_embeddings_con_artefacto(chunks, nuevos, backend, args.embeddings_npy, args.cuantizacion)
+        else:
+            embeddings = generar_embeddings([c['text'] for c in nuevos], backend) if nuevos else []
         print()
         
         # Paso 5 y 6: Conectar y subir a Pinecone
-        nombre_archivo = os.path.basename(args.pdf_path)
         subir_a_pinecone(
-            chunks=chunks,
+            chunks=nuevos,
             embeddings=embeddings,
             api_key=variables['PINECONE_API_KEY'],
             environment=variables['PINECONE_ENVIRONMENT'],
             index_name=variables['PINECONE_INDEX_NAME'],
-            nombre_archivo=nombre_archivo
+            nombre_archivo=nombre_archivo,
+            ids_obsoletos=diferencias['obsoletos'],
+            purgar_ids_posicionales_antiguos=manifiesto is None,
+            namespace=args.namespace,
+            reposicionados=diferencias['reposicionados']
         )
+        guardar_manifiesto(manifest_path, chunks, nombre_archivo)
+        
+        # Paso 6b: Índice vectorial local (mismos ids y metadata que en Pinecone)
+        if args.indice_local:
+            construir_indice_local(chunks, args.embeddings_npy, args.indice_local, args.modo_indice, nombre_archivo)
+        
+        # Paso 7: Invalidar cachés solo de los artículos afectados
+        if manifiesto is not None and diferencias['articulos_afectados']:
+            invalidar_caches(diferencias['articulos_afectados'], conectar_redis_opcional(),
+                             os.getenv('API_URL'), documento=args.documento)
         print()
         
         # Resumen final
@@ -293,8 +522,8 @@ def main():
         print("=" * 60)
         print(f"📄 Archivo procesado: {nombre_archivo}")
         print(f"📊 Total de fragmentos: {len(chunks)}")
-        print(f"🤖 Embeddings generados: {len(embeddings)}")
-        print(f"🌲 Índice Pinecone: {variables['PINECONE_INDEX_NAME']}")
+        print(f"🤖 Embeddings generados: {len(embeddings)} (reutilizados: {diferencias['sin_cambios']})")
+        print(f"🌲 Índice Pinecone: {variables['PINECONE_INDEX_NAME']} (namespace: '{args.namespace}')")
         print("=" * 60)
     
     except FileNotFoundError as e:
@@ -0,0 +1,108 @@
+"""
+Benchmark del índice vectorial local (float32 vs int8 vs PQ)
+Mide recall@k frente al índice exacto float32, latencia por consulta (p50/p95)
+y memoria residente, con y sin re-ordenación float32 de la shortlist.
+
+Corpus:
+  --embeddings-npy: artefacto generado por procesar_pdf.py --embeddings-npy (Código Penal)
+  sin argumento:    matriz sintética agrupada del mismo tamaño aproximado
+
+Consultas:
+  --consultas fichero.txt: una consulta por línea, codificadas con el modelo local
+  sin argumento:           vectores del corpus con ruido (simulan paráfrasis)
+
+Uso: python scripts/benchmark_indice_local.py [--embeddings-npy cp.npy] [--consultas q.txt] [--top-k 10]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend-api"))
+
+from indice_local import IndiceVectorialLocal, recall_at_k
+from embeddings_locales import cargar_artefacto, EmbeddingsLocales, MODELO_LOCAL
+
+
+def corpus_sintetico(n: int = 3000, dim: int = 384, grupos: int = 80, seed: int = 0) -> np.ndarray:
+    """Vectores agrupados por 'temas' (como artículos de un mismo título)"""
+    rng = np.random.default_rng(seed)
+    centros = rng.normal(size=(grupos, dim)).astype(np.float32)
+    matriz = centros[rng.integers(grupos, size=n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return matriz / np.linalg.norm(matriz, axis=1, keepdims=True)
+
+
+def consultas_con_ruido(matriz: np.ndarray, num: int, ruido: float = 0.3, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    consultas = matriz[rng.integers(len(matriz), size=num)] + ruido * rng.normal(size=(num, matriz.shape[1]))
+    return (consultas / np.linalg.norm(consultas, axis=1, keepdims=True)).astype(np.float32)
+
+
+def medir(indice: IndiceVectorialLocal, consultas: np.ndarray, top_k: int, reordenar: bool = True) -> tuple:
+    """(resultados, latencias en ms)"""
+    resultados, latencias = [], []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        matches = indice.buscar(consulta, top_k, reordenar=reordenar)['matches']
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        resultados.append([m['id'] for m in matches])
+    return resultados, latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del índice vectorial local')
+    parser.add_argument('--embeddings-npy', type=str, default=None)
+    parser.add_argument('--consultas', type=str, default=None)
+    parser.add_argument('--num-consultas', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--pq-subespacios', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.embeddings_npy:
+        matriz, ids, metadata = cargar_artefacto(args.embeddings_npy, mmap=False)
+        modelo = metadata['modelo'] or MODELO_LOCAL
+        print(f"📄 Corpus: {args.embeddings_npy} ({len(ids)} chunks, {modelo})")
+    else:
+        modelo = MODELO_LOCAL
+        matriz = corpus_sintetico()
+        ids = [f"chunk-{i}" for i in range(len(matriz))]
+        print(f"📄 Corpus sintético: {len(ids)} vectores x {matriz.shape[1]} dims")
+
+    if args.consultas:
+        with open(args.consultas, 'r', encoding='utf-8') as f:
+            textos = [linea.strip() for linea in f if linea.strip()]
+        consultas = EmbeddingsLocales(modelo=modelo).codificar(textos)
+    else:
+        consultas = consultas_con_ruido(matriz, args.num_consultas)
+    print(f"🔍 {len(consultas)} consultas, top_k={args.top_k}\n")
+
+    exacto = IndiceVectorialLocal(matriz, ids, modo="float32")
+    resultados_exactos, latencias_exacto = medir(exacto, consultas, args.top_k)
+
+    print(f"{'Modo':<22}{'Construcción':>14}{'Memoria':>12}{'R@5':>8}{'R@' + str(args.top_k):>8}{'p50 ms':>10}{'p95 ms':>10}")
+    print("-" * 84)
+
+    def fila(nombre, indice, construccion, resultados, latencias):
+        memoria = indice.bytes_residentes() / 1024 / 1024
+        print(f"{nombre:<22}{construccion:>13.2f}s{memoria:>10.2f}MB"
+              f"{recall_at_k(resultados_exactos, resultados, min(5, args.top_k)):>8.3f}"
+              f"{recall_at_k(resultados_exactos, resultados, args.top_k):>8.3f}"
+              f"{np.percentile(latencias, 50):>10.3f}{np.percentile(latencias, 95):>10.3f}")
+
+    fila("float32 (exacto)", exacto, 0.0, resultados_exactos, latencias_exacto)
+    for modo in ("int8", "pq"):
+        inicio = time.perf_counter()
+        indice = IndiceVectorialLocal(matriz, ids, modo=modo, pq_subespacios=args.pq_subespacios)
+        construccion = time.perf_counter() - inicio
+        for reordenar in (False, True):
+            resultados, latencias = medir(indice, consultas, args.top_k, reordenar)
+            nombre = f"{modo} + rerank f32" if reordenar else f"{modo} (sin rerank)"
+            fila(nombre, indice, construccion, resultados, latencias)
+
+    print("\nMemoria: en int8/PQ los vectores float32 de re-ordenación se leen del disco (mmap) y no cuentan.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark de la unión de fragmentos en reconstruir_articulos_completos
+Compara el bucle original O(overlap²) con la unión lineal y el cosido por offsets
+sobre artículos sintéticos de 30 chunks.
+
+Uso: python scripts/benchmark_reconstruccion.py [--repeticiones N]
+"""
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend-api"))
+
+from reconstruccion_utils import unir_fragmentos, unir_por_offsets
+
+PALABRAS = (
+    "el que matare a otro será castigado como reo de homicidio con la pena de prisión "
+    "de diez a quince años los hechos serán castigados con la pena superior en grado"
+).split()
+
+
+def unir_original(partes: list) -> str:
+    """Implementación original (bucle de sufijos de 200 a 1)"""
+    textos_combinados = []
+    texto_previo = ""
+    for parte in partes:
+        texto_actual = parte['texto']
+        if texto_previo:
+            overlap_length = min(200, len(texto_previo), len(texto_actual))
+            for i in range(overlap_length, 0, -1):
+                if texto_previo[-i:] == texto_actual[:i]:
+                    texto_actual = texto_actual[i:]
+                    break
+        textos_combinados.append(texto_actual)
+        texto_previo = texto_actual
+    return "".join(textos_combinados)
+
+
+def generar_partes(num_chunks: int, chunk_size: int, overlap: int, seed: int = 0) -> tuple:
+    """Genera un texto y sus chunks solapados con offsets"""
+    random.seed(seed)
+    paso = chunk_size - overlap
+    longitud = paso * num_chunks + overlap
+    texto = ""
+    while len(texto) < longitud:
+        texto += random.choice(PALABRAS) + " "
+    texto = texto[:longitud]
+
+    partes = []
+    for i in range(num_chunks):
+        inicio = i * paso
+        fin = inicio + chunk_size
+        partes.append({
+            'chunk_index': i,
+            'texto': texto[inicio:fin],
+            'char_start': inicio,
+            'char_end': fin,
+        })
+    return texto, partes
+
+
+def medir(funcion, partes: list, repeticiones: int) -> float:
+    """Tiempo medio en milisegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(partes)
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de unión de fragmentos (30 chunks)')
+    parser.add_argument('--repeticiones', type=int, default=200)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("⏱️  BENCHMARK DE RECONSTRUCCIÓN DE ARTÍCULOS (30 chunks)")
+    print("=" * 70)
+
+    for chunk_size, overlap in [(800, 100), (1000, 200), (800, 0)]:
+        texto, partes = generar_partes(30, chunk_size, overlap)
+        sin_offsets = [{k: v for k, v in p.items() if k not in ('char_start', 'char_end')} for p in partes]
+
+        assert unir_por_offsets(partes) == texto
+        assert unir_fragmentos(sin_offsets) == unir_original(sin_offsets)
+
+        t_original = medir(unir_original, sin_offsets, args.repeticiones)
+        t_lineal = medir(unir_fragmentos, sin_offsets, args.repeticiones)
+        t_offsets = medir(unir_fragmentos, partes, args.repeticiones)
+
+        print(f"\n📊 chunk_size={chunk_size}, overlap={overlap}")
+        print(f"   - Original (sufijos 200→1): {t_original:.3f} ms")
+        print(f"   - Solapamiento lineal:      {t_lineal:.3f} ms ({t_original / t_lineal:.1f}x)")
+        print(f"   - Cosido por offsets:       {t_offsets:.3f} ms ({t_original / t_offsets:.1f}x)")
+
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Replay de consultas reales contra las claves de caché
+Compara la tasa de aciertos de cada capa de caché con las claves anteriores
+(texto literal o normalización ad hoc) y con la forma canónica de
+normalizacion_consultas, reproduciendo las consultas en orden sobre una LRU
+de la capacidad indicada.
+
+Capas:
+  - chat: single-flight de /chat (firma de la consulta)
+  - embeddings: caché de vectores de consulta (forma canónica)
+  - respuestas: respuesta formateada de un artículo (número canónico detectado)
+
+Uso:
+  python scripts/replay_claves_cache.py consultas.txt [--capacidad N]
+  python scripts/replay_claves_cache.py consultas.jsonl       # campo query/pregunta/content
+  python scripts/replay_claves_cache.py --postgresql [--limite N]  # mensajes de usuario guardados
+"""
+import re
+import sys
+import json
+import argparse
+from collections import OrderedDict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend-api"))
+
+from normalizacion_consultas import normalizar_consulta, firma_consulta, numero_canonico
+
+# Patrón de detección de artículo de generate_rag_response
+ARTICULO_PATTERN = r'\b(?:art[íi]culo|art\.?)\s*(\d+(?:\s+bis|\s+ter|\s+quater)?)\b'
+SOLO_NUMERO_PATTERN = r'^\s*(\d+(?:\s+bis|\s+ter|\s+quater)?)\s*$'
+CAMPOS_JSON = ("query", "pregunta", "content", "message")
+
+
+def clave_chat_anterior(query: str) -> str:
+    """Normalización de clave_consulta antes de la forma canónica"""
+    return re.sub(r'\s+', ' ', query.lower()).strip(' ¿?¡!.')
+
+
+def articulo_anterior(query: str):
+    match = re.search(ARTICULO_PATTERN, query, re.IGNORECASE) or re.match(SOLO_NUMERO_PATTERN, query)
+    return match.group(1) if match else None
+
+
+def articulo_canonico(query: str):
+    canonica = normalizar_consulta(query)
+    match = re.search(ARTICULO_PATTERN, canonica, re.IGNORECASE) or re.match(SOLO_NUMERO_PATTERN, canonica)
+    return numero_canonico(match.group(1)) if match else None
+
+
+CAPAS = {
+    "chat": (clave_chat_anterior, firma_consulta),
+    "embeddings": (lambda q: q, normalizar_consulta),
+    "respuestas": (articulo_anterior, articulo_canonico),
+}
+
+
+def simular(claves: list, capacidad: int = 0) -> dict:
+    """Aciertos de una LRU (capacidad 0 = ilimitada) al reproducir las claves en orden; None = no cacheable"""
+    lru = OrderedDict()
+    aciertos = consultas = 0
+    for clave in claves:
+        if clave is None:
+            continue
+        consultas += 1
+        if clave in lru:
+            aciertos += 1
+            lru.move_to_end(clave)
+            continue
+        lru[clave] = True
+        if capacidad and len(lru) > capacidad:
+            lru.popitem(last=False)
+    return {
+        "consultas": consultas,
+        "claves_distintas": len(set(c for c in claves if c is not None)),
+        "aciertos": aciertos,
+        "tasa": aciertos / consultas if consultas else 0.0,
+    }
+
+
+def replay(consultas: list, capacidad: int = 0) -> dict:
+    """{capa: {'anterior': simular(...), 'canonica': simular(...)}}"""
+    return {
+        capa: {
+            "anterior": simular([anterior(q) for q in consultas], capacidad),
+            "canonica": simular([canonica(q) for q in consultas], capacidad),
+        }
+        for capa, (anterior, canonica) in CAPAS.items()
+    }
+
+
+def leer_fichero(ruta: str) -> list:
+    consultas = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.rstrip("\n")
+            if not linea.strip():
+                continue
+            if ruta.endswith(".jsonl"):
+                registro = json.loads(linea)
+                linea = next((registro[c] for c in CAMPOS_JSON if registro.get(c)), "")
+            if linea:
+                consultas.append(linea)
+    return consultas
+
+
+def leer_postgresql(limite: int) -> list:
+    from database import get_db_session
+    from models import Message
+    db = get_db_session()
+    try:
+        mensajes = db.query(Message.content).filter(Message.role == "user")\
+            .order_by(Message.created_at).limit(limite).all()
+        return [m.content for m in mensajes]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de consultas: aciertos con claves anteriores y canónicas")
+    parser.add_argument("ficheros", nargs="*", help=".txt (una consulta por línea) o .jsonl")
+    parser.add_argument("--postgresql", action="store_true", help="Usar los mensajes de usuario guardados")
+    parser.add_argument("--limite", type=int, default=100000, help="Máximo de mensajes leídos de PostgreSQL")
+    parser.add_argument("--capacidad", type=int, default=0, help="Entradas de la LRU simulada (0 = ilimitada)")
+    args = parser.parse_args()
+
+    consultas = []
+    for ruta in args.ficheros:
+        consultas.extend(leer_fichero(ruta))
+    if args.postgresql:
+        consultas.extend(leer_postgresql(args.limite))
+    if not consultas:
+        parser.error("no hay consultas: indica ficheros o --postgresql")
+
+    print(f"🔁 Replay de {len(consultas)} consultas (LRU: {args.capacidad or 'ilimitada'})\n")
+    print(f"{'Capa':<12} {'Consultas':>10} {'Claves ant.':>12} {'Claves can.':>12} {'Aciertos ant.':>14} {'Aciertos can.':>14}")
+    for capa, resultado in replay(consultas, args.capacidad).items():
+        anterior, canonica = resultado["anterior"], resultado["canonica"]
+        print(
+            f"{capa:<12} {canonica['consultas']:>10} {anterior['claves_distintas']:>12} {canonica['claves_distintas']:>12} "
+            f"{anterior['tasa']:>13.1%} {canonica['tasa']:>13.1%}"
+        )
+    print("\n(respuestas: solo consultas que nombran un artículo; con la clave anterior algunas no se detectaban)")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,12 @@ from main import (
     get_cached_articulo, 
     set_cached_articulo, 
     get_cache_stats,
-    ARTICULOS_CACHE
+    REGISTRO_CORPUS
 )
+from corpus import clave_articulo, DOCUMENTO_POR_DEFECTO
+from cache_redis import codificar
+
+ARTICULOS_CACHE = REGISTRO_CORPUS.articulos()  # Índice del documento por defecto
 
 def print_header(text):
     """Imprimir encabezado bonito"""
@@ -78,7 +82,7 @@ def test_3_guardar_articulo():
     
     if success:
         print(f"✅ Guardado exitoso en {elapsed:.2f}ms")
-        print(f"   Clave: articulo:{articulo_num}")
+        print(f"   Clave: {clave_articulo(DOCUMENTO_POR_DEFECTO, articulo_num)}")
         print(f"   TTL: 86400 segundos (24 horas)")
     else:
         print("❌ Error al guardar")
@@ -149,17 +153,17 @@ def test_5_performance():
     # Limpiar
     print(f"\n🧹 Limpiando artículos de prueba...")
     for i in range(200, 200 + num_operaciones):
-        REDIS_CLIENT.delete(f"articulo:{i}")
+        REDIS_CLIENT.delete(clave_articulo(DOCUMENTO_POR_DEFECTO, i))
     print("✅ Limpieza completada")
 
 def test_6_ttl():
     """Test 6: Probar expiración automática (TTL)"""
     print_header("TEST 6: TTL (TIME TO LIVE)")
     
-    test_key = "articulo:999"
+    test_key = clave_articulo(DOCUMENTO_POR_DEFECTO, "999")
     
     print("\n⏰ Creando artículo con TTL de 5 segundos...")
-    REDIS_CLIENT.setex(test_key, 5, '{"numero": "999", "texto": "Test de TTL"}')
+    REDIS_CLIENT.setex(test_key, 5, codificar({"numero": "999", "texto": "Test de TTL"}))
     print("✅ Artículo creado")
     
     # Verificar que existe
@@ -198,18 +202,18 @@ def test_7_multiples_articulos():
     print("✅ Artículos cacheados")
     
     print("\n🔍 Listando artículos en Redis:")
-    keys = REDIS_CLIENT.keys("articulo:*")
+    keys = [k.decode() for k in REDIS_CLIENT.keys(clave_articulo(DOCUMENTO_POR_DEFECTO, "*"))]  # Cliente binario
     print(f"   Total de artículos en caché: {len(keys)}")
     
     if len(keys) <= 10:
         print("\n   📋 Artículos encontrados:")
         for key in sorted(keys):
-            numero = key.replace("articulo:", "")
+            numero = key.replace(clave_articulo(DOCUMENTO_POR_DEFECTO, ""), "")
             print(f"      • Artículo {numero}")
     else:
         print(f"\n   📋 Mostrando primeros 10 artículos:")
         for key in sorted(keys)[:10]:
-            numero = key.replace("articulo:", "")
+            numero = key.replace(clave_articulo(DOCUMENTO_POR_DEFECTO, ""), "")
             print(f"      • Artículo {numero}")
         print(f"      ... y {len(keys) - 10} más")
 
@@ -218,7 +222,7 @@ def test_8_limpiar_cache():
     print_header("TEST 8: LIMPIAR CACHÉ")
     
     # Contar claves antes
-    keys_before = len(REDIS_CLIENT.keys("articulo:*"))
+    keys_before = len(REDIS_CLIENT.keys(clave_articulo(DOCUMENTO_POR_DEFECTO, "*")))
     print(f"\n📊 Artículos en caché antes: {keys_before}")
     
     if keys_before > 0:
@@ -226,11 +230,11 @@ def test_8_limpiar_cache():
         
         if respuesta.lower() == 's':
             print("\n🧹 Limpiando caché...")
-            keys = REDIS_CLIENT.keys("articulo:*")
+            keys = REDIS_CLIENT.keys(clave_articulo(DOCUMENTO_POR_DEFECTO, "*"))
             for key in keys:
                 REDIS_CLIENT.delete(key)
             
-            keys_after = len(REDIS_CLIENT.keys("articulo:*"))
+            keys_after = len(REDIS_CLIENT.keys(clave_articulo(DOCUMENTO_POR_DEFECTO, "*")))
             print(f"✅ Caché limpiado")
             print(f"   • Artículos eliminados: {keys_before - keys_after}")
             print(f"   • Artículos restantes: {keys_after}")
@@ -11,8 +11,11 @@ from main import (
     get_cached_articulo, 
     set_cached_articulo, 
     get_cache_stats,
-    ARTICULOS_CACHE
+    REGISTRO_CORPUS
 )
+from corpus import clave_articulo, DOCUMENTO_POR_DEFECTO
+
+ARTICULOS_CACHE = REGISTRO_CORPUS.articulos()  # Índice del documento por defecto
 
 print("\n" + "="*60)
 print("🗄️  TEST DE REDIS EN VIVO")
@@ -92,7 +95,7 @@ print(f"   Memoria usada: {final_stats.get('memory_used', 'N/A')}")
 print("\n🧹 Limpiando datos de prueba...")
 if REDIS_CLIENT:
     for i in range(100, 150):
-        REDIS_CLIENT.delete(f"articulo:{i}")
+        REDIS_CLIENT.delete(clave_articulo(DOCUMENTO_POR_DEFECTO, i))
     print("   ✅ Datos de prueba eliminados")
 
 print("\n" + "="*60)
@@ -0,0 +1,129 @@
+"""
+TESTS PARA EL AGRUPADOR DE EMBEDDINGS (MICRO-BATCHING)
+Valida que las peticiones concurrentes se resuelven con pocas llamadas por
+lotes, que cada una recibe su vector y que los errores llegan a todo el lote
+"""
+
+import pytest
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from agrupador_embeddings import AgrupadorEmbeddings, CacheEmbeddings
+
+
+class ModeloFalso:
+    """embed_fn que registra el tamaño de cada llamada; el vector es [len(texto)]"""
+
+    def __init__(self):
+        self.llamadas = []
+        self._lock = threading.Lock()
+
+    def __call__(self, textos):
+        with self._lock:
+            self.llamadas.append(list(textos))
+        return [[float(len(t))] for t in textos]
+
+
+def consultas_concurrentes(agrupador, textos):
+    with ThreadPoolExecutor(max_workers=len(textos)) as pool:
+        return list(pool.map(agrupador.embed_query, textos))
+
+
+def test_peticiones_concurrentes_se_agrupan():
+    modelo = ModeloFalso()
+    agrupador = AgrupadorEmbeddings(modelo, ventana_ms=50, max_lote=64)
+    textos = [f"consulta {'x' * i}" for i in range(20)]
+
+    vectores = consultas_concurrentes(agrupador, textos)
+    agrupador.cerrar()
+
+    assert vectores == [[float(len(t))] for t in textos]
+    assert len(modelo.llamadas) < len(textos)
+    stats = agrupador.estadisticas()
+    assert stats["peticiones"] == 20
+    assert stats["llamadas_ahorradas"] == 20 - stats["lotes"]
+    print(f"✅ 20 peticiones en {stats['lotes']} llamadas (tamaño medio {stats['tamano_medio_lote']})")
+
+
+def test_tamano_maximo_de_lote():
+    modelo = ModeloFalso()
+    agrupador = AgrupadorEmbeddings(modelo, ventana_ms=200, max_lote=4)
+
+    consultas_concurrentes(agrupador, [f"t{i}" for i in range(10)])
+    agrupador.cerrar()
+
+    assert all(len(llamada) <= 4 for llamada in modelo.llamadas)
+    assert sum(len(llamada) for llamada in modelo.llamadas) == 10
+    print("✅ Ningún lote supera max_lote")
+
+
+def test_textos_repetidos_se_calculan_una_vez():
+    modelo = ModeloFalso()
+    agrupador = AgrupadorEmbeddings(modelo, ventana_ms=100, max_lote=64)
+
+    vectores = agrupador.embed(["homicidio", "robo", "homicidio"])
+    agrupador.cerrar()
+
+    assert vectores == [[9.0], [4.0], [9.0]]
+    assert sorted(sum(modelo.llamadas, [])) == ["homicidio", "robo"]
+    print("✅ Deduplicación dentro del lote")
+
+
+def test_error_llega_a_todo_el_lote():
+    def fallar(textos):
+        raise RuntimeError("cuota agotada")
+
+    agrupador = AgrupadorEmbeddings(fallar, ventana_ms=50)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futuros = [pool.submit(agrupador.embed_query, t) for t in ("a", "b", "c")]
+        for futuro in futuros:
+            with pytest.raises(RuntimeError):
+                futuro.result()
+    agrupador.cerrar()
+    assert agrupador.estadisticas()["errores"] >= 1
+    print("✅ Errores propagados a las peticiones del lote")
+
+
+def test_respuesta_con_numero_incorrecto_de_vectores():
+    agrupador = AgrupadorEmbeddings(lambda textos: [], ventana_ms=1)
+    with pytest.raises(ValueError):
+        agrupador.embed_query("robo")
+    agrupador.cerrar()
+    print("✅ Lote incompleto detectado")
+
+
+def test_ventana_cero_llama_directamente():
+    modelo = ModeloFalso()
+    agrupador = AgrupadorEmbeddings(modelo, ventana_ms=0)
+
+    assert agrupador.embed_query("hurto") == [5.0]
+    assert agrupador._hilo is None
+    assert agrupador.estadisticas()["lotes"] == 1
+    agrupador.cerrar()
+    print("✅ Agrupación desactivada con ventana 0")
+
+
+def test_cache_embeddings_por_forma_canonica():
+    modelo = ModeloFalso()
+    cache = CacheEmbeddings(lambda texto: modelo([texto])[0], max_entradas=2)
+
+    assert cache.embed_query("Artículo 142") == [12.0]
+    assert cache.embed_query("art. 142") == [12.0]  # Misma clave canónica: sin llamada
+    assert len(modelo.llamadas) == 1
+
+    cache.embed_query("hurto")
+    cache.embed_query("robo")  # Expulsa "articulo 142" (LRU de 2)
+    cache.embed_query("ART 142")
+    assert len(modelo.llamadas) == 4
+    assert cache.estadisticas()["aciertos"] == 1
+    print("✅ Variantes de la misma consulta reutilizan el vector (LRU)")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,123 @@
+"""
+TESTS PARA CHUNKING CONSCIENTE DE ARTÍCULOS
+Valida la localización de artículos, la estructura Libro/Título/Capítulo y la metadata de chunks
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from articulos_utils import (
+    localizar_articulos, construir_indice_articulos, dividir_por_articulos,
+    metadata_pinecone, filtro_articulo
+)
+
+
+TEXTO_CP = """CÓDIGO PENAL
+Preámbulo del texto consolidado.
+LIBRO II
+Delitos y sus penas
+TÍTULO I
+Del homicidio y sus formas
+Artículo 138.
+1. El que matare a otro será castigado, como reo de homicidio, con la pena de prisión de diez a quince años.
+Artículo 139.
+1. Será castigado con la pena de prisión de quince a veinticinco años, como reo de asesinato, el que matare
+a otro concurriendo alguna de las circunstancias siguientes: con alevosía; por precio, recompensa o promesa.
+Artículo 142 bis.
+En los casos previstos en el artículo anterior se podrá imponer la pena superior en grado.
+TÍTULO II
+Del aborto
+CAPÍTULO I
+Disposiciones generales
+Artículo 144.
+""" + "El que produzca el aborto de una mujer, sin su consentimiento, será castigado. " * 30
+
+
+def test_localiza_articulos_y_estructura():
+    """Detecta encabezados a principio de línea y su Libro/Título/Capítulo"""
+    articulos = localizar_articulos(TEXTO_CP)
+    numeros = [a['numero'] for a in articulos]
+
+    assert numeros == ['138', '139', '142 bis', '144']
+    assert articulos[0]['libro'] == "LIBRO II. Delitos y sus penas"
+    assert articulos[0]['titulo'] == "TÍTULO I. Del homicidio y sus formas"
+    assert articulos[0]['capitulo'] is None
+    assert articulos[3]['titulo'] == "TÍTULO II. Del aborto"
+    assert articulos[3]['capitulo'] == "CAPÍTULO I. Disposiciones generales"
+    print(f"✅ Artículos localizados: {numeros}")
+
+
+def test_referencias_internas_no_son_articulos():
+    """'el artículo anterior' o 'artículo 138' dentro del texto no abren un artículo nuevo"""
+    texto = "Artículo 140.\nLas penas del artículo 138. se impondrán en su mitad superior.\n"
+    assert [a['numero'] for a in localizar_articulos(texto)] == ['140']
+
+
+def test_encabezados_en_mayusculas_y_sufijos_latinos():
+    """'ARTÍCULO 140.', 'Artículo 12 quinquies.' y 'Artículo 143' sin punto abren artículo"""
+    texto = ("ARTÍCULO 140.\nTexto.\nArtículo 12 quinquies.\nTexto.\n"
+             "Artículo 143\nTexto.\nArtículo 144 - Aborto\nTexto.\n")
+    assert [a['numero'] for a in localizar_articulos(texto)] == ['140', '12 quinquies', '143', '144']
+
+
+def test_menciones_laxas_para_los_encabezados_perdidos():
+    """Un encabezado pegado a la línea anterior se recupera si encaja en el orden del documento"""
+    texto = ("Artículo 138.\nEl que matare a otro. Artículo 139. Será castigado con las penas del artículo 138.\n"
+             "Artículo 140.\nLo dispuesto en el artículo 150. no se aplica.\nArtículo 141.\nTexto.\n")
+    indice = construir_indice_articulos(texto)
+    assert list(indice) == ['138', '139', '140', '141']  # '150' está fuera de orden: es una referencia
+    assert indice['139'].startswith("Artículo 139.")
+    print("✅ Encabezados perdidos por el patrón estricto recuperados en orden")
+
+
+def test_articulo_termina_antes_del_siguiente_titulo():
+    """El texto de un artículo no incluye el encabezado del título siguiente"""
+    indice = construir_indice_articulos(TEXTO_CP)
+    assert "TÍTULO II" not in indice['142 bis']
+    assert indice['138'].startswith("Artículo 138.")
+
+
+def test_chunks_no_cruzan_articulos():
+    """Ningún chunk contiene texto de dos artículos distintos"""
+    chunks = dividir_por_articulos(TEXTO_CP, chunk_size=300, overlap=50, source="cp.pdf")
+    for chunk in chunks:
+        assert TEXTO_CP[chunk['char_start']:chunk['char_end']] == chunk['text']
+        if chunk['articulo']:
+            assert chunk['text'].count("Artículo ") <= 1
+    print(f"✅ {len(chunks)} chunks con offsets exactos")
+
+
+def test_metadata_de_partes():
+    """Los artículos largos se dividen en partes numeradas con total_partes"""
+    chunks = dividir_por_articulos(TEXTO_CP, chunk_size=300, overlap=50)
+    partes_144 = [c for c in chunks if c['articulo'] == '144']
+
+    assert len(partes_144) > 1
+    assert [c['parte'] for c in partes_144] == list(range(1, len(partes_144) + 1))
+    assert all(c['total_partes'] == len(partes_144) for c in partes_144)
+    assert all(c['capitulo'] == "CAPÍTULO I. Disposiciones generales" for c in partes_144)
+    assert partes_144[0]['text'].startswith("Artículo 144.")
+
+
+def test_metadata_pinecone_sin_nulos():
+    """La metadata enviada a Pinecone no contiene valores nulos"""
+    chunks = dividir_por_articulos(TEXTO_CP)
+    for chunk in chunks:
+        metadata = metadata_pinecone(chunk)
+        assert None not in metadata.values()
+        assert 'text' in metadata
+
+
+def test_filtro_articulo():
+    """Filtro de metadata para Pinecone"""
+    assert filtro_articulo("142  bis ") == {"articulo": {"$eq": "142 bis"}}
+    assert filtro_articulo(None) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
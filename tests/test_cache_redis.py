@@ -0,0 +1,183 @@
+"""
+TESTS PARA LA CACHÉ REDIS EN BLOQUE
+Valida la codificación binaria (msgpack/JSON + zlib), la compatibilidad con los
+valores JSON antiguos y las operaciones MGET/pipeline con un cliente en memoria
+"""
+
+import pytest
+import sys
+import json
+import time
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+import cache_redis
+from cache_redis import CacheArticulos, codificar, decodificar, clave_indice
+from corpus import clave_articulo
+
+
+class RedisEnMemoria:
+    """Subconjunto de comandos de Redis usado por CacheArticulos; cuenta los viajes de red"""
+
+    def __init__(self):
+        self.valores = {}
+        self.zsets = {}
+        self.viajes = 0
+
+    def mget(self, claves):
+        self.viajes += 1
+        return [self.valores.get(c) for c in claves]
+
+    def get(self, clave):
+        self.viajes += 1
+        return self.valores.get(clave)
+
+    def set(self, clave, valor, nx=False, ex=None):
+        self.viajes += 1
+        if nx and clave in self.valores:
+            return None
+        self.valores[clave] = valor.encode("utf-8") if isinstance(valor, str) else valor
+        return True
+
+    def delete(self, *claves):
+        self.viajes += 1
+        return sum(self.valores.pop(c, None) is not None for c in claves)
+
+    def eval(self, script, num_claves, clave, token):
+        """Solo el compare-and-delete de liberar_lock"""
+        self.viajes += 1
+        if self.valores.get(clave) == token.encode("utf-8"):
+            del self.valores[clave]
+            return 1
+        return 0
+
+    def zrem(self, clave, *miembros):
+        self.viajes += 1
+        zset = self.zsets.get(clave, {})
+        return sum(zset.pop(m, None) is not None for m in miembros)
+
+    def pipeline(self, transaction=True):
+        return PipelineEnMemoria(self)
+
+
+class PipelineEnMemoria:
+    def __init__(self, redis):
+        self.redis = redis
+        self.comandos = []
+
+    def set(self, clave, valor, ex=None):
+        self.comandos.append(lambda: self.redis.valores.__setitem__(clave, valor) or True)
+
+    def zadd(self, clave, mapping):
+        self.comandos.append(lambda: self.redis.zsets.setdefault(clave, {}).update(mapping) or len(mapping))
+
+    def expire(self, clave, segundos):
+        self.comandos.append(lambda: True)
+
+    def zremrangebyscore(self, clave, minimo, maximo):
+        def ejecutar():
+            zset = self.redis.zsets.get(clave, {})
+            caducados = [m for m, score in zset.items() if score <= maximo]
+            for m in caducados:
+                del zset[m]
+            return len(caducados)
+        self.comandos.append(ejecutar)
+
+    def zcard(self, clave):
+        self.comandos.append(lambda: len(self.redis.zsets.get(clave, {})))
+
+    def execute(self):
+        self.redis.viajes += 1
+        return [comando() for comando in self.comandos]
+
+
+def test_codificacion_ida_y_vuelta():
+    valor = {"numero": "138", "texto": "El que matare a otro será castigado...", "metadata": {}, "cached_at": 1.5}
+    assert decodificar(codificar(valor)) == valor
+
+
+def test_valores_grandes_se_comprimen():
+    """Los artículos largos ocupan bastante menos que el JSON original"""
+    texto = "El que, con ánimo de lucro, se apoderare de las cosas muebles ajenas. " * 60
+    valor = {"numero": "234", "texto": texto, "metadata": {}}
+    codificado = codificar(valor)
+
+    assert len(codificado) < len(json.dumps(valor).encode("utf-8")) / 4
+    assert decodificar(codificado)["texto"] == texto
+    print(f"✅ {len(json.dumps(valor))} bytes JSON -> {len(codificado)} bytes")
+
+
+def test_compatibilidad_con_json_antiguo():
+    """Los valores guardados antes (JSON plano, str o bytes) se siguen leyendo"""
+    antiguo = json.dumps({"numero": "234", "texto": "El que..."})
+    assert decodificar(antiguo)["numero"] == "234"
+    assert decodificar(antiguo.encode("utf-8"))["texto"] == "El que..."
+
+
+def test_valor_ilegible_es_fallo_de_cache():
+    assert decodificar(None) is None
+    assert decodificar(bytes([0x12]) + b"no es zlib") is None
+    assert decodificar(bytes([0x0F]) + b"formato desconocido") is None
+
+
+def test_rango_en_un_solo_viaje():
+    """Guardar y leer un rango cuesta un viaje de red cada uno"""
+    redis = RedisEnMemoria()
+    cache = CacheArticulos(redis, ttl=60)
+    articulos = {str(n): f"Artículo {n}. Texto." for n in range(138, 143)}
+
+    assert cache.guardar_varios("cp", articulos) == 5
+    assert redis.viajes == 1
+
+    encontrados = cache.obtener_varios("cp", [str(n) for n in range(136, 143)])
+    assert redis.viajes == 2
+    assert sorted(encontrados) == sorted(articulos)
+    assert encontrados["140"]["texto"] == "Artículo 140. Texto."
+    assert (cache.aciertos, cache.fallos) == (5, 2)
+
+
+def test_recuento_sin_keys():
+    """El recuento sale del índice por documento, que descarta las entradas caducadas"""
+    redis = RedisEnMemoria()
+    cache = CacheArticulos(redis, ttl=60)
+    cache.guardar_varios("cp", {"138": "a", "139": "b"})
+    cache.guardar("lecrim", "1", "c")
+    redis.zsets[clave_indice("cp")]["137"] = time.time() - 1  # Caducado
+
+    assert cache.contar(["cp", "lecrim", "lsv"]) == {"cp": 2, "lecrim": 1, "lsv": 0}
+    assert cache.estadisticas(["cp", "lecrim"])["total_keys"] == 3
+
+
+def test_invalidar_actualiza_el_indice():
+    redis = RedisEnMemoria()
+    cache = CacheArticulos(redis, ttl=60)
+    cache.guardar_varios("cp", {"138": "a", "139": "b"})
+
+    assert cache.invalidar("cp", ["138"]) == 1
+    assert clave_articulo("cp", "138") not in redis.valores
+    assert cache.contar(["cp"]) == {"cp": 1}
+
+
+def test_respuestas_se_invalidan_con_el_articulo():
+    redis = RedisEnMemoria()
+    cache = CacheArticulos(redis, ttl=60)
+    cache.guardar("cp", "138", "El que matare a otro...")
+    cache.guardar_respuestas("cp", {"138": "**Artículo 138**\n\nEl que matare a otro..."})
+    assert cache.obtener_respuesta("cp", "138").startswith("**Artículo 138**")
+
+    assert cache.invalidar("cp", ["138"]) == 2
+    assert cache.obtener_respuesta("cp", "138") is None
+
+
+def test_sin_msgpack_se_usa_json(monkeypatch):
+    monkeypatch.setattr(cache_redis, "msgpack", None)
+    codificado = codificar({"numero": "1", "texto": "x"})
+    assert codificado[0] == cache_redis._FORMATO_JSON
+    assert decodificar(codificado) == {"numero": "1", "texto": "x"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
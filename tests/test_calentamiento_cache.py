@@ -0,0 +1,120 @@
+"""
+TESTS PARA EL CALENTAMIENTO DE CACHÉ
+Valida la carga por lotes, la idempotencia por versión, el lock entre workers
+y el precálculo de respuestas y comparaciones
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from cache_redis import CacheArticulos, clave_respuesta
+from calentamiento_cache import calentar_cache, clave_lock, clave_version, pares_configurados
+from corpus import clave_articulo, version_articulos
+from formato_utils import formatear_respuesta_articulo
+from test_cache_redis import RedisEnMemoria
+
+ARTICULOS = {str(n): f"Artículo {n}. Texto completo del artículo {n}." for n in range(130, 150)}
+
+
+def _cache():
+    return CacheArticulos(RedisEnMemoria(), ttl=60)
+
+
+def test_calentamiento_por_lotes():
+    """Todos los artículos y sus respuestas se cargan con un pipeline por lote"""
+    cache = _cache()
+    resultado = calentar_cache(cache, "cp", ARTICULOS, "v1", formatear=formatear_respuesta_articulo, lote=8)
+
+    assert resultado["estado"] == "calentado"
+    assert resultado["articulos"] == resultado["respuestas"] == 20
+    assert cache.obtener("cp", "142")["texto"] == ARTICULOS["142"]
+    assert cache.obtener_respuesta("cp", "142").startswith("**Artículo 142**")
+    assert cache.cliente.viajes < 20  # Nunca un SET por artículo
+    print(f"✅ 20 artículos + 20 respuestas en {cache.cliente.viajes} viajes a Redis")
+
+
+def test_idempotente_por_version():
+    """Con la misma versión no se vuelve a escribir; con otra versión sí"""
+    cache = _cache()
+    calentar_cache(cache, "cp", ARTICULOS, "v1")
+    assert calentar_cache(cache, "cp", ARTICULOS, "v1")["estado"] == "al_dia"
+    assert calentar_cache(cache, "cp", ARTICULOS, "v2")["estado"] == "calentado"
+    assert cache.cliente.valores[clave_version("cp")] == b"v2"
+    assert calentar_cache(cache, "cp", ARTICULOS, "v2", forzar=True)["estado"] == "calentado"
+
+
+def test_otro_worker_calentando():
+    """Si otro worker tiene el lock no se escribe nada"""
+    cache = _cache()
+    cache.cliente.set(clave_lock("cp"), "otro-worker", nx=True)
+
+    assert calentar_cache(cache, "cp", ARTICULOS, "v1")["estado"] == "en_curso"
+    assert clave_articulo("cp", "138") not in cache.cliente.valores
+    assert cache.cliente.valores[clave_lock("cp")] == b"otro-worker"
+
+
+def test_no_libera_el_lock_de_otro_worker():
+    """Si nuestro lock caducó y otro worker lo tomó, al terminar no se borra el suyo"""
+    cache = _cache()
+    clave = clave_lock("cp")
+
+    def formatear_lento(numero, texto):
+        cache.cliente.valores[clave] = b"otro-worker"  # Nuestro lock caducó y otro lo tomó
+        return None
+
+    assert calentar_cache(cache, "cp", ARTICULOS, "v1", formatear=formatear_lento)["estado"] == "calentado"
+    assert cache.cliente.valores[clave] == b"otro-worker"
+    print("✅ El lock de otro worker se conserva")
+
+
+def test_lock_se_libera_tras_error():
+    cache = _cache()
+
+    def formatear_roto(numero, texto):
+        raise RuntimeError("fallo")
+
+    with pytest.raises(RuntimeError):
+        calentar_cache(cache, "cp", ARTICULOS, "v1", formatear=formatear_roto)
+    assert clave_lock("cp") not in cache.cliente.valores
+    assert clave_version("cp") not in cache.cliente.valores  # Se repetirá entero
+
+
+def test_comparaciones_populares():
+    """Solo se generan las comparaciones de artículos existentes y que no estén ya en caché"""
+    cache = _cache()
+    llamadas = []
+
+    def comparar(art1, art2):
+        llamadas.append((art1, art2))
+        return {"comparacion": f"{art1} vs {art2}"}
+
+    pares = [("138", "142"), ("138", "999")]
+    resultado = calentar_cache(cache, "cp", ARTICULOS, "v1", comparar=comparar, pares=pares)
+    assert resultado["comparaciones"] == 1
+    assert cache.obtener_comparacion("cp", "v1", "138", "142") == {"comparacion": "138 vs 142"}
+
+    calentar_cache(cache, "cp", ARTICULOS, "v1", comparar=comparar, pares=pares, forzar=True)
+    assert llamadas == [("138", "142")]
+
+
+def test_articulo_incompleto_sin_respuesta_precalculada():
+    cache = _cache()
+    calentar_cache(cache, "cp", {"1": "Artículo 1. Texto cortado sin punto"}, "v1",
+                   formatear=formatear_respuesta_articulo)
+    assert clave_respuesta("cp", "1") not in cache.cliente.valores
+
+
+def test_version_y_pares():
+    assert version_articulos(ARTICULOS) == version_articulos(dict(reversed(list(ARTICULOS.items()))))
+    assert version_articulos(ARTICULOS) != version_articulos({**ARTICULOS, "138": "Artículo 138. Reformado."})
+    assert pares_configurados("138-142, 234 - 237") == [("138", "142"), ("234", "237")]
+    assert len(pares_configurados("")) >= 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
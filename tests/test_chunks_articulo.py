@@ -0,0 +1,131 @@
+"""
+TESTS PARA LA RECUPERACIÓN DIRECTA DE CHUNKS POR ARTÍCULO
+Valida el mapa artículo -> ids del manifiesto de ingesta y el fetch por id
+(Pinecone e índice local) que sustituye a la búsqueda semántica con plantilla
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from reindexado_utils import asignar_ids_por_contenido, guardar_manifiesto, cargar_manifiesto, ids_por_articulo
+from chunks_articulo import ChunksPorArticulo, fetch_pinecone, matches_desde_fetch
+from indice_local import IndiceVectorialLocal
+from corpus import Documento
+
+
+def _chunks():
+    chunks = [
+        {'text': "Artículo 138. El que matare a otro", 'articulo': '138', 'parte': 1},
+        {'text': "será castigado con prisión de diez a quince años", 'articulo': '138', 'parte': 2},
+        {'text': "Artículo 142 bis. En los casos previstos", 'articulo': '142 bis', 'parte': 1},
+        {'text': "LIBRO II", 'articulo': None, 'parte': 1},
+    ]
+    return asignar_ids_por_contenido(chunks, "cp.pdf")
+
+
+class PineconeFalso:
+    """index.fetch con la forma de respuesta del cliente (objeto con .vectors); registra las llamadas"""
+
+    class Vector:
+        def __init__(self, metadata):
+            self.metadata = metadata
+
+    class Respuesta:
+        def __init__(self, vectors):
+            self.vectors = vectors
+
+    def __init__(self, chunks):
+        self.vectores = {c['id']: self.Vector({'text': c['text'], 'articulo': c['articulo']}) for c in chunks}
+        self.llamadas = []
+
+    def fetch(self, ids, namespace=""):
+        self.llamadas.append((list(ids), namespace))
+        return self.Respuesta({i: self.vectores[i] for i in ids if i in self.vectores})
+
+
+def test_manifiesto_registra_ids_por_articulo(tmp_path):
+    chunks = _chunks()
+    ruta = str(tmp_path / "manifiesto.json")
+    guardar_manifiesto(ruta, list(reversed(chunks)), "cp.pdf")  # Orden de partes aunque lleguen desordenados
+
+    mapa = ids_por_articulo(cargar_manifiesto(ruta))
+    assert mapa['138'] == [chunks[0]['id'], chunks[1]['id']]
+    assert mapa['142 bis'] == [chunks[2]['id']]
+    assert len(mapa) == 2
+    print("✅ Mapa artículo -> ids en orden de partes")
+
+
+def test_manifiesto_antiguo_sin_mapa():
+    manifiesto = {"chunks": {"a": {"hash": "1", "articulo": "138"}, "b": {"hash": "2", "articulo": "138"},
+                             "c": {"hash": "3", "articulo": None}}}
+    assert ids_por_articulo(manifiesto) == {'138': ["a", "b"]}
+    assert ids_por_articulo(None) == {}
+    print("✅ Mapa derivado de los chunks en manifiestos anteriores")
+
+
+def test_fetch_pinecone_en_orden():
+    chunks = _chunks()
+    index = PineconeFalso(chunks)
+    ids = [chunks[1]['id'], chunks[0]['id'], "no-existe"]
+
+    results = fetch_pinecone(index, ids, namespace="cp")
+
+    assert [m['id'] for m in results['matches']] == ids[:2]
+    assert all(m['score'] == 1.0 for m in results['matches'])
+    assert index.llamadas == [(ids, "cp")]
+    assert matches_desde_fetch({'vectors': {"x": {'metadata': {'articulo': '1'}}}}, ["x"])[0]['metadata'] == {'articulo': '1'}
+    print("✅ Fetch por id en Pinecone con formato de búsqueda")
+
+
+def test_indice_local_obtener():
+    indice = IndiceVectorialLocal(np.eye(3, dtype=np.float32), ["a", "b", "c"],
+                                  [{'articulo': '1'}, {'articulo': '2'}, {'articulo': '3'}])
+    assert [m['id'] for m in indice.obtener(["c", "x", "a"])['matches']] == ["c", "a"]
+    print("✅ Fetch por id en el índice local")
+
+
+def test_recuperar_articulo_sin_embedding(tmp_path):
+    chunks = _chunks()
+    guardar_manifiesto(str(tmp_path / "m.json"), chunks, "cp.pdf")
+    index = PineconeFalso(chunks)
+    documento = Documento(id="cp", nombre="Código Penal", pdf_path="cp.pdf")
+    mapa = ChunksPorArticulo(lambda doc: str(tmp_path / "m.json"))
+
+    results = mapa.recuperar(documento, " 142  bis ", lambda ids: fetch_pinecone(index, ids))
+
+    assert [m['metadata']['articulo'] for m in results['matches']] == ['142 bis']
+    assert mapa.recuperar(documento, "999", lambda ids: fetch_pinecone(index, ids)) is None
+    assert len(index.llamadas) == 1  # Artículo desconocido: ni siquiera se llama al índice
+    assert mapa.estadisticas()["fetches_por_id"] == 1
+    print("✅ Artículo recuperado por id; desconocido -> búsqueda vectorial")
+
+
+def test_manifiesto_desfasado_vuelve_a_vectorial(tmp_path):
+    chunks = _chunks()
+    guardar_manifiesto(str(tmp_path / "m.json"), chunks, "cp.pdf")
+    index = PineconeFalso(chunks[1:])  # Falta la parte 1 del 138 en el índice
+    documento = Documento(id="cp", nombre="Código Penal", pdf_path="cp.pdf")
+    mapa = ChunksPorArticulo(lambda doc: str(tmp_path / "m.json"))
+
+    assert mapa.recuperar(documento, "138", lambda ids: fetch_pinecone(index, ids)) is None
+    assert mapa.estadisticas()["fallbacks_a_vectorial"] == 1
+    print("✅ Chunks incompletos en el índice: no se responde con medio artículo")
+
+
+def test_documento_sin_manifiesto(tmp_path):
+    mapa = ChunksPorArticulo(lambda doc: str(tmp_path / "no_existe.json"))
+    documento = Documento(id="lecrim", nombre="LECrim", pdf_path="")
+    assert mapa.ids(documento, "1") == []
+    assert mapa.estadisticas()["articulos_por_documento"] == {"lecrim": 0}
+    print("✅ Sin manifiesto se sigue con la búsqueda vectorial")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,123 @@
+"""
+TESTS PARA EL CLIENTE LLM (PLAZOS, REINTENTOS Y COBERTURA)
+Valida el comportamiento con un modelo falso de latencia y errores controlados
+"""
+
+import pytest
+import sys
+import time
+import threading
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from cliente_llm import ClienteLLM, PlazoAgotado, percentil, es_transitorio
+
+
+class Respuesta:
+    def __init__(self, text):
+        self.text = text
+
+
+class ServiceUnavailable(Exception):
+    """Mismo nombre que google.api_core.exceptions.ServiceUnavailable"""
+
+
+class ModeloFalso:
+    """generate_content con latencias y errores por llamada (listas consumidas en orden)"""
+
+    def __init__(self, latencias=None, errores=None):
+        self.latencias = list(latencias or [])
+        self.errores = list(errores or [])
+        self.llamadas = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            n = self.llamadas
+            self.llamadas += 1
+        time.sleep(self.latencias[n] if n < len(self.latencias) else 0)
+        if n < len(self.errores) and self.errores[n]:
+            raise self.errores[n]
+        return Respuesta(f"respuesta {n}")
+
+
+def test_llamada_normal():
+    cliente = ClienteLLM(ModeloFalso())
+    assert cliente.generar("hola").text == "respuesta 0"
+    assert cliente.estadisticas()["llamadas"] == 1
+    print("✅ Llamada directa")
+
+
+def test_reintento_ante_error_transitorio():
+    modelo = ModeloFalso(errores=[ServiceUnavailable("503"), None])
+    cliente = ClienteLLM(modelo, reintentos=2, backoff_base=0.01)
+
+    assert cliente.generar("hola").text == "respuesta 1"
+    assert cliente.estadisticas()["reintentos"] == 1
+    print("✅ Error transitorio reintentado")
+
+
+def test_error_no_transitorio_no_se_reintenta():
+    modelo = ModeloFalso(errores=[ValueError("prompt bloqueado")])
+    cliente = ClienteLLM(modelo, reintentos=3, backoff_base=0.01)
+
+    with pytest.raises(ValueError):
+        cliente.generar("hola")
+    assert modelo.llamadas == 1
+    assert cliente.estadisticas()["errores"] == 1
+    print("✅ Errores permanentes sin reintento")
+
+
+def test_plazo_agotado():
+    cliente = ClienteLLM(ModeloFalso(latencias=[0.5]), plazo=0.1)
+    inicio = time.perf_counter()
+    with pytest.raises(PlazoAgotado):
+        cliente.generar("hola")
+    assert time.perf_counter() - inicio < 0.4
+    assert cliente.estadisticas()["plazos_agotados"] == 1
+    print("✅ La petición no espera más que el plazo")
+
+
+def test_cobertura_gana_a_la_peticion_lenta():
+    modelo = ModeloFalso(latencias=[0.5, 0.01])
+    cliente = ClienteLLM(modelo, cobertura=True, retardo_cobertura=0.05, max_fraccion_cobertura=1.0)
+
+    inicio = time.perf_counter()
+    respuesta = cliente.generar("hola")
+    assert respuesta.text == "respuesta 1"
+    assert time.perf_counter() - inicio < 0.3
+    stats = cliente.estadisticas()
+    assert stats["cobertura"]["lanzadas"] == 1
+    assert stats["cobertura"]["ganadoras"] == 1
+    print("✅ La petición de cobertura recorta la cola")
+
+
+def test_cobertura_limitada_por_fraccion():
+    modelo = ModeloFalso(latencias=[0.1] * 10)
+    cliente = ClienteLLM(modelo, cobertura=True, retardo_cobertura=0.01, max_fraccion_cobertura=0.0)
+
+    cliente.generar("hola")
+    assert cliente.estadisticas()["cobertura"]["lanzadas"] == 0
+    assert modelo.llamadas == 1
+    print("✅ Sin presupuesto no se duplican peticiones")
+
+
+def test_percentiles():
+    assert percentil([], 95) is None
+    assert percentil(list(range(1, 101)), 95) == 95
+    assert percentil([3, 1, 2], 50) == 2
+    print("✅ Percentil por rango más cercano")
+
+
+def test_errores_transitorios():
+    assert es_transitorio(ServiceUnavailable())
+    assert es_transitorio(TimeoutError())
+    assert not es_transitorio(ValueError())
+    print("✅ Clasificación de errores")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
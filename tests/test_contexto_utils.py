@@ -0,0 +1,169 @@
+"""
+TESTS PARA ENSAMBLADO DE CONTEXTO
+Valida la deduplicación y compresión de fragmentos antes de enviarlos a Gemini
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from contexto_utils import (
+    ensamblar_contexto, firma_minhash, similitud_minhash, estimar_tokens
+)
+
+
+TEXTO_ARTICULO = (
+    "Artículo 138. 1. El que matare a otro será castigado, como reo de homicidio, "
+    "con la pena de prisión de diez a quince años. 2. Los hechos serán castigados "
+    "con la pena superior en grado en los siguientes casos: a) cuando concurra en "
+    "su comisión alguna de las circunstancias del apartado 1 del artículo 140."
+)
+
+
+def _match(texto, score=0.8, **metadata):
+    return {"score": score, "metadata": dict(text=texto, **metadata)}
+
+
+def test_minhash_textos_identicos():
+    """Dos textos idénticos tienen similitud 1.0"""
+    firma = firma_minhash(TEXTO_ARTICULO)
+    assert similitud_minhash(firma, firma) == 1.0
+    print("✅ MinHash: textos idénticos → 1.0")
+
+
+def test_minhash_textos_distintos():
+    """Textos sin relación tienen similitud baja"""
+    otro = "Artículo 234. El que, con ánimo de lucro, tomare las cosas muebles ajenas sin la voluntad de su dueño"
+    sim = similitud_minhash(firma_minhash(TEXTO_ARTICULO), firma_minhash(otro))
+    assert sim < 0.2
+    print(f"✅ MinHash: textos distintos → {sim:.2f}")
+
+
+def test_colapsa_chunks_solapados_por_offsets():
+    """Chunks con intervalos solapados se fusionan en un único fragmento exacto"""
+    texto = "Lorem ipsum dolor sit amet " * 20
+    a = texto[0:300]
+    b = texto[200:540]
+    chunks = [
+        _match(a, 0.7, source="cp.pdf", char_start=0, char_end=300),
+        _match(b, 0.9, source="cp.pdf", char_start=200, char_end=540),
+    ]
+    parts, stats = ensamblar_contexto(chunks)
+
+    assert len(parts) == 1
+    assert texto[0:540] in parts[0]
+    assert "0.90" in parts[0]
+    assert stats["fragmentos_fusionados"] == 1
+    print("✅ Chunks solapados colapsados por span")
+
+
+def test_une_partes_del_mismo_articulo_sin_offsets():
+    """Partes consecutivas del mismo artículo se unen eliminando el overlap"""
+    parte1 = TEXTO_ARTICULO[:180]
+    parte2 = TEXTO_ARTICULO[150:]
+    chunks = [
+        _match(parte1, 0.8, articulo="138"),
+        _match(parte2, 0.6, articulo="138"),
+    ]
+    parts, _ = ensamblar_contexto(chunks)
+
+    assert len(parts) == 1
+    assert TEXTO_ARTICULO in parts[0]
+    print("✅ Partes del mismo artículo unidas")
+
+
+def test_elimina_casi_duplicados():
+    """Un fragmento casi idéntico a otro más relevante se descarta"""
+    variante = TEXTO_ARTICULO.replace("diez a quince", "diez a 15")
+    chunks = [_match(TEXTO_ARTICULO, 0.9), _match(variante, 0.5)]
+    parts, stats = ensamblar_contexto(chunks, umbral_duplicado=0.7)
+
+    assert len(parts) == 1
+    assert stats["casi_duplicados_eliminados"] == 1
+    assert "0.90" in parts[0]
+    print("✅ Casi-duplicados eliminados")
+
+
+def test_descarta_chunks_de_articulos_reconstruidos():
+    """Los chunks de artículos ya reconstruidos no se repiten en el contexto"""
+    reconstruidos = {"138": {"texto": TEXTO_ARTICULO, "metodo": "cache_instantaneo", "completo": True}}
+    chunks = [_match(TEXTO_ARTICULO[:200], 0.9), _match("Artículo 142. El que por imprudencia grave causare la muerte de otro", 0.6)]
+    parts, stats = ensamblar_contexto(chunks, reconstruidos)
+
+    assert len(parts) == 2
+    assert parts[0].startswith("[Artículo 138 - Reconstruido")
+    assert "Artículo 142" in parts[1]
+    # El chunk del 138 lo sustituye el artículo reconstruido: no cuenta como ahorro
+    assert stats["tokens_originales"] == estimar_tokens(parts[0]) + estimar_tokens(chunks[1]["metadata"]["text"])
+    print("✅ Reconstruidos no duplicados")
+
+
+def test_numeros_canonicos_en_ambos_lados():
+    """'142bis' en metadata, '142 BIS' en la cabecera y '142 bis' reconstruido son el mismo artículo"""
+    reconstruidos = {"142 bis": {"texto": "Artículo 142 bis. Texto completo.", "metodo": "cache_instantaneo", "completo": True}}
+    chunks = [
+        _match("Parte del artículo por metadata.", 0.9, articulo="142bis"),
+        _match("Artículo 142 BIS. Parte con cabecera.", 0.8),
+        _match("Artículo 143. El que induzca al suicidio de otro.", 0.7),
+    ]
+    parts, stats = ensamblar_contexto(chunks, reconstruidos)
+
+    assert len(parts) == 2
+    assert "Artículo 143" in parts[1]
+    assert stats["tokens_ahorrados"] == 0
+    print("✅ Números de artículo normalizados en metadata, cabecera y reconstruidos")
+
+
+def test_conserva_fragmentos_que_citan_articulos_reconstruidos():
+    """Un fragmento de otro artículo que cita uno ya incluido no se descarta"""
+    reconstruidos = {"138": {"texto": TEXTO_ARTICULO, "metodo": "cache_instantaneo", "completo": True}}
+    chunks = [
+        _match("Artículo 140. 1. El asesinato será castigado con prisión permanente revisable cuando la víctima "
+               "sea menor de dieciséis años; se aplicará el artículo 138 en lo demás.", 0.9),
+        _match("Los hechos serán castigados con la pena superior en grado.", 0.8, articulo="138"),
+    ]
+    parts, _ = ensamblar_contexto(chunks, reconstruidos)
+
+    assert len(parts) == 2
+    assert "Artículo 140" in parts[1]
+    print("✅ Solo se descartan los fragmentos del propio artículo, no las referencias cruzadas")
+
+
+def test_estadisticas_de_tokens():
+    """Las estadísticas reflejan la reducción de tokens"""
+    chunks = [_match(TEXTO_ARTICULO, 0.9) for _ in range(5)]
+    parts, stats = ensamblar_contexto(chunks)
+
+    assert len(parts) == 1
+    assert stats["tokens_originales"] == 5 * estimar_tokens(TEXTO_ARTICULO)
+    assert stats["tokens_finales"] < stats["tokens_originales"]
+    print(f"✅ Tokens: {stats['tokens_originales']} → {stats['tokens_finales']}")
+
+
+def test_formatear_texto_aplicado():
+    """La función de formateo se aplica a cada fragmento"""
+    parts, _ = ensamblar_contexto([_match("texto", 0.5)], formatear_texto=str.upper)
+    assert "TEXTO" in parts[0]
+
+
+def test_articulos_referenciados_al_final():
+    """Los artículos citados se añaden tras los fragmentos, salvo si ya están en el contexto"""
+    chunks = [_match(TEXTO_ARTICULO, 0.9, articulo="138")]
+    referenciados = {
+        "140": {"texto": "Artículo 140. 1. El asesinato será castigado con prisión permanente revisable", "citado_por": "138"},
+        "138": {"texto": TEXTO_ARTICULO, "citado_por": "139"},
+    }
+    parts, stats = ensamblar_contexto(chunks, articulos_referenciados=referenciados)
+
+    assert len(parts) == 2
+    assert parts[1].startswith("[Artículo 140 - Citado por el artículo 138]")
+    assert stats["articulos_referenciados_incluidos"] == ["140"]
+    print("✅ Vecinos del grafo de referencias añadidos sin duplicar")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
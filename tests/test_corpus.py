@@ -0,0 +1,151 @@
+"""
+TESTS PARA EL CORPUS MULTI-DOCUMENTO
+Valida la carga bajo demanda, el desalojo LRU, las claves de caché por documento
+y la recarga de artículos tras un reindexado
+"""
+
+import pytest
+import sys
+import json
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from corpus import (
+    Documento, RegistroCorpus, DocumentoNoEncontrado, cargar_documentos, clave_articulo
+)
+
+
+def _texto(prefijo):
+    return (
+        f"Artículo 1.\n{prefijo}: primer artículo.\n"
+        f"Artículo 2.\n{prefijo}: segundo artículo.\n"
+    )
+
+
+class CargadorFalso:
+    """Devuelve un texto distinto por PDF y cuenta las lecturas"""
+
+    def __init__(self, textos):
+        self.textos = textos
+        self.lecturas = []
+
+    def __call__(self, pdf_path):
+        self.lecturas.append(pdf_path)
+        return self.textos[pdf_path]
+
+
+def _registro(max_cargados=2):
+    documentos = [
+        Documento(id="cp", nombre="Código Penal", pdf_path="cp.pdf"),
+        Documento(id="lecrim", nombre="Ley de Enjuiciamiento Criminal", pdf_path="lecrim.pdf", namespace="lecrim"),
+        Documento(id="lsv", nombre="Ley de Seguridad Vial", pdf_path="lsv.pdf", namespace="lsv"),
+    ]
+    cargador = CargadorFalso({d.pdf_path: _texto(d.id.upper()) for d in documentos})
+    return RegistroCorpus(documentos, cargador, por_defecto="cp", max_cargados=max_cargados), cargador
+
+
+def test_carga_bajo_demanda():
+    """Cada documento se lee solo al consultarlo y una única vez"""
+    registro, cargador = _registro()
+    assert cargador.lecturas == []
+
+    assert "LECRIM" in registro.articulos("lecrim")["1"]
+    registro.articulos("lecrim")
+    assert cargador.lecturas == ["lecrim.pdf"]
+    assert "CP" in registro.articulos()["2"]  # None = documento por defecto
+    print("✅ Índices cargados bajo demanda")
+
+
+def test_desalojo_lru_conserva_documento_por_defecto():
+    """Por encima de max_cargados se descarga el menos usado, nunca el por defecto"""
+    registro, cargador = _registro(max_cargados=2)
+    registro.precargar("cp")
+    registro.precargar("lecrim")
+    registro.precargar("lsv")
+
+    assert registro.esta_cargado("cp")
+    assert not registro.esta_cargado("lecrim")
+    assert registro.esta_cargado("lsv")
+    assert registro.desalojos == 1
+
+    registro.articulos("lecrim")  # Vuelve a leerse del PDF
+    assert cargador.lecturas.count("lecrim.pdf") == 2
+
+
+def test_documento_desconocido():
+    registro, _ = _registro()
+    with pytest.raises(DocumentoNoEncontrado):
+        registro.articulos("no-existe")
+
+
+def test_documento_por_defecto_debe_existir():
+    with pytest.raises(ValueError):
+        RegistroCorpus([Documento(id="lecrim", nombre="LECrim", pdf_path="x.pdf")], lambda _: "", por_defecto="cp")
+
+
+def test_clave_articulo_por_documento():
+    """El mismo número de artículo no colisiona entre documentos"""
+    assert clave_articulo("cp", "138") == "articulo:cp:138"
+    assert clave_articulo("cp", "138") != clave_articulo("lecrim", "138")
+
+
+def test_error_de_carga_no_se_guarda(monkeypatch):
+    """Si el PDF no se puede leer se responde sin artículos y se reintenta pasado el TTL del fallo"""
+    import corpus
+    ahora = [1000.0]
+    monkeypatch.setattr(corpus.time, "monotonic", lambda: ahora[0])
+    textos = {}
+    cargador = CargadorFalso(textos)
+    registro = RegistroCorpus([Documento(id="cp", nombre="Código Penal", pdf_path="cp.pdf")],
+                              cargador, por_defecto="cp", ttl_fallos=30)
+    assert registro.articulos() == {}
+    assert not registro.esta_cargado("cp")
+
+    textos["cp.pdf"] = _texto("CP")
+    assert registro.articulos() == {}  # Fallo reciente: no se relee el PDF en cada consulta
+    assert cargador.lecturas == ["cp.pdf"]
+
+    ahora[0] += 31
+    assert "1" in registro.articulos()
+    assert cargador.lecturas == ["cp.pdf", "cp.pdf"]
+    print("✅ Fallos de carga recordados durante el TTL")
+
+
+def test_recargar_articulos():
+    """Solo se actualizan los artículos indicados; los que desaparecen se eliminan"""
+    registro, cargador = _registro()
+    registro.precargar("lecrim")
+    cargador.textos["lecrim.pdf"] = "Artículo 1.\nLECRIM reformado.\n"
+
+    anteriores = registro.articulos("lecrim")
+    version_anterior = registro.version("lecrim")
+
+    actualizados, eliminados = registro.recargar_articulos("lecrim", ["1", "2"])
+
+    assert actualizados == ["1"] and eliminados == ["2"]
+    assert "reformado" in registro.articulos("lecrim")["1"]
+    assert registro.version("lecrim") != version_anterior
+    assert set(anteriores) == {"1", "2"}  # Copy-on-write: el índice anterior no se modifica
+    assert cargador.lecturas.count("lecrim.pdf") == 2
+    assert registro.recargar_articulos("lsv", ["1"]) == ([], [])  # No cargado: nada que refrescar
+
+
+def test_cargar_documentos(tmp_path):
+    """Sin fichero el corpus es solo el Código Penal; con fichero, la lista configurada"""
+    por_defecto = cargar_documentos(str(tmp_path / "no_existe.json"), "cp.pdf")
+    assert [(d.id, d.pdf_path, d.namespace) for d in por_defecto] == [("cp", "cp.pdf", "")]
+
+    ruta = tmp_path / "corpus.json"
+    ruta.write_text(json.dumps([
+        {"id": "cp", "nombre": "Código Penal", "pdf_path": "cp.pdf"},
+        {"id": "lecrim", "nombre": "LECrim", "pdf_path": "lecrim.pdf", "namespace": "lecrim"},
+    ]), encoding="utf-8")
+    documentos = cargar_documentos(str(ruta))
+    assert [d.namespace for d in documentos] == ["", "lecrim"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,82 @@
+"""
+TESTS PARA EL CORRECTOR ORTOGRÁFICO (SYMSPELL)
+Valida la distancia de edición, la corrección de erratas contra el vocabulario
+del documento y de los sinónimos, y que las palabras válidas, cortas o
+coloquiales no se tocan, y que solo se corrige hacia términos jurídicos
+"""
+
+import pytest
+import sys
+import time
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from corrector_ortografico import distancia_edicion, vocabulario_de_texto, construir_corrector
+from semantic_utils import SINONIMOS_LEGALES
+
+
+TEXTO = """Artículo 138. El que matare a otro será castigado, como reo de homicidio, con la pena de prisión.
+Artículo 139. Será castigado como reo de asesinato el que matare a otro con alevosía.
+Artículo 234. El que tomare las cosas muebles ajenas será castigado como reo de hurto.
+Artículo 248. Cometen estafa los que utilizaren engaño bastante. El homicidio, el asesinato, el hurto,
+la estafa y la alevosía se castigan con la pena que corresponda. Artículo 237. Son reos del delito de robo.
+Los que robaren con violencia y los que robaren con fuerza. El que hubiere pagado o no hubiere pagado la cuota."""
+
+
+@pytest.fixture(scope="module")
+def corrector():
+    return construir_corrector(TEXTO, SINONIMOS_LEGALES)
+
+
+def test_distancia_edicion():
+    assert distancia_edicion("omicidio", "homicidio", 2) == 1
+    assert distancia_edicion("alveosia", "alevosia", 2) == 1  # Trasposición
+    assert distancia_edicion("robo", "hurto", 2) == 3  # Supera el máximo
+    print("✅ Damerau-Levenshtein con corte al superar el máximo")
+
+
+def test_vocabulario_de_texto():
+    vocabulario = vocabulario_de_texto(TEXTO)
+    assert vocabulario["homicidio"] == 2
+    assert vocabulario["artículo"] == 5
+    print("✅ Frecuencias del vocabulario del documento")
+
+
+def test_corrige_erratas(corrector):
+    assert corrector.corregir("omicidio") == ("homicidio", {"omicidio": "homicidio"})
+    assert corrector.corregir("estaffa por internet")[0] == "estafa por internet"
+    assert corrector.corregir("asesinto con alebosia")[0] == "asesinato con alevosía"
+    assert corrector.corregir("me hurtó la cartera")[0] == "me hurto la cartera"  # Solo cambia la tilde
+    print("✅ Erratas corregidas contra el Código Penal y los sinónimos")
+
+
+def test_no_toca_palabras_validas(corrector):
+    for consulta in ["¿Qué pena tiene el artículo 138?", "Homicidio", "robo de coche", "art 140 bis"]:
+        assert corrector.corregir(consulta) == (consulta, {})
+    print("✅ Palabras conocidas, cortas, coloquiales y números intactos")
+
+
+def test_no_corrige_verbos_coloquiales(corrector):
+    """Formas verbales válidas cercanas a palabras del documento no son erratas"""
+    for consulta in ["me han pegado", "me robaron el bolso", "me han pagado", "lo mataron",
+                     "me estafaron", "mi vecino me amenazó", "varios robos", "me agredieron"]:
+        assert corrector.corregir(consulta) == (consulta, {})
+    assert corrector.corregir("lesines por imprudensia")[0] == "lesiones por imprudencia"
+    print("✅ 'pegado' no pasa a 'pagado' ni 'robaron' a 'robaren'; solo se corrige hacia términos jurídicos")
+
+
+def test_rapido_y_memoria(corrector):
+    corrector.corregir("omicidio con alebosia")
+    inicio = time.perf_counter()
+    for _ in range(1000):
+        corrector.corregir("omicidio con alebosia")
+    assert (time.perf_counter() - inicio) / 1000 < 0.001
+    assert corrector.estadisticas()["consultas_corregidas"] >= 1000
+    print("✅ Corrección por consulta en microsegundos")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
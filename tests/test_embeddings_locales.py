@@ -0,0 +1,80 @@
+"""
+TESTS PARA EMBEDDINGS LOCALES
+Valida la cuantización float16/int8 y el artefacto .npy (el modelo de sentence-transformers no se carga)
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+np = pytest.importorskip("numpy")
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from embeddings_locales import (
+    cuantizar, descuantizar, guardar_artefacto, cargar_artefacto, vectores_por_id, EmbeddingsLocales
+)
+
+
+def _matriz(n=200, dim=384, semilla=0):
+    rng = np.random.default_rng(semilla)
+    matriz = rng.normal(size=(n, dim)).astype(np.float32)
+    return matriz / np.linalg.norm(matriz, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("modo,bytes_por_valor", [("float32", 4), ("float16", 2), ("int8", 1)])
+def test_cuantizacion_conserva_similitudes(modo, bytes_por_valor):
+    """Las similitudes coseno apenas cambian tras cuantizar"""
+    matriz = _matriz()
+    datos, escala = cuantizar(matriz, modo)
+    recuperada = descuantizar(datos, escala)
+
+    assert datos.itemsize == bytes_por_valor
+    error = np.abs(recuperada @ matriz[0] - matriz @ matriz[0]).max()
+    assert error < 0.02
+    print(f"✅ {modo}: error máximo de similitud {error:.5f}")
+
+
+def test_modo_desconocido():
+    with pytest.raises(ValueError):
+        cuantizar(_matriz(2, 4), "int4")
+
+
+def test_artefacto_ida_y_vuelta(tmp_path):
+    """El artefacto conserva ids, orden de filas y modo de cuantización"""
+    matriz = _matriz(10, 16)
+    ids = [f"cp-{i}" for i in range(10)]
+    ruta = str(tmp_path / "embeddings.npy")
+
+    metadata = guardar_artefacto(ruta, matriz, ids, modo="int8", modelo="all-MiniLM-L6-v2")
+    cargada, ids_cargados, metadata_cargada = cargar_artefacto(ruta)
+
+    assert ids_cargados == ids
+    assert metadata_cargada["modo"] == metadata["modo"] == "int8"
+    assert cargada.shape == (10, 16) and cargada.dtype == np.float32
+    assert np.allclose(cargada, matriz, atol=0.02)
+
+    por_id = vectores_por_id(ruta)
+    assert np.allclose(por_id["cp-3"], cargada[3])
+
+
+def test_ids_y_vectores_deben_coincidir(tmp_path):
+    with pytest.raises(ValueError):
+        guardar_artefacto(str(tmp_path / "x.npy"), _matriz(3, 4), ["a", "b"])
+
+
+def test_artefacto_inexistente(tmp_path):
+    assert vectores_por_id(str(tmp_path / "no_existe.npy")) == {}
+
+
+def test_backend_carga_el_modelo_bajo_demanda():
+    """Crear el backend no carga sentence-transformers"""
+    backend = EmbeddingsLocales(batch_size=0, num_hilos=2)
+    assert backend._modelo is None
+    assert backend.batch_size == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
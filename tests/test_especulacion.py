@@ -0,0 +1,124 @@
+"""
+TESTS PARA LA RECUPERACIÓN ESPECULATIVA
+Valida la predicción de cuándo hará falta la rama vectorial y que la rama
+especulativa se aprovecha o se cancela sin llegar a los pasos caros
+"""
+
+import pytest
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from especulacion import hace_falta_recuperacion, RamaEspeculativa
+
+ARTICULOS = {
+    "138": "El que matare a otro será castigado, como reo de homicidio, con la pena de prisión de diez a quince años.",
+    "139": "Será castigado con la pena de prisión de quince a veinticinco años, como reo de asesinato, el que",
+    "140": "El asesinato será castigado con pena de prisión permanente revisable.",
+}
+
+
+def test_articulo_completo_no_especula():
+    assert not hace_falta_recuperacion(ARTICULOS, "138")
+    print("✅ Artículo completo: solo búsqueda exacta")
+
+
+def test_articulo_incompleto_o_ausente_especula():
+    assert hace_falta_recuperacion(ARTICULOS, "139")
+    assert hace_falta_recuperacion(ARTICULOS, "999")
+    print("✅ Artículo incompleto o ausente: rama vectorial en paralelo")
+
+
+def test_rangos():
+    assert not hace_falta_recuperacion(ARTICULOS, rango_articulos=(140, 142))  # Presentes y completos
+    assert hace_falta_recuperacion(ARTICULOS, rango_articulos=(138, 140))  # 139 incompleto
+    assert hace_falta_recuperacion(ARTICULOS, rango_articulos=(500, 510))  # Ninguno presente
+    print("✅ Predicción para rangos")
+
+
+def test_consulta_conceptual_no_especula():
+    assert not hace_falta_recuperacion(ARTICULOS)
+    print("✅ Sin artículo no hay rama exacta con la que solapar")
+
+
+def test_rama_aprovechada():
+    pool = ThreadPoolExecutor(max_workers=1)
+
+    def recuperar(query, cancelada=None):
+        time.sleep(0.05)
+        return {"query": query, "matches": [1, 2]}
+
+    rama = RamaEspeculativa(recuperar, "robo", pool=pool)
+    time.sleep(0.02)  # La búsqueda exacta se ejecuta mientras tanto
+    assert rama.resultado() == {"query": "robo", "matches": [1, 2]}
+    rama.cancelar()  # No-op: ya se usó
+    assert not rama.cancelada.is_set()
+    pool.shutdown()
+    print("✅ Resultado especulativo aprovechado")
+
+
+def test_ahorro_es_el_solape_con_la_busqueda_exacta():
+    """Se cuenta el tiempo de la búsqueda exacta (acotado por la rama), no la duración de la rama"""
+    pool = ThreadPoolExecutor(max_workers=1)
+
+    def recuperar(cancelada=None):
+        time.sleep(0.2)
+        return {}
+
+    antes = RamaEspeculativa.ahorro_total
+    rama = RamaEspeculativa(recuperar, pool=pool)
+    time.sleep(0.02)  # Búsqueda exacta mucho más corta que la rama
+    rama.resultado()
+    ahorro = RamaEspeculativa.ahorro_total - antes
+    pool.shutdown()
+
+    assert 0.015 < ahorro < 0.1
+    print(f"✅ Ahorro contabilizado: {ahorro * 1000:.1f} ms")
+
+
+def test_rama_cancelada_no_llega_a_los_pasos_caros():
+    pool = ThreadPoolExecutor(max_workers=1)
+    pasos = []
+    empezada = threading.Event()
+
+    def recuperar(cancelada=None):
+        pasos.append("estrategia")
+        empezada.set()
+        time.sleep(0.05)
+        if cancelada.is_set():
+            return None
+        pasos.append("busqueda_vectorial")
+        return {}
+
+    rama = RamaEspeculativa(recuperar, pool=pool)
+    empezada.wait()
+    canceladas_antes = RamaEspeculativa.estadisticas()["canceladas"]
+    rama.cancelar()
+    pool.shutdown(wait=True)
+
+    assert pasos == ["estrategia"]
+    assert RamaEspeculativa.estadisticas()["canceladas"] == canceladas_antes + 1
+    print("✅ Rama cancelada antes de la búsqueda vectorial")
+
+
+def test_errores_de_la_rama_se_propagan():
+    pool = ThreadPoolExecutor(max_workers=1)
+
+    def fallar(cancelada=None):
+        raise ConnectionError("Pinecone no disponible")
+
+    rama = RamaEspeculativa(fallar, pool=pool)
+    with pytest.raises(ConnectionError):
+        rama.resultado()
+    pool.shutdown()
+    print("✅ Error de la rama visible para la petición")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
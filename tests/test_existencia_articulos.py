@@ -0,0 +1,114 @@
+"""
+TESTS PARA LA EXISTENCIA DE ARTÍCULOS Y LA CACHÉ NEGATIVA
+Valida el conjunto de artículos válidos, las sugerencias de artículos cercanos
+y que la caché negativa se invalida al cambiar la versión del índice
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from existencia_articulos import ExistenciaArticulos, sugerencias_cercanas, clave_orden, inexistencia_segura
+
+
+ARTICULOS_CP = ['1', '2', '12', '12 bis', '138', '142', '142 bis', '639']
+
+
+class Fuente:
+    """Artículos y versión de un documento; cuenta cuántas veces se reconstruye el conjunto"""
+
+    def __init__(self, articulos):
+        self.articulos = list(articulos)
+        self.version = "v1"
+        self.lecturas = 0
+
+    def __call__(self, documento_id):
+        self.lecturas += 1
+        return self.articulos
+
+
+def test_clave_orden():
+    assert clave_orden("142 bis") < clave_orden("142 ter") < clave_orden("143")
+    assert clave_orden("12 quáter") == (12, 3)
+    assert clave_orden("abc") is None
+    print("✅ Orden de documento con sufijos latinos")
+
+
+def test_sugerencias_mismo_numero_primero():
+    assert sugerencias_cercanas("12 quater", ARTICULOS_CP) == ['2', '12', '12 bis']
+    assert sugerencias_cercanas("142 ter", ARTICULOS_CP) == ['138', '142', '142 bis']
+    assert sugerencias_cercanas("999", ARTICULOS_CP, n=1) == ['639']
+    print("✅ Sugerencias ordenadas por cercanía")
+
+
+def test_existe_y_no_existe():
+    fuente = Fuente(ARTICULOS_CP)
+    existencia = ExistenciaArticulos(fuente, lambda doc: fuente.version)
+
+    assert existencia.comprobar("cp", "142  BIS") is None
+    assert existencia.comprobar("cp", "142bis") is None and existencia.comprobar("cp", "142 BÍS") is None
+    sugerencias = existencia.comprobar("cp", "999")
+    assert sugerencias == ['142', '142 bis', '639']
+    assert fuente.lecturas == 1  # El conjunto se construye una vez por versión
+    print(f"✅ Artículo 999 inexistente, sugerencias: {sugerencias}")
+
+
+def test_solo_inexistencia_segura():
+    """Un hueco en la numeración puede ser un encabezado no detectado: no se afirma que no existe"""
+    assert inexistencia_segura("999", ARTICULOS_CP)  # Después del último artículo
+    assert inexistencia_segura("142 ter", ARTICULOS_CP)  # Sufijo ausente de un número que existe
+    assert not inexistencia_segura("500", ARTICULOS_CP)
+    assert not inexistencia_segura("13 bis", ARTICULOS_CP)  # Tampoco está el 13
+
+    existencia = ExistenciaArticulos(lambda doc: ARTICULOS_CP, lambda doc: "v1")
+    assert existencia.comprobar("cp", "500") is None
+    assert existencia.existe("cp", "500")  # Sigue por la búsqueda con regex y el RAG
+    assert not existencia.existe("cp", "999")
+    assert existencia.estadisticas()["dudosos"] == 1
+    print("✅ 'No existe' solo cuando es seguro; el resto vuelve al RAG")
+
+
+def test_cache_negativa():
+    fuente = Fuente(ARTICULOS_CP)
+    existencia = ExistenciaArticulos(fuente, lambda doc: fuente.version)
+
+    existencia.comprobar("cp", "12 quater")
+    existencia.comprobar("cp", "12 quater")
+    stats = existencia.estadisticas()
+    assert stats["inexistentes"] == 2
+    assert stats["aciertos_cache_negativa"] == 1
+    print("✅ Sugerencias servidas desde la caché negativa")
+
+
+def test_nueva_version_invalida_negativos():
+    fuente = Fuente(ARTICULOS_CP)
+    existencia = ExistenciaArticulos(fuente, lambda doc: fuente.version)
+    assert existencia.comprobar("cp", "12 ter") is not None
+
+    fuente.articulos.append('12 ter')  # Reindexado que añade el artículo
+    fuente.version = "v2"
+    assert existencia.comprobar("cp", "12 ter") is None
+    print("✅ El artículo nuevo deja de ser inexistente tras cambiar la versión")
+
+
+def test_cache_negativa_acotada():
+    existencia = ExistenciaArticulos(lambda doc: ARTICULOS_CP, lambda doc: "v1", max_negativos=2)
+    for numero in ("900", "901", "902"):
+        existencia.comprobar("cp", numero)
+    assert existencia.estadisticas()["cache_negativa"] == 2
+    print("✅ Caché negativa LRU limitada")
+
+
+def test_documento_sin_articulos_no_decide():
+    existencia = ExistenciaArticulos(lambda doc: [], lambda doc: "v1")
+    assert existencia.existe("lecrim", "999")
+    assert existencia.comprobar("lecrim", "999") is None
+    print("✅ Sin conjunto de artículos se sigue el flujo normal")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
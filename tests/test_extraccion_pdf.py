@@ -0,0 +1,86 @@
+"""
+TESTS PARA EXTRACCIÓN DE TEXTO DE PDF
+Valida el reparto de páginas, los offsets por página y la caché por hash del PDF
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from extraccion_pdf import (
+    rangos_paginas, unir_paginas, pagina_de_offset, anotar_paginas,
+    hash_pdf, ruta_cache, guardar_cache, cargar_cache, extraer_texto_pdf
+)
+
+
+def test_rangos_cubren_todas_las_paginas_en_orden():
+    """Los rangos son contiguos, ordenados y sin huecos"""
+    for num_paginas, num_rangos in [(1, 8), (17, 4), (640, 32), (10, 10)]:
+        rangos = rangos_paginas(num_paginas, num_rangos)
+        assert rangos[0][0] == 0 and rangos[-1][1] == num_paginas
+        assert all(a[1] == b[0] for a, b in zip(rangos, rangos[1:]))
+        assert len(rangos) <= num_rangos
+    print("✅ Rangos de páginas correctos")
+
+
+def test_offsets_por_pagina():
+    """Cada offset apunta exactamente al texto de su página en el texto unido"""
+    paginas = ["Artículo 138.\nEl que matare", "", "a otro será castigado"]
+    texto, offsets = unir_paginas(paginas)
+
+    assert texto == "\n".join(paginas)
+    for offset, pagina in zip(offsets, paginas):
+        assert texto[offset['char_start']:offset['char_end']] == pagina
+    assert [o['pagina'] for o in offsets] == [1, 2, 3]
+
+
+def test_pagina_de_offset_y_anotacion():
+    """Localiza la página de un carácter y anota la página de inicio de los chunks"""
+    texto, offsets = unir_paginas(["aaaa", "bbbb", "cccc"])
+    assert pagina_de_offset(offsets, 0) == 1
+    assert pagina_de_offset(offsets, texto.index("b")) == 2
+    assert pagina_de_offset(offsets, len(texto) - 1) == 3
+
+    chunks = anotar_paginas([{'char_start': texto.index("c")}, {'text': 'sin offsets'}], offsets)
+    assert chunks[0]['pagina'] == 3
+    assert 'pagina' not in chunks[1]
+
+
+def test_cache_por_hash_evita_extraccion(tmp_path):
+    """Con la caché del mismo PDF no se abre el PDF (ni hace falta PyPDF2)"""
+    pdf = tmp_path / "cp.pdf"
+    pdf.write_bytes(b"%PDF-1.4 contenido de prueba")
+    cache_dir = str(tmp_path / "cache")
+
+    digest = hash_pdf(str(pdf))
+    guardar_cache(ruta_cache(cache_dir, digest, "pypdf2"), ["pagina 1", "pagina 2"], digest, "pypdf2")
+
+    extraccion = extraer_texto_pdf(str(pdf), cache_dir=cache_dir)
+    assert extraccion['desde_cache'] is True
+    assert extraccion['texto'] == "pagina 1\npagina 2"
+    assert extraccion['num_paginas'] == 2
+    print(f"✅ Texto servido desde caché en {extraccion['duracion_s']}s")
+
+
+def test_cache_invalida_si_cambia_el_pdf(tmp_path):
+    """Un PDF distinto tiene otro hash y no reutiliza la caché"""
+    pdf = tmp_path / "cp.pdf"
+    pdf.write_bytes(b"version 1")
+    digest_v1 = hash_pdf(str(pdf))
+    pdf.write_bytes(b"version 2")
+
+    assert hash_pdf(str(pdf)) != digest_v1
+    assert cargar_cache(ruta_cache(str(tmp_path), hash_pdf(str(pdf)), "pypdf2")) is None
+
+
+def test_pdf_inexistente():
+    with pytest.raises(FileNotFoundError):
+        extraer_texto_pdf("no_existe.pdf", cache_dir=None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,122 @@
+"""
+TESTS PARA LA RECUPERACIÓN JERÁRQUICA (ÍNDICE DE ARTÍCULOS)
+Valida las entradas por artículo y por Título, la primera etapa de búsqueda
+y el filtro $in con el que se restringe la búsqueda de chunks
+"""
+
+import pytest
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from articulos_utils import filtro_articulos
+from indice_articulos import entradas_indice, construir_indice, articulos_candidatos, IndicesArticulos
+from indice_local import IndiceVectorialLocal
+from corpus import Documento
+
+
+TEXTO_CP = """LIBRO II
+Delitos y sus penas
+TÍTULO I
+Del homicidio y sus formas
+Artículo 138.
+1. El que matare a otro será castigado, como reo de homicidio, con la pena de prisión de diez a quince años.
+Artículo 142.
+1. El que por imprudencia grave causare la muerte de otro será castigado con prisión de uno a cuatro años.
+TÍTULO XIII
+De los delitos contra el patrimonio
+Artículo 234.
+1. El que, con ánimo de lucro, tomare las cosas muebles ajenas sin la voluntad de su dueño será castigado por hurto.
+Artículo 237.
+Son reos del delito de robo los que, con ánimo de lucro, se apoderaren de las cosas muebles ajenas empleando fuerza.
+"""
+
+DIMENSION = 64
+
+
+def embed_bolsa_de_palabras(textos):
+    """Embedding determinista: cada palabra suma en una dimensión (hash)"""
+    vectores = []
+    for texto in textos:
+        vector = np.zeros(DIMENSION, dtype=np.float32)
+        for palabra in texto.lower().split():
+            vector[zlib.crc32(palabra.strip('.,;:').encode()) % DIMENSION] += 1
+        vectores.append(vector.tolist())
+    return vectores
+
+
+def test_entradas_por_articulo():
+    ids, textos, metadatas = entradas_indice(TEXTO_CP)
+    assert ids == ['138', '142', '234', '237']
+    assert textos[0].startswith("TÍTULO I. Del homicidio y sus formas")
+    assert metadatas[2]['articulos'] == ['234']
+    print("✅ Un texto por artículo con su Título")
+
+
+def test_entradas_por_titulo():
+    ids, _, metadatas = entradas_indice(TEXTO_CP, nivel="titulo")
+    assert ids == ["TÍTULO I. Del homicidio y sus formas", "TÍTULO XIII. De los delitos contra el patrimonio"]
+    assert metadatas[1]['articulos'] == ['234', '237']
+    with pytest.raises(ValueError):
+        entradas_indice(TEXTO_CP, nivel="capitulo_suelto")
+    print("✅ Un texto por Título con sus artículos")
+
+
+def test_primera_etapa_elige_los_articulos_relevantes():
+    indice = construir_indice(TEXTO_CP, embed_bolsa_de_palabras, lote=3)
+    query = embed_bolsa_de_palabras(["robo con fuerza de cosas muebles ajenas"])[0]
+
+    etapa = articulos_candidatos(indice, query, top=2)
+
+    assert etapa['articulos'][0] == '237'
+    assert etapa['filtro'] == {"articulo": {"$in": etapa['articulos']}}
+    print(f"✅ Artículos ganadores: {etapa['articulos']}")
+
+
+def test_titulo_expande_a_sus_articulos():
+    indice = construir_indice(TEXTO_CP, embed_bolsa_de_palabras, nivel="titulo")
+    query = embed_bolsa_de_palabras(["delitos contra el patrimonio"])[0]
+
+    etapa = articulos_candidatos(indice, query, top=1)
+    assert etapa['articulos'] == ['234', '237']
+    print("✅ Un Título ganador aporta todos sus artículos")
+
+
+def test_dimension_incompatible():
+    indice = construir_indice(TEXTO_CP, embed_bolsa_de_palabras)
+    assert articulos_candidatos(indice, [0.1] * 8) is None
+    print("✅ Índice de otro modelo: se vuelve a la búsqueda plana")
+
+
+def test_filtro_in_en_el_indice_de_chunks():
+    chunks = IndiceVectorialLocal(
+        np.eye(3, dtype=np.float32), ["c1", "c2", "c3"],
+        [{'articulo': '138'}, {'articulo': '237'}, {'articulo': '142 bis'}]
+    )
+    resultado = chunks.buscar([1, 1, 1], top_k=3, filtro=filtro_articulos(['237', '142  bis']))
+    assert sorted(m['id'] for m in resultado['matches']) == ["c2", "c3"]
+    assert filtro_articulos([]) is None
+    print("✅ Chunks restringidos a los artículos ganadores")
+
+
+def test_indices_por_documento(tmp_path):
+    construir_indice(TEXTO_CP, embed_bolsa_de_palabras).guardar(str(tmp_path / "cp_articulos"))
+    indices = IndicesArticulos(lambda doc: doc.indice_articulos)
+
+    con_indice = Documento(id="cp", nombre="Código Penal", pdf_path="", indice_articulos=str(tmp_path / "cp_articulos"))
+    sin_indice = Documento(id="lecrim", nombre="LECrim", pdf_path="")
+
+    assert len(indices.obtener(con_indice)) == 4
+    assert indices.obtener(sin_indice) is None
+    assert indices.estadisticas() == {"cp": 4, "lecrim": None}
+    print("✅ Carga bajo demanda por documento")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
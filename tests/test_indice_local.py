@@ -0,0 +1,104 @@
+"""
+TESTS PARA EL ÍNDICE VECTORIAL LOCAL
+Valida los modos float32/int8/PQ, la re-ordenación de la shortlist, los filtros y la persistencia
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+np = pytest.importorskip("numpy")
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from indice_local import IndiceVectorialLocal, entrenar_pq, recall_at_k
+
+
+def _corpus(n=600, dim=64, grupos=20, semilla=0):
+    rng = np.random.default_rng(semilla)
+    centros = rng.normal(size=(grupos, dim)).astype(np.float32)
+    matriz = centros[rng.integers(grupos, size=n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    matriz /= np.linalg.norm(matriz, axis=1, keepdims=True)
+    ids = [f"cp-{i}" for i in range(n)]
+    metadatas = [{'articulo': str(100 + i % 50), 'text': f"chunk {i}"} for i in range(n)]
+    return matriz, ids, metadatas
+
+
+def _consultas(matriz, num=40, semilla=1):
+    rng = np.random.default_rng(semilla)
+    consultas = matriz[rng.integers(len(matriz), size=num)] + 0.3 * rng.normal(size=(num, matriz.shape[1]))
+    return consultas / np.linalg.norm(consultas, axis=1, keepdims=True)
+
+
+def _ids(indice, consultas, k=10, reordenar=True):
+    return [[m['id'] for m in indice.buscar(q, k, reordenar=reordenar)['matches']] for q in consultas]
+
+
+def test_float32_es_exacto():
+    """El modo float32 devuelve el producto escalar exacto en el formato de Pinecone"""
+    matriz, ids, metadatas = _corpus()
+    indice = IndiceVectorialLocal(matriz, ids, metadatas)
+    resultado = indice.buscar(matriz[7], top_k=3)
+
+    assert resultado['matches'][0]['id'] == "cp-7"
+    assert resultado['matches'][0]['score'] == pytest.approx(1.0, abs=1e-5)
+    assert resultado['matches'][0]['metadata']['text'] == "chunk 7"
+    scores = [m['score'] for m in resultado['matches']]
+    assert scores == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("modo,recall_minimo", [("int8", 0.95), ("pq", 0.9)])
+def test_recall_con_reordenacion(modo, recall_minimo):
+    """Con re-ordenación float32 de la shortlist el recall@10 es casi el del índice exacto"""
+    matriz, ids, metadatas = _corpus()
+    consultas = _consultas(matriz)
+    exactos = _ids(IndiceVectorialLocal(matriz, ids), consultas)
+
+    indice = IndiceVectorialLocal(matriz, ids, metadatas, modo=modo, pq_subespacios=8)
+    recall = recall_at_k(exactos, _ids(indice, consultas), 10)
+    assert recall >= recall_minimo
+    assert indice.codigos.nbytes <= matriz.nbytes / 4  # Los diccionarios de PQ son fijos, no crecen con n
+    print(f"✅ {modo}: recall@10 = {recall:.3f}, códigos de {indice.codigos.nbytes} bytes vs {matriz.nbytes}")
+
+
+def test_reordenacion_no_empeora_pq():
+    matriz, ids, _ = _corpus()
+    consultas = _consultas(matriz)
+    exactos = _ids(IndiceVectorialLocal(matriz, ids), consultas)
+    indice = IndiceVectorialLocal(matriz, ids, modo="pq", pq_subespacios=8)
+
+    assert recall_at_k(exactos, _ids(indice, consultas), 10) >= recall_at_k(exactos, _ids(indice, consultas, reordenar=False), 10)
+
+
+def test_filtro_de_articulo():
+    """Los filtros $eq de Pinecone se aplican antes de puntuar"""
+    matriz, ids, metadatas = _corpus()
+    indice = IndiceVectorialLocal(matriz, ids, metadatas, modo="int8")
+    matches = indice.buscar(matriz[0], top_k=5, filtro={"articulo": {"$eq": "123"}})['matches']
+
+    assert matches and all(m['metadata']['articulo'] == "123" for m in matches)
+    assert indice.buscar(matriz[0], top_k=5, filtro={"articulo": {"$eq": "999"}})['matches'] == []
+
+
+def test_pq_dimension_no_divisible():
+    with pytest.raises(ValueError):
+        entrenar_pq(np.zeros((10, 10), dtype=np.float32), subespacios=3)
+
+
+@pytest.mark.parametrize("modo", ["float32", "int8", "pq"])
+def test_guardar_y_cargar(tmp_path, modo):
+    """El índice guardado conserva modo, ids, metadata y resultados"""
+    matriz, ids, metadatas = _corpus(n=300)
+    indice = IndiceVectorialLocal(matriz, ids, metadatas, modo=modo, pq_subespacios=8)
+    indice.guardar(str(tmp_path))
+    cargado = IndiceVectorialLocal.cargar(str(tmp_path))
+
+    assert cargado.modo == modo
+    assert cargado.ids == ids
+    assert _ids(cargado, matriz[:5], 5) == _ids(indice, matriz[:5], 5)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
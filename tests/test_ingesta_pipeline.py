@@ -0,0 +1,144 @@
+"""
+TESTS PARA LA INGESTA CONCURRENTE DE EMBEDDINGS
+Valida el pool de workers, los lotes adaptativos, los reintentos y el checkpoint reanudable
+"""
+
+import pytest
+import sys
+import json
+import threading
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from ingesta_pipeline import PipelineEmbeddings, es_error_rate_limit
+
+
+def _chunks(n):
+    return [{"id": f"chunk_{i}", "text": f"texto del chunk {i}"} for i in range(n)]
+
+
+class FakeVectorStore:
+    """Simula Pinecone: guarda los vectores subidos"""
+
+    def __init__(self):
+        self.vectores = {}
+        self.lock = threading.Lock()
+
+    def upsert(self, vectores):
+        with self.lock:
+            for v in vectores:
+                self.vectores[v["id"]] = v
+
+
+def _embed(textos):
+    return [[float(len(t)), 1.0] for t in textos]
+
+
+def test_procesa_todos_los_chunks():
+    """Todos los chunks se embeben y suben, con resumen de throughput"""
+    store = FakeVectorStore()
+    pipeline = PipelineEmbeddings(_embed, store.upsert, max_workers=4, batch_inicial=2, batch_maximo=8)
+    resumen = pipeline.ejecutar(_chunks(50))
+
+    assert resumen["procesados"] == 50
+    assert resumen["fallidos"] == []
+    assert len(store.vectores) == 50
+    assert resumen["chunks_por_segundo"] > 0
+    assert resumen["batch_final"] == 8
+    print(f"✅ 50 chunks procesados ({resumen['chunks_por_segundo']} chunks/s)")
+
+
+def test_lote_respeta_limites():
+    """Ningún lote supera el máximo de textos ni de tokens"""
+    tamanos = []
+    chunks = [{"id": f"c{i}", "text": "x" * 400} for i in range(40)]  # ~101 tokens por chunk
+
+    def embed(textos):
+        tamanos.append(len(textos))
+        return _embed(textos)
+
+    pipeline = PipelineEmbeddings(embed, lambda v: None, max_workers=1, batch_inicial=64,
+                                  batch_maximo=64, tokens_maximos=500)
+    pipeline.ejecutar(chunks)
+    assert max(tamanos) <= 4
+
+
+def test_reintenta_rate_limit_y_reduce_lote():
+    """Un 429 reduce el tamaño de lote y el lote se reintenta"""
+    store = FakeVectorStore()
+    fallos = {"pendientes": 2}
+
+    def embed(textos):
+        if fallos["pendientes"] > 0:
+            fallos["pendientes"] -= 1
+            raise Exception("429 Resource exhausted: quota exceeded")
+        return _embed(textos)
+
+    pipeline = PipelineEmbeddings(embed, store.upsert, max_workers=1, batch_inicial=8,
+                                  batch_maximo=8, backoff_base=0.001)
+    resumen = pipeline.ejecutar(_chunks(20))
+
+    assert resumen["procesados"] == 20
+    assert resumen["rate_limits"] == 2
+    assert len(store.vectores) == 20
+    print("✅ Rate limit gestionado con backoff")
+
+
+def test_fallidos_no_se_pierden_y_se_reanudan(tmp_path):
+    """Los lotes que agotan reintentos se reportan; otra ejecución los reanuda desde el checkpoint"""
+    checkpoint = tmp_path / "checkpoint.json"
+    store = FakeVectorStore()
+
+    def embed_roto(textos):
+        if any("chunk 7" == t[-7:] for t in textos):
+            raise RuntimeError("error de red")
+        return _embed(textos)
+
+    pipeline = PipelineEmbeddings(embed_roto, store.upsert, max_workers=2, batch_inicial=1,
+                                  batch_maximo=1, max_reintentos=1, backoff_base=0.001,
+                                  checkpoint_path=str(checkpoint), checkpoint_clave="indice")
+    resumen = pipeline.ejecutar(_chunks(10))
+
+    assert resumen["fallidos"] == ["chunk_7"]
+    assert checkpoint.exists()
+    assert "chunk_7" not in json.loads(checkpoint.read_text())["completados"]
+
+    # Segunda ejecución: solo el chunk fallido
+    llamadas = []
+
+    def embed_ok(textos):
+        llamadas.extend(textos)
+        return _embed(textos)
+
+    pipeline = PipelineEmbeddings(embed_ok, store.upsert, checkpoint_path=str(checkpoint),
+                                  checkpoint_clave="indice")
+    resumen = pipeline.ejecutar(_chunks(10))
+
+    assert resumen["saltados_checkpoint"] == 9
+    assert llamadas == ["texto del chunk 7"]
+    assert len(store.vectores) == 10
+    assert not checkpoint.exists()
+    print("✅ Ingesta reanudada desde el checkpoint")
+
+
+def test_checkpoint_de_otro_indice_se_ignora(tmp_path):
+    """Un checkpoint con otra clave no salta chunks"""
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(json.dumps({"clave": "otro", "completados": ["chunk_0"]}))
+
+    pipeline = PipelineEmbeddings(_embed, lambda v: None, checkpoint_path=str(checkpoint),
+                                  checkpoint_clave="indice")
+    assert pipeline.ejecutar(_chunks(3))["saltados_checkpoint"] == 0
+
+
+def test_detecta_rate_limit():
+    assert es_error_rate_limit(Exception("429 Too Many Requests"))
+    assert es_error_rate_limit(Exception("Quota exceeded for aiplatform"))
+    assert not es_error_rate_limit(ValueError("dimensión incorrecta"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
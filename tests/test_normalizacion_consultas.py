@@ -0,0 +1,70 @@
+"""
+TESTS PARA LA NORMALIZACIÓN CANÓNICA DE CONSULTAS
+Valida que las variantes de una misma consulta (mayúsculas, tildes, espacios,
+"art."/"artículo") dan la misma forma canónica y las mismas claves de caché,
+y que el replay mide la mejora de aciertos
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from normalizacion_consultas import plegar, numero_canonico, normalizar_consulta, firma_consulta
+from cache_redis import clave_respuesta, clave_comparacion
+from corpus import clave_articulo
+from replay_claves_cache import replay
+
+VARIANTES_142 = ["Artículo 142", "art. 142", "ART 142 ", "articulo 142", "artículo   142", "Art.142", "¿artículo 142?"]
+
+
+def test_plegar_conserva_la_enie():
+    assert plegar("ÁRBOL Pingüino Año") == "arbol pinguino año"
+    assert plegar("Articulo") == plegar("Artículo") == plegar("ARTÍCULO")
+    print("✅ Minúsculas y sin tildes, la ñ se conserva")
+
+
+def test_variantes_de_referencia():
+    assert {normalizar_consulta(v) for v in VARIANTES_142} == {"articulo 142"}
+    assert normalizar_consulta("¿Qué dice el ART. 142 BIS?") == "que dice el articulo 142 bis"
+    assert normalizar_consulta("art.142bis") == "articulo 142 bis"
+    assert normalizar_consulta("arts 138 a 140") == "articulos 138 a 140"
+    assert normalizar_consulta("cartel 12") == "cartel 12"  # "art" solo como palabra
+    print("✅ Referencias a artículos reescritas en una única forma")
+
+
+def test_firma_ignora_relleno():
+    assert firma_consulta("El artículo 138 del Código Penal") == firma_consulta("artículo 138 código penal")
+    assert firma_consulta("robo con violencia") != firma_consulta("robo sin violencia")
+    assert firma_consulta("artículos 138 a 140") != firma_consulta("artículos 138 140")
+    print("✅ Firma sin artículos ni preposiciones de relleno, conservando las que cambian el sentido")
+
+
+def test_claves_de_cache_canonicas():
+    assert numero_canonico(" 142  BIS ") == "142 bis"
+    assert numero_canonico("142bis") == numero_canonico("142-BIS") == numero_canonico("142 bis") == "142 bis"
+    assert numero_canonico("12 quáter") == "12 quater"
+    assert normalizar_consulta("142BIS") == "142 bis"
+    assert clave_articulo("cp", "142 BIS") == clave_articulo("cp", "142 bis") == "articulo:cp:142 bis"
+    assert clave_respuesta("cp", "142  Bis") == clave_respuesta("cp", "142 bis")
+    assert clave_comparacion("cp", "v1", "138", "142 BIS") == clave_comparacion("cp", "v1", "138", "142 bis")
+    print("✅ Artículos, respuestas y comparaciones con número canónico (también '142bis')")
+
+
+def test_replay_mide_la_mejora():
+    consultas = VARIANTES_142 + ["¿Qué es el homicidio?", "que es el homicidio", "142 BIS", "142 bis"]
+    resultado = replay(consultas)
+    assert resultado["embeddings"]["anterior"]["aciertos"] == 0
+    assert resultado["embeddings"]["canonica"]["claves_distintas"] == 3
+    assert resultado["chat"]["canonica"]["tasa"] > resultado["chat"]["anterior"]["tasa"]
+    assert resultado["respuestas"]["canonica"]["claves_distintas"] == 2
+    assert replay(consultas, capacidad=1)["embeddings"]["canonica"]["aciertos"] == 8
+    print("✅ Replay: más aciertos con las claves canónicas en todas las capas")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
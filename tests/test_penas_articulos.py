@@ -0,0 +1,129 @@
+"""
+TESTS PARA LAS PENAS ESTRUCTURADAS
+Valida la extracción de penas por apartado con rangos en meses, el formato de
+la respuesta directa y la detección de preguntas que solo piden la pena
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from penas_articulos import (
+    extraer_penas, dividir_apartados, formatear_duracion, formatear_penas, es_pregunta_de_pena, IndicePenas,
+    penas_completas
+)
+
+
+ART_138 = """Artículo 138.
+1. El que matare a otro será castigado, como reo de homicidio, con la pena de prisión de diez a quince años.
+2. Los hechos serán castigados con la pena superior en grado en los siguientes casos:
+a) cuando concurra en su comisión alguna de las circunstancias del apartado 1 del artículo 140."""
+
+ART_142 = """Artículo 142.
+1. El que por imprudencia grave causare la muerte de otro, será castigado, como reo de homicidio imprudente, con la pena de prisión de uno a cuatro años.
+Si el homicidio imprudente se hubiera cometido por imprudencia profesional, se impondrá además la pena de inhabilitación especial para el ejercicio de la profesión, oficio o cargo por un período de tres a seis años.
+2. El que por imprudencia menos grave causare la muerte de otro, será castigado con la pena de multa de tres meses a dieciocho meses."""
+
+
+def test_apartados_consecutivos():
+    apartados = dividir_apartados(ART_142)
+    assert [a for a, _ in apartados] == ['1', '2']
+    assert dividir_apartados("Artículo 140 bis. Texto sin numerar.")[0][0] is None
+    print("✅ Apartados numerados detectados")
+
+
+def test_prision_en_meses():
+    penas = extraer_penas(ART_138)
+    assert penas[0] == {
+        'apartado': '1', 'tipo': 'prision', 'min_meses': 120, 'max_meses': 180,
+        'detalle': None, 'texto': 'prisión de diez a quince años'
+    }
+    assert [(p['apartado'], p['tipo']) for p in penas[1:]] == [('2', 'sin_extraer')]
+    print("✅ Prisión de diez a quince años -> 120-180 meses")
+
+
+def test_varias_penas_por_apartado():
+    penas = extraer_penas(ART_142)
+    assert [(p['apartado'], p['tipo'], p['min_meses'], p['max_meses']) for p in penas] == [
+        ('1', 'prision', 12, 48),
+        ('1', 'inhabilitacion', 36, 72),
+        ('2', 'multa', 3, 18),
+    ]
+    assert penas[1]['detalle'] == 'especial'
+    print("✅ Prisión, inhabilitación especial y multa por apartado")
+
+
+def test_unidad_compartida_y_permanente():
+    penas = extraer_penas("Será castigado con la pena de prisión de seis meses a dos años. "
+                          "Se impondrá la pena de prisión permanente revisable. Multa del tanto al triplo del perjuicio.")
+    assert [(p['tipo'], p['min_meses'], p['max_meses']) for p in penas] == [
+        ('prision', 6, 24), ('prision_permanente', None, None), ('multa_proporcional', None, None)
+    ]
+    print("✅ Unidades distintas, prisión permanente y multa proporcional")
+
+
+def test_duraciones_compuestas_y_numeros_altos():
+    penas = extraer_penas("Será castigado con la pena de prisión de dos años y seis meses a cinco años "
+                          "y multa de veintiséis a cincuenta meses. La pena de prisión de tres meses y un día "
+                          "a treinta y seis meses.")
+    assert [(p['tipo'], p['min_meses'], p['max_meses']) for p in penas] == [
+        ('prision', 30, 60), ('multa', 26, 50), ('prision', 3.03, 36)
+    ]
+    assert penas_completas(penas)
+    print("✅ 'X años y Y meses', veintiséis-cincuenta y 'treinta y seis'")
+
+
+def test_penas_relativas_sin_extraer():
+    """Los apartados con pena no estructurada quedan registrados y la respuesta directa no es completa"""
+    for texto in [
+        "1. El que matare a otro será castigado con la pena de prisión de diez a quince años. "
+        "2. Se impondrá la pena en su mitad superior cuando la víctima sea menor de dieciséis años.",
+        "Los que cometieren el delito serán castigados con la pena superior en grado a la señalada en el artículo 138.",
+        "Será castigado con la pena de prisión de la mitad a las tres cuartas partes de la del delito consumado.",
+    ]:
+        penas = extraer_penas(texto)
+        assert not penas_completas(penas), texto
+        assert penas[-1]['tipo'] == 'sin_extraer' and penas[-1]['texto']
+    assert penas_completas(extraer_penas(ART_142))
+    print("✅ 'Pena superior en grado', 'en su mitad superior' y rangos no reconocidos -> vuelven al RAG")
+
+
+def test_formato():
+    assert formatear_duracion(120) == "10 años"
+    assert formatear_duracion(18) == "1 año y 6 meses"
+    assert formatear_duracion(3) == "3 meses"
+    assert formatear_duracion(3.03) == "3 meses y 1 día"
+    assert formatear_duracion(24, en_anos=False) == "24 meses"
+    respuesta = formatear_penas('142', extraer_penas(ART_142))
+    assert "*Apartado 2:*" in respuesta
+    assert "- Multa de tres meses a dieciocho meses" in respuesta  # Literal, sin pasar a años
+    penas = extraer_penas("Prisión de tres meses y un día a un año y multa de doce a veinticuatro meses.")
+    assert "- Prisión de tres meses y un día a un año" in formatear_penas('1', penas)
+    assert "- Multa de doce a veinticuatro meses" in formatear_penas('1', penas)
+    print("✅ Respuesta en Markdown agrupada por apartado")
+
+
+def test_pregunta_de_pena():
+    assert es_pregunta_de_pena("¿Qué pena tiene el artículo 138?")
+    assert es_pregunta_de_pena("pena del artículo 234")
+    assert not es_pregunta_de_pena("artículo 138")
+    assert not es_pregunta_de_pena("¿qué pena tiene el 138 si hay alevosía?")
+    print("✅ Solo las preguntas puras de pena van a la respuesta directa")
+
+
+def test_indice_por_documento():
+    indice = IndicePenas(lambda doc: {'138': ART_138, '142 bis': "Artículo 142 bis. Sin penas."}, lambda doc: "v1")
+    indice.construir("cp")
+    assert indice.penas("cp", "138")[0]['max_meses'] == 180
+    assert indice.penas("cp", "142  BIS") == indice.penas("cp", "142bis") == []
+    assert indice.penas("cp", "999") is None
+    assert indice.estadisticas() == {"cp": {"articulos": 2, "con_pena": 1, "sin_extraer": 1}}
+    print("✅ Índice de penas por documento")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
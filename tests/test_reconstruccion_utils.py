@@ -0,0 +1,152 @@
+"""
+TESTS PARA RECONSTRUCCIÓN DE ARTÍCULOS
+Valida la unión lineal de fragmentos solapados y el cosido por offsets
+"""
+
+import pytest
+import random
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from reconstruccion_utils import (
+    MARCA_HUECO, longitud_solapamiento, solapamiento_kmp, unir_fragmentos, unir_por_offsets
+)
+
+
+def _solapamiento_ingenuo(previo, actual, maximo=200):
+    limite = min(maximo, len(previo), len(actual))
+    for i in range(limite, 0, -1):
+        if previo[-i:] == actual[:i]:
+            return i
+    return 0
+
+
+def test_solapamiento_basico():
+    """Detecta el sufijo/prefijo común"""
+    assert longitud_solapamiento("abcdef", "defxyz") == 3
+    assert solapamiento_kmp("abcdef", "defxyz") == 3
+    assert longitud_solapamiento("abc", "xyz") == 0
+    assert longitud_solapamiento("", "xyz") == 0
+    print("✅ Solapamiento básico correcto")
+
+
+def test_solapamiento_respeta_maximo():
+    """No considera solapamientos mayores que el máximo"""
+    assert longitud_solapamiento("xaaaa", "aaaay", maximo=2) == 2
+    assert solapamiento_kmp("xaaaa", "aaaay", maximo=2) == 2
+
+
+@pytest.mark.parametrize("alfabeto", ["ab", "abc", "el que matare a otro"])
+def test_equivalente_al_bucle_original(alfabeto):
+    """Mismos resultados que el bucle original en textos aleatorios (incluidos muy repetitivos)"""
+    random.seed(42)
+    for _ in range(300):
+        previo = "".join(random.choice(alfabeto) for _ in range(random.randint(0, 300)))
+        actual = "".join(random.choice(alfabeto) for _ in range(random.randint(0, 300)))
+        esperado = _solapamiento_ingenuo(previo, actual)
+        assert longitud_solapamiento(previo, actual) == esperado
+        assert solapamiento_kmp(previo, actual) == esperado
+    print(f"✅ Equivalencia con el algoritmo original (alfabeto: {alfabeto!r})")
+
+
+def test_unir_por_offsets_reconstruye_texto():
+    """El cosido por intervalos reproduce el texto original, aunque lleguen desordenados"""
+    texto = "".join(chr(97 + i % 26) for i in range(2500))
+    partes = []
+    for inicio in range(0, 2300, 700):
+        fin = min(inicio + 900, len(texto))
+        partes.append({'texto': texto[inicio:fin], 'char_start': inicio, 'char_end': fin})
+    random.shuffle(partes)
+
+    assert unir_por_offsets(partes) == texto[:max(p['char_end'] for p in partes)]
+    print("✅ Cosido por offsets exacto")
+
+
+def test_unir_fragmentos_sin_offsets():
+    """Sin offsets, elimina el overlap textual entre partes consecutivas"""
+    texto = "Artículo 179. Cuando la agresión sexual consista en acceso carnal por vía vaginal, anal o bucal"
+    partes = [
+        {'chunk_index': 1, 'texto': texto[40:]},
+        {'chunk_index': 0, 'texto': texto[:60]},
+    ]
+    assert unir_fragmentos(partes) == texto
+
+
+def test_unir_fragmentos_prefiere_offsets():
+    """Con offsets en todas las partes no se compara texto"""
+    partes = [
+        {'chunk_index': 0, 'texto': 'AAAAABBBBB', 'char_start': 0, 'char_end': 10},
+        {'chunk_index': 1, 'texto': 'BBBBBCCCCC', 'char_start': 5, 'char_end': 15},
+    ]
+    assert unir_fragmentos(partes) == 'AAAAABBBBBCCCCC'
+
+
+def test_unir_fragmentos_ordena_por_parte():
+    """Con metadata de ingesta manda `parte`, no chunk_index"""
+    partes = [
+        {'parte': 2, 'total_partes': 2, 'chunk_index': 0, 'texto': 'segunda mitad.'},
+        {'parte': 1, 'total_partes': 2, 'chunk_index': 7, 'texto': 'Primera mitad, '},
+    ]
+    assert unir_fragmentos(partes) == 'Primera mitad, segunda mitad.'
+
+
+def test_marca_hueco_entre_partes_no_contiguas():
+    """1/3 + 3/3 no se cosen como si fueran seguidas"""
+    partes = [
+        {'parte': 3, 'total_partes': 3, 'texto': 'final del artículo.'},
+        {'parte': 1, 'total_partes': 3, 'texto': 'Artículo 1. Inicio '},
+    ]
+    assert unir_fragmentos(partes) == 'Artículo 1. Inicio ' + MARCA_HUECO + 'final del artículo.'
+
+    con_offsets = [
+        {'texto': 'AAAAA', 'char_start': 0, 'char_end': 5},
+        {'texto': 'CCCCC', 'char_start': 10, 'char_end': 15},
+    ]
+    assert unir_por_offsets(con_offsets) == 'AAAAA' + MARCA_HUECO + 'CCCCC'
+    print("✅ Huecos marcados con [...]")
+
+
+@pytest.mark.performance
+def test_benchmark_30_chunks():
+    """La unión lineal no es más lenta que el bucle original en 30 chunks sin overlap"""
+    import time
+
+    random.seed(0)
+    palabras = "el que matare a otro será castigado con la pena de prisión".split()
+    partes = []
+    for i in range(30):
+        texto = " ".join(random.choice(palabras) for _ in range(150))
+        partes.append({'chunk_index': i, 'texto': texto})
+
+    def original(partes):
+        previo, salida = "", []
+        for p in partes:
+            actual = p['texto']
+            if previo:
+                actual = actual[_solapamiento_ingenuo(previo, actual):]
+            salida.append(actual)
+            previo = actual
+        return "".join(salida)
+
+    assert unir_fragmentos(partes) == original(partes)
+
+    inicio = time.perf_counter()
+    for _ in range(50):
+        original(partes)
+    t_original = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for _ in range(50):
+        unir_fragmentos(partes)
+    t_lineal = time.perf_counter() - inicio
+
+    print(f"✅ 30 chunks: original {t_original*20:.3f} ms, lineal {t_lineal*20:.3f} ms")
+    assert t_lineal < t_original * 1.5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
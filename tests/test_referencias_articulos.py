@@ -0,0 +1,94 @@
+"""
+TESTS PARA EL GRAFO DE REFERENCIAS ENTRE ARTÍCULOS
+Valida la extracción de referencias explícitas, rangos y relativas
+(anterior/siguiente), la exclusión de otras normas y los vecinos a un salto
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from referencias_articulos import (
+    extraer_referencias, construir_grafo, invertir_grafo, vecinos_a_un_salto, orden_documento, GrafosReferencias
+)
+
+
+ARTICULOS = {
+    '138': "Artículo 138. 1. El que matare a otro será castigado con la pena de prisión de diez a quince años.",
+    '139': "Artículo 139. Será castigado con la pena de prisión de quince a veinticinco años, como reo de asesinato, "
+           "el que matare a otro concurriendo alguna de las circunstancias siguientes, y con la pena del artículo anterior.",
+    '140': "Artículo 140. Las penas de los dos artículos anteriores se impondrán en su mitad superior.",
+    '140 bis': "Artículo 140 bis. A los condenados por la comisión de uno o más delitos comprendidos en los artículos 138 a 140 "
+               "se les podrá imponer una medida de libertad vigilada.",
+    '142': "Artículo 142. En los casos del artículo siguiente y del artículo 5 de la Ley Orgánica 5/2000.",
+    '143': "Artículo 143. El que induzca al suicidio de otro será castigado (arts. 138 y 142).",
+}
+
+
+def test_orden_documento():
+    assert orden_documento(['142', '140 bis', '138', '140']) == ['138', '140', '140 bis', '142']
+    print("✅ Orden de documento con sufijos")
+
+
+def test_referencia_explicita_y_lista():
+    orden = orden_documento(ARTICULOS)
+    assert extraer_referencias(ARTICULOS['143'], '143', orden) == ['138', '142']
+    print("✅ 'arts. 138 y 142' -> dos referencias")
+
+
+def test_rango():
+    orden = orden_documento(ARTICULOS)
+    assert extraer_referencias(ARTICULOS['140 bis'], '140 bis', orden) == ['138', '139', '140']
+    print("✅ 'artículos 138 a 140' expandido con los artículos existentes")
+
+
+def test_relativas():
+    orden = orden_documento(ARTICULOS)
+    assert extraer_referencias(ARTICULOS['139'], '139', orden) == ['138']
+    assert extraer_referencias(ARTICULOS['140'], '140', orden) == ['138', '139']
+    print("✅ 'artículo anterior' y 'dos artículos anteriores' resueltos")
+
+
+def test_siguiente_y_norma_externa():
+    orden = orden_documento(ARTICULOS)
+    assert extraer_referencias(ARTICULOS['142'], '142', orden) == ['143']  # El art. 5 es de otra ley
+    print("✅ 'artículo siguiente' resuelto; referencias a otras leyes ignoradas")
+
+
+def test_grafo_inverso_y_vecinos():
+    grafo = construir_grafo(ARTICULOS)
+    inverso = invertir_grafo(grafo)
+    assert inverso['138'] == ['139', '140', '140 bis', '143']
+
+    vecinos = vecinos_a_un_salto(grafo, ['143', '138'], maximo=5)
+    assert vecinos == {'142': '143'}  # 138 ya está entre las semillas
+    assert len(vecinos_a_un_salto(grafo, ['140 bis'], maximo=2)) == 2
+    print("✅ Vecinos a un salto que no están ya en el contexto")
+
+
+def test_grafo_por_version():
+    lecturas = []
+    version = {"cp": "v1"}
+
+    def articulos(doc_id):
+        lecturas.append(doc_id)
+        return ARTICULOS
+
+    grafos = GrafosReferencias(articulos, lambda doc_id: version[doc_id])
+    grafos.construir("cp")
+    assert grafos.referencias("cp", "140  BIS")["referencias"] == ['138', '139', '140']
+    assert grafos.referencias("cp", "999") is None
+    assert lecturas == ["cp"]
+
+    version["cp"] = "v2"
+    grafos.vecinos("cp", ['139'])
+    assert lecturas == ["cp", "cp"]
+    print("✅ Grafo reconstruido solo al cambiar la versión del índice")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
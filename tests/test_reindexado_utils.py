@@ -0,0 +1,158 @@
+"""
+TESTS PARA REINDEXADO INCREMENTAL
+Valida los ids direccionados por contenido, el diff contra el manifiesto y la invalidación de caché
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from reindexado_utils import (
+    asignar_ids_por_contenido, calcular_diferencias, guardar_manifiesto,
+    cargar_manifiesto, ruta_manifiesto, borrar_vectores, invalidar_caches,
+    actualizar_metadata_posicional
+)
+
+
+def _chunks(textos, articulos=None):
+    articulos = articulos or [None] * len(textos)
+    return [{'text': t, 'articulo': a} for t, a in zip(textos, articulos)]
+
+
+def test_ids_estables_ante_desplazamientos():
+    """Insertar un chunk al principio no cambia el id de los demás"""
+    antes = asignar_ids_por_contenido(_chunks(["Artículo 138.", "Artículo 139."]), "cp.pdf")
+    despues = asignar_ids_por_contenido(_chunks(["Preámbulo", "Artículo 138.", "Artículo 139."]), "cp.pdf")
+
+    assert [c['id'] for c in antes] == [c['id'] for c in despues[1:]]
+    assert antes[0]['id'].startswith("cp-pdf-")
+    print(f"✅ Ids estables: {antes[0]['id']}")
+
+
+def test_textos_duplicados_tienen_ids_distintos():
+    """Dos chunks con el mismo texto no colisionan"""
+    chunks = asignar_ids_por_contenido(_chunks(["igual", "igual"]), "cp.pdf")
+    assert chunks[0]['id'] != chunks[1]['id']
+
+
+def test_diferencias_contra_manifiesto(tmp_path):
+    """Solo se embeben los chunks nuevos; se borran los desaparecidos"""
+    ruta = ruta_manifiesto(str(tmp_path), "indice", "cp.pdf")
+    previos = asignar_ids_por_contenido(
+        _chunks(["Artículo 138. v1", "Artículo 139.", "Artículo 140."], ["138", "139", "140"]), "cp.pdf")
+    guardar_manifiesto(ruta, previos, "cp.pdf")
+
+    actuales = asignar_ids_por_contenido(
+        _chunks(["Artículo 138. v2", "Artículo 139.", "Artículo 140."], ["138", "139", "140"]), "cp.pdf")
+    diferencias = calcular_diferencias(actuales, cargar_manifiesto(ruta))
+
+    assert [c['text'] for c in diferencias['nuevos']] == ["Artículo 138. v2"]
+    assert diferencias['sin_cambios'] == 2
+    assert diferencias['obsoletos'] == [previos[0]['id']]
+    assert diferencias['articulos_afectados'] == ["138"]
+    print(f"✅ Diff: {len(diferencias['nuevos'])} nuevos, {len(diferencias['obsoletos'])} obsoletos")
+
+
+def test_desplazamiento_refresca_metadata_posicional(tmp_path):
+    """Un prefijo nuevo desplaza los offsets: los chunks iguales solo actualizan su metadata"""
+    def con_offsets(textos):
+        chunks, inicio = _chunks(textos), 0
+        for parte, chunk in enumerate(chunks, 1):
+            chunk.update(char_start=inicio, char_end=inicio + len(chunk['text']),
+                         parte=parte, total_partes=len(chunks))
+            inicio = chunk['char_end'] + 1
+        return asignar_ids_por_contenido(chunks, "cp.pdf")
+
+    ruta = ruta_manifiesto(str(tmp_path), "indice", "cp.pdf")
+    guardar_manifiesto(ruta, con_offsets(["Artículo 138.", "Artículo 139."]), "cp.pdf")
+    actuales = con_offsets(["Preámbulo", "Artículo 138.", "Artículo 139."])
+    diferencias = calcular_diferencias(actuales, cargar_manifiesto(ruta))
+
+    assert [c['text'] for c in diferencias['nuevos']] == ["Preámbulo"]
+    assert [c['char_start'] for c in diferencias['reposicionados']] == [10, 24]
+    assert diferencias['sin_cambios'] == 2
+
+    class IndiceFalso:
+        def __init__(self):
+            self.actualizaciones = []
+
+        def update(self, id, set_metadata, namespace=""):
+            self.actualizaciones.append((id, set_metadata, namespace))
+
+    indice = IndiceFalso()
+    assert actualizar_metadata_posicional(indice, diferencias['reposicionados'], "ns") == 2
+    assert indice.actualizaciones[0] == (
+        actuales[1]['id'], {'char_start': 10, 'char_end': 23, 'parte': 2, 'total_partes': 3}, "ns")
+
+    guardar_manifiesto(ruta, actuales, "cp.pdf")
+    assert calcular_diferencias(actuales, cargar_manifiesto(ruta))['reposicionados'] == []
+    print("✅ Offsets y partes refrescados sin re-embeber")
+
+
+def test_primera_ejecucion_sin_manifiesto(tmp_path):
+    """Sin manifiesto previo todos los chunks son nuevos"""
+    chunks = asignar_ids_por_contenido(_chunks(["a", "b"]), "cp.pdf")
+    assert cargar_manifiesto(str(tmp_path / "no_existe.json")) is None
+    diferencias = calcular_diferencias(chunks, None)
+    assert len(diferencias['nuevos']) == 2
+    assert diferencias['obsoletos'] == []
+
+
+def test_borrado_por_lotes():
+    """Los ids obsoletos se borran en lotes de como máximo 1000"""
+    class IndiceFalso:
+        def __init__(self):
+            self.llamadas = []
+
+        def delete(self, ids, namespace):
+            self.llamadas.append((len(ids), namespace))
+
+    indice = IndiceFalso()
+    assert borrar_vectores(indice, [f"id-{i}" for i in range(2500)], "lecrim") == 2500
+    assert indice.llamadas == [(1000, "lecrim"), (1000, "lecrim"), (500, "lecrim")]
+
+
+def test_invalidar_solo_articulos_afectados():
+    """Solo se borran de Redis las claves de los artículos afectados"""
+    class RedisFalso:
+        def __init__(self):
+            self.datos = {"articulo:cp:138": "x", "articulo:cp:139": "y", "articulo:lecrim:138": "z"}
+
+        def delete(self, *claves):
+            return sum(self.datos.pop(c, None) is not None for c in claves)
+
+        def zrem(self, clave, *miembros):
+            return 0
+
+    redis_falso = RedisFalso()
+    resultado = invalidar_caches(["138"], redis_falso, documento="cp")
+
+    assert resultado["redis"] == 1
+    assert list(redis_falso.datos) == ["articulo:cp:139", "articulo:lecrim:138"]
+
+
+
+def test_notificacion_a_la_api_con_clave_admin(monkeypatch):
+    """La notificación a /cache/invalidar envía la clave de operación"""
+    import io
+    import json
+    import urllib.request
+    peticiones = []
+
+    def urlopen_falso(peticion, timeout=None):
+        peticiones.append(peticion)
+        return io.BytesIO(json.dumps({"actualizados": ["138"]}).encode("utf-8"))
+
+    monkeypatch.setattr(urllib.request, "urlopen", urlopen_falso)
+    resultado = invalidar_caches(["138"], api_url="http://api/", documento="cp", clave_admin="secreta")
+
+    assert peticiones[0].full_url == "http://api/cache/invalidar"
+    assert peticiones[0].get_header("X-admin-key") == "secreta"
+    assert resultado["api"] == {"actualizados": ["138"]}
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
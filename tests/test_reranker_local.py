@@ -0,0 +1,85 @@
+"""
+TESTS PARA EL RE-RANKER LOCAL
+Valida la selección por puntuación, el presupuesto de tokens y la caché de
+pares con una función de puntuación falsa (sin descargar el cross-encoder)
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from reranker_local import RerankerLocal
+
+
+def match(texto, score=0.5):
+    return {'id': texto[:10], 'score': score, 'metadata': {'text': texto}}
+
+
+class PuntuacionFalsa:
+    """Relevancia = palabras de la consulta que aparecen en el texto; registra los pares inferidos"""
+
+    def __init__(self):
+        self.pares = []
+
+    def __call__(self, pares):
+        self.pares.extend(pares)
+        return [sum(palabra in texto for palabra in query.split()) for query, texto in pares]
+
+
+def test_ordena_por_relevancia_y_recorta_a_top_n():
+    reranker = RerankerLocal(puntuar_fn=PuntuacionFalsa())
+    matches = [match("hurto simple"), match("robo con violencia e intimidación"), match("robo con fuerza")]
+
+    seleccionados, stats = reranker.reordenar("robo con violencia", matches, top_n=2)
+
+    assert [m['metadata']['text'] for m in seleccionados] == ["robo con violencia e intimidación", "robo con fuerza"]
+    assert stats["fragmentos_entrada"] == 3
+    assert stats["fragmentos_salida"] == 2
+    assert stats["tokens_ahorrados"] > 0
+    print("✅ Top N por puntuación del cross-encoder")
+
+
+def test_presupuesto_de_tokens():
+    reranker = RerankerLocal(puntuar_fn=lambda pares: [len(texto) for _, texto in pares])
+    matches = [match("a" * 400), match("b" * 300), match("c" * 200)]  # ~100, 75 y 50 tokens
+
+    seleccionados, stats = reranker.reordenar("consulta", matches, top_n=10, presupuesto_tokens=160)
+
+    assert [m['metadata']['text'][0] for m in seleccionados] == ["a", "c"]
+    assert stats["tokens_salida"] <= 160
+    print("✅ Solo entran los fragmentos que caben en el presupuesto")
+
+
+def test_siempre_al_menos_un_fragmento():
+    reranker = RerankerLocal(puntuar_fn=lambda pares: [1.0] * len(pares))
+    seleccionados, _ = reranker.reordenar("consulta", [match("x" * 4000)], presupuesto_tokens=10)
+    assert len(seleccionados) == 1
+    print("✅ El mejor fragmento se conserva aunque supere el presupuesto")
+
+
+def test_cache_de_pares():
+    puntuacion = PuntuacionFalsa()
+    reranker = RerankerLocal(puntuar_fn=puntuacion)
+    matches = [match("robo con fuerza"), match("hurto")]
+
+    reranker.reordenar("robo", matches)
+    _, stats = reranker.reordenar("robo", matches + [match("estafa")])
+
+    assert len(puntuacion.pares) == 3  # Solo "estafa" se infiere en la segunda llamada
+    assert stats["aciertos_cache"] == 2
+    print("✅ Pares ya puntuados servidos desde la caché")
+
+
+def test_cache_acotada():
+    reranker = RerankerLocal(puntuar_fn=lambda pares: [0.0] * len(pares), tam_cache=2)
+    reranker.puntuar("q", ["a", "b", "c"])
+    assert len(reranker._cache) == 2
+    print("✅ Caché LRU limitada")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
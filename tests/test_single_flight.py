@@ -0,0 +1,232 @@
+"""
+TESTS PARA LA COALESCENCIA DE CONSULTAS (SINGLE-FLIGHT)
+Valida que las peticiones idénticas simultáneas comparten una sola ejecución,
+en el mismo proceso y entre workers con un Redis en memoria
+"""
+
+import pytest
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from single_flight import SingleFlight, clave_consulta
+
+
+class RedisCompartido:
+    """Subconjunto de Redis usado por SingleFlight (set NX/PX, get, delete, pipeline get+exists)"""
+
+    def __init__(self):
+        self.valores = {}
+        self._lock = threading.Lock()
+
+    def set(self, clave, valor, nx=False, px=None):
+        with self._lock:
+            if nx and clave in self.valores:
+                return None
+            self.valores[clave] = valor.encode("utf-8") if isinstance(valor, str) else valor
+            return True
+
+    def get(self, clave):
+        return self.valores.get(clave)
+
+    def exists(self, clave):
+        return int(clave in self.valores)
+
+    def delete(self, *claves):
+        with self._lock:
+            return sum(self.valores.pop(c, None) is not None for c in claves)
+
+    def eval(self, script, num_claves, clave, token):
+        """Solo el compare-and-delete de liberar_lock"""
+        with self._lock:
+            if self.valores.get(clave) == token.encode("utf-8"):
+                del self.valores[clave]
+                return 1
+            return 0
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.comandos = []
+
+            def get(self, clave):
+                self.comandos.append(lambda: redis.get(clave))
+
+            def exists(self, clave):
+                self.comandos.append(lambda: redis.exists(clave))
+
+            def execute(self):
+                return [comando() for comando in self.comandos]
+
+        return Pipeline()
+
+
+def funcion_lenta(contador, resultado, espera=0.1):
+    def ejecutar():
+        contador.append(1)
+        time.sleep(espera)
+        return resultado
+    return ejecutar
+
+
+def test_consultas_identicas_se_ejecutan_una_vez():
+    """10 peticiones iguales simultáneas -> 1 ejecución"""
+    sf = SingleFlight()
+    llamadas = []
+
+    async def escenario():
+        return await asyncio.gather(*[
+            sf.ejecutar("chat:abc", funcion_lenta(llamadas, {"respuesta": "Art. 138"}))
+            for _ in range(10)
+        ])
+
+    resultados = asyncio.run(escenario())
+    assert len(llamadas) == 1
+    assert all(r == {"respuesta": "Art. 138"} for r in resultados)
+    assert sf.estadisticas()["compartidas"] == 9
+    assert sf.estadisticas()["en_vuelo"] == 0
+    print("✅ Peticiones idénticas coalescidas")
+
+
+def test_claves_distintas_no_se_comparten():
+    sf = SingleFlight()
+    llamadas = []
+
+    async def escenario():
+        return await asyncio.gather(
+            sf.ejecutar("chat:a", funcion_lenta(llamadas, "a")),
+            sf.ejecutar("chat:b", funcion_lenta(llamadas, "b")),
+        )
+
+    assert asyncio.run(escenario()) == ["a", "b"]
+    assert len(llamadas) == 2
+    print("✅ Claves distintas se ejecutan por separado")
+
+
+def test_peticiones_posteriores_vuelven_a_ejecutar():
+    """El single-flight no es una caché: al terminar, la siguiente petición ejecuta de nuevo"""
+    sf = SingleFlight()
+    llamadas = []
+
+    async def escenario():
+        await sf.ejecutar("chat:a", funcion_lenta(llamadas, "a", 0))
+        await sf.ejecutar("chat:a", funcion_lenta(llamadas, "a", 0))
+
+    asyncio.run(escenario())
+    assert len(llamadas) == 2
+    print("✅ Sin retención de resultados tras terminar")
+
+
+def test_excepcion_llega_a_todas_las_peticiones():
+    sf = SingleFlight()
+
+    def fallar():
+        time.sleep(0.05)
+        raise RuntimeError("Gemini no disponible")
+
+    async def escenario():
+        return await asyncio.gather(*[sf.ejecutar("chat:x", fallar) for _ in range(3)], return_exceptions=True)
+
+    errores = asyncio.run(escenario())
+    assert all(isinstance(e, RuntimeError) for e in errores)
+    assert sf.estadisticas()["ejecuciones"] == 1
+    print("✅ El error se propaga a todas las peticiones en espera")
+
+
+def test_cada_peticion_recibe_su_copia():
+    sf = SingleFlight()
+
+    async def escenario():
+        return await asyncio.gather(*[
+            sf.ejecutar("chat:c", funcion_lenta([], {"fuentes": [{"articulo": "138"}]}))
+            for _ in range(2)
+        ])
+
+    primero, segundo = asyncio.run(escenario())
+    primero["fuentes"].append({"articulo": "139"})
+    assert len(segundo["fuentes"]) == 1
+    print("✅ Resultados independientes por petición")
+
+
+def test_resultado_compartido_entre_workers():
+    """Dos 'workers' (instancias distintas) con el mismo Redis: solo calcula el que tiene el lock"""
+    redis = RedisCompartido()
+    worker1 = SingleFlight(redis, intervalo=0.01)
+    worker2 = SingleFlight(redis, intervalo=0.01)
+    llamadas = []
+
+    async def escenario():
+        return await asyncio.gather(
+            worker1.ejecutar("comparar:cp:138:142", funcion_lenta(llamadas, {"comparacion": "..."}, 0.2)),
+            worker2.ejecutar("comparar:cp:138:142", funcion_lenta(llamadas, {"comparacion": "..."}, 0.2)),
+        )
+
+    resultados = asyncio.run(escenario())
+    assert len(llamadas) == 1
+    assert resultados[0] == resultados[1] == {"comparacion": "..."}
+    assert worker1.compartidas_redis + worker2.compartidas_redis == 1
+    assert not any(c.startswith("singleflight:lock:") for c in redis.valores)
+    print("✅ Resultado compartido entre workers vía Redis")
+
+
+def test_worker_calcula_si_el_lider_falla():
+    """Si el worker con el lock falla, el que espera calcula por su cuenta"""
+    redis = RedisCompartido()
+    lider = SingleFlight(redis, intervalo=0.01)
+    seguidor = SingleFlight(redis, intervalo=0.01)
+
+    def fallar():
+        time.sleep(0.1)
+        raise RuntimeError("timeout")
+
+    async def escenario():
+        tarea_lider = asyncio.ensure_future(lider.ejecutar("chat:k", fallar))
+        await asyncio.sleep(0.02)
+        resultado = await seguidor.ejecutar("chat:k", lambda: "calculado por el seguidor")
+        with pytest.raises(RuntimeError):
+            await tarea_lider
+        return resultado
+
+    assert asyncio.run(escenario()) == "calculado por el seguidor"
+    print("✅ Respaldo local si el líder no publica resultado")
+
+
+def test_lider_no_libera_el_lock_ajeno():
+    """Si el lock del líder caduca y otro worker lo toma, el líder no se lo borra al terminar"""
+    redis = RedisCompartido()
+    lider = SingleFlight(redis, intervalo=0.01)
+    clave_lock = "singleflight:lock:chat:k"
+
+    def calcular():
+        redis.valores[clave_lock] = b"otro-worker"  # Nuestro lock caducó y otro lo tomó
+        return "ok"
+
+    assert asyncio.run(lider.ejecutar("chat:k", calcular)) == "ok"
+    assert redis.valores[clave_lock] == b"otro-worker"
+    print("✅ El lock de otro worker se conserva")
+
+
+def test_clave_consulta_normaliza_la_pregunta():
+    assert clave_consulta("¿Qué dice el artículo 138?", "cp") == clave_consulta("  qué dice el   Artículo 138 ", "cp")
+    assert clave_consulta("Artículo 142", "cp") == clave_consulta("ART. 142", "cp") == clave_consulta("el articulo 142", "cp")
+    assert clave_consulta("artículo 138", "cp") != clave_consulta("artículo 138", "lecrim")
+    print("✅ Clave normalizada y separada por documento")
+
+
+def test_clave_consulta_depende_del_historial():
+    historial = [{"role": "user", "content": "Háblame del homicidio"}]
+    assert clave_consulta("¿y la pena?", "cp", historial) != clave_consulta("¿y la pena?", "cp")
+    assert clave_consulta("¿y la pena?", "cp", historial) == clave_consulta("¿y la pena?", "cp", list(historial))
+    print("✅ La conversación previa forma parte de la clave")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,107 @@
+"""
+TESTS PARA LAS SUGERENCIAS (TYPEAHEAD)
+Valida la extracción de epígrafes, la búsqueda por prefijo sin tildes (también
+por palabras interiores del encabezado), el orden de resultados y la
+reconstrucción del índice al cambiar la versión del documento
+"""
+
+import pytest
+import sys
+import time
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from articulos_utils import extraer_epigrafes
+from sugerencias import normalizar, construir_indice_sugerencias, IndicesSugerencias
+
+
+TEXTO = """LIBRO II
+Delitos y sus penas
+TÍTULO I
+Del homicidio y sus formas
+Artículo 138. Homicidio.
+1. El que matare a otro será castigado como reo de homicidio.
+Artículo 139.
+1. Será castigado como reo de asesinato.
+TÍTULO XIII
+De los delitos contra el patrimonio y contra el orden socioeconómico
+CAPÍTULO II
+De los robos
+Artículo 237.
+Son reos del delito de robo los que se apoderaren de las cosas muebles ajenas.
+CAPÍTULO VII
+De las frustraciones de la ejecución
+Artículo 257.
+1. Será castigado con las penas de prisión de uno a cuatro años.
+"""
+
+
+def test_normalizar():
+    assert normalizar("TÍTULO I. Del Homicidio") == "titulo i del homicidio"
+    assert normalizar("  Daños  ") == "danos"  # "danos" también encuentra "Daños"
+    print("✅ Sin tildes, mayúsculas ni puntuación")
+
+
+def test_epigrafes():
+    entradas = extraer_epigrafes(TEXTO)
+    titulo = next(e for e in entradas if e['etiqueta'].startswith("TÍTULO I."))
+    assert titulo['tipo'] == 'titulo'
+    assert titulo['articulos'] == ['138', '139']
+    assert {'tipo': 'articulo', 'etiqueta': "Artículo 138. Homicidio.", 'articulos': ['138']} in entradas
+    assert not any(e['etiqueta'].startswith("Artículo 139") for e in entradas)  # Sin epígrafe propio
+    print("✅ Libro/Título/Capítulo con sus artículos y epígrafes de artículo")
+
+
+def test_prefijo_sin_tildes():
+    indice = construir_indice_sugerencias(TEXTO, ['138', '139', '237', '257'])
+    resultados = indice.buscar("HOMIC")
+    assert [r['etiqueta'] for r in resultados] == ["Artículo 138. Homicidio.", "TÍTULO I. Del homicidio y sus formas"]
+    assert resultados[0]['consulta'] == "artículo 138"
+    assert indice.buscar("socioeconomico")[0]['articulos'] == ['237', '257']
+    print("✅ Prefijo sin tildes, también en palabras interiores del encabezado")
+
+
+def test_numero_y_orden():
+    indice = construir_indice_sugerencias(TEXTO, ['13', '138', '139', '237', '257'])
+    assert [r['articulos'][0] for r in indice.buscar("13")] == ['13', '138', '139']
+    assert indice.buscar("robos")[0]['etiqueta'] == "CAPÍTULO II. De los robos"
+    assert indice.buscar("d") == []  # Prefijo demasiado corto
+    assert len(indice.buscar("de", limite=2)) == 2
+    print("✅ Números de artículo, coincidencia inicial primero y límite")
+
+
+def test_latencia():
+    indice = construir_indice_sugerencias(TEXTO * 50, [str(n) for n in range(1, 700)])
+    inicio = time.perf_counter()
+    for _ in range(1000):
+        indice.buscar("del")
+    assert (time.perf_counter() - inicio) / 1000 < 0.001
+    print("✅ Búsqueda por tecla por debajo del milisegundo")
+
+
+def test_indice_por_version():
+    lecturas = []
+    version = {"cp": "v1"}
+
+    def texto(doc_id):
+        lecturas.append(doc_id)
+        return TEXTO
+
+    indices = IndicesSugerencias(texto, lambda doc_id: ['138', '139'], lambda doc_id: version[doc_id])
+    indices.construir("cp")
+    assert indices.buscar("cp", "asesin") == []
+    assert indices.buscar("cp", "139")[0]['etiqueta'] == "Artículo 139"
+    assert lecturas == ["cp"]
+
+    version["cp"] = "v2"
+    indices.buscar("cp", "homicidio")
+    assert lecturas == ["cp", "cp"]
+    assert "cp" in indices.estadisticas()
+    print("✅ Índice reconstruido solo al cambiar la versión del documento")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
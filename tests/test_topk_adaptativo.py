@@ -0,0 +1,96 @@
+"""
+TESTS PARA EL TOP-K ADAPTATIVO
+Valida la detección del codo en la distribución de scores y que la búsqueda
+solo se amplía cuando la cola sigue siendo relevante
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Añadir directorio backend-api al path
+backend_path = Path(__file__).parent.parent / "backend-api"
+sys.path.insert(0, str(backend_path))
+
+from topk_adaptativo import detectar_codo, recuperar_adaptativo, EstadisticasTopK
+
+
+class IndiceFalso:
+    """buscar(k) sobre una lista fija de scores; registra los k pedidos"""
+
+    def __init__(self, scores):
+        self.scores = sorted(scores, reverse=True)
+        self.peticiones = []
+
+    def __call__(self, k):
+        self.peticiones.append(k)
+        return {'matches': [{'id': f"chunk_{i}", 'score': s} for i, s in enumerate(self.scores[:k])]}
+
+
+def test_codo_claro():
+    assert detectar_codo([0.82, 0.80, 0.79, 0.55, 0.54]) == 3
+    print("✅ Codo detectado tras el salto de score")
+
+
+def test_caida_gradual_sin_codo():
+    assert detectar_codo([0.80, 0.78, 0.76, 0.74, 0.72, 0.70]) is None
+    assert detectar_codo([0.9, 0.5]) is None  # Muy pocos resultados
+    print("✅ Sin codo en distribuciones graduales")
+
+
+def test_cola_bajo_umbral_no_amplia():
+    indice = IndiceFalso([0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2, 0.1] + [0.05] * 30)
+    results, stats = recuperar_adaptativo(indice, umbral=0.45, top_k_max=30, k_inicial=8)
+
+    assert indice.peticiones == [8]
+    assert [m['score'] for m in results['matches']] == [0.8, 0.7, 0.6, 0.5]
+    assert stats["motivo"] == "umbral"
+    assert stats["recuperados"] == 8
+    print("✅ Una sola ronda cuando la cola ya no es relevante")
+
+
+def test_cola_relevante_amplia_hasta_el_maximo():
+    indice = IndiceFalso([0.9 - i * 0.01 for i in range(40)])
+    results, stats = recuperar_adaptativo(indice, umbral=0.45, top_k_max=30, k_inicial=8)
+
+    assert indice.peticiones == [8, 16, 30]
+    assert len(results['matches']) == 30
+    assert stats["motivo"] == "maximo"
+    assert stats["rondas"] == 3
+    print("✅ Ampliación x2 mientras todo supera el umbral")
+
+
+def test_codo_detiene_la_ampliacion():
+    indice = IndiceFalso([0.85, 0.84, 0.83, 0.60, 0.59, 0.58, 0.57, 0.56] + [0.55] * 30)
+    results, stats = recuperar_adaptativo(indice, umbral=0.45, top_k_max=30, k_inicial=8)
+
+    assert indice.peticiones == [8]
+    assert len(results['matches']) == 8  # Todos los relevantes: el umbral y el reranker recortan
+    assert stats["motivo"] == "codo"
+    assert stats["codo"] == 3
+    print("✅ El codo evita ampliar sin descartar resultados relevantes")
+
+
+def test_indice_agotado():
+    indice = IndiceFalso([0.9, 0.8, 0.7])
+    _, stats = recuperar_adaptativo(indice, umbral=0.45, top_k_max=30, k_inicial=8)
+    assert indice.peticiones == [8]
+    assert stats["motivo"] == "agotado"
+    print("✅ Sin más resultados no se repite la búsqueda")
+
+
+def test_estadisticas_por_estrategia():
+    estadisticas = EstadisticasTopK()
+    estadisticas.registrar("estandar", {"rondas": 1, "recuperados": 8, "devueltos": 4, "motivo": "umbral"}, 20)
+    estadisticas.registrar("estandar", {"rondas": 2, "recuperados": 24, "devueltos": 16, "motivo": "maximo"}, 20)
+
+    resumen = estadisticas.resumen()["estandar"]
+    assert resumen["consultas"] == 2
+    assert resumen["recuperados_media"] == 16.0
+    assert resumen["recuperados_con_top_k_fijo"] == 20.0
+    assert resumen["motivos"] == {"umbral": 1, "maximo": 1}
+    print("✅ Volumen recuperado frente a top_k fijo por estrategia")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])